@@ -1,14 +1,18 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import scipy.stats as stats
 from pathlib import Path
 
+# Motor de intervalos de confianza del paquete analysis de interciclo (requirements.txt)
+from analysis.ci import batch_ci, error_bars
+
 # ===========================
 # CONFIGURACIÓN
 # ===========================
 CSV_DIR = Path("./output/data")  # Carpeta donde están los CSVs
 OUTPUT_PLOT = "psnr_bars.png"  # Archivo de salida de la gráfica
+CONFIANZA = 0.95
+METODO_IC = "t"                 # "t", "normal", "bootstrap" o "block" (frames autocorrelacionados)
 
 # ===========================
 # LEER CSVs
@@ -18,8 +22,7 @@ if not csv_files:
     raise ValueError(f"No se encontraron CSV en {CSV_DIR}")
 
 video_names = []
-means = []
-ci95 = []
+psnrY = []
 
 for csv_file in csv_files:
     df = pd.read_csv(csv_file, names=["frame", "psnry", "psnru", "psnrv"])
@@ -27,17 +30,12 @@ for csv_file in csv_files:
     psnrU_values = df["psnru"].values
     psnrV_values = df["psnrv"].values
 
-    # Media
-    mean_psnr = np.mean(psnrY_values)
     name = csv_file.stem.replace("_psnr", "").split(".")[0]
     video_names.append(name)  # solo el nombre base
+    psnrY.append(psnrY_values)
 
-    # Intervalo de confianza 95%
-    n = len(psnrY_values)
-    sem = stats.sem(psnrY_values)  # error estándar de la media
-    h = sem * stats.t.ppf((1 + 0.95) / 2, n-1)  # intervalo t-student
-    means.append(mean_psnr)
-    ci95.append(h)
+# Media e intervalo de confianza 95% de todos los videos en una llamada
+ic = batch_ci(psnrY, method=METODO_IC, confidence=CONFIANZA)
 
 # ===========================
 # ORDENAR POR BITRATE ASCENDENTE
@@ -54,14 +52,15 @@ for name in video_names:
 sorted_idx = np.argsort(bitrates)
 
 video_names = [video_names[i] for i in sorted_idx]
-means       = [means[i]       for i in sorted_idx]
-ci95        = [ci95[i]        for i in sorted_idx]
+means       = ic["mean"][sorted_idx]
+ci95        = ic["half"][sorted_idx]
+yerr        = error_bars(ic)[:, sorted_idx]
 
 # ===========================
 # GRAFICA DE BARRAS
 # ===========================
 plt.figure(figsize=(10,6))
-bars = plt.bar(video_names, means, yerr=ci95, capsize=5, color='skyblue')
+bars = plt.bar(video_names, means, yerr=yerr, capsize=5, color='skyblue')
 plt.ylabel("PSNR (dB)")
 plt.xlabel("Video")
 plt.title("PSNR promedio con IC 95% por video")
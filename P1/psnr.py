@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# Motor Y4M/PSNR del paquete analysis de interciclo (requirements.txt)
+from analysis.y4m import psnr_frames, write_csv, write_stats
+
+# ===========================
+# CONFIGURACIÓN
+# ===========================
+INPUT_DIR = "./videos"        # Carpeta con los videos a comparar
+OUTPUT_DIR = "./psnr"         # Carpeta donde se guardarán los CSV
+ORIGIN = "mobile_cif"         # Nombre base del video original (sin extensión)
+JOBS = os.cpu_count() or 1    # Procesos entre los que se reparten las tandas de frames
+
+
+# ===========================
+# PSNR DE TODOS LOS VIDEOS FRENTE AL ORIGINAL
+# ===========================
+def compare_all(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, origin=ORIGIN, jobs=JOBS, log=True):
+    """
+    Escribe <video>.y4m_psnr.csv (n,psnr_y,psnr_u,psnr_v por frame) y, con
+    log, el registro <video>.y4m_psnr.log con el formato de ffmpeg, para
+    cada .y4m de input_dir salvo el original
+    """
+    original = Path(input_dir) / f"{origin}.y4m"
+    if not original.is_file():
+        print(f"[!] No se encontró el video original: {original}")
+        return 1
+
+    print(f"[+] Directorio de entrada: {input_dir}")
+    print(f"[+] Directorio de salida:  {output_dir}")
+    print(f"[+] Video original:        {original}")
+    print()
+    os.makedirs(output_dir, exist_ok=True)
+
+    for video in sorted(Path(input_dir).glob("*.y4m")):
+        if video.name == original.name:
+            continue
+        print(f"[→] Procesando: {video.name}")
+
+        result = psnr_frames(str(original), str(video), jobs=jobs)
+        csv_file = Path(output_dir) / f"{video.name}_psnr.csv"
+        write_csv(csv_file, result)
+        if log:
+            write_stats(Path(output_dir) / f"{video.name}_psnr.log", result)
+
+        print(f"    ✓ Guardado: {csv_file}")
+
+    print()
+    print(f"[✓] Proceso completado. Archivos CSV en: {output_dir}")
+    return 0
+
+
+# ===========================
+# MAIN
+# ===========================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="PSNR por frame (Y, U, V) de cada video .y4m frente al original, "
+                    "con el mismo CSV que ffmpeg -lavfi psnr + sed")
+    parser.add_argument("input_dir", nargs="?", default=INPUT_DIR)
+    parser.add_argument("output_dir", nargs="?", default=OUTPUT_DIR)
+    parser.add_argument("origin", nargs="?", default=ORIGIN,
+                        help="Nombre base del video original (sin extensión)")
+    parser.add_argument("--jobs", "-j", type=int, default=JOBS,
+                        help="Procesos para las tandas de frames (1 = en serie)")
+    parser.add_argument("--no-log", action="store_true",
+                        help="No escribir el registro por frame con formato de ffmpeg (.log)")
+    args = parser.parse_args()
+
+    sys.exit(compare_all(args.input_dir, args.output_dir, args.origin,
+                         jobs=max(1, args.jobs), log=not args.no_log))
@@ -5,101 +5,29 @@ Script para analizar y visualizar PSNR de diferentes configuraciones de video
 
 import os
 import sys
-import glob
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from pathlib import Path
 
-# Configuración de matplotlib
-plt.style.use('seaborn-v0_8-darkgrid')
-plt.rcParams['figure.figsize'] = (14, 8)
-plt.rcParams['font.size'] = 11
-
-
-def extract_psnr_from_file(filepath):
-    """
-    Extrae valores de PSNR desde el archivo generado por psnr_video.sh
-    
-    El formato es:
-    psnr: 300 frames (CPU: 0 s) mean: 15.37 stdv: 4.33
-    valor1
-    valor2
-    ...
-    """
-    try:
-        with open(filepath, 'r') as f:
-            lines = f.readlines()
-        
-        if not lines:
-            print(f"  [-] Archivo vacío: {filepath}")
-            return None
-        
-        # Primera línea contiene el resumen
-        header = lines[0].strip()
-        
-        # Extraer mean del header
-        if 'mean:' in header:
-            mean_str = header.split('mean:')[1].split()[0]
-            mean_psnr = float(mean_str)
-            return mean_psnr
-        else:
-            print(f"  [-] Formato inválido en: {filepath}")
-            return None
-            
-    except Exception as e:
-        print(f"  [-] Error al procesar {filepath}: {e}")
-        return None
-
-
-def collect_psnr_data(videos_dir):
-    """
-    Recorre la carpeta videos/ y recopila datos PSNR de cada configuración
-    """
-    configs = {}
-    
-    # Buscar todas las subcarpetas en videos/
-    config_dirs = sorted([d for d in Path(videos_dir).iterdir() if d.is_dir()])
-    
-    if not config_dirs:
-        print(f"[-] No se encontraron directorios en {videos_dir}")
-        return None
-    
-    print(f"[+] Analizando {len(config_dirs)} configuración(es)...\n")
-    
-    for config_dir in config_dirs:
-        config_name = config_dir.name
-        print(f"[*] Procesando: {config_name}")
-        
-        # Buscar archivo PSNR en esta carpeta
-        psnr_files = list(config_dir.glob('psnr_*.txt'))
-        
-        if not psnr_files:
-            print(f"  [-] No se encontró archivo PSNR en {config_name}")
-            continue
-        
-        psnr_file = psnr_files[0]  # Tomar el primero si hay múltiples
-        print(f"  [*] Archivo: {psnr_file.name}")
-        
-        # Extraer PSNR
-        mean_psnr = extract_psnr_from_file(psnr_file)
-        
-        if mean_psnr is not None:
-            configs[config_name] = mean_psnr
-            print(f"  [+] PSNR Mean: {mean_psnr:.2f} dB")
-        
-        print()
-    
-    if not configs:
-        print("[-] No se recopilaron datos PSNR")
-        return None
-    
-    return configs
+# Lectura de los resúmenes PSNR e instrumentación por etapas del paquete
+# analysis de interciclo (requirements.txt)
+from analysis import profiling
+from analysis.y4m import collect_psnr
 
 
 def create_bar_chart(configs, output_file='psnr_comparison.png'):
     """
     Crea un gráfico de barras comparativo con los datos PSNR
     """
+    # matplotlib se importa solo al dibujar (los resúmenes no lo necesitan)
+    with profiling.stage('import_matplotlib'):
+        import matplotlib.pyplot as plt
+        from matplotlib.patches import Patch
+
+    # Configuración de matplotlib
+    plt.style.use('seaborn-v0_8-darkgrid')
+    plt.rcParams['figure.figsize'] = (14, 8)
+    plt.rcParams['font.size'] = 11
+
     # Ordenar por valor PSNR descendente
     sorted_configs = sorted(configs.items(), key=lambda x: x[1], reverse=True)
     names = [item[0] for item in sorted_configs]
@@ -134,7 +62,6 @@ def create_bar_chart(configs, output_file='psnr_comparison.png'):
     ax.grid(axis='y', alpha=0.3)
     
     # Leyenda
-    from matplotlib.patches import Patch
     legend_elements = [
         Patch(facecolor='#FF6B6B', edgecolor='black', label='QP (Calidad)'),
         Patch(facecolor='#4ECDC4', edgecolor='black', label='Bitrate (kbps)')
@@ -145,7 +72,8 @@ def create_bar_chart(configs, output_file='psnr_comparison.png'):
     plt.tight_layout()
     
     # Guardar figura
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    with profiling.stage('savefig'):
+        plt.savefig(output_file, dpi=300, bbox_inches='tight')
     print(f"[+] Gráfico guardado: {output_file}")
     
     # Mostrar figura
@@ -184,11 +112,13 @@ def main():
     """
     Función principal
     """
-    # Determinar directorio de videos
-    if len(sys.argv) > 1:
-        videos_dir = sys.argv[1]
-    else:
-        videos_dir = './videos'
+    parser = argparse.ArgumentParser(description='Comparativa de PSNR por configuración')
+    parser.add_argument('videos_dir', nargs='?', default='./videos',
+                        help='Directorio con una subcarpeta por configuración')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.setup(args)
+    videos_dir = args.videos_dir
     
     # Validar que la carpeta existe
     if not os.path.isdir(videos_dir):
@@ -201,7 +131,7 @@ def main():
     print()
     
     # Recopilar datos PSNR
-    configs = collect_psnr_data(videos_dir)
+    configs = collect_psnr(videos_dir)
     
     if not configs:
         print("[-] No se pudieron recopilar datos PSNR")
@@ -212,9 +142,11 @@ def main():
     
     # Crear gráfico de barras
     output_file = os.path.join(videos_dir, '../psnr_comparison.png')
-    create_bar_chart(configs, output_file)
+    with profiling.stage('bar_chart', items=len(configs)):
+        create_bar_chart(configs, output_file)
     
     print("[+] ¡Análisis completado!")
+    profiling.report()
 
 
 if __name__ == '__main__':
@@ -1,58 +1,52 @@
 #!/usr/bin/env python3
-import sys
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from scapy.all import rdpcap, UDP
+
+from analysis.pcap_reader import read_udp_packets, filter_port, has_payload_offsets
+from analysis.merge import expand_captures, read_merged
+from analysis.metrics import compute_throughput, rfc3550_jitter
+from analysis.pyramid import ThroughputPyramid
+from analysis.matching import match_nearest, neighbour_diffs, match_fingerprints, choose_match
+from analysis.clock import estimate_clock, correct_timestamps, check_nearest_clock
+from analysis.frames import (extract_frames, sender_order, match_frames, format_frame_summary,
+                             FRAME_TYPES)
+from analysis.report import figure_task, output_figures, FORMATS
+from analysis.decimate import decimate, DEFAULT_POINTS, METHODS
+from analysis.peers import peer_matrix, format_peers
+from analysis import profiling
 
 
 # ---------------------------------------------------------------
-# CARGA PCAP Y EXTRAE TIMESTAMPS Y TAMAÑOS DE PAQUETES UDP
+# CARGA PCAP Y EXTRAE TIMESTAMPS, TAMAÑOS Y HUELLAS DE PAQUETES UDP
+# (archivo pcap/pcapng, directorio o glob: varias capturas se mezclan
+#  por timestamp y llevan la columna "file")
 # ---------------------------------------------------------------
-def load_pcap(filename):
-    packets = rdpcap(filename)
-    timestamps = []
-    sizes = []
-
-    for p in packets:
-        if UDP in p:
-            timestamps.append(float(p.time))
-            sizes.append(len(p))
-
-    return np.array(timestamps), np.array(sizes)
+def load_pcap(spec):
+    files = expand_captures(spec)
+    if len(files) == 1:
+        return read_udp_packets(files[0])
+    print(f"  {len(files)} archivos mezclados por timestamp")
+    return read_merged(files)
 
 
 # ---------------------------------------------------------------
 # ESTIMAR OFFSET ENTRE RELOJES (A → B)
 # ---------------------------------------------------------------
-def estimate_offset(tsA, tsB, max_delay=1.0):
+def estimate_offset(tsA, tsB, fpA=None, fpB=None, max_delay=1.0):
     """
     Busca para cada timestamp en A un timestamp cercano en B,
     calcula diferencias B - A y toma la mediana como offset.
 
+    Si se pasan las huellas de payload se usan los pares exactos.
     max_delay: filtra diferencias imposibles (ej. >1 s)
     """
     print("Estimando offset entre relojes...")
 
-    diffs = []
-
-    j = 0
-    for t in tsA:
-        # avanzar en B hasta estar "cerca"
-        while j < len(tsB) - 1 and tsB[j] < t:
-            j += 1
-
-        candidates = []
-        if j > 0:
-            candidates.append(tsB[j - 1])
-        candidates.append(tsB[j])
-
-        for c in candidates:
-            diffs.append(c - t)
-
-    diffs = np.array(diffs)
-
-    # filtrar valores imposibles
-    diffs = diffs[np.abs(diffs) < max_delay]
+    if fpA is not None and fpB is not None:
+        diffs = match_fingerprints(fpA, tsA, fpB, tsB)["delay"]
+    else:
+        # vecinos anterior y siguiente en B, filtrando valores imposibles
+        diffs = neighbour_diffs(tsA, tsB, max_gap=max_delay)
 
     if len(diffs) == 0:
         print("⚠ No se pudo estimar offset. Se usará 0.")
@@ -65,47 +59,204 @@ def estimate_offset(tsA, tsB, max_delay=1.0):
 
 
 # ---------------------------------------------------------------
-# CALCULA THROUGHPUT EN VENTANAS DE 1 SEGUNDO
+# ESTIMAR OFFSET Y DERIVA ENTRE RELOJES (A → B)
 # ---------------------------------------------------------------
-def compute_throughput(timestamps, sizes, window=1.0):
-    if len(timestamps) == 0:
-        return np.array([]), np.array([])
+def estimate_drift(tsA, tsB, fpA=None, fpB=None, max_delay=1.0):
+    """
+    Ajusta offset y deriva lineal del reloj de B sobre la envolvente
+    inferior de (tB - tA) de los pares emparejados.
 
-    start = timestamps[0]
-    end = timestamps[-1]
+    Si se pasan las huellas de payload se usan los pares exactos; si no,
+    el vecino más cercano en B (|B - A| <= max_delay).
+    """
+    print("Estimando offset y deriva entre relojes...")
 
-    bins = np.arange(start, end, window)
-    throughput = []
+    if fpA is not None and fpB is not None:
+        res = match_fingerprints(fpA, tsA, fpB, tsB)
+        idxA, diffs = res["idxA"], res["delay"]
+    else:
+        idxA, _, diffs = match_nearest(tsA, tsB, max_gap=max_delay)
 
-    for i in range(len(bins)-1):
-        t0 = bins[i]
-        t1 = bins[i+1]
-        mask = (timestamps >= t0) & (timestamps < t1)
-        total_bytes = sizes[mask].sum()
-        throughput.append(total_bytes * 8 / window)  # bits/s
+    clock = estimate_clock(tsA[idxA], diffs)
+    if clock is None:
+        print("⚠ No se pudo estimar el reloj. No se corregirá B.")
+        return None
 
-    return bins[:-1], np.array(throughput)
+    print(f"✔ Offset estimado: {clock['offset']:.6f} segundos")
+    print(f"✔ Deriva estimada: {clock['skew_ppm']:.3f} ppm")
+
+    return clock
+
+
+# ---------------------------------------------------------------
+# FIGURAS
+# ---------------------------------------------------------------
+def draw_delay(fig, ax, t, delays_ms, title, method="minmax", max_points=DEFAULT_POINTS):
+    ax.plot(*decimate(t, delays_ms, max_points, method))
+    ax.set_title(title)
+    ax.set_xlabel("Tiempo (s)")
+    ax.set_ylabel("Delay (ms)")
+    ax.grid()
+
+
+def draw_frames(fig, ax, t, delay_ms, completion_ms, size, types):
+    """Delay y tiempo de completado por frame, y tamaño por tipo de frame"""
+    fig.suptitle("Frames H.264")
+    ax[0].plot(t, delay_ms, ".", markersize=2, label="Delay (primer paquete)")
+    ax[0].plot(t, completion_ms, ".", markersize=2, label="Completado (último paquete)")
+    ax[0].set_ylabel("ms")
+    ax[0].grid()
+    ax[0].legend()
+
+    for code in np.unique(types):
+        m = types == code
+        ax[1].plot(t[m], size[m] / 1e3, ".", markersize=3, label=FRAME_TYPES[code])
+    ax[1].set_xlabel("Tiempo (s)")
+    ax[1].set_ylabel("Tamaño (kB)")
+    ax[1].grid()
+    ax[1].legend()
+    fig.tight_layout()
+
+
+def draw_matrix(fig, ax, hosts, matrix, title, fmt):
+    """Mapa de calor emisor (filas) → receptor (columnas)"""
+    image = ax.imshow(np.ma.masked_invalid(matrix), cmap="viridis")
+    fig.colorbar(image, ax=ax)
+    for (i, j), value in np.ndenumerate(matrix):
+        if not np.isnan(value):
+            ax.text(j, i, format(value, fmt), ha="center", va="center", color="w")
+    ax.set_xticks(range(len(hosts)))
+    ax.set_xticklabels(hosts, rotation=30)
+    ax.set_yticks(range(len(hosts)))
+    ax.set_yticklabels(hosts)
+    ax.set_xlabel("Receptor")
+    ax.set_ylabel("Emisor")
+    ax.set_title(title)
+    fig.tight_layout()
+
+
+def draw_peer_delays(fig, ax, series, method="minmax", max_points=DEFAULT_POINTS):
+    for label, t, delays_ms in series:
+        ax.plot(*decimate(t, delays_ms, max_points, method), label=label)
+    ax.set_title("Delay por paquete (ms), relojes corregidos conjuntamente")
+    ax.set_xlabel("Tiempo (s)")
+    ax.set_ylabel("Delay (ms)")
+    ax.grid()
+    ax.legend()
+
+
+def draw_throughput(fig, ax, pyramids, labels, windows=(1.0,), flows=None):
+    """
+    Throughput de cada sentido, un eje por tamaño de ventana
+
+    Los datos salen de las pirámides de throughput: en modo interactivo,
+    al hacer zoom cada eje se recalcula con la ventana más fina que deja
+    como mucho pyramid.MAX_BINS puntos en el tramo visible (sin bajar de
+    la resolución base ni subir de la ventana del eje). Las ventanas
+    pedidas que la pirámide no reproduce (ver matches_throughput) se
+    calculan con compute_throughput sobre `flows`, [(ts, tamaños), ...].
+    """
+    axes = np.atleast_1d(ax)
+    flows = flows or [None] * len(pyramids)
+    views = []
+    for axis, window in zip(axes, windows):
+        lines = []
+        for pyr, flow, label in zip(pyramids, flows, labels):
+            if flow is None or pyr.matches_throughput(window):
+                t, thr = pyr.throughput(window)
+            else:
+                t, thr = compute_throughput(*flow, window)
+            lines.append(axis.plot(t, thr / 1e6, label=f"{label} (Mbps)")[0])
+        axis.set_title(f"Throughput (Mbps), ventanas de {window:g} s")
+        axis.set_xlabel("Tiempo (s)")
+        axis.set_ylabel("Mbps")
+        axis.grid()
+        axis.legend()
+        if axis is not axes[0]:
+            axis.sharex(axes[0])
+        views.append((axis, window, lines))
+    fig.tight_layout()
+
+    import matplotlib
+    if matplotlib.get_backend().lower() == "agg":
+        return
+
+    def refine(_):
+        lo, hi = axes[0].get_xlim()
+        for axis, window, lines in views:
+            res = min([window] + [pyr.resolution_for(lo, hi) for pyr in pyramids
+                                  if pyr.start is not None])
+            for line, pyr in zip(lines, pyramids):
+                t, thr = pyr.throughput(res, start=lo - res, end=hi + res)
+                line.set_data(t, thr / 1e6)
+            axis.set_title(f"Throughput (Mbps), ventanas de {res:g} s")
+        fig.canvas.draw_idle()
+
+    axes[0].callbacks.connect("xlim_changed", refine)
 
 
 # ---------------------------------------------------------------
 # PROCESO PRINCIPAL
 # ---------------------------------------------------------------
-def analyze(pcapA, pcapB):
+def analyze(pcapA, pcapB, match=None, clock="drift", port=None,
+            report_dir=None, formats=("png",), jobs=1,
+            decimation="minmax", max_points=DEFAULT_POINTS, frames=False, windows=(1.0,)):
+    """
+    match: "nearest" empareja cada paquete de A con el timestamp más
+           cercano de B; "payload" usa la huella del payload UDP y da
+           el delay exacto por paquete, la pérdida y el reordenamiento;
+           None = payload si las huellas emparejan (choose_match)
+    clock: "offset" resta la mediana de las diferencias (offset fijo);
+           "drift" ajusta offset y deriva lineal, y el delay queda
+           referido al mínimo observado
+    port: filtrar ambas capturas por puerto
+    report_dir: si se indica, las figuras se guardan ahí (sin ventanas)
+    decimation: "minmax", "lttb" o "none" para el delay por paquete
+    frames: reensamblar los frames H.264 del flujo MPEG-TS y calcular el
+            delay y el tiempo de completado por frame
+    windows: ventanas del throughput (s), un eje por ventana; todas salen
+             de una pirámide de throughput por sentido
+    """
     print("Cargando PCAP A...")
-    tsA, sizeA = load_pcap(pcapA)
+    packetsA = load_pcap(pcapA)
+    if port is not None:
+        packetsA = filter_port(packetsA, port)
+    tsA, sizeA, fpA = packetsA["ts"], packetsA["size"], packetsA["fp"]
 
     print("Cargando PCAP B...")
-    tsB, sizeB = load_pcap(pcapB)
+    packetsB = load_pcap(pcapB)
+    if port is not None:
+        packetsB = filter_port(packetsB, port)
+    tsB, sizeB, fpB = packetsB["ts"], packetsB["size"], packetsB["fp"]
 
     if len(tsA) == 0 or len(tsB) == 0:
         print("ERROR: Uno de los pcaps no tiene paquetes UDP.")
         return
+    if match is None:
+        match = choose_match(packetsA, packetsB)
+        print(f"Emparejamiento: {match}")
 
-    # ------ 1) Estimar offset ------
-    offset = estimate_offset(tsA, tsB)
-
+    # ------ 1) Estimar offset (y deriva) ------
     # ------ 2) Corregir reloj de B ------
-    tsB_corr = tsB - offset
+    if clock == "drift":
+        if match == "payload":
+            clk = estimate_drift(tsA, tsB, fpA, fpB)
+        else:
+            clk = estimate_drift(tsA, tsB)
+        tsB_corr = correct_timestamps(tsB, clk)
+    else:
+        if match == "payload":
+            offset = estimate_offset(tsA, tsB, fpA, fpB)
+        else:
+            offset = estimate_offset(tsA, tsB)
+        tsB_corr = tsB - offset
+    if match == "nearest":
+        # Con offsets mayores que la separación entre paquetes los vecinos son otros datagramas
+        fit = clk if clock == "drift" else {"offset": offset}
+        warning = fit and check_nearest_clock(fit["offset"], tsA, sizeA, tsB, sizeB,
+                                              fit.get("skew", 0.0), fit.get("t_ref"))
+        if warning:
+            print(f"⚠ {warning}")
 
     # ------ 3) Normalización conjunta ------
     t0 = min(tsA[0], tsB_corr[0])
@@ -113,59 +264,180 @@ def analyze(pcapA, pcapB):
     tsB_norm = tsB_corr - t0
 
     # ------ 4) Calcular delays ------
-    delays = []
-
-    j = 0
-    for tA in tsA_norm:
-        while j < len(tsB_norm) - 1 and tsB_norm[j] < tA:
-            j += 1
-
-        candidates = []
-        if j > 0:
-            candidates.append(tsB_norm[j - 1])
-        candidates.append(tsB_norm[j])
-
-        best = min(candidates, key=lambda x: abs(x - tA))
-        delays.append(best - tA)
-
-    delays = np.array(delays)
-
-    # ------ 5) Filtrar delays imposibles ------
-    delays = delays[np.abs(delays) < 1.0]  # 1 segundo max
+    if match == "payload":
+        # Mismo datagrama en ambas capturas (huella del payload)
+        res = match_fingerprints(fpA, tsA_norm, fpB, tsB_norm)
+        idxA, delays = res["idxA"], res["delay"]
+        print(f"✔ Paquetes emparejados: {res['received']} de {res['sent']}")
+        print(f"  Pérdida: {res['lost']} ({res['loss_rate'] * 100:.2f} %)")
+        print(f"  Reordenados: {res['reordered']}  Duplicados: {res['duplicates']}"
+              f"  Ambiguos: {res['ambiguous']}")
+    else:
+        # Vecino más cercano en B, filtrando delays imposibles (1 segundo max)
+        idxA, _, delays = match_nearest(tsA_norm, tsB_norm, max_gap=1.0)
     print(f"✔ Delays válidos: {len(delays)}")
-
-    # ------ 6) Throughput ------
-    tA, thrA = compute_throughput(tsA_norm, sizeA)
-    tB, thrB = compute_throughput(tsB_norm, sizeB)
+    if len(delays) > 1:
+        # D(i-1, i) = diferencia de tránsito entre paquetes consecutivos
+        jitter = rfc3550_jitter(np.diff(delays))
+        print(f"✔ Jitter RFC 3550: {jitter[-1] * 1000:.3f} ms")
+
+    # ------ 6) Throughput (una pirámide por sentido: cualquier ventana) ------
+    pyramids = [ThroughputPyramid.from_packets(tsA_norm, sizeA),
+                ThroughputPyramid.from_packets(tsB_norm, sizeB)]
+    # Los paquetes solo viajan a la figura si alguna ventana no sale de la pirámide
+    flows = None
+    if not all(pyr.matches_throughput(w) for pyr in pyramids for w in windows):
+        flows = [(tsA_norm, sizeA), (tsB_norm, sizeB)]
 
     # ---------------------------------------------------
     # GRÁFICAS
     # ---------------------------------------------------
-    plt.figure(figsize=(12, 6))
-    plt.plot(tsA_norm[:len(delays)], delays * 1000)
-    plt.title("Delay aproximado (ms)")
-    plt.xlabel("Tiempo (s)")
-    plt.ylabel("Delay (ms)")
-    plt.grid()
+    title = "Delay por paquete (ms)" if match == "payload" else "Delay aproximado (ms)"
+    figures = [
+        figure_task("delay", draw_delay, tsA_norm[idxA], delays * 1000, title,
+                    decimation, max_points),
+        figure_task("throughput", draw_throughput, pyramids, ["A → B", "B → A"], windows, flows,
+                    nrows=len(windows), figsize=(12, 4 + 2 * len(windows))),
+    ]
+
+    # ------ 7) Frames H.264 (mismo reloj corregido) ------
+    if frames and ("file" in packetsA or "file" in packetsB):
+        print("Frames H.264: se necesita una sola captura por extremo (se omite)")
+    elif frames and not (has_payload_offsets(packetsA) and has_payload_offsets(packetsB)):
+        print("Frames H.264: se necesita el lector nativo pcap/pcapng (captura leída con "
+              "scapy, se omite)")
+    elif frames:
+        framesA = extract_frames(expand_captures(pcapA)[0], packetsA, times=tsA_norm)
+        # B se reensambla en el orden de envío (huellas): el reordenamiento no parte frames
+        framesB = extract_frames(expand_captures(pcapB)[0], packetsB, times=tsB_norm,
+                                 order=sender_order(packetsA, packetsB))
+        fm = match_frames(framesA, framesB)
+        if framesB["reordered"]:
+            print(f"Frames de B reensamblados en el orden del emisor "
+                  f"({framesB['reordered']} datagramas llegaron desordenados)")
+        print(format_frame_summary(framesA, fm))
+
+        ok = fm["complete"]
+        iA = fm["idxA"][ok]
+        figures.append(figure_task(
+            "frames", draw_frames, framesA["t_first"][iA], fm["delay"][ok] * 1000,
+            fm["completion"][ok] * 1000, framesA["size"][iA], framesA["type"][iA],
+            nrows=2, figsize=(12, 8)))
+
+    output_figures(figures, report_dir, formats=formats, jobs=jobs)
 
-    plt.figure(figsize=(12, 6))
-    plt.plot(tA, thrA / 1e6, label="A → B (Mbps)")
-    plt.plot(tB, thrB / 1e6, label="B → A (Mbps)")
-    plt.title("Throughput (Mbps)")
-    plt.xlabel("Tiempo (s)")
-    plt.ylabel("Mbps")
-    plt.grid()
-    plt.legend()
 
-    plt.show()
+# ---------------------------------------------------------------
+# VARIAS CAPTURAS: RELOJES CONJUNTOS Y MATRIZ EMISOR → RECEPTOR
+# ---------------------------------------------------------------
+def analyze_peers(specs, hosts=None, port=None, match="payload", reference=0,
+                  report_dir=None, formats=("png",), jobs=1,
+                  decimation="minmax", max_points=DEFAULT_POINTS):
+    """
+    Una captura por equipo (cada una de su propia interfaz). Cada captura
+    se lee una sola vez; los offsets y derivas de todos los relojes se
+    estiman a la vez (mínimos cuadrados sobre los pares, analysis/peers.py)
+    y se calcula delay, jitter, pérdida y throughput de cada sentido.
+
+    hosts: IPv4 de cada equipo en el orden de las capturas (None = la
+           dirección más frecuente de cada captura, ver peers.own_addresses)
+    port: filtrar por puerto antes de clasificar los flujos
+    reference: índice de la captura cuyo reloj se toma como referencia
+    """
+    captures = []
+    for k, spec in enumerate(specs):
+        print(f"Cargando captura {k} ({spec})...")
+        packets = load_pcap(spec)
+        captures.append(packets if port is None else filter_port(packets, port))
+        if len(captures[-1]["ts"]) == 0:
+            print(f"ERROR: La captura {spec} no tiene paquetes UDP.")
+            return
+
+    print("Estimando relojes de todas las capturas...")
+    try:
+        result = peer_matrix(captures, hosts=hosts, match=match, reference=reference)
+    except ValueError as exc:
+        print(f"ERROR: {exc}")
+        return
+    print(format_peers(result))
+
+    names = [f"{k}:{h}" for k, h in enumerate(result["hosts"])]
+    t0 = result["t_ref"]
+    series = [(f"{names[i]} → {names[j]}", t - t0, delays * 1000)
+              for (i, j), (t, delays) in sorted(result["delays"].items())]
+
+    m = result["matrix"]
+    figures = [
+        figure_task("peers_delay", draw_matrix, names, m["delay_ms"], "Delay mediano (ms)", ".2f"),
+        figure_task("peers_loss", draw_matrix, names, m["loss_rate"] * 100, "Pérdida (%)", ".2f"),
+        figure_task("peers_throughput", draw_matrix, names, m["throughput_mbps"],
+                    "Throughput recibido (Mbps)", ".2f"),
+        figure_task("peers_delay_series", draw_peer_delays, series, decimation, max_points),
+    ]
+    output_figures(figures, report_dir, formats=formats, jobs=jobs)
+    return result
 
 
 # ---------------------------------------------------------------
 # MAIN
 # ---------------------------------------------------------------
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Uso: python3 analyze_v2.py <pcap_emisor> <pcap_receptor>")
-        sys.exit(1)
-
-    analyze(sys.argv[1], sys.argv[2])
+    parser = argparse.ArgumentParser(
+        description="Delay y throughput entre dos capturas, o entre N capturas "
+                    "(una por equipo) con relojes estimados conjuntamente")
+    parser.add_argument("capturas", nargs="+",
+                        help="Capturas (archivo, directorio o glob entre comillas): "
+                             "emisor y receptor, o una por equipo")
+    parser.add_argument("--peers", action="store_true",
+                        help="Modo de N capturas también con dos (automático con tres o más)")
+    parser.add_argument("--hosts", nargs="+", metavar="IP",
+                        help="IPv4 de cada equipo, en el orden de las capturas (modo N capturas)")
+    parser.add_argument("--reference", type=int, default=0,
+                        help="Captura de reloj de referencia (modo N capturas)")
+    parser.add_argument("--port", type=int,
+                        help="Filtrar las capturas por puerto")
+    parser.add_argument("--match", choices=["nearest", "payload"],
+                        help="Emparejamiento de paquetes: timestamp más cercano o huella del "
+                             "payload (por defecto payload; con dos capturas, nearest si las "
+                             "huellas no emparejan)")
+    parser.add_argument("--clock", choices=["offset", "drift"], default="drift",
+                        help="Corrección del reloj de B: offset fijo o offset + deriva lineal")
+    parser.add_argument("--frames", action="store_true",
+                        help="Delay y tiempo de completado por frame H.264 (MPEG-TS)")
+    parser.add_argument("--windows", type=float, nargs="+", default=[1.0], metavar="S",
+                        help="Ventanas del throughput, un eje por ventana (p. ej. 1 0.1 0.01; "
+                             "múltiplos de 1 ms); en modo interactivo el zoom afina la ventana")
+    parser.add_argument("--report", metavar="DIR",
+                        help="Guardar las figuras en DIR sin abrir ventanas (backend Agg)")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["png"],
+                        dest="formats", help="Formatos de las figuras en modo reporte")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Procesos de dibujo en modo reporte")
+    parser.add_argument("--decimate", choices=METHODS, default="minmax",
+                        help="Decimación de las series por paquete (none = todas las muestras)")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS,
+                        help="Puntos por serie tras la decimación")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    multi = args.peers or len(args.capturas) > 2
+    if len(args.capturas) < 2:
+        parser.error("se necesitan al menos dos capturas")
+    if args.hosts and len(args.hosts) != len(args.capturas):
+        parser.error("--hosts necesita una IP por captura")
+    if not 0 <= args.reference < len(args.capturas):
+        parser.error("--reference fuera de rango")
+    profiling.setup(args)
+
+    with profiling.stage("analize1"):
+        if multi:
+            analyze_peers(args.capturas, hosts=args.hosts, port=args.port,
+                          match=args.match or "payload", reference=args.reference,
+                          report_dir=args.report, formats=tuple(args.formats),
+                          jobs=max(1, args.jobs), decimation=args.decimate,
+                          max_points=args.points)
+        else:
+            analyze(args.capturas[0], args.capturas[1], match=args.match,
+                    clock=args.clock, port=args.port, report_dir=args.report, formats=tuple(args.formats),
+                    jobs=max(1, args.jobs), decimation=args.decimate,
+                    max_points=args.points, frames=args.frames, windows=args.windows)
+    profiling.report()
@@ -0,0 +1,10 @@
+"""
+Módulos de análisis de capturas (throughput, IAT, delay)
+"""
+
+from .pcap_reader import read_udp_packets, filter_port
+
+__all__ = [
+    'read_udp_packets',
+    'filter_port'
+]
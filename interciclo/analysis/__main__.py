@@ -0,0 +1,11 @@
+# analysis/__main__.py
+
+"""
+python -m analysis <subcomando> ... (ver analysis/cli.py)
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,179 @@
+# analysis/cache.py
+
+"""
+Caché de columnas extraídas de cada captura
+Guarda junto a cada pcap un directorio <captura>.pcap.cache con un .npy
+sin comprimir por columna del lector. Al cargarla cada columna se mapea
+en memoria (np.load con mmap_mode="r"): solo se leen del disco las
+páginas que se tocan, y filtrar por puerto copia únicamente lo elegido.
+La caché se identifica por la versión del formato, el tamaño, la fecha
+de modificación y un hash de la cabecera del pcap; si la captura cambia
+se reconstruye automáticamente.
+
+La pirámide de throughput de cada captura y puerto (analysis/pyramid.py)
+se guarda al lado, en <captura>.<puerto>.pyr.cache, con la misma clave
+más la versión de la pirámide.
+"""
+
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from .pcap_reader import COLUMNS, read_udp_packets, iter_udp_packets, filter_port
+from .profiling import profiled
+from .pyramid import ThroughputPyramid, BASE_RESOLUTION, FANOUT, PYRAMID_VERSION
+
+
+# Subir al cambiar las columnas del lector o el formato en disco
+# (v1: un .npz por captura; v2: un directorio con un .npy por columna)
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".cache"
+PYRAMID_SUFFIX = ".pyr" + CACHE_SUFFIX
+LEGACY_SUFFIX = ".npz"              # cachés de la v1 que aún queden en disco
+KEY_FILE = "_key.npy"
+HEADER_HASH_BYTES = 64 * 1024
+
+
+def capture_key(path):
+    """
+    Clave de la captura: versión, tamaño, mtime y SHA-1 de los primeros 64 KiB
+
+    Returns:
+        str: Clave que se guarda dentro del archivo de caché
+    """
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        header_hash = hashlib.sha1(f.read(HEADER_HASH_BYTES)).hexdigest()
+    return f"v{CACHE_VERSION}:{st.st_size}:{st.st_mtime_ns}:{header_hash}"
+
+
+def cache_path(path):
+    """Ruta del directorio de caché asociado a una captura"""
+    return f"{path}{CACHE_SUFFIX}"
+
+
+@profiled("load_packets", items=lambda res, *a, **k: len(res["ts"]))
+def load_packets(path, port=None, use_cache=True):
+    """
+    Columnas UDP de una captura, desde la caché si está vigente
+
+    La caché guarda todos los datagramas UDP (sin filtrar por puerto),
+    así que sirve para cualquier puerto. Sin filtro las columnas quedan
+    mapeadas en memoria y son de solo lectura.
+
+    Args:
+        path: Ruta del archivo .pcap
+        port: Filtrar por puerto origen/destino (None = todos)
+        use_cache: False para leer siempre el pcap sin tocar la caché
+
+    Returns:
+        dict: Columnas NumPy (ver pcap_reader.COLUMNS)
+    """
+    if not use_cache:
+        return read_udp_packets(path, port)
+
+    key = capture_key(path)
+    cpath = cache_path(path)
+
+    packets = _read_cache(cpath, key)
+    if packets is None:
+        packets = read_udp_packets(path)
+        _write_cache(cpath, key, packets)
+
+    return filter_port(packets, port)
+
+
+def pyramid_path(path, port=None):
+    """Ruta de la pirámide de throughput de una captura y puerto"""
+    return f"{path}.{'udp' if port is None else port}{PYRAMID_SUFFIX}"
+
+
+@profiled("load_pyramid")
+def load_pyramid(path, port=None, use_cache=True, max_memory=None,
+                 base=BASE_RESOLUTION, fanout=FANOUT):
+    """
+    Pirámide de throughput de una captura, desde su caché si está vigente
+
+    Si no hay pirámide guardada se cuenta una vez a partir de las columnas
+    (caché de paquetes incluida) o, con max_memory, leyendo la captura por
+    bloques; después cualquier ventana o tramo sale de la pirámide.
+
+    Args:
+        path: Ruta del archivo .pcap
+        port: Puerto origen/destino (None = todo el tráfico UDP)
+        use_cache: False para no leer ni escribir cachés
+        max_memory: Memoria de trabajo por bloque (bytes); None = en memoria
+        base, fanout: Resolución base (s) y factor entre niveles
+
+    Returns:
+        ThroughputPyramid
+    """
+    key = f"{capture_key(path)}:p{PYRAMID_VERSION}:{port}:{base}:{fanout}" if use_cache else None
+    ppath = pyramid_path(path, port)
+    if use_cache:
+        arrays = _read_cache(ppath, key, names=None)
+        if arrays is not None:
+            return ThroughputPyramid.from_arrays(arrays)
+
+    if max_memory is not None:
+        pyramid = ThroughputPyramid(base, fanout)
+        for chunk in iter_udp_packets(path, port, max_memory):
+            pyramid.update(chunk["ts"], chunk["size"])
+    else:
+        packets = load_packets(path, port, use_cache)
+        pyramid = ThroughputPyramid.from_packets(packets["ts"], packets["size"], base, fanout)
+
+    if use_cache:
+        _write_cache(ppath, key, pyramid.to_arrays())
+    return pyramid
+
+
+def _read_cache(cpath, key, names=COLUMNS):
+    """
+    Mapear la caché si existe y su clave coincide; None en otro caso
+
+    names: arrays que debe contener (None = todos los del directorio)
+    """
+    kpath = os.path.join(cpath, KEY_FILE)
+    if not os.path.exists(kpath):
+        return None
+    try:
+        if str(np.load(kpath, allow_pickle=False)) != key:
+            return None
+        if names is None:
+            names = [name[:-4] for name in sorted(os.listdir(cpath))
+                     if name.endswith(".npy") and name != KEY_FILE]
+        paths = {name: os.path.join(cpath, f"{name}.npy") for name in names}
+        if not all(os.path.exists(p) for p in paths.values()):
+            return None
+        # np.asarray: vista ndarray sobre el mapa, sin la subclase memmap
+        return {name: np.asarray(np.load(p, mmap_mode="r", allow_pickle=False))
+                for name, p in paths.items()}
+    except (OSError, ValueError) as e:
+        print(f"Caché inválida {cpath}: {e}")
+        return None
+
+
+def _write_cache(cpath, key, arrays):
+    """
+    Escribir la caché en un directorio temporal y renombrarlo
+
+    La clave se escribe la última, así que un directorio a medias nunca
+    pasa por vigente. El temporal también acaba en CACHE_SUFFIX para que
+    el catálogo no lo tome por una captura.
+    """
+    tmp = f"{cpath[:-len(CACHE_SUFFIX)]}.tmp{CACHE_SUFFIX}"
+    try:
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, col in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(col))
+        np.save(os.path.join(tmp, KEY_FILE), np.array(key))
+        if os.path.isdir(cpath):
+            shutil.rmtree(cpath)
+        os.replace(tmp, cpath)
+    except OSError as e:
+        print(f"No se pudo guardar la caché {cpath}: {e}")
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,574 @@
+# analysis/catalog.py
+
+"""
+Catálogo indexado de las campañas de medición
+Una base SQLite (por defecto <base_dir>/catalog.sqlite) con una fila por
+captura (usuario, perfil, fecha del primer paquete, duración, paquetes,
+bytes) y una fila de métricas por captura y puerto: throughput (media y
+varianza de Welford, y la serie por segundo para los intervalos bootstrap),
+IAT (media, percentiles y el histograma logarítmico completo, guardado
+disperso), jitter RFC 3550 y ráfagas.
+
+La ingesta es incremental: una captura ya catalogada con el mismo tamaño
+y fecha de modificación no se vuelve a leer, y las capturas borradas se
+quitan. Las consultas ("todas las de lejano de este mes, mediana del IAT")
+leen solo la base: los histogramas de varias capturas se fusionan sumando
+contadores, así que la mediana agregada es la de todos los paquetes y no
+la mediana de las medianas.
+
+La estructura de directorios es la de las mediciones:
+<base_dir>/<usuario>/<perfil>/<captura>; las capturas se reconocen por su
+cabecera pcap/pcapng (las rotaciones de tcpdump se catalogan por archivo).
+Las rutas se guardan relativas a base_dir, así que el catálogo sigue
+valiendo si se copia o se mueve el directorio de mediciones.
+"""
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from .cache import load_packets, CACHE_SUFFIX, LEGACY_SUFFIX
+from .decimate import DEFAULT_POINTS
+from .flows import flow_table, select_flows, flow_packets, stream_ports
+from .merge import expand_captures, iter_merged, read_merged, is_capture
+from .metrics import flow_metrics
+from .streaming import RunningStats, LogHistogram
+from .profiling import profiled, stage
+
+
+CATALOG_NAME = "catalog.sqlite"
+SCHEMA_VERSION = 2          # cambiarla reconstruye el catálogo
+STATS_CHUNK = 1 << 20
+PROFILE_ORDER = ("cercano", "medio", "lejano")   # orden de las figuras
+CAPTURE_PATTERN = "{profile}.pcap"               # captura de cada <usuario>/<perfil>/
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,  -- relativa a base_dir
+    user TEXT,
+    profile TEXT,
+    start REAL,                 -- primer paquete (epoch, s)
+    date TEXT,                  -- primer paquete, hora local ISO
+    duration REAL,
+    packets INTEGER,
+    bytes INTEGER,
+    flows INTEGER,
+    size INTEGER NOT NULL,      -- tamaño y mtime del archivo al catalogarlo
+    mtime_ns INTEGER NOT NULL,
+    ingested REAL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    capture_id INTEGER NOT NULL REFERENCES captures(id),
+    port INTEGER NOT NULL,
+    packets INTEGER, bytes INTEGER, duration REAL,
+    thr_n INTEGER, thr_mean REAL, thr_m2 REAL, thr_min REAL, thr_max REAL,
+    thr_series BLOB,            -- Mbps por segundo, float32
+    iat_n INTEGER, iat_mean REAL, iat_m2 REAL, iat_min REAL, iat_max REAL,
+    iat_zeros INTEGER, iat_p50 REAL, iat_p95 REAL, iat_p99 REAL,
+    iat_bins BLOB, iat_counts BLOB,
+    jitter_ms REAL, bursts INTEGER,
+    PRIMARY KEY (capture_id, port)
+);
+CREATE INDEX IF NOT EXISTS captures_profile ON captures (profile, start);
+CREATE INDEX IF NOT EXISTS captures_user ON captures (user, start);
+CREATE INDEX IF NOT EXISTS captures_start ON captures (start);
+CREATE INDEX IF NOT EXISTS metrics_port ON metrics (port, capture_id);
+"""
+
+
+# ---------------------------------------------------------------
+# MÉTRICAS DE UNA CAPTURA
+# ---------------------------------------------------------------
+def _port_summary(ts, size):
+    """Throughput, IAT, jitter y ráfagas de los paquetes de un puerto"""
+    ts_norm = ts - ts[0] if len(ts) else ts
+
+    # Una sola pasada: throughput, IAT, jitter RFC 3550 y ráfagas
+    metrics = flow_metrics(ts_norm, size)
+    iat_ms = metrics["iat"] * 1000
+    _, thr = metrics["throughput"][1.0]
+
+    # Resumen de tamaño fijo para boxplots e intervalos de confianza
+    iat_hist = LogHistogram()
+    for chunk in np.array_split(iat_ms, max(1, len(iat_ms) // STATS_CHUNK)):
+        iat_hist.update(chunk)
+    thr_stats = RunningStats()
+    thr_stats.update(thr / 1e6)
+
+    return {
+        "iat": (np.arange(len(iat_ms)), iat_ms),
+        "thr": (np.arange(len(thr)), thr / 1e6),
+        "iat_hist": iat_hist,
+        "thr_stats": thr_stats,
+        "jitter_ms": metrics["jitter_last"] * 1000,
+        "bursts": len(metrics["bursts"]["packets"]),
+        "packets": metrics["packets"],
+        "bytes": metrics["bytes"],
+        "duration": metrics["duration"],
+    }
+
+
+def summarize_capture(spec, ports, use_cache=True, max_memory=None, max_points=DEFAULT_POINTS):
+    """
+    Métricas de una captura para uno o varios puertos, con una sola lectura
+
+    Con max_memory la captura se lee por bloques (sin caché) y la serie
+    del IAT llega ya decimada a max_points puntos.
+
+    Args:
+        spec: Archivo pcap/pcapng, directorio o glob (ver expand_captures)
+        ports: Puertos a analizar
+
+    Returns:
+        dict: start, duration, packets y bytes de toda la captura, flows
+              (tabla de flujos sin "index") y ports: {puerto: iat, thr
+              (series), iat_hist, thr_stats, jitter_ms, bursts, packets,
+              bytes, duration}
+    """
+    files = expand_captures(spec)
+    if max_memory is not None:
+        chunks = iter_merged(files, max_memory=max_memory)
+        by_port, flows = stream_ports(chunks, ports, scale=1000, max_points=max_points)
+        summaries = {}
+        for port, metrics in by_port.items():
+            _, thr = metrics["throughput"][1.0]
+            thr_stats = RunningStats()
+            thr_stats.update(thr / 1e6)
+            summaries[port] = {
+                "iat": metrics["iat_series"],
+                "thr": (np.arange(len(thr)), thr / 1e6),
+                "iat_hist": metrics["iat_hist"],
+                "thr_stats": thr_stats,
+                "jitter_ms": metrics["jitter_last"] * 1000,
+                "bursts": metrics["bursts"]["count"],
+                "packets": metrics["packets"],
+                "bytes": metrics["bytes"],
+                "duration": metrics["duration"],
+            }
+    else:
+        # Una lectura: tabla de flujos (5-tupla) y paquetes de cada puerto
+        if len(files) == 1:
+            packets = load_packets(files[0], use_cache=use_cache)
+        else:
+            packets = read_merged(files)
+        flows = flow_table(packets)
+        summaries = {}
+        for port in ports:
+            selected = flow_packets(packets, flows, select_flows(flows, port=port))
+            summaries[port] = _port_summary(selected["ts"], selected["size"])
+        del flows["index"]
+
+    n = len(flows["packets"])
+    start = float(flows["first"].min()) if n else None
+    return {
+        "start": start,
+        "duration": float(flows["last"].max()) - start if n else 0.0,
+        "packets": int(flows["packets"].sum()),
+        "bytes": int(flows["bytes"].sum()),
+        "flows": flows,
+        "ports": summaries,
+    }
+
+
+# ---------------------------------------------------------------
+# PERFILES × USUARIOS (en paralelo con jobs > 1)
+# ---------------------------------------------------------------
+def summarize_cell(profile, user, base_dir, port, use_cache=True, max_memory=None,
+                   max_points=DEFAULT_POINTS, capture=CAPTURE_PATTERN):
+    """
+    Métricas de la captura de un perfil y usuario de un puerto
+
+    Es independiente del resto, así que puede ejecutarse en un proceso
+    aparte; devuelve solo los arrays compactos de resultados.
+
+    Returns:
+        dict: El resumen del puerto de summarize_capture más flows
+    """
+    path = os.path.join(base_dir, user, profile, capture.format(profile=profile))
+    res = summarize_capture(path, [port], use_cache=use_cache,
+                            max_memory=max_memory, max_points=max_points)
+    return dict(res["ports"][port], flows=res["flows"])
+
+
+def summarize_profiles(profiles, users, base_dir, port, jobs=1, use_cache=True,
+                       max_memory=None, max_points=DEFAULT_POINTS, capture=CAPTURE_PATTERN):
+    """
+    summarize_cell de cada perfil × usuario
+
+    Con jobs > 1 las capturas se reparten en un ProcessPoolExecutor; los
+    resultados se recogen por clave, así que la salida es la misma que en
+    serie. En modo por bloques el límite max_memory se reparte entre los
+    procesos. Las combinaciones sin directorio <usuario>/<perfil>/ se omiten.
+
+    Args:
+        capture: Archivo, directorio o glob dentro de <usuario>/<perfil>/
+                 ({profile} = nombre del perfil)
+
+    Returns:
+        dict: {perfil: {usuario: resumen de summarize_cell}}
+    """
+    tasks = [(profile, user) for profile in profiles for user in users
+             if os.path.isdir(os.path.join(base_dir, user, profile))]
+    results = {profile: {} for profile in profiles}
+
+    if max_memory is not None:
+        max_memory //= max(1, min(jobs, len(tasks)))
+    options = dict(base_dir=base_dir, port=port, use_cache=use_cache, max_memory=max_memory,
+                   max_points=max_points, capture=capture)
+
+    if jobs <= 1:
+        for profile, user in tasks:
+            results[profile][user] = summarize_cell(profile, user, **options)
+        return results
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {(profile, user): executor.submit(summarize_cell, profile, user, **options)
+                   for profile, user in tasks}
+        for (profile, user), future in futures.items():
+            results[profile][user] = future.result()
+    return results
+
+
+# ---------------------------------------------------------------
+# BASE DE DATOS
+# ---------------------------------------------------------------
+def default_path(base_dir):
+    return os.path.join(base_dir, CATALOG_NAME)
+
+
+def open_catalog(path):
+    """
+    Abrir (o crear) el catálogo
+
+    Si la base es de otra versión del esquema se vacía: todo su contenido
+    se puede reconstruir desde las capturas.
+    """
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+        print(f"Catálogo {path} de otra versión ({version}): se reconstruye")
+        db.executescript("DROP TABLE IF EXISTS metrics; DROP TABLE IF EXISTS captures;")
+    db.executescript(SCHEMA)
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return db
+
+
+def _finite(value):
+    """inf/nan (estadísticas vacías) como NULL"""
+    return float(value) if value is not None and np.isfinite(value) else None
+
+
+def _metric_row(port, summary):
+    """Fila de la tabla metrics a partir de una entrada de summarize_capture"""
+    thr, hist = summary["thr_stats"], summary["iat_hist"]
+    nz = np.flatnonzero(hist.counts)
+    return {
+        "port": int(port),
+        "packets": int(summary["packets"]),
+        "bytes": int(summary["bytes"]),
+        "duration": float(summary["duration"]),
+        "thr_n": thr.n, "thr_mean": thr.mean, "thr_m2": thr.m2,
+        "thr_min": _finite(thr.min), "thr_max": _finite(thr.max),
+        "thr_series": np.asarray(summary["thr"][1], dtype=np.float32).tobytes(),
+        "iat_n": hist.n, "iat_mean": hist.stats.mean, "iat_m2": hist.stats.m2,
+        "iat_min": _finite(hist.stats.min), "iat_max": _finite(hist.stats.max),
+        "iat_zeros": hist.zeros,
+        "iat_p50": _finite(hist.quantile(0.5)),
+        "iat_p95": _finite(hist.quantile(0.95)),
+        "iat_p99": _finite(hist.quantile(0.99)),
+        "iat_bins": nz.astype(np.int32).tobytes(),
+        "iat_counts": hist.counts[nz].astype(np.int64).tobytes(),
+        "jitter_ms": float(summary["jitter_ms"]),
+        "bursts": int(summary["bursts"]),
+    }
+
+
+def _catalog_entry(path, ports, use_cache, max_memory):
+    """Resumen compacto de una captura (se ejecuta en un proceso aparte)"""
+    try:
+        res = summarize_capture(path, ports, use_cache=use_cache, max_memory=max_memory)
+    except (OSError, ValueError) as e:
+        print(f"⚠ No se pudo catalogar {path}: {e}")
+        return None
+    return {
+        "start": res["start"],
+        "duration": res["duration"],
+        "packets": res["packets"],
+        "bytes": res["bytes"],
+        "flows": len(res["flows"]["packets"]),
+        "metrics": [_metric_row(port, s) for port, s in res["ports"].items()],
+    }
+
+
+def discover(base_dir):
+    """
+    Capturas bajo base_dir con su usuario y perfil
+
+    Returns:
+        list: (ruta, usuario, perfil) según <usuario>/<perfil>/...; None
+              donde la ruta no tiene ese nivel
+    """
+    found = []
+    for root, dirs, files in os.walk(base_dir):
+        dirs[:] = sorted(d for d in dirs if not d.endswith(CACHE_SUFFIX))
+        rel = os.path.relpath(root, base_dir)
+        parts = [] if rel == os.curdir else rel.split(os.sep)
+        for name in sorted(files):
+            if name.endswith(LEGACY_SUFFIX) or name.startswith(CATALOG_NAME):
+                continue
+            found.append((os.path.join(root, name),
+                          parts[0] if len(parts) > 0 else None,
+                          parts[1] if len(parts) > 1 else None))
+    return found
+
+
+def layout(base_dir):
+    """
+    Usuarios y perfiles del árbol <usuario>/<perfil>/
+
+    Returns:
+        tuple: (usuarios en orden alfabético, perfiles en PROFILE_ORDER y
+               después los demás en orden alfabético)
+    """
+    users = sorted(d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d)))
+    profiles = {p for u in users for p in os.listdir(os.path.join(base_dir, u))
+                if os.path.isdir(os.path.join(base_dir, u, p))}
+    return users, order_profiles(profiles)
+
+
+def order_profiles(profiles):
+    known = [p for p in PROFILE_ORDER if p in profiles]
+    return known + sorted(set(profiles) - set(known))
+
+
+@profiled("catalog_ingest", items=lambda res, *a, **k: res["read"])
+def ingest(db, base_dir, ports=(39400,), use_cache=True, max_memory=None, jobs=1, prune=True):
+    """
+    Catalogar las capturas nuevas o modificadas de base_dir
+
+    Una captura ya catalogada con el mismo tamaño y mtime solo se vuelve a
+    leer si falta algún puerto de `ports`; prune quita del catálogo las
+    capturas que ya no existen.
+
+    Returns:
+        dict: new, updated, unchanged, removed y read (capturas leídas)
+    """
+    known = {row["path"]: row for row in db.execute(
+        "SELECT id, path, size, mtime_ns FROM captures")}
+    have = {}
+    for row in db.execute("SELECT capture_id, port FROM metrics"):
+        have.setdefault(row["capture_id"], set()).add(row["port"])
+
+    counts = {"new": 0, "updated": 0, "unchanged": 0, "removed": 0, "read": 0}
+    todo = []
+    seen = set()
+    for full, user, profile in discover(base_dir):
+        path = os.path.relpath(full, base_dir)
+        st = os.stat(full)
+        row = known.get(path)
+        same = row is not None and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns
+        if not same and not is_capture(full):
+            continue
+        seen.add(path)
+        if same:
+            missing = set(ports) - have.get(row["id"], set())
+            if not missing:
+                counts["unchanged"] += 1
+                continue
+            todo.append((path, user, profile, st, sorted(missing), False))
+        else:
+            # Modificada: se recalculan también los puertos que ya tenía
+            old = have.get(row["id"], set()) if row is not None else set()
+            todo.append((path, user, profile, st, sorted(set(ports) | old), row is not None))
+
+    if todo:
+        print(f"Catalogando {len(todo)} captura(s) de {base_dir}...")
+    if jobs > 1 and len(todo) > 1:
+        max_memory = None if max_memory is None else max_memory // min(jobs, len(todo))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_catalog_entry, os.path.join(base_dir, t[0]), t[4],
+                                       use_cache, max_memory) for t in todo]
+            entries = [f.result() for f in futures]
+    else:
+        entries = [_catalog_entry(os.path.join(base_dir, t[0]), t[4], use_cache, max_memory)
+                   for t in todo]
+
+    with stage("catalog_write", items=len(todo)), db:
+        now = time.time()
+        for (path, user, profile, st, _, replaced), entry in zip(todo, entries):
+            if entry is None:
+                continue
+            row = known.get(path)
+            date = datetime.fromtimestamp(entry["start"]).isoformat(" ", "seconds") \
+                if entry["start"] is not None else None
+            values = (user, profile, entry["start"], date, entry["duration"], entry["packets"],
+                      entry["bytes"], entry["flows"], st.st_size, st.st_mtime_ns, now)
+            if row is None:
+                cur = db.execute(
+                    "INSERT INTO captures (user, profile, start, date, duration, packets, bytes, "
+                    "flows, size, mtime_ns, ingested, path) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                    values + (path,))
+                capture_id = cur.lastrowid
+                counts["new"] += 1
+            else:
+                capture_id = row["id"]
+                db.execute(
+                    "UPDATE captures SET user=?, profile=?, start=?, date=?, duration=?, "
+                    "packets=?, bytes=?, flows=?, size=?, mtime_ns=?, ingested=? WHERE id=?",
+                    values + (capture_id,))
+                if replaced:
+                    db.execute("DELETE FROM metrics WHERE capture_id=?", (capture_id,))
+                counts["updated"] += 1
+            for metric in entry["metrics"]:
+                names = ["capture_id"] + list(metric)
+                db.execute(f"INSERT OR REPLACE INTO metrics ({', '.join(names)}) "
+                           f"VALUES ({', '.join('?' * len(names))})",
+                           [capture_id] + list(metric.values()))
+        counts["read"] = sum(entry is not None for entry in entries)
+
+        if prune:
+            gone = [(row["id"],) for path, row in known.items() if path not in seen]
+            db.executemany("DELETE FROM metrics WHERE capture_id=?", gone)
+            db.executemany("DELETE FROM captures WHERE id=?", gone)
+            counts["removed"] = len(gone)
+    return counts
+
+
+# ---------------------------------------------------------------
+# CONSULTAS
+# ---------------------------------------------------------------
+def parse_date(text):
+    """'AAAA-MM-DD', 'AAAA-MM-DD HH:MM[:SS]' o 'AAAA-MM' (hora local) -> epoch"""
+    fmt = "%Y-%m" if len(text) == 7 else None
+    value = datetime.strptime(text, fmt) if fmt else datetime.fromisoformat(text)
+    return value.timestamp()
+
+
+def month_range(month=None):
+    """
+    Inicio y fin (epoch, hora local) de un mes 'AAAA-MM'; None = mes actual
+    """
+    first = datetime.strptime(month, "%Y-%m") if month else datetime.now().replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0)
+    following = first.replace(year=first.year + first.month // 12, month=first.month % 12 + 1)
+    return first.timestamp(), following.timestamp()
+
+
+def query(db, profile=None, user=None, port=None, since=None, until=None):
+    """
+    Capturas catalogadas con sus métricas
+
+    Args:
+        profile, user: Nombre o lista de nombres
+        port: Puerto de las métricas (None = todos)
+        since, until: Intervalo [since, until) del primer paquete (epoch)
+
+    Returns:
+        list: Un diccionario por captura y puerto (columnas de captures y
+              metrics), en orden de fecha
+    """
+    where, args = [], []
+    for column, value in (("c.profile", profile), ("c.user", user), ("m.port", port)):
+        if value is None:
+            continue
+        values = [value] if isinstance(value, (str, int)) else list(value)
+        where.append(f"{column} IN ({', '.join('?' * len(values))})")
+        args += values
+    if since is not None:
+        where.append("c.start >= ?")
+        args.append(since)
+    if until is not None:
+        where.append("c.start < ?")
+        args.append(until)
+    sql = ("SELECT c.id, c.path, c.user, c.profile, c.start, c.date, c.duration AS capture_duration, "
+           "c.flows, m.* FROM captures c JOIN metrics m ON m.capture_id = c.id")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY c.start, c.path, m.port"
+    return [dict(row) for row in db.execute(sql, args)]
+
+
+def _stats(row, prefix):
+    stats = RunningStats()
+    stats.n = row[f"{prefix}_n"]
+    if stats.n:
+        stats.mean, stats.m2 = row[f"{prefix}_mean"], row[f"{prefix}_m2"]
+        stats.min, stats.max = row[f"{prefix}_min"], row[f"{prefix}_max"]
+    return stats
+
+
+def row_histogram(row):
+    """LogHistogram del IAT (ms) de una fila de query"""
+    hist = LogHistogram()
+    bins = np.frombuffer(row["iat_bins"], dtype=np.int32)
+    hist.counts[bins] = np.frombuffer(row["iat_counts"], dtype=np.int64)
+    hist.zeros = row["iat_zeros"]
+    hist.stats = _stats(row, "iat")
+    return hist
+
+
+def aggregate(rows, by=("profile", "user")):
+    """
+    Agrupar filas de query fusionando sus estadísticas
+
+    Las filas sin paquetes (puerto sin tráfico en esa captura) no cuentan.
+
+    Returns:
+        list: Por grupo, las claves de `by` más runs (capturas), duration (s),
+              packets, bytes, first y last (fecha), thr_stats
+              (RunningStats, Mbps), thr_series (throughput por segundo de
+              todas las capturas, una tras otra), iat_hist (LogHistogram, ms),
+              jitter_ms (media por fila) y bursts (total)
+    """
+    groups = {}
+    for row in rows:
+        if not row["packets"]:
+            continue
+        key = tuple(row[k] for k in by)
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = dict(zip(by, key), captures=set(), rows=0, duration=0.0,
+                                   packets=0, bytes=0, first=row["date"], last=row["date"],
+                                   thr_stats=RunningStats(), thr_series=[],
+                                   iat_hist=LogHistogram(),
+                                   jitter_ms=0.0, bursts=0)
+        g["captures"].add(row["id"])
+        g["rows"] += 1
+        g["duration"] += row["duration"]
+        g["packets"] += row["packets"]
+        g["bytes"] += row["bytes"]
+        g["last"] = row["date"]
+        g["thr_stats"].merge(_stats(row, "thr"))
+        g["thr_series"].append(np.frombuffer(row["thr_series"], dtype=np.float32))
+        g["iat_hist"].merge(row_histogram(row))
+        g["jitter_ms"] += row["jitter_ms"]
+        g["bursts"] += row["bursts"]
+    for g in groups.values():
+        g["runs"] = len(g.pop("captures"))
+        g["jitter_ms"] /= g.pop("rows")
+        g["thr_series"] = np.concatenate(g["thr_series"]).astype(np.float64)
+
+    def sort_key(g):
+        return [PROFILE_ORDER.index(g[k]) if k == "profile" and g[k] in PROFILE_ORDER
+                else len(PROFILE_ORDER) for k in by] + [str(g[k]) for k in by]
+    return sorted(groups.values(), key=sort_key)
+
+
+def format_groups(groups, by=("profile", "user")):
+    """Tabla de texto de aggregate"""
+    head = "".join(f"{k:<12}" for k in by)
+    lines = [f"{head}{'capturas':>9} {'min':>8} {'Mbps':>8} {'IAT p50':>9} {'IAT p95':>9} "
+             f"{'jitter':>8}  periodo"]
+    for g in groups:
+        keys = "".join(f"{str(g[k]):<12}" for k in by)
+        lines.append(f"{keys}{g['runs']:>9} {g['duration'] / 60:>8.1f} "
+                     f"{g['thr_stats'].mean:>8.3f} {g['iat_hist'].quantile(0.5):>9.3f} "
+                     f"{g['iat_hist'].quantile(0.95):>9.3f} {g['jitter_ms']:>8.3f}  "
+                     f"{g['first']} .. {g['last']}")
+    return "\n".join(lines)
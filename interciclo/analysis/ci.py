@@ -0,0 +1,224 @@
+# analysis/ci.py
+
+"""
+Intervalos de confianza de la media
+El cuantil t sale de scipy.special.stdtrit, importado al primer uso: los
+resúmenes no cargan scipy.stats (más de un segundo de arranque en frío) y
+el CLI arranca sin SciPy. El de la normal es el de la biblioteca estándar.
+
+batch_ci calcula los intervalos de muchos grupos en una sola llamada: t,
+normal, bootstrap de percentiles y bootstrap por bloques móviles (para
+series autocorrelacionadas), con los remuestreos como matrices de índices.
+"""
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+_NORMAL = NormalDist()
+
+
+def normal_ppf(q):
+    """Cuantil q de la normal estándar"""
+    return _NORMAL.inv_cdf(q)
+
+
+def t_ppf(q, df):
+    """Cuantil q de la t de Student con df grados de libertad (scipy.stats.t.ppf)"""
+    from scipy.special import stdtrit
+
+    return float(stdtrit(df, q))
+
+
+def mean_ci(n, mean, std, confidence=0.90):
+    """
+    Media y semiancho del intervalo t de la media
+
+    Returns:
+        tuple: (media, semiancho); (0, 0) con menos de dos muestras
+    """
+    if n < 2:
+        return 0, 0
+    sem = std / math.sqrt(n)
+    return mean, t_ppf((1 + confidence) / 2, n - 1) * sem
+
+
+# ---------------------------------------------------------------
+# INTERVALOS DE MUCHOS GRUPOS A LA VEZ
+# ---------------------------------------------------------------
+CI_METHODS = ("t", "normal", "bootstrap", "block")
+N_BOOT = 2000
+MAX_ELEMENTS = 1 << 23      # índices por bloque de remuestreos (64 MiB en int64)
+
+
+def _pack(samples):
+    """Muestras de cada grupo en un array plano, con tamaños y desplazamientos"""
+    groups = [np.asarray(s, dtype=np.float64).ravel() for s in samples]
+    n = np.array([len(g) for g in groups], dtype=np.int64)
+    flat = np.concatenate(groups) if groups else np.empty(0)
+    offset = np.zeros(len(n), dtype=np.int64)
+    offset[1:] = np.cumsum(n)[:-1]
+    return flat, n, offset
+
+
+def block_length(n):
+    """Longitud de bloque por defecto del bootstrap por bloques: n^(1/3)"""
+    return np.maximum(1, np.ceil(np.asarray(n, dtype=np.float64) ** (1 / 3))).astype(np.int64)
+
+
+def _resample_means(flat, n, offset, block, n_boot, rng):
+    """
+    Medias de n_boot remuestreos por bloques circulares de cada grupo
+
+    La matriz de índices es la de los inicios de bloque (grupo, remuestreo,
+    bloque): un remuestreo de n muestras son K = ceil(n / block) bloques
+    circulares que empiezan en posiciones aleatorias, el último recortado
+    a n - (K - 1) · block. La suma de cada bloque sale de la suma acumulada
+    de la serie duplicada (dos lecturas por bloque, no una por muestra);
+    los bloques sobrantes de los grupos con menos bloques tienen largo 0.
+    Con block = 1 es el bootstrap i.i.d. Los remuestreos se generan en
+    tandas de MAX_ELEMENTS inicios.
+    """
+    G = len(n)
+    K = -(-n // block)
+    Kmax = int(K.max())
+
+    groups = [flat[o:o + m] for o, m in zip(offset, n)]
+    mean = np.array([x.mean() for x in groups])
+    k = np.arange(Kmax)
+    length = np.where(k[None, :] < K[:, None] - 1, block[:, None], 0)
+    length[np.arange(G), K - 1] = n - (K - 1) * block
+
+    iid = bool(np.all(block == 1))
+    if iid:
+        # Bloques de una muestra: se leen directamente de la serie centrada
+        # y las posiciones de relleno apuntan a un cero añadido al final
+        centred = np.concatenate([x - m for x, m in zip(groups, mean)] + [[0.0]])
+        local = np.zeros(G, dtype=np.int64)
+        local[1:] = np.cumsum(n)[:-1]
+        padding = (length == 0)[:, None, :]
+    else:
+        # Suma acumulada circular de cada grupo (centrada: menos cancelación)
+        csum, coff = [], np.zeros(G, dtype=np.int64)
+        for g, x in enumerate(groups):
+            x = x - mean[g]
+            c = np.zeros(2 * n[g] + 1)
+            np.cumsum(np.concatenate([x, x]), out=c[1:])
+            csum.append(c)
+            coff[g] = coff[g - 1] + len(csum[g - 1]) if g else 0
+        csum = np.concatenate(csum)
+
+    # Índices de 32 bits siempre que quepan: la mitad de memoria que recorrer
+    top = len(centred) if iid else len(csum)
+    dtype = np.int32 if top < np.iinfo(np.int32).max else np.int64
+    means = np.empty((G, n_boot))
+    step = max(1, MAX_ELEMENTS // (G * Kmax))
+    for b0 in range(0, n_boot, step):
+        b = min(step, n_boot - b0)
+        starts = _random_starts(rng, n, (G, b, Kmax), dtype)
+        if iid:
+            starts += local[:, None, None]
+            np.copyto(starts, len(centred) - 1, where=padding)
+            sums = centred[starts].sum(axis=2)
+        else:
+            starts += coff[:, None, None]
+            sums = (csum[starts + length[:, None, :]] - csum[starts]).sum(axis=2)
+        means[:, b0:b0 + b] = mean[:, None] + sums / n[:, None]
+    return means
+
+
+def _random_starts(rng, n, shape, dtype=np.int64):
+    """Enteros uniformes en [0, n_g) con la forma (grupo, ...)"""
+    if np.all(n == n[0]):
+        return rng.integers(0, n[0], size=shape, dtype=dtype)
+    # rng.integers con un límite por elemento es varias veces más lento
+    high = n.reshape((-1,) + (1,) * (len(shape) - 1))
+    u = rng.random(shape, dtype=np.float32)
+    u *= high.astype(np.float32)
+    return np.minimum(u.astype(dtype), (high - 1).astype(dtype))
+
+
+def batch_ci(samples, method="t", confidence=0.90, n_boot=N_BOOT, block=None, seed=0):
+    """
+    Intervalos de confianza de la media de muchos grupos en una llamada
+
+    Métodos:
+        t:         media ± t · s / sqrt(n) (muestras i.i.d.)
+        normal:    igual con el cuantil de la normal
+        bootstrap: percentiles de las medias de remuestreos i.i.d.
+        block:     percentiles del bootstrap por bloques móviles
+                   (circulares), para series autocorrelacionadas como el
+                   throughput por segundo; bloques de `block` muestras
+                   (por defecto n^(1/3))
+
+    Los remuestreos de todos los grupos se generan como matrices de índices
+    de NumPy; los grupos se agrupan por tamaño (potencias de dos) para que
+    el relleno hasta el más largo no pase del doble.
+
+    Args:
+        samples: Lista de arrays (uno por grupo, de cualquier largo) o array 2-D
+        method: "t", "normal", "bootstrap" o "block"
+        confidence: Nivel de confianza
+        n_boot: Remuestreos por grupo (bootstrap)
+        block: Longitud de bloque (entero o uno por grupo); None = n^(1/3)
+        seed: Semilla del generador (resultados reproducibles)
+
+    Returns:
+        dict: Arrays por grupo n, mean, lo, hi, half ((hi - lo) / 2) y block,
+              más method y confidence. Con n < 2 el intervalo es [mean, mean]
+              (mean = NaN si el grupo está vacío)
+    """
+    if method not in CI_METHODS:
+        raise ValueError(f"Método de intervalo desconocido: {method}")
+    flat, n, offset = _pack(samples)
+    G = len(n)
+    gid = np.repeat(np.arange(G), n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(gid, weights=flat, minlength=G) / n
+    lo, hi = mean.copy(), mean.copy()
+    ok = n >= 2
+    alpha = 1 - confidence
+
+    if method == "block":
+        blocks = block_length(n) if block is None else np.broadcast_to(
+            np.asarray(block, dtype=np.int64), (G,)).copy()
+        blocks = np.clip(blocks, 1, np.maximum(n, 1))
+    else:
+        blocks = np.ones(G, dtype=np.int64)
+
+    if method in ("t", "normal"):
+        dev = (flat - mean[gid]) ** 2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sem = np.sqrt(np.bincount(gid, weights=dev, minlength=G) / (n - 1) / n)
+        if method == "normal":
+            q = np.full(G, normal_ppf(1 - alpha / 2))
+        else:
+            quantiles = {df: t_ppf(1 - alpha / 2, df) for df in np.unique(n[ok] - 1)}
+            q = np.array([quantiles.get(k - 1, 0.0) for k in n])
+        lo[ok] = mean[ok] - q[ok] * sem[ok]
+        hi[ok] = mean[ok] + q[ok] * sem[ok]
+    elif ok.any():
+        rng = np.random.default_rng(seed)
+        # Grupos de tamaño parecido juntos: relleno < 2x
+        size_class = np.floor(np.log2(np.maximum(n, 1))).astype(np.int64)
+        for cls in np.unique(size_class[ok]):
+            sel = np.flatnonzero(ok & (size_class == cls))
+            means = _resample_means(flat, n[sel], offset[sel], blocks[sel], n_boot, rng)
+            lo[sel], hi[sel] = np.quantile(means, [alpha / 2, 1 - alpha / 2], axis=1)
+
+    return {
+        "method": method,
+        "confidence": confidence,
+        "n": n,
+        "mean": mean,
+        "lo": lo,
+        "hi": hi,
+        "half": (hi - lo) / 2,
+        "block": blocks,
+    }
+
+
+def error_bars(result):
+    """yerr asimétrico de matplotlib (2 × grupos) a partir de batch_ci"""
+    return np.vstack([result["mean"] - result["lo"], result["hi"] - result["mean"]])
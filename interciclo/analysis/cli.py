@@ -0,0 +1,550 @@
+# analysis/cli.py
+
+"""
+Punto de entrada único de los análisis: python -m analysis <subcomando>
+Subcomandos throughput, delay, peers, iat, profiles, catalog y psnr. Cada uno imprime en
+stdout un resumen JSON (medias, percentiles, jitter, ráfagas, intervalos
+de confianza) sin dibujar nada; los mensajes de progreso van a stderr.
+
+Solo se importan al arrancar argparse, json y la biblioteca estándar:
+NumPy y los módulos de análisis se cargan dentro de cada subcomando, de
+SciPy solo scipy.special (cuantil t) al calcular un intervalo, y
+matplotlib, scipy.stats y Scapy no se cargan nunca en un resumen (Scapy
+solo si hace falta el lector de respaldo). El arranque en frío hasta
+empezar el trabajo se mide en cada ejecución y se compara con
+STARTUP_BUDGET.
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+
+_T_IMPORT = time.perf_counter()
+
+STARTUP_BUDGET = 0.5                            # s desde el inicio del proceso
+HEAVY_MODULES = ("matplotlib", "scipy.stats", "scapy")
+PERCENTILES = (50, 95, 99)
+CONFIDENCE = 0.90
+CI_METHODS = ("t", "normal", "bootstrap", "block")     # los de analysis.ci.batch_ci
+
+
+# ---------------------------------------------------------------
+# ARRANQUE
+# ---------------------------------------------------------------
+def process_age():
+    """
+    Segundos desde que arrancó el proceso
+
+    En Linux se lee el instante de arranque de /proc/self/stat (resolución
+    de un tick, 10 ms); en otros sistemas se cuenta desde que se importó
+    este módulo, sin el arranque del intérprete.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _T_IMPORT
+
+
+def heavy_modules():
+    """Bibliotecas pesadas que ya están importadas"""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+# ---------------------------------------------------------------
+# RESÚMENES
+# ---------------------------------------------------------------
+def describe(values, scale=1.0):
+    """n, media, desviación, mínimo, percentiles, máximo e IC de la media"""
+    import numpy as np
+    from .ci import mean_ci
+
+    values = np.asarray(values, dtype=np.float64) * scale
+    n = len(values)
+    if n == 0:
+        return {"n": 0}
+    std = float(values.std(ddof=1)) if n > 1 else 0.0
+    pct = np.percentile(values, PERCENTILES)
+    summary = {"n": n, "mean": float(values.mean()), "std": std,
+               "min": float(values.min()), "max": float(values.max())}
+    summary.update({f"p{p}": float(v) for p, v in zip(PERCENTILES, pct)})
+    summary["ci"] = mean_ci(n, summary["mean"], std, CONFIDENCE)[1]
+    return summary
+
+
+def describe_hist(hist, scale=1.0):
+    """Igual que describe, a partir de un LogHistogram (cuantiles aproximados)"""
+    from .ci import mean_ci
+
+    stats = hist.stats
+    if stats.n == 0:
+        return {"n": 0}
+    summary = {"n": stats.n, "mean": stats.mean * scale, "std": stats.std * scale,
+               "min": stats.min * scale, "max": stats.max * scale}
+    summary.update({f"p{p}": hist.quantile(p / 100) * scale for p in PERCENTILES})
+    summary["ci"] = mean_ci(stats.n, summary["mean"], summary["std"], CONFIDENCE)[1]
+    return summary
+
+
+def describe_throughput(stats, ci, i):
+    """Resumen del throughput de una celda: estadísticas e intervalo i de batch_ci"""
+    return {"n": stats.n, "mean": stats.mean, "std": stats.std,
+            "min": stats.min, "max": stats.max, "ci": float(ci["half"][i]),
+            "ci_lo": float(ci["lo"][i]), "ci_hi": float(ci["hi"][i]),
+            "ci_method": ci["method"]}
+
+
+def _bursts(bursts):
+    """Ráfagas de flow_metrics o de StreamingFlow con las mismas claves"""
+    import numpy as np
+
+    if "count" in bursts:
+        gaps = bursts["gaps"]
+        return {"count": bursts["count"], "mean_packets": bursts["mean_packets"],
+                "max_packets": bursts["max_packets"],
+                "gap_ms": describe_hist(gaps, 1000) if gaps.n else {"n": 0}}
+    n = len(bursts["packets"])
+    return {"count": n,
+            "mean_packets": float(np.mean(bursts["packets"])) if n else 0.0,
+            "max_packets": int(bursts["packets"].max()) if n else 0,
+            "gap_ms": describe(bursts["gaps"], 1000)}
+
+
+def _flow_metrics(spec, port, windows, max_memory):
+    """
+    Métricas de un flujo de una captura (archivo, directorio o glob)
+
+    Returns:
+        tuple: (métricas de flow_metrics o StreamingFlow.finish, tabla
+                de flujos, IAT en ms como describe)
+    """
+    from .merge import expand_captures, iter_merged, read_merged
+    from .flows import flow_table, select_flows, flow_packets, stream_ports
+
+    files = expand_captures(spec)
+    if max_memory is not None:
+        chunks = iter_merged(files, max_memory=max_memory)
+        by_port, table = stream_ports(chunks, [port], windows=windows, scale=1000)
+        metrics = by_port[port]
+        return metrics, table, describe_hist(metrics["iat_hist"])
+
+    from .pcap_reader import read_udp_packets
+    from .metrics import flow_metrics
+
+    packets = read_udp_packets(files[0]) if len(files) == 1 else read_merged(files)
+    table = flow_table(packets)
+    selected = flow_packets(packets, table, select_flows(table, port=port))
+    del table["index"]
+    metrics = flow_metrics(selected["ts"], selected["size"], windows=windows)
+    return metrics, table, describe(metrics["iat"], 1000)
+
+
+def _flow_header(spec, metrics, table):
+    duration = metrics["duration"]
+    return {
+        "capture": spec,
+        "packets": metrics["packets"],
+        "bytes": metrics["bytes"],
+        "duration_s": duration,
+        "mean_mbps": metrics["bytes"] * 8 / duration / 1e6 if duration > 0 else 0.0,
+        "flows": len(table["packets"]),
+    }
+
+
+# ---------------------------------------------------------------
+# SUBCOMANDOS
+# ---------------------------------------------------------------
+def _pyramid(spec, port, max_memory):
+    """Pirámide de throughput de una captura (archivo, directorio o glob)"""
+    from .merge import expand_captures, read_merged
+    from .pcap_reader import filter_port
+    from .cache import load_pyramid
+    from .pyramid import ThroughputPyramid
+
+    files = expand_captures(spec)
+    if len(files) == 1:
+        return load_pyramid(files[0], port, max_memory=max_memory)
+    packets = filter_port(read_merged(files), port)
+    return ThroughputPyramid.from_packets(packets["ts"], packets["size"])
+
+
+def cmd_throughput_pyramid(args):
+    """Ventanas y tramos servidos desde la pirámide guardada junto a la caché"""
+    results = []
+    for spec in args.pcap:
+        pyramid = _pyramid(spec, args.port, args.max_memory)
+        summary = {"capture": spec, "resolutions_s": pyramid.resolutions}
+        if pyramid.start is None:
+            summary["packets"] = 0
+            results.append(summary)
+            continue
+        start = pyramid.start + (args.start or 0.0)
+        end = pyramid.start + args.end if args.end is not None else None
+        _, nbytes, npackets = pyramid.levels[-1]
+        summary.update(packets=int(npackets.sum()), bytes=int(nbytes.sum()),
+                       duration_s=pyramid.last_ts - pyramid.start,
+                       range_s=[args.start or 0.0, args.end])
+        summary["throughput_mbps"] = {
+            str(w): describe(pyramid.throughput(w, start=start, end=end)[1], 1e-6)
+            for w in args.window}
+        summary["pkt_rate"] = describe(pyramid.pkt_rate(1.0, start=start, end=end)[1])
+        results.append(summary)
+    return {"port": args.port, "captures": results}
+
+
+def cmd_throughput(args):
+    if args.pyramid or args.start is not None or args.end is not None:
+        return cmd_throughput_pyramid(args)
+    results = []
+    for spec in args.pcap:
+        metrics, table, _ = _flow_metrics(spec, args.port, args.window, args.max_memory)
+        summary = _flow_header(spec, metrics, table)
+        summary["throughput_mbps"] = {str(w): describe(metrics["throughput"][w][1], 1e-6)
+                                      for w in args.window}
+        summary["pkt_rate"] = describe(metrics["pkt_rate"][1])
+        results.append(summary)
+    return {"port": args.port, "captures": results}
+
+
+def cmd_iat(args):
+    results = []
+    for spec in args.pcap:
+        for port in args.port:
+            metrics, table, iat = _flow_metrics(spec, port, (1.0,), args.max_memory)
+            summary = _flow_header(spec, metrics, table)
+            summary.update(port=port, iat_ms=iat,
+                           jitter_ms=metrics["jitter_last"] * 1000,
+                           bursts=_bursts(metrics["bursts"]))
+            results.append(summary)
+    return {"captures": results}
+
+
+def cmd_delay(args):
+    import numpy as np
+    from .merge import expand_captures, read_merged
+    from .pcap_reader import read_udp_packets, filter_port
+    from .matching import match_nearest, match_fingerprints, choose_match
+    from .clock import estimate_clock, correct_timestamps, check_nearest_clock
+    from .metrics import rfc3550_jitter
+
+    def load(spec):
+        files = expand_captures(spec)
+        packets = read_udp_packets(files[0]) if len(files) == 1 else read_merged(files)
+        return packets if args.port is None else filter_port(packets, args.port)
+
+    A, B = load(args.pcapA), load(args.pcapB)
+    tsA, tsB = A["ts"], B["ts"]
+    result = {"captures": [args.pcapA, args.pcapB], "port": args.port, "match": args.match,
+              "clock": args.clock, "packets": [len(tsA), len(tsB)]}
+    if len(tsA) == 0 or len(tsB) == 0:
+        result["error"] = "Uno de los pcaps no tiene paquetes UDP"
+        return result
+    if args.match is None:
+        args.match = result["match"] = choose_match(A, B)
+
+    # Reloj de B: offset fijo (mediana) u offset + deriva (envolvente inferior)
+    if args.match == "payload":
+        pairs = match_fingerprints(A["fp"], tsA, B["fp"], tsB)
+        idxA, diffs = pairs["idxA"], pairs["delay"]
+    else:
+        idxA, _, diffs = match_nearest(tsA, tsB, max_gap=args.max_delay)
+    if args.clock == "drift":
+        clk = estimate_clock(tsA[idxA], diffs)
+        tsB = correct_timestamps(tsB, clk)
+        result["clock_fit"] = clk
+    else:
+        offset = float(np.median(diffs)) if len(diffs) else 0.0
+        tsB = tsB - offset
+        result["clock_fit"] = {"offset": offset}
+    fit = result["clock_fit"]
+    if args.match == "nearest" and fit is not None:
+        warning = check_nearest_clock(fit["offset"], A["ts"], A["size"], B["ts"], B["size"],
+                                      fit.get("skew", 0.0), fit.get("t_ref"), args.max_delay)
+        if warning:
+            result["warning"] = warning
+            print(f"⚠ {warning}")
+
+    if args.match == "payload":
+        res = match_fingerprints(A["fp"], tsA, B["fp"], tsB)
+        delays = res["delay"]
+        result.update({k: res[k] for k in ("sent", "received", "lost", "loss_rate",
+                                           "reordered", "duplicates", "ambiguous")})
+    else:
+        _, _, delays = match_nearest(tsA, tsB, max_gap=args.max_delay)
+    result["delay_ms"] = describe(delays, 1000)
+    result["jitter_ms"] = float(rfc3550_jitter(np.diff(delays))[-1] * 1000) if len(delays) > 1 else 0.0
+    return result
+
+
+def cmd_peers(args):
+    from .peers import load_capture, peer_matrix
+
+    captures = [load_capture(spec, args.port) for spec in args.captures]
+    result = peer_matrix(captures, hosts=args.hosts, match=args.match,
+                         reference=args.reference, max_delay=args.max_delay)
+    del result["delays"]
+    # NaN (sentido sin tráfico) como null
+    result["matrix"] = {name: [[None if math.isnan(v) else v for v in row] for row in m.tolist()]
+                        for name, m in result["matrix"].items()}
+    return dict(captures=args.captures, port=args.port, **result)
+
+
+def cmd_profiles(args):
+    from .catalog import layout, summarize_profiles
+    from .ci import batch_ci
+
+    users, profiles = layout(args.base_dir)
+    profiles = args.profile or profiles
+    all_results = summarize_profiles(profiles, args.user or users, args.base_dir, args.port,
+                                     jobs=max(1, args.jobs), use_cache=not args.no_cache,
+                                     max_memory=args.max_memory, capture=args.capture)
+    cells = [(profile, user) for profile in profiles for user in all_results[profile]]
+    ci = batch_ci([all_results[p][u]["thr"][1] for p, u in cells], args.ci, CONFIDENCE)
+    summary = {profile: {} for profile in profiles}
+    for i, (profile, user) in enumerate(cells):
+        res = all_results[profile][user]
+        summary[profile][user] = {
+            "throughput_mbps": describe_throughput(res["thr_stats"], ci, i),
+            "iat_ms": describe_hist(res["iat_hist"]),
+            "jitter_ms": res["jitter_ms"],
+            "bursts": res["bursts"],
+            "flows": len(res["flows"]["packets"]),
+        }
+    return {"base_dir": args.base_dir, "port": args.port, "profiles": summary}
+
+
+def _group_summary(group, by, ci, i):
+    """Resumen JSON de un grupo de catalog.aggregate (i: su intervalo en ci)"""
+    summary = {k: group[k] for k in by}
+    summary.update(runs=group["runs"], first=group["first"], last=group["last"],
+                   duration_s=group["duration"], packets=group["packets"], bytes=group["bytes"])
+    summary["throughput_mbps"] = describe_throughput(group["thr_stats"], ci, i)
+    summary["iat_ms"] = describe_hist(group["iat_hist"])
+    summary["jitter_ms"] = group["jitter_ms"]
+    summary["bursts"] = group["bursts"]
+    return summary
+
+
+def cmd_catalog(args):
+    from .catalog import (open_catalog, default_path, ingest, query, aggregate,
+                          parse_date, month_range)
+    from .ci import batch_ci
+
+    path = args.db or default_path(args.base_dir)
+    db = open_catalog(path)
+    result = {"catalog": path}
+    if args.action == "ingest":
+        result["base_dir"] = args.base_dir
+        result.update(ingest(db, args.base_dir, ports=args.port, use_cache=not args.no_cache,
+                             max_memory=args.max_memory, jobs=max(1, args.jobs),
+                             prune=not args.keep_missing))
+        result["captures"] = db.execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+        return result
+
+    since = parse_date(args.since) if args.since else None
+    until = parse_date(args.until) if args.until else None
+    if args.month is not None:
+        since, until = month_range(args.month or None)
+    rows = query(db, profile=args.profile, user=args.user, port=args.port,
+                 since=since, until=until)
+    result["filters"] = {"profile": args.profile, "user": args.user, "port": args.port,
+                         "since": since, "until": until}
+    groups = aggregate(rows, args.by)
+    ci = batch_ci([g["thr_series"] for g in groups], args.ci, CONFIDENCE)
+    result["groups"] = [_group_summary(g, args.by, ci, i) for i, g in enumerate(groups)]
+    if args.captures:
+        result["captures"] = [{k: v for k, v in row.items() if not isinstance(v, bytes)}
+                              for row in rows]
+    return result
+
+
+def cmd_psnr(args):
+    from .ci import mean_ci
+
+    from .y4m import collect_psnr
+
+    configs = collect_psnr(args.videos_dir) or {}
+    values = list(configs.values())
+    n = len(values)
+    result = {"videos_dir": args.videos_dir, "configs": configs, "n": n}
+    if n:
+        mean = sum(values) / n
+        std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1)) if n > 1 else 0.0
+        result.update(mean=mean, std=std, min=min(values), max=max(values),
+                      best=max(configs, key=configs.get), ci=mean_ci(n, mean, std, CONFIDENCE)[1])
+    return result
+
+
+# ---------------------------------------------------------------
+# ARGUMENTOS
+# ---------------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m analysis",
+        description="Resúmenes estadísticos en JSON de las capturas y del PSNR, sin gráficas")
+    parser.add_argument("--output", "-o", metavar="ARCHIVO",
+                        help="Escribir el JSON en ARCHIVO en lugar de stdout")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET, metavar="S",
+                        help="Presupuesto de arranque en frío en segundos (aviso si se supera)")
+    parser.add_argument("--profile", action="store_true", dest="profile_stages",
+                        help="Medir cada etapa: tabla por stderr y lista \"profile\" en el JSON")
+    parser.add_argument("--profile-dump", metavar="DIR",
+                        help="Además, perfilar cada etapa con cProfile y guardar DIR/<etapa>.prof")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def max_memory(p):
+        p.add_argument("--max-memory", type=lambda mb: int(mb) << 20, metavar="MB",
+                       help="Leer por bloques sin superar MB de memoria de trabajo")
+
+    def ci_method(p):
+        p.add_argument("--ci", choices=CI_METHODS, default="block",
+                       help="Intervalo del throughput medio: t, normal, bootstrap i.i.d. o "
+                            "bootstrap por bloques móviles (throughput autocorrelacionado)")
+
+    p = sub.add_parser("throughput", help="Throughput por ventanas y paquetes/s")
+    p.add_argument("pcap", nargs="+", help="Capturas (archivo, directorio o glob)")
+    p.add_argument("--port", type=int, help="Puerto UDP (origen o destino); por defecto todos")
+    p.add_argument("--window", type=float, nargs="+", default=[1.0], metavar="S",
+                   help="Tamaños de ventana en segundos")
+    p.add_argument("--pyramid", action="store_true",
+                   help="Servir las ventanas desde la pirámide de throughput guardada junto "
+                        "a la caché (<captura>.<puerto>.pyr.cache), sin recorrer los paquetes")
+    p.add_argument("--start", type=float, metavar="S",
+                   help="Solo las ventanas desde S segundos tras el primer paquete (implica --pyramid)")
+    p.add_argument("--end", type=float, metavar="S",
+                   help="Solo las ventanas que terminan antes de S segundos (implica --pyramid)")
+    max_memory(p)
+    p.set_defaults(func=cmd_throughput)
+
+    p = sub.add_parser("iat", help="IAT, jitter RFC 3550 y ráfagas por puerto")
+    p.add_argument("pcap", nargs="+", help="Capturas (archivo, directorio o glob)")
+    p.add_argument("--port", type=int, nargs="+", default=[None],
+                   help="Puertos UDP; por defecto todo el tráfico UDP")
+    max_memory(p)
+    p.set_defaults(func=cmd_iat)
+
+    p = sub.add_parser("delay", help="Delay A → B, pérdida y jitter")
+    p.add_argument("pcapA")
+    p.add_argument("pcapB")
+    p.add_argument("--port", type=int, help="Puerto UDP; por defecto todo el tráfico UDP")
+    p.add_argument("--match", choices=["nearest", "payload"],
+                   help="Emparejamiento: vecino más cercano o huella del payload UDP "
+                        "(por defecto payload si las huellas emparejan)")
+    p.add_argument("--clock", choices=["offset", "drift"], default="drift",
+                   help="Corrección del reloj de B")
+    p.add_argument("--max-delay", type=float, default=1.0, metavar="S",
+                   help="Diferencia máxima aceptada en el emparejamiento por vecino")
+    p.set_defaults(func=cmd_delay)
+
+    p = sub.add_parser("peers", help="Relojes conjuntos y matriz de delay/throughput de N capturas")
+    p.add_argument("captures", nargs="+", help="Una captura por equipo")
+    p.add_argument("--hosts", nargs="+", metavar="IP",
+                   help="IPv4 de cada equipo; por defecto la más frecuente de cada captura")
+    p.add_argument("--reference", type=int, default=0, help="Captura de reloj de referencia")
+    p.add_argument("--port", type=int, help="Puerto UDP; por defecto todo el tráfico UDP")
+    p.add_argument("--match", choices=["nearest", "payload"], default="payload",
+                   help="Emparejamiento: huella del payload UDP o vecino más cercano")
+    p.add_argument("--max-delay", type=float, default=1.0, metavar="S",
+                   help="Diferencia máxima aceptada en el emparejamiento por vecino")
+    p.set_defaults(func=cmd_peers)
+
+    p = sub.add_parser("profiles", help="Throughput e IAT por perfil y usuario")
+    p.add_argument("--base-dir", default="mediciones")
+    p.add_argument("--profile", nargs="+",
+                   help="Perfiles; por defecto los directorios <usuario>/<perfil>/ encontrados")
+    p.add_argument("--user", nargs="+", help="Usuarios; por defecto los directorios encontrados")
+    p.add_argument("--port", type=int, default=39400)
+    p.add_argument("--capture", default="{profile}.pcap", metavar="PATRÓN",
+                   help="Captura de cada <usuario>/<perfil>/ ({profile} = nombre del perfil)")
+    p.add_argument("--no-cache", action="store_true", help="No usar la caché .npz")
+    p.add_argument("--jobs", "-j", type=int, default=1)
+    max_memory(p)
+    ci_method(p)
+    p.set_defaults(func=cmd_profiles)
+
+    p = sub.add_parser("catalog", help="Catálogo SQLite de las capturas: ingesta y consultas")
+    actions = p.add_subparsers(dest="action", required=True)
+    for name, help_text in (("ingest", "Catalogar capturas nuevas o modificadas"),
+                            ("query", "Métricas agregadas de las capturas catalogadas, "
+                                      "sin leer los pcap")):
+        a = actions.add_parser(name, help=help_text)
+        a.add_argument("--base-dir", default="mediciones")
+        a.add_argument("--db", metavar="ARCHIVO",
+                       help="Base SQLite; por defecto <base-dir>/catalog.sqlite")
+        a.set_defaults(func=cmd_catalog)
+        if name == "ingest":
+            a.add_argument("--port", type=int, nargs="+", default=[39400],
+                           help="Puertos de los que se guardan métricas")
+            a.add_argument("--no-cache", action="store_true", help="No usar la caché .npz")
+            a.add_argument("--jobs", "-j", type=int, default=1)
+            a.add_argument("--keep-missing", action="store_true",
+                           help="No quitar del catálogo las capturas que ya no existen")
+            max_memory(a)
+        else:
+            a.add_argument("--profile", nargs="+")
+            a.add_argument("--user", nargs="+")
+            a.add_argument("--port", type=int, nargs="+", default=[39400])
+            a.add_argument("--since", metavar="FECHA", help="Desde FECHA (AAAA-MM-DD[ HH:MM])")
+            a.add_argument("--until", metavar="FECHA", help="Antes de FECHA")
+            a.add_argument("--month", nargs="?", const="", metavar="AAAA-MM",
+                           help="Capturas de ese mes (sin valor: el mes actual)")
+            a.add_argument("--by", nargs="+", choices=["profile", "user", "port"],
+                           default=["profile", "user"], help="Agrupar por estas columnas")
+            a.add_argument("--captures", action="store_true",
+                           help="Incluir también las filas de cada captura")
+            ci_method(a)
+
+    p = sub.add_parser("psnr", help="PSNR medio por configuración de video")
+    p.add_argument("videos_dir", nargs="?", default="./videos")
+    p.set_defaults(func=cmd_psnr)
+
+    return parser
+
+
+def _json_default(value):
+    """Escalares y arrays de NumPy como tipos de JSON"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} no es serializable")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    startup = process_age()
+    from . import profiling
+    profiling.setup(args)
+
+    t0 = time.perf_counter()
+    # El progreso de los módulos de análisis no debe mezclarse con el JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        with profiling.stage(args.command):
+            result = args.func(args)
+    total = time.perf_counter() - t0
+    if profiling.enabled():
+        result["profile"] = profiling.results()
+        profiling.report(sys.stderr)
+
+    heavy = heavy_modules()
+    result["timing"] = {"startup_s": round(startup, 3), "work_s": round(total, 3),
+                        "budget_s": args.budget, "heavy_modules": heavy}
+    if startup > args.budget:
+        print(f"⚠ Arranque en frío de {startup:.2f} s (presupuesto {args.budget:.2f} s)",
+              file=sys.stderr)
+    if heavy:
+        print(f"⚠ Bibliotecas pesadas importadas: {', '.join(heavy)}", file=sys.stderr)
+
+    text = json.dumps(result, indent=2, ensure_ascii=False, default=_json_default)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
@@ -0,0 +1,210 @@
+# analysis/decimate.py
+
+"""
+Decimación de series por paquete antes de graficarlas
+Una figura no puede mostrar más puntos que columnas de píxeles, así que
+las series de millones de muestras se reducen a unos pocos miles:
+
+- "minmax": el mínimo y el máximo de cada tramo (conserva todos los picos)
+- "lttb":   Largest-Triangle-Three-Buckets (conserva la forma de la curva)
+"""
+
+import numpy as np
+
+from .profiling import profiled
+
+
+DEFAULT_POINTS = 4000
+METHODS = ("minmax", "lttb", "none")
+
+
+def minmax(x, y, max_points=DEFAULT_POINTS):
+    """
+    Mínimo y máximo de cada uno de max_points/2 tramos de igual número de
+    muestras, en su orden original. Se conservan el primer y último punto.
+
+    Returns:
+        tuple: (x, y) decimados
+    """
+    n = len(y)
+    if max_points is None or n <= max_points:
+        return x, y
+
+    size = -(-n // max(max_points // 2, 1))         # muestras por tramo
+    nb = -(-n // size)
+
+    # Matriz tramos × muestras; el relleno del último tramo no puede ganar
+    y = np.asarray(y)
+    flat = np.empty(nb * size, dtype=np.float64)
+    flat[:n] = y
+    blocks = flat.reshape(nb, size)
+    flat[n:] = np.inf
+    imin = blocks.argmin(axis=1)
+    flat[n:] = -np.inf
+    imax = blocks.argmax(axis=1)
+
+    base = np.arange(nb) * size
+    idx = np.unique(np.concatenate([base + imin, base + imax, [0, n - 1]]))
+    return np.asarray(x)[idx], y[idx]
+
+
+def lttb(x, y, max_points=DEFAULT_POINTS):
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013)
+
+    Divide la serie en max_points - 2 tramos y de cada uno toma el punto
+    que forma el triángulo de mayor área con el punto elegido en el tramo
+    anterior y el promedio del tramo siguiente.
+
+    Returns:
+        tuple: (x, y) decimados
+    """
+    n = len(y)
+    if max_points is None or n <= max_points or max_points < 3:
+        return x, y
+
+    xf = np.asarray(x, dtype=np.float64)
+    yf = np.asarray(y, dtype=np.float64)
+
+    nb = max_points - 2
+    edges = np.linspace(1, n - 1, nb + 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(xf[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(yf[:n - 1], edges[:-1]) / counts
+    # Para el último tramo el "siguiente" es el último punto
+    avg_x = np.append(avg_x[1:], xf[-1])
+    avg_y = np.append(avg_y[1:], yf[-1])
+
+    idx = np.empty(max_points, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(nb):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((xf[a] - avg_x[i]) * (yf[lo:hi] - yf[a])
+                      - (xf[a] - xf[lo:hi]) * (avg_y[i] - yf[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+@profiled("decimate", items=lambda res, x, *a, **k: len(x))
+def decimate(x, y, max_points=DEFAULT_POINTS, method="minmax"):
+    """
+    Reducir una serie a unos max_points puntos para graficarla
+
+    Args:
+        x, y: Serie completa
+        max_points: Número aproximado de puntos de salida (None = todos)
+        method: "minmax", "lttb" o "none" (sin decimar)
+
+    Returns:
+        tuple: (x, y) decimados
+    """
+    if method == "minmax":
+        return minmax(x, y, max_points)
+    if method == "lttb":
+        return lttb(x, y, max_points)
+    if method in (None, "none"):
+        return x, y
+    raise ValueError(f"Método de decimación desconocido: {method}")
+
+
+class StreamingDecimator:
+    """
+    Decimación min-max de una serie que llega por bloques
+
+    Reduce cada bloque de `size` muestras a su mínimo y su máximo; cuando
+    se acumulan más de 2·max_points puntos, fusiona los tramos de dos en
+    dos y duplica `size`. La memoria queda acotada por max_points más un
+    tramo incompleto, sea cual sea la longitud de la serie. El resultado
+    es el mismo tipo de trazo que minmax() (se conservan todos los picos).
+    """
+
+    def __init__(self, max_points=DEFAULT_POINTS):
+        self.max_points = max(int(max_points), 4)
+        self.size = 1                       # muestras por tramo
+        self.tramos = []                    # bloques (x_min, y_min, x_max, y_max)
+        self.n_tramos = 0
+        self.pending_x = np.array([])
+        self.pending_y = np.array([])
+        self.first = None
+        self.last = None
+        self.n = 0
+
+    def update(self, x, y):
+        """Añadir un bloque de la serie (en orden)"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(y) == 0:
+            return
+        if self.first is None:
+            self.first = (x[0], y[0])
+        self.last = (x[-1], y[-1])
+        self.n += len(y)
+
+        x = np.concatenate([self.pending_x, x])
+        y = np.concatenate([self.pending_y, y])
+        full = len(y) - len(y) % self.size
+        self.pending_x, self.pending_y = x[full:], y[full:]
+        if full:
+            self._add(*self._reduce(x[:full], y[:full], self.size))
+        if self.n_tramos > self.max_points:
+            self._halve()
+
+    @staticmethod
+    def _reduce(x, y, size):
+        """Mínimo y máximo de cada tramo de `size` muestras"""
+        if size == 1:
+            return x, y, x, y
+        by = y.reshape(-1, size)
+        base = np.arange(len(by)) * size
+        imin = base + by.argmin(axis=1)
+        imax = base + by.argmax(axis=1)
+        return x[imin], y[imin], x[imax], y[imax]
+
+    def _add(self, xmin, ymin, xmax, ymax):
+        self.tramos.append((xmin, ymin, xmax, ymax))
+        self.n_tramos += len(ymin)
+
+    def _halve(self):
+        """Fusionar tramos de dos en dos hasta volver a max_points / 2"""
+        xmin, ymin, xmax, ymax = (np.concatenate(col) for col in zip(*self.tramos))
+        while len(ymin) > self.max_points // 2:
+            if len(ymin) % 2:
+                # El tramo impar sobrante vuelve a quedar pendiente como
+                # muestras sueltas: sus extremos bastan para el trazo
+                extra = np.array([[xmin[-1], ymin[-1]], [xmax[-1], ymax[-1]]])
+                extra = extra[np.argsort(extra[:, 0], kind="stable")]
+                self.pending_x = np.concatenate([extra[:, 0], self.pending_x])
+                self.pending_y = np.concatenate([extra[:, 1], self.pending_y])
+                xmin, ymin, xmax, ymax = xmin[:-1], ymin[:-1], xmax[:-1], ymax[:-1]
+            lo = ymin[1::2] < ymin[0::2]
+            hi = ymax[1::2] > ymax[0::2]
+            xmin = np.where(lo, xmin[1::2], xmin[0::2])
+            ymin = np.where(lo, ymin[1::2], ymin[0::2])
+            xmax = np.where(hi, xmax[1::2], xmax[0::2])
+            ymax = np.where(hi, ymax[1::2], ymax[0::2])
+            self.size *= 2
+        self.tramos = [(xmin, ymin, xmax, ymax)]
+        self.n_tramos = len(ymin)
+
+    def finish(self):
+        """
+        Serie decimada hasta el momento
+
+        Returns:
+            tuple: (x, y) ordenados por x, con el primer y el último punto
+        """
+        if self.first is None:
+            return np.array([]), np.array([])
+        parts_x = [np.array([self.first[0]])]
+        parts_y = [np.array([self.first[1]])]
+        for xmin, ymin, xmax, ymax in self.tramos:
+            parts_x += [xmin, xmax]
+            parts_y += [ymin, ymax]
+        parts_x += [self.pending_x, np.array([self.last[0]])]
+        parts_y += [self.pending_y, np.array([self.last[1]])]
+        x, y = np.concatenate(parts_x), np.concatenate(parts_y)
+        x, idx = np.unique(x, return_index=True)
+        return x, y[idx]
@@ -0,0 +1,220 @@
+# analysis/flows.py
+
+"""
+Tabla de flujos UDP de una captura
+Clasifica en una sola pasada vectorizada todos los datagramas por su
+5-tupla (IP y puerto de origen y destino; el protocolo es siempre UDP) y
+resume cada flujo: paquetes, bytes, duración y tasa media. Con el índice
+de flujo de cada paquete se obtienen las columnas de cualquier flujo (o
+conjunto de flujos) sin volver a leer el pcap: ambos sentidos de una
+llamada, audio y video, o varios pares.
+"""
+
+import socket
+import struct
+
+import numpy as np
+
+from .pcap_reader import empty_columns
+from .streaming import StreamingFlow
+from .profiling import profiled, stage
+
+
+@profiled("flow_table", items=lambda res, *a, **k: len(res["index"]))
+def flow_table(packets):
+    """
+    Agrupar los paquetes por 5-tupla
+
+    Args:
+        packets: Columnas del lector (pcap_reader.COLUMNS)
+
+    Returns:
+        dict: "index" (flujo de cada paquete) y, por flujo, ordenados de
+              más a menos bytes: src, dst, sport, dport, packets, bytes,
+              first, last, duration (s), rate (bits/s medios) y pkt_rate
+              (paquetes/s medios)
+    """
+    ts = np.asarray(packets["ts"], dtype=np.float64)
+    return _aggregate(packets["src"], packets["dst"], packets["sport"], packets["dport"],
+                      np.ones(len(ts), dtype=np.int64),
+                      np.asarray(packets["size"], dtype=np.int64), ts, ts)
+
+
+def merge_flow_tables(tables):
+    """
+    Fusionar tablas de flujos de distintos bloques de una captura
+
+    Permite construir la tabla por bloques (pcap_reader.iter_udp_packets)
+    con memoria proporcional al número de flujos y no al de paquetes.
+
+    Returns:
+        dict: Tabla como la de flow_table, sin "index"
+    """
+    cols = {name: np.concatenate([t[name] for t in tables])
+            for name in ("src", "dst", "sport", "dport", "packets", "bytes", "first", "last")}
+    table = _aggregate(cols["src"], cols["dst"], cols["sport"], cols["dport"],
+                       cols["packets"], cols["bytes"], cols["first"], cols["last"])
+    del table["index"]
+    return table
+
+
+def _aggregate(src, dst, sport, dport, count, nbytes, first, last):
+    """
+    Sumar las filas con la misma 5-tupla (paquetes sueltos o resúmenes)
+
+    Un solo ordenamiento por (direcciones, puertos), cortes donde cambia
+    la clave y un reduceat por columna.
+    """
+    n = len(count)
+    addr = (np.asarray(src).astype(np.uint64) << np.uint64(32)) | np.asarray(dst).astype(np.uint64)
+    ports = (np.asarray(sport).astype(np.uint64) << np.uint64(16)) | np.asarray(dport).astype(np.uint64)
+
+    order = np.lexsort((ports, addr))
+    a, p = addr[order], ports[order]
+    new = np.ones(n, dtype=bool)
+    new[1:] = (a[1:] != a[:-1]) | (p[1:] != p[:-1])
+    starts = np.flatnonzero(new)
+
+    key_id = np.empty(n, dtype=np.int64)
+    key_id[order] = np.cumsum(new) - 1
+
+    if n:
+        count = np.add.reduceat(np.asarray(count, dtype=np.int64)[order], starts)
+        nbytes = np.add.reduceat(np.asarray(nbytes, dtype=np.int64)[order], starts)
+        first = np.minimum.reduceat(np.asarray(first, dtype=np.float64)[order], starts)
+        last = np.maximum.reduceat(np.asarray(last, dtype=np.float64)[order], starts)
+    else:
+        count = nbytes = np.empty(0, dtype=np.int64)
+        first = last = np.empty(0)
+
+    # Renumerar de más a menos bytes
+    rank = np.argsort(-nbytes, kind="stable")
+    new_id = np.empty(len(starts), dtype=np.int64)
+    new_id[rank] = np.arange(len(starts))
+
+    addr_k, ports_k = a[starts][rank], p[starts][rank]
+    duration = (last - first)[rank]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(duration > 0, nbytes[rank] * 8 / duration, 0.0)
+        pkt_rate = np.where(duration > 0, count[rank] / duration, 0.0)
+
+    return {
+        "index": new_id[key_id],
+        "src": (addr_k >> np.uint64(32)).astype(np.uint32),
+        "dst": (addr_k & np.uint64(0xFFFFFFFF)).astype(np.uint32),
+        "sport": (ports_k >> np.uint64(16)).astype(np.uint16),
+        "dport": (ports_k & np.uint64(0xFFFF)).astype(np.uint16),
+        "packets": count[rank],
+        "bytes": nbytes[rank],
+        "first": first[rank],
+        "last": last[rank],
+        "duration": duration,
+        "rate": rate,
+        "pkt_rate": pkt_rate,
+    }
+
+
+def select_flows(table, port=None, src=None, dst=None):
+    """
+    Flujos que cumplen todos los criterios indicados
+
+    Args:
+        table: Salida de flow_table
+        port: Puerto de origen o de destino
+        src, dst: IPv4 de origen / destino (texto "a.b.c.d" o entero)
+
+    Returns:
+        np.ndarray: Índices de flujo
+    """
+    mask = np.ones(len(table["packets"]), dtype=bool)
+    if port is not None:
+        mask &= (table["sport"] == port) | (table["dport"] == port)
+    if src is not None:
+        mask &= table["src"] == _ip_value(src)
+    if dst is not None:
+        mask &= table["dst"] == _ip_value(dst)
+    return np.flatnonzero(mask)
+
+
+def flow_packets(packets, table, flows):
+    """
+    Columnas de los paquetes de uno o varios flujos, en el orden de la captura
+
+    Args:
+        packets: Columnas del lector usadas para construir `table`
+        table: Salida de flow_table
+        flows: Índice de flujo o lista de índices
+
+    Returns:
+        dict: Columnas NumPy (mismas claves que `packets`)
+    """
+    mask = np.isin(table["index"], np.atleast_1d(flows))
+    return {name: col[mask] for name, col in packets.items()}
+
+
+def split_flows(packets, table):
+    """
+    Columnas de cada flujo por separado con un único ordenamiento
+
+    Returns:
+        list: Un diccionario de columnas por flujo, en el orden de `table`
+    """
+    order = np.argsort(table["index"], kind="stable")
+    bounds = np.cumsum(table["packets"])[:-1]
+    cols = {name: np.split(col[order], bounds) for name, col in packets.items()}
+    return [{name: cols[name][i] for name in cols} for i in range(len(table["packets"]))]
+
+
+def stream_ports(chunks, ports, **flow_kwargs):
+    """
+    Una sola pasada por bloques: métricas por puerto y tabla de flujos
+
+    Args:
+        chunks: Iterable de bloques de columnas (iter_udp_packets, iter_merged)
+        ports: Puertos a analizar
+        flow_kwargs: Parámetros de StreamingFlow
+
+    Returns:
+        tuple: ({puerto: StreamingFlow.finish()}, tabla de flujos sin "index")
+    """
+    flows = {port: StreamingFlow(**flow_kwargs) for port in ports}
+    table = None
+    for packets in chunks:
+        chunk_table = flow_table(packets)
+        with stage("stream_metrics", items=len(packets["ts"])):
+            for port, flow in flows.items():
+                sel = flow_packets(packets, chunk_table, select_flows(chunk_table, port=port))
+                flow.update(sel["ts"], sel["size"])
+        parts = [chunk_table] if table is None else [table, chunk_table]
+        table = merge_flow_tables(parts)
+
+    if table is None:
+        table = merge_flow_tables([flow_table(empty_columns())])
+    return {port: flow.finish() for port, flow in flows.items()}, table
+
+
+def _ip_value(ip):
+    if isinstance(ip, str):
+        return struct.unpack("!I", socket.inet_aton(ip))[0]
+    return int(ip)
+
+
+def ip_text(value):
+    """IPv4 en texto a partir del entero de las columnas"""
+    return socket.inet_ntoa(struct.pack("!I", int(value)))
+
+
+def format_flow_table(table, limit=20):
+    """Tabla de texto con los `limit` flujos de más bytes"""
+    lines = [f"{'#':>3} {'origen':>21} {'destino':>21} {'paquetes':>9} {'MB':>9} "
+             f"{'dur (s)':>8} {'Mbps':>8} {'pkt/s':>8}"]
+    n = len(table["packets"])
+    for i in range(min(n, limit)):
+        lines.append(f"{i:>3} {ip_text(table['src'][i]) + ':' + str(table['sport'][i]):>21} "
+                     f"{ip_text(table['dst'][i]) + ':' + str(table['dport'][i]):>21} "
+                     f"{table['packets'][i]:>9} {table['bytes'][i] / 1e6:>9.2f} "
+                     f"{table['duration'][i]:>8.1f} {table['rate'][i] / 1e6:>8.3f} "
+                     f"{table['pkt_rate'][i]:>8.1f}")
+    if n > limit:
+        lines.append(f"... y {n - limit} flujos más")
+    return "\n".join(lines)
@@ -0,0 +1,318 @@
+# analysis/frames.py
+
+"""
+Reensamblado de access units H.264 a partir de los paquetes TS capturados
+Cada PES del PID de video es un access unit (un frame): empieza en el
+paquete TS con payload_unit_start_indicator y termina antes del siguiente.
+Por frame se obtiene el PTS, el tamaño, el tipo (IDR/I/P/B según la
+primera slice) y los instantes del primer y último paquete. Emparejando
+por PTS los frames de emisor y receptor se obtiene el delay por frame y
+el tiempo hasta completar cada frame en el receptor.
+
+Se procesa por bloques de datagramas (mpegts.iter_ts_chunks) y solo se
+guardan arrays por frame, así que sirve para sesiones largas.
+"""
+
+import numpy as np
+
+from .mpegts import (TS_PACKET, CHUNK, FLAG_PUSI, FLAG_PAYLOAD, FLAG_ERROR,
+                     FLAG_DUP_DGRAM, iter_ts_chunks, program_map)
+from .matching import match_fingerprints
+from .profiling import profiled
+
+
+PES_HEADER_BYTES = 14
+ES_PROBE = 64               # bytes del ES que se inspeccionan buscando la slice
+KEY_STRIDE = 1 << 12        # > paquetes TS por datagrama (clave de orden de envío)
+FRAME_TYPES = np.array(["?", "P", "B", "I", "SP", "SI", "IDR"])
+
+_U64 = np.uint64
+
+
+def _gather(data, offs, nbytes):
+    """Bytes [offs, offs + nbytes) de cada offset, sin salirse del buffer"""
+    idx = np.minimum(offs[:, None] + np.arange(nbytes), len(data) - 1)
+    return data[idx]
+
+
+def _pes_headers(data, offs):
+    """
+    PTS y longitud de la cabecera PES en los offsets indicados
+
+    Returns:
+        tuple: (pts o -1 si no hay, longitud de la cabecera PES)
+    """
+    b = _gather(data, offs, PES_HEADER_BYTES).astype(np.int64)
+    valid = (b[:, 0] == 0) & (b[:, 1] == 0) & (b[:, 2] == 1)
+    hlen = np.where(valid, 9 + b[:, 8], 0)
+    pts = (((b[:, 9] >> 1) & 0x7) << 30) | (b[:, 10] << 22) | ((b[:, 11] >> 1) << 15) \
+        | (b[:, 12] << 7) | (b[:, 13] >> 1)
+    has_pts = valid & ((b[:, 7] & 0x80) != 0)
+    return np.where(has_pts, pts, -1), hlen
+
+
+def _clz64(w):
+    """Ceros a la izquierda de cada uint64"""
+    w = w.copy()
+    n = np.zeros(len(w), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        top = (w >> _U64(64 - shift)) == 0
+        n += np.where(top, shift, 0)
+        w = np.where(top, w << _U64(shift), w)
+    return np.where(w == 0, 64, n)
+
+
+def _ue(word, pos):
+    """Exp-Golomb sin signo ue(v) que empieza en el bit `pos` de cada palabra"""
+    w = word << pos.astype(np.uint64)
+    lz = np.minimum(_clz64(w), 31)
+    nbits = 2 * lz + 1
+    value = (w >> (64 - nbits).astype(np.uint64)).astype(np.int64) - 1
+    return value, pos + nbits
+
+
+def frame_types(probe):
+    """
+    Tipo de frame a partir de los primeros bytes del ES de cada access unit
+
+    Busca la primera NAL de slice (tipo 1 o 5) y lee first_mb_in_slice y
+    slice_type de su cabecera.
+
+    Args:
+        probe: Matriz uint8 (frames × bytes) con el inicio del ES
+
+    Returns:
+        np.ndarray: Código de tipo (índice en FRAME_TYPES, 0 = desconocido)
+    """
+    f = len(probe)
+    if f == 0:
+        return np.zeros(0, dtype=np.uint8)
+    b = np.concatenate([probe, np.zeros((f, 12), dtype=np.uint8)], axis=1)
+    k = probe.shape[1]
+
+    start = (b[:, :k - 3] == 0) & (b[:, 1:k - 2] == 0) & (b[:, 2:k - 1] == 1)
+    nal = b[:, 3:k] & 0x1F
+    is_slice = start & ((nal == 1) | (nal == 5))
+    found = is_slice.any(axis=1)
+    i = is_slice.argmax(axis=1)
+    rows = np.arange(f)
+
+    word = np.zeros(f, dtype=np.uint64)
+    for j in range(8):
+        word |= b[rows, i + 4 + j].astype(np.uint64) << _U64(56 - 8 * j)
+    _, pos = _ue(word, np.zeros(f, dtype=np.int64))       # first_mb_in_slice
+    slice_type, _ = _ue(word, pos)
+
+    code = np.where(nal[rows, i] == 5, 6, slice_type % 5 + 1)
+    return np.where(found & (slice_type >= 0), code, 0).astype(np.uint8)
+
+
+def sender_order(packetsA, packetsB):
+    """
+    Posición de cada datagrama del receptor en la captura del emisor
+
+    Los datagramas se emparejan por huella; los que no tienen pareja toman
+    la posición interpolada entre sus vecinos. Como `order` de
+    extract_frames, los frames del receptor se reensamblan en el orden de
+    envío aunque los datagramas lleguen desordenados.
+
+    Returns:
+        np.ndarray: Clave de orden (float64) por datagrama de B
+    """
+    res = match_fingerprints(packetsA["fp"], packetsA["ts"], packetsB["fp"], packetsB["ts"])
+    idxA, idxB = res["idxA"], res["idxB"]
+    pos = np.arange(len(packetsB["ts"]), dtype=np.float64)
+    if len(idxB) == 0:
+        return pos
+    srt = np.argsort(idxB, kind="stable")
+    order = np.interp(pos, idxB[srt], idxA[srt].astype(np.float64))
+    order[idxB] = idxA
+    return order
+
+
+def _video_packets(filename, packets, times, pid, rank=None):
+    """
+    Paquetes TS con payload del PID de video, por bloques de datagramas
+
+    Con rank (rango de cada datagrama en el orden de envío) cada paquete
+    lleva además su clave de orden: rango del datagrama · KEY_STRIDE +
+    posición dentro del datagrama.
+
+    Yields:
+        tuple: (pid, data, offset, inicio del payload, pusi, instante, clave o None)
+    """
+    skip = FLAG_ERROR | FLAG_DUP_DGRAM
+    for s, data, offs, per_dgram, h in iter_ts_chunks(filename, packets):
+        if pid is None:
+            kinds = program_map(data, offs, h)
+            video = [p for p, kind in sorted(kinds.items()) if kind == "video"]
+            if not video:
+                continue
+            pid = video[0]
+
+        sel = (h["pid"] == pid) & ((h["flags"] & FLAG_PAYLOAD) != 0) & ((h["flags"] & skip) == 0)
+        t = np.repeat(times[s:s + CHUNK], per_dgram)[sel]
+        key = None
+        if rank is not None:
+            pos = np.arange(len(offs)) - np.repeat(np.cumsum(per_dgram) - per_dgram, per_dgram)
+            key = (np.repeat(rank[s:s + CHUNK], per_dgram) * KEY_STRIDE + pos)[sel]
+        yield (pid, data, offs[sel], h["start"][sel].astype(np.int64),
+               (h["flags"][sel] & FLAG_PUSI) != 0, t, key)
+
+
+@profiled("frames", items=lambda res, *a, **k: len(res["pts"]))
+def extract_frames(filename, packets, times=None, pid=None, order=None):
+    """
+    Frames (access units) del PID de video de una captura
+
+    Los frames se delimitan en el orden de la captura o, con `order`, en
+    el de esa clave: si los datagramas llegaron desordenados se hace una
+    primera pasada que solo guarda la clave del paquete de inicio de cada
+    PES y el frame de cada paquete es el último inicio anterior a él.
+
+    Args:
+        filename: Ruta del pcap del que salen las columnas
+        packets: Columnas del lector filtradas al flujo MPEG-TS
+        times: Timestamp de cada datagrama (p. ej. corregido de reloj);
+               None = packets["ts"]
+        pid: PID de video; None = el primero de tipo video en la PMT
+        order: Clave de orden de envío de cada datagrama (sender_order);
+               None = orden de la captura
+
+    Returns:
+        dict: pid, reordered (datagramas por detrás de uno anterior según
+              order) y, por frame: pts (-1 si no se pudo leer), size (bytes
+              del ES), type (código, ver FRAME_TYPES), t_first, t_last y
+              packets (paquetes TS)
+    """
+    times = np.asarray(packets["ts"] if times is None else times, dtype=np.float64)
+
+    rank, starts, reordered = None, None, 0
+    if order is not None and len(order) > 1:
+        order = np.asarray(order, dtype=np.float64)
+        reordered = int(np.count_nonzero(order < np.maximum.accumulate(order)))
+    if reordered:
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[np.argsort(order, kind="stable")] = np.arange(len(order))
+        keys = []
+        for pid, _, _, _, pusi, _, key in _video_packets(filename, packets, times, pid, rank):
+            keys.append(key[pusi])
+        starts = np.sort(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.int64)
+
+    agg, pes = [], []
+    n_frames = 0                            # PES iniciados en bloques anteriores
+    for pid, data, o, st, pusi, t, key in _video_packets(filename, packets, times, pid, rank):
+        # Frame de cada paquete: número de PES iniciados hasta él
+        if key is None:
+            fid = n_frames + np.cumsum(pusi) - 1
+            n_frames += int(pusi.sum())
+        else:
+            fid = np.searchsorted(starts, key, side="right") - 1
+        keep = fid >= 0                     # datos previos al primer PES
+        if keep.any():
+            fk, tk, sk = fid[keep], t[keep], st[keep]
+            if key is not None:
+                srt = np.argsort(fk, kind="stable")
+                fk, tk, sk = fk[srt], tk[srt], sk[srt]
+            u, first = np.unique(fk, return_index=True)
+            agg.append((u,
+                        np.add.reduceat(TS_PACKET - sk, first),
+                        np.minimum.reduceat(tk, first),
+                        np.maximum.reduceat(tk, first),
+                        np.diff(np.r_[first, len(fk)])))
+
+        # Cabecera PES y tipo de frame en los paquetes de inicio
+        ps = np.flatnonzero(pusi)
+        if len(ps):
+            pts, hlen = _pes_headers(data, o[ps] + st[ps])
+            es = o[ps] + st[ps] + hlen
+            avail = TS_PACKET - st[ps] - hlen
+            probe = _gather(data, es, ES_PROBE)
+            probe[np.arange(ES_PROBE) >= avail[:, None]] = 0xFF
+            pes.append((fid[ps], pts, hlen, frame_types(probe)))
+
+    if not agg:
+        empty = np.array([], dtype=np.int64)
+        return {"pid": pid, "reordered": reordered, "pts": empty, "size": empty,
+                "type": np.array([], dtype=np.uint8), "t_first": np.array([]),
+                "t_last": np.array([]), "packets": empty}
+
+    # Frames partidos entre bloques: se combinan por identificador
+    u, size, tf, tl, npk = (np.concatenate(col) for col in zip(*agg))
+    srt = np.argsort(u, kind="stable")
+    u, size, tf, tl, npk = u[srt], size[srt], tf[srt], tl[srt], npk[srt]
+    ids, first = np.unique(u, return_index=True)
+    size = np.add.reduceat(size, first)
+    tf = np.minimum.reduceat(tf, first)
+    tl = np.maximum.reduceat(tl, first)
+    npk = np.add.reduceat(npk, first)
+
+    pts = np.full(len(ids), -1, dtype=np.int64)
+    ftype = np.zeros(len(ids), dtype=np.uint8)
+    if pes:
+        pfid, ppts, phlen, ptype = (np.concatenate(col) for col in zip(*pes))
+        pos = np.searchsorted(ids, pfid)
+        pts[pos] = ppts
+        ftype[pos] = ptype
+        size[pos] -= phlen
+
+    return {"pid": pid, "reordered": reordered, "pts": pts, "size": size, "type": ftype,
+            "t_first": tf, "t_last": tl, "packets": npk}
+
+
+def match_frames(framesA, framesB):
+    """
+    Emparejar por PTS los frames del emisor y del receptor
+
+    Ambas capturas deben estar en la misma escala de tiempo (reloj de B
+    corregido). Un frame del receptor está completo si su tamaño coincide
+    con el del emisor; si se pierde el paquete de inicio de un PES, sus
+    datos quedan sumados al frame anterior, que tampoco cuenta como
+    completo.
+
+    Returns:
+        dict: idxA, idxB, delay (primer paquete B - primer paquete A),
+              completion (último paquete B - primer paquete A), tx_spread
+              (último - primer paquete en A), complete, sent, received,
+              lost e incomplete
+    """
+    okA = np.flatnonzero(framesA["pts"] >= 0)
+    okB = np.flatnonzero(framesB["pts"] >= 0)
+
+    res = match_fingerprints(framesA["pts"][okA].astype(np.uint64), framesA["t_first"][okA],
+                             framesB["pts"][okB].astype(np.uint64), framesB["t_first"][okB])
+    idxA, idxB = okA[res["idxA"]], okB[res["idxB"]]
+    complete = framesB["size"][idxB] == framesA["size"][idxA]
+
+    return {
+        "idxA": idxA,
+        "idxB": idxB,
+        "delay": res["delay"],
+        "completion": framesB["t_last"][idxB] - framesA["t_first"][idxA],
+        "tx_spread": framesA["t_last"][idxA] - framesA["t_first"][idxA],
+        "complete": complete,
+        "sent": res["sent"],
+        "received": res["received"],
+        "lost": res["lost"],
+        "incomplete": int(np.count_nonzero(~complete)),
+    }
+
+
+def format_frame_summary(framesA, match):
+    """Tabla de texto por tipo de frame: tamaño, delay y tiempo de completado"""
+    lines = [f"Frames: {match['sent']} enviados, {match['received']} recibidos, "
+             f"{match['lost']} perdidos, {match['incomplete']} incompletos",
+             f"{'tipo':<5} {'frames':>7} {'bytes':>9} {'delay p50':>10} {'p95':>8} "
+             f"{'compl. p50':>11} {'p95':>8}  (ms)"]
+    types = framesA["type"][match["idxA"]]
+    ok = match["complete"]
+    for code in np.unique(types):
+        m = (types == code) & ok
+        if not m.any():
+            continue
+        size = framesA["size"][match["idxA"]][m]
+        d = np.percentile(match["delay"][m], [50, 95]) * 1000
+        c = np.percentile(match["completion"][m], [50, 95]) * 1000
+        lines.append(f"{FRAME_TYPES[code]:<5} {int(m.sum()):>7} {size.mean():>9.0f} "
+                     f"{d[0]:>10.2f} {d[1]:>8.2f} {c[0]:>11.2f} {c[1]:>8.2f}")
+    return "\n".join(lines)
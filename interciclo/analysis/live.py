@@ -0,0 +1,265 @@
+# analysis/live.py
+
+"""
+Análisis en vivo de una captura mientras se escribe
+Lee el pcap desde una tubería (tcpdump -U -w -) o desde un archivo que
+crece, y mantiene en buffers circulares el throughput y el IAT de los
+últimos segundos. Cada segundo publica un resumen.
+"""
+
+import json
+import os
+import select
+import sys
+import time
+
+import numpy as np
+
+from .pcap_reader import (PCAP_MAGIC, PCAP_HEADER_LEN, _read_linktype,
+                          scan_records, decode_records, empty_columns, filter_port)
+from .streaming import LogHistogram
+
+
+READ_SIZE = 1 << 16
+
+
+class PcapStream:
+    """
+    Parser incremental de pcap: recibe bytes sueltos y devuelve las
+    columnas de los registros completos. Lo que queda de un registro
+    incompleto se guarda para el siguiente bloque.
+    """
+
+    def __init__(self, port=None):
+        self.port = port
+        self.buf = bytearray()
+        self.endian = None
+        self.ts_scale = None
+        self.linktype = None
+
+    def feed(self, data):
+        """
+        Añadir bytes y decodificar los registros completos
+
+        Returns:
+            dict: Columnas NumPy de los paquetes nuevos
+        """
+        self.buf += data
+
+        if self.linktype is None:
+            if len(self.buf) < PCAP_HEADER_LEN:
+                return empty_columns()
+            magic = bytes(self.buf[:4])
+            if magic not in PCAP_MAGIC:
+                raise ValueError("Formato no soportado: se espera pcap (tcpdump -w)")
+            self.endian, self.ts_scale = PCAP_MAGIC[magic]
+            self.linktype = _read_linktype(bytes(self.buf[:PCAP_HEADER_LEN]), self.endian)
+            if self.linktype is None:
+                raise ValueError("Tipo de enlace no soportado en modo en vivo")
+            del self.buf[:PCAP_HEADER_LEN]
+
+        offsets, consumed = scan_records(self.buf, 0, len(self.buf), self.endian)
+        if consumed == 0:
+            return empty_columns()
+
+        chunk = bytes(self.buf[:consumed])
+        del self.buf[:consumed]
+        packets = decode_records(chunk, offsets, self.endian, self.ts_scale, self.linktype)
+        return filter_port(packets, self.port)
+
+
+class LiveMonitor:
+    """
+    Throughput e IAT por segundo en buffers circulares de `history` segundos
+
+    Los segundos se cuentan desde el primer paquete (tiempo de captura).
+    El segundo en curso todavía se está llenando, así que los resúmenes
+    usan los segundos ya completos.
+    """
+
+    def __init__(self, history=60):
+        self.history = history
+        self.bytes = np.zeros(history, dtype=np.int64)
+        self.pkts = np.zeros(history, dtype=np.int64)
+        self.iat_sum = np.zeros(history)
+        self.iat_max = np.zeros(history)
+        self.start = None
+        self.last_ts = None
+        self.cur_sec = -1
+        self.total_pkts = 0
+        self.total_bytes = 0
+        self.iat_hist = LogHistogram(rel_error=0.01)
+
+    def update(self, ts, sizes):
+        """Incorporar un bloque de paquetes"""
+        if len(ts) == 0:
+            return
+        order = np.argsort(ts, kind="stable")
+        ts = np.asarray(ts, dtype=np.float64)[order]
+        sizes = np.asarray(sizes, dtype=np.int64)[order]
+
+        if self.start is None:
+            self.start = ts[0]
+            self.last_ts = ts[0]
+
+        iat = np.diff(ts, prepend=self.last_ts)
+        self.last_ts = max(self.last_ts, ts[-1])
+        sec = np.floor(ts - self.start).astype(np.int64)
+
+        # Avanzar el buffer circular: limpiar los segundos que se reutilizan
+        new_sec = int(sec.max())
+        if new_sec > self.cur_sec:
+            stale = np.arange(self.cur_sec + 1, new_sec + 1)[-self.history:] % self.history
+            for arr in (self.bytes, self.pkts, self.iat_sum, self.iat_max):
+                arr[stale] = 0
+            self.cur_sec = new_sec
+
+        # Paquetes demasiado antiguos para el buffer se ignoran
+        ok = sec > self.cur_sec - self.history
+        slot = sec[ok] % self.history
+        self.bytes += np.bincount(slot, weights=sizes[ok], minlength=self.history).astype(np.int64)
+        self.pkts += np.bincount(slot, minlength=self.history)
+        self.iat_sum += np.bincount(slot, weights=iat[ok], minlength=self.history)
+        np.maximum.at(self.iat_max, slot, iat[ok])
+
+        self.total_pkts += len(ts)
+        self.total_bytes += int(sizes.sum())
+        self.iat_hist.update(iat * 1000)
+
+    def summary(self, window=10):
+        """
+        Resumen del último segundo completo y de los últimos `window` segundos
+
+        Returns:
+            dict: Métricas listas para imprimir o serializar a JSON
+        """
+        last = self.cur_sec - 1
+        if last < 0:
+            return {"elapsed_s": max(self.cur_sec, 0), "total_pkts": self.total_pkts}
+
+        window = min(window, self.history - 1, last + 1)
+        secs = np.arange(last - window + 1, last + 1) % self.history
+        slot = last % self.history
+
+        pkts_last = int(self.pkts[slot])
+        pkts_win = int(self.pkts[secs].sum())
+        return {
+            "elapsed_s": last + 1,
+            "thr_mbps": self.bytes[slot] * 8 / 1e6,
+            "thr_mbps_avg": self.bytes[secs].sum() * 8 / 1e6 / window,
+            "pkt_rate": pkts_last,
+            "iat_ms": self.iat_sum[slot] / pkts_last * 1000 if pkts_last else None,
+            "iat_ms_avg": self.iat_sum[secs].sum() / pkts_win * 1000 if pkts_win else None,
+            "iat_max_ms": float(self.iat_max[secs].max() * 1000),
+            "iat_p50_ms": self.iat_hist.quantile(0.5),
+            "iat_p99_ms": self.iat_hist.quantile(0.99),
+            "total_pkts": self.total_pkts,
+            "total_mb": self.total_bytes / 1e6,
+            "window_s": int(window),
+        }
+
+
+def format_summary(s):
+    """Línea de texto con el resumen de LiveMonitor.summary"""
+    if "thr_mbps" not in s:
+        return f"[{s['elapsed_s']:5d} s] esperando paquetes... ({s['total_pkts']} recibidos)"
+
+    def ms(v):
+        return f"{v:.2f}" if v is not None else "-"
+
+    return (f"[{s['elapsed_s']:5d} s] {s['thr_mbps']:7.3f} Mbps "
+            f"({s['window_s']} s: {s['thr_mbps_avg']:.3f}) | {s['pkt_rate']:5d} pkt/s | "
+            f"IAT {ms(s['iat_ms'])} ms (max {ms(s['iat_max_ms'])}) | "
+            f"p50 {ms(s['iat_p50_ms'])} p99 {ms(s['iat_p99_ms'])} ms | "
+            f"total {s['total_pkts']} pkt")
+
+
+def read_source(source, follow=True, timeout=0.25):
+    """
+    Generador de bloques de bytes de la captura
+
+    Con source == "-" lee la entrada estándar (tubería de tcpdump); si no,
+    lee el archivo y, con follow=True, espera a que crezca como `tail -f`.
+    Cuando no hay datos nuevos devuelve b"" para que el llamador pueda
+    publicar el resumen a tiempo.
+    """
+    if source == "-":
+        fd = sys.stdin.buffer.fileno()
+        while True:
+            ready, _, _ = select.select([fd], [], [], timeout)
+            if not ready:
+                yield b""
+                continue
+            data = os.read(fd, READ_SIZE)
+            if not data:
+                return
+            yield data
+
+    while not os.path.exists(source):
+        if not follow:
+            raise FileNotFoundError(source)
+        yield b""
+        time.sleep(timeout)
+
+    with open(source, "rb") as f:
+        while True:
+            data = f.read(READ_SIZE)
+            if data:
+                yield data
+            elif follow:
+                yield b""
+                time.sleep(timeout)
+            else:
+                return
+
+
+def run_live(source, port=None, interval=1.0, window=10, history=60,
+             follow=True, as_json=False, idle_timeout=None, out=None):
+    """
+    Bucle principal del modo en vivo
+
+    Args:
+        source: Ruta del pcap que se está escribiendo o "-" (stdin)
+        port: Filtrar por puerto UDP
+        interval: Segundos entre resúmenes
+        window: Segundos que abarca el promedio móvil
+        history: Tamaño del buffer circular (s)
+        follow: Esperar a que el archivo crezca
+        as_json: Publicar líneas JSON en lugar de texto
+        idle_timeout: Terminar tras este tiempo sin datos nuevos (s)
+        out: Flujo de salida (por defecto stdout)
+
+    Returns:
+        LiveMonitor: Estado final
+    """
+    out = out or sys.stdout
+    stream = PcapStream(port)
+    monitor = LiveMonitor(history=history)
+
+    next_pub = time.monotonic() + interval
+    last_data = time.monotonic()
+
+    def publish():
+        s = monitor.summary(window)
+        s["idle_s"] = round(time.monotonic() - last_data, 1)
+        line = json.dumps(s) if as_json else format_summary(s)
+        if not as_json and s["idle_s"] >= 2 * interval:
+            line += f"  ⚠ sin paquetes hace {s['idle_s']:.0f} s"
+        print(line, file=out, flush=True)
+
+    for data in read_source(source, follow=follow, timeout=min(0.25, interval)):
+        now = time.monotonic()
+        if data:
+            packets = stream.feed(data)
+            if len(packets["ts"]):
+                monitor.update(packets["ts"], packets["size"])
+                last_data = now
+        elif idle_timeout is not None and now - last_data > idle_timeout:
+            break
+
+        if now >= next_pub:
+            publish()
+            next_pub = max(next_pub + interval, now)
+
+    publish()
+    return monitor
@@ -0,0 +1,185 @@
+# analysis/matching.py
+
+"""
+Emparejamiento de paquetes entre dos capturas (A -> B)
+"""
+
+import numpy as np
+
+from .profiling import profiled
+
+
+MIN_PAYLOAD_MATCH = 0.5     # fracción de datagramas de A en B para emparejar por huella
+
+
+def _sorted_view(ts):
+    """Devuelve (ts ordenado, índices originales o None si ya estaba ordenado)"""
+    ts = np.asarray(ts, dtype=np.float64)
+    if np.any(ts[1:] < ts[:-1]):
+        order = np.argsort(ts, kind="stable")
+        return ts[order], order
+    return ts, None
+
+
+@profiled("match_nearest", items=lambda res, tsA, *a, **k: len(tsA))
+def match_nearest(tsA, tsB, max_gap=None):
+    """
+    Para cada timestamp de A, el timestamp más cercano de B
+
+    Se resuelve con un único searchsorted: el vecino más cercano de t en B
+    es B[i-1] o B[i], con i la posición de inserción de t. En caso de
+    empate se elige el anterior, como hacía el recorrido con puntero.
+
+    Args:
+        tsA: Timestamps de A
+        tsB: Timestamps de B
+        max_gap: Si se indica, se descartan pares con |B - A| > max_gap (s)
+
+    Returns:
+        tuple: (índices en A, índices en B, delay B - A) de los pares aceptados
+    """
+    tsA = np.asarray(tsA, dtype=np.float64)
+    sortedB, orderB = _sorted_view(tsB)
+    if len(tsA) == 0 or len(sortedB) == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([])
+
+    i = np.searchsorted(sortedB, tsA, side="left")
+    prev = np.clip(i - 1, 0, len(sortedB) - 1)
+    nxt = np.clip(i, 0, len(sortedB) - 1)
+
+    d_prev = sortedB[prev] - tsA
+    d_next = sortedB[nxt] - tsA
+    use_prev = np.abs(d_prev) <= np.abs(d_next)
+
+    idxB = np.where(use_prev, prev, nxt)
+    delay = np.where(use_prev, d_prev, d_next)
+    idxA = np.arange(len(tsA))
+
+    if max_gap is not None:
+        ok = np.abs(delay) <= max_gap
+        idxA, idxB, delay = idxA[ok], idxB[ok], delay[ok]
+
+    if orderB is not None:
+        idxB = orderB[idxB]
+
+    return idxA, idxB, delay
+
+
+@profiled("neighbour_diffs", items=lambda res, tsA, *a, **k: len(tsA))
+def neighbour_diffs(tsA, tsB, max_gap=None):
+    """
+    Diferencias B - A contra los dos vecinos de cada timestamp de A
+
+    Para cada t de A se toman B[i-1] (si existe) y B[i], con i la posición
+    de inserción de t acotada al último índice de B.
+
+    Args:
+        tsA: Timestamps de A
+        tsB: Timestamps de B
+        max_gap: Si se indica, se descartan diferencias con |B - A| >= max_gap
+
+    Returns:
+        np.ndarray: Diferencias B - A
+    """
+    tsA = np.asarray(tsA, dtype=np.float64)
+    sortedB, _ = _sorted_view(tsB)
+    if len(tsA) == 0 or len(sortedB) == 0:
+        return np.array([])
+
+    j = np.minimum(np.searchsorted(sortedB, tsA, side="left"), len(sortedB) - 1)
+    has_prev = j > 0
+    diffs = np.concatenate([
+        sortedB[j[has_prev] - 1] - tsA[has_prev],
+        sortedB[j] - tsA,
+    ])
+
+    if max_gap is not None:
+        diffs = diffs[np.abs(diffs) < max_gap]
+    return diffs
+
+
+@profiled("match_fingerprints", items=lambda res, fpA, *a, **k: len(fpA))
+def match_fingerprints(fpA, tsA, fpB, tsB):
+    """
+    Emparejamiento exacto emisor -> receptor por huella de payload
+
+    Cada datagrama de A se une con el datagrama de B que tiene la misma
+    huella (columna "fp" del lector). Las huellas repetidas dentro de A
+    son ambiguas y no se emparejan; si B recibe varias copias de un mismo
+    datagrama se usa la primera llegada. La unión se hace ordenando las
+    huellas de B una vez y buscándolas con searchsorted, sin bucles
+    por paquete.
+
+    Args:
+        fpA, tsA: Huellas y timestamps del emisor
+        fpB, tsB: Huellas y timestamps del receptor
+
+    Returns:
+        dict: idxA, idxB, delay (B - A) de los pares encontrados, más
+              sent, received, lost, ambiguous, duplicates, reordered y
+              loss_rate
+    """
+    fpA = np.asarray(fpA, dtype=np.uint64)
+    fpB = np.asarray(fpB, dtype=np.uint64)
+    tsA = np.asarray(tsA, dtype=np.float64)
+    tsB = np.asarray(tsB, dtype=np.float64)
+
+    # Huellas únicas en A (las repetidas no se pueden atribuir)
+    _, invA, countA = np.unique(fpA, return_inverse=True, return_counts=True)
+    unambiguous = countA[invA] == 1
+
+    # Primera llegada de cada huella en B, en orden de llegada
+    orderB = np.argsort(tsB, kind="stable")
+    uB, first = np.unique(fpB[orderB], return_index=True)
+    firstB = orderB[first]
+
+    pos = np.searchsorted(uB, fpA)
+    pos = np.minimum(pos, max(len(uB) - 1, 0))
+    found = unambiguous & (len(uB) > 0)
+    if len(uB) > 0:
+        found &= uB[pos] == fpA
+
+    idxA = np.flatnonzero(found)
+    idxB = firstB[pos[idxA]] if len(idxA) else np.array([], dtype=np.int64)
+    delay = tsB[idxB] - tsA[idxA]
+
+    # Reordenamiento: llega antes que un datagrama enviado previamente
+    orderA = np.argsort(tsA[idxA], kind="stable")
+    arrival = tsB[idxB][orderA]
+    reordered = 0
+    if len(arrival) > 1:
+        reordered = int(np.count_nonzero(arrival[1:] < np.maximum.accumulate(arrival)[:-1]))
+
+    sent = int(np.count_nonzero(unambiguous))
+    lost = sent - len(idxA)
+
+    return {
+        "idxA": idxA,
+        "idxB": idxB,
+        "delay": delay,
+        "sent": sent,
+        "received": len(idxA),
+        "lost": lost,
+        "ambiguous": int(len(fpA) - sent),
+        "duplicates": int(len(fpB) - len(uB)),
+        "reordered": reordered,
+        "loss_rate": lost / sent if sent else 0.0,
+    }
+
+
+def choose_match(packetsA, packetsB, min_rate=MIN_PAYLOAD_MATCH, sample=100_000):
+    """
+    Emparejamiento por defecto de dos capturas
+
+    "payload" si ambas tienen huellas y al menos min_rate de los datagramas
+    de A (una muestra repartida por la captura) aparecen en B; si no,
+    "nearest", que solo es fiable con relojes a menos de la separación
+    entre paquetes (ver clock.check_nearest_clock).
+    """
+    if "fp" not in packetsA or "fp" not in packetsB or len(packetsA["fp"]) == 0:
+        return "nearest"
+    fpA = packetsA["fp"]
+    if len(fpA) > sample:
+        fpA = fpA[np.linspace(0, len(fpA) - 1, sample).astype(np.int64)]
+    return "payload" if np.isin(fpA, packetsB["fp"]).mean() >= min_rate else "nearest"
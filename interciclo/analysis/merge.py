@@ -0,0 +1,156 @@
+# analysis/merge.py
+
+"""
+Capturas repartidas en varios archivos leídas como un solo flujo
+tcpdump -C / -G rota la salida en varios archivos y capturar en varias
+interfaces deja un archivo por interfaz. expand_captures convierte un
+archivo, un directorio o un patrón glob en la lista de capturas (pcap o
+pcapng) e iter_merged las lee por bloques y las mezcla por timestamp con
+un merge k-way sobre un heap: en memoria hay como mucho un bloque por
+archivo y nunca se ordena la captura completa.
+"""
+
+import glob
+import heapq
+import os
+import re
+
+import numpy as np
+
+from .pcap_reader import COLUMNS, PCAP_MAGIC, PCAPNG_MAGIC, empty_columns, iter_udp_packets
+from .profiling import stage
+
+
+def is_capture(path):
+    """True si el archivo empieza con la cabecera de un pcap o un pcapng"""
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(4)
+    except OSError:
+        return False
+    return magic in PCAP_MAGIC or magic == PCAPNG_MAGIC
+
+
+def _natural_key(path):
+    """Orden natural: captura.pcap2 antes que captura.pcap10"""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path)]
+
+
+def expand_captures(spec):
+    """
+    Lista de capturas que describe `spec`
+
+    Args:
+        spec: Ruta de un archivo, de un directorio (todas las capturas que
+              contiene) o patrón glob ("mediciones/tx_*.pcap*")
+
+    Returns:
+        list: Rutas en orden natural (el de rotación de tcpdump)
+    """
+    if os.path.isfile(spec):
+        return [spec]
+    if os.path.isdir(spec):
+        candidates = [os.path.join(spec, name) for name in os.listdir(spec)]
+    else:
+        candidates = glob.glob(spec)
+
+    # El contenido decide, no la extensión: las rotaciones de tcpdump -C
+    # se llaman captura.pcap1, captura.pcap2... y las cachés .npz se ignoran
+    files = sorted((p for p in candidates if os.path.isfile(p) and is_capture(p)),
+                   key=_natural_key)
+    if not files:
+        raise FileNotFoundError(f"No se encontraron capturas pcap/pcapng en {spec}")
+    return files
+
+
+def _blocks(index, filename, port, max_memory):
+    """Bloques de un archivo, ordenados por tiempo y con la columna "file" """
+    for packets in iter_udp_packets(filename, port, max_memory=max_memory):
+        if len(packets["ts"]) == 0:
+            continue
+        ts = packets["ts"]
+        if np.any(ts[1:] < ts[:-1]):
+            order = np.argsort(ts, kind="stable")
+            packets = {name: col[order] for name, col in packets.items()}
+        packets["file"] = np.full(len(ts), index, dtype=np.int32)
+        yield packets
+
+
+def iter_merged(files, port=None, max_memory=256 << 20):
+    """
+    Mezclar por timestamp varias capturas, por bloques
+
+    Cada archivo se lee con iter_udp_packets y se guarda su bloque actual.
+    El heap ordena los archivos por el último timestamp de su bloque: el
+    menor de ellos es un horizonte seguro, porque ningún paquete que quede
+    por leer puede ser anterior. Se emite todo lo que hay hasta el
+    horizonte en todos los bloques (un merge de secuencias ya ordenadas)
+    y se lee el siguiente bloque del archivo que se agotó.
+
+    Args:
+        files: Rutas de las capturas (ver expand_captures)
+        port: Filtrar por puerto origen/destino (None = todos)
+        max_memory: Memoria de trabajo total; se reparte entre los archivos
+
+    Yields:
+        dict: Columnas NumPy (ver pcap_reader.COLUMNS) más "file", índice
+              en `files` de la captura de cada paquete (payload_off es un
+              offset dentro de ese archivo)
+    """
+    # Un bloque por archivo más el bloque mezclado de salida
+    per_file = max(1, max_memory // (2 * max(len(files), 1)))
+    sources = [_blocks(i, f, port, per_file) for i, f in enumerate(files)]
+    pending = [None] * len(files)
+    heap = []
+
+    def refill(i):
+        block = next(sources[i], None)
+        pending[i] = block
+        if block is not None:
+            heapq.heappush(heap, (block["ts"][-1], i))
+
+    for i in range(len(files)):
+        refill(i)
+
+    while heap:
+        horizon, i = heapq.heappop(heap)
+
+        parts = []
+        for j, block in enumerate(pending):
+            if block is None:
+                continue
+            k = int(np.searchsorted(block["ts"], horizon, side="right"))
+            if k == 0:
+                continue
+            parts.append({name: col[:k] for name, col in block.items()})
+            pending[j] = {name: col[k:] for name, col in block.items()}
+
+        # El archivo i ha emitido todo su bloque: siguiente bloque
+        refill(i)
+
+        if not parts:
+            continue
+        if len(parts) == 1:
+            yield parts[0]
+            continue
+        with stage("merge") as st:
+            merged = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+            order = np.argsort(merged["ts"], kind="stable")
+            merged = {name: col[order] for name, col in merged.items()}
+            st.count(len(order))
+        yield merged
+
+
+def read_merged(files, port=None, max_memory=256 << 20):
+    """
+    Todas las capturas mezcladas por timestamp en un único diccionario
+
+    Returns:
+        dict: Columnas NumPy como read_udp_packets, más "file"
+    """
+    parts = list(iter_merged(files, port, max_memory))
+    if not parts:
+        packets = empty_columns()
+        packets["file"] = np.empty(0, dtype=np.int32)
+        return packets
+    return {name: np.concatenate([p[name] for p in parts]) for name in list(COLUMNS) + ["file"]}
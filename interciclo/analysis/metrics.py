@@ -0,0 +1,270 @@
+# analysis/metrics.py
+
+"""
+Métricas por ventana de tiempo sobre arrays de paquetes
+"""
+
+import numpy as np
+
+from .profiling import profiled
+
+
+BURST_GAP = 0.002           # IAT máximo entre paquetes de una misma ráfaga (s)
+JITTER_BLOCK = 4096         # muestras por bloque del filtro de jitter RFC 3550
+
+
+@profiled("throughput", items=lambda res, ts, *a, **k: len(ts))
+def compute_throughput(ts, sizes, window=1.0, step=None):
+    """
+    Throughput en bits/s por ventanas de tiempo
+
+    Las ventanas empiezan en el primer paquete y se descarta la última
+    ventana incompleta, igual que la versión con máscaras por bin. Los bytes
+    de cada ventana se obtienen con searchsorted sobre la suma acumulada,
+    de modo que el coste es O(paquetes + ventanas).
+
+    Args:
+        ts: Timestamps (s)
+        sizes: Tamaño de cada paquete (bytes)
+        window: Duración de la ventana (s)
+        step: Desplazamiento entre ventanas (s). None = ventanas contiguas;
+              un valor menor que `window` da ventanas deslizantes
+
+    Returns:
+        tuple: (inicio de cada ventana, throughput en bits/s)
+    """
+    ts = np.asarray(ts, dtype=np.float64)
+    sizes = np.asarray(sizes)
+    if len(ts) == 0:
+        return np.array([]), np.array([])
+
+    if np.any(ts[1:] < ts[:-1]):
+        order = np.argsort(ts, kind="stable")
+        ts, sizes = ts[order], sizes[order]
+
+    start = ts[0]
+    end = ts[-1]
+
+    if step is None or step == window:
+        edges = np.arange(start, end, window)
+        lo, hi = edges[:-1], edges[1:]
+    else:
+        lo = np.arange(start, end, step)
+        hi = lo + window
+        keep = hi <= end
+        lo, hi = lo[keep], hi[keep]
+
+    total_bytes = window_sums(ts, sizes, lo, hi)
+    return lo, total_bytes * 8 / window
+
+
+def window_sums(ts, sizes, lo, hi):
+    """
+    Suma de `sizes` de los paquetes con lo <= ts < hi para cada ventana
+
+    Args:
+        ts: Timestamps ordenados
+        sizes: Valores a sumar (mismo largo que ts)
+        lo, hi: Límites de cada ventana
+
+    Returns:
+        np.ndarray: Suma por ventana (entera si `sizes` es entero)
+    """
+    return _range_sums(ts, _prefix_sums(sizes), lo, hi)
+
+
+def _prefix_sums(sizes):
+    """Suma acumulada con un cero inicial (csum[i] = sum(sizes[:i]))"""
+    sizes = np.asarray(sizes)
+    acc_dtype = np.int64 if np.issubdtype(sizes.dtype, np.integer) else np.float64
+    csum = np.zeros(len(sizes) + 1, dtype=acc_dtype)
+    np.cumsum(sizes, dtype=acc_dtype, out=csum[1:])
+    return csum
+
+
+def _range_sums(ts, csum, lo, hi):
+    i0 = np.searchsorted(ts, lo, side="left")
+    i1 = np.searchsorted(ts, hi, side="left")
+    return csum[i1] - csum[i0]
+
+
+def _tumbling(start, end, window):
+    """Inicio y fin de las ventanas contiguas completas (igual que compute_throughput)"""
+    edges = np.arange(start, end, window)
+    return edges[:-1], edges[1:]
+
+
+@profiled("iat", items=lambda res, ts, *a, **k: len(ts))
+def compute_iat(ts, discard_seconds=1.0):
+    """
+    Inter-arrival time eliminando el tramo inicial para evitar picos
+    por diferencias entre inicios de captura.
+
+    Args:
+        ts: Timestamps ordenados (s)
+        discard_seconds: Tramo inicial que se descarta (s)
+
+    Returns:
+        np.ndarray: IAT (s)
+    """
+    ts = np.asarray(ts, dtype=np.float64)
+    if len(ts) < 2:
+        return np.array([])
+
+    t0 = ts[0] + discard_seconds
+    ts = ts[ts >= t0]
+    if len(ts) < 2:
+        return np.array([])
+
+    return np.diff(ts)
+
+
+@profiled("jitter", items=lambda res, d: len(d))
+def rfc3550_jitter(d):
+    """
+    Estimador de jitter entre llegadas de la RFC 3550 (sección 6.4.1)
+
+    J(i) = J(i-1) + (|D(i-1, i)| - J(i-1)) / 16, con J(0) = 0. Es un filtro
+    IIR de primer orden: dentro de un bloque de JITTER_BLOCK muestras se
+    evalúa en forma cerrada, J(j) = g^j · (g·J0 + Σ g^-k |D(k)| / 16) con
+    g = 15/16, y solo se itera en Python sobre los bloques. Equivale a
+    scipy.signal.lfilter([1/16], [1, -15/16], |D|) sin importar SciPy.
+
+    Args:
+        d: Diferencias de tránsito D(i-1, i) entre paquetes consecutivos (s)
+
+    Returns:
+        np.ndarray: J tras cada paquete (s)
+    """
+    d = np.abs(np.asarray(d, dtype=np.float64))
+    out = np.empty(len(d))
+    if len(d) == 0:
+        return out
+
+    # g^-k cabe en float64 hasta k ~ 11000; los bloques son mucho menores
+    g = 15 / 16
+    k = np.arange(JITTER_BLOCK)
+    up, down = g ** k, g ** -k
+    j0 = 0.0
+    for s in range(0, len(d), JITTER_BLOCK):
+        block = d[s:s + JITTER_BLOCK]
+        n = len(block)
+        acc = g * j0 + np.cumsum(block * down[:n]) / 16
+        out[s:s + n] = up[:n] * acc
+        j0 = out[s + n - 1]
+    return out
+
+
+@profiled("bursts", items=lambda res, ts, *a, **k: len(ts))
+def burst_stats(ts, sizes, burst_gap=BURST_GAP):
+    """
+    Ráfagas: tramos de paquetes separados por IAT <= burst_gap
+
+    Args:
+        ts: Timestamps ordenados (s)
+        sizes: Tamaño de cada paquete (bytes)
+        burst_gap: Separación máxima dentro de una ráfaga (s)
+
+    Returns:
+        dict: packets, bytes y duration de cada ráfaga, y gaps (silencios
+              entre ráfagas consecutivas, s)
+    """
+    ts = np.asarray(ts, dtype=np.float64)
+    if len(ts) == 0:
+        empty = np.array([], dtype=np.int64)
+        return {"packets": empty, "bytes": empty, "duration": np.array([]),
+                "gaps": np.array([])}
+
+    iat = np.diff(ts)
+    breaks = np.flatnonzero(iat > burst_gap) + 1
+    starts = np.r_[0, breaks]
+    ends = np.r_[breaks, len(ts)]
+
+    csum = _prefix_sums(sizes)
+    return {
+        "packets": ends - starts,
+        "bytes": csum[ends] - csum[starts],
+        "duration": ts[ends - 1] - ts[starts],
+        "gaps": iat[breaks - 1],
+    }
+
+
+@profiled("flow_metrics", items=lambda res, *a, **k: res["packets"])
+def flow_metrics(ts, sizes, windows=(1.0,), discard_seconds=1.0,
+                 burst_gap=BURST_GAP, transit=None):
+    """
+    Todas las métricas de un flujo en una sola pasada sobre sus arrays
+
+    Se ordena una vez, se calculan una vez la suma acumulada de tamaños y
+    los IAT, y de ahí salen el throughput a cada tamaño de ventana, la tasa
+    de paquetes por segundo, el jitter RFC 3550 y las ráfagas.
+
+    Sin `transit`, D(i-1, i) se toma como IAT - mediana del IAT (espaciado
+    nominal de un emisor de tasa constante); con los tránsitos de pares
+    emparejados (tB - tA) se usa la diferencia entre tránsitos consecutivos,
+    como en la RFC.
+
+    Args:
+        ts: Timestamps (s)
+        sizes: Tamaño de cada paquete (bytes)
+        windows: Tamaños de ventana para el throughput (s)
+        discard_seconds: Tramo inicial que se descarta para IAT y jitter (s)
+        burst_gap: Separación máxima dentro de una ráfaga (s)
+        transit: Tiempo de tránsito de cada paquete (opcional, s)
+
+    Returns:
+        dict: packets, bytes, duration, throughput {ventana: (inicio, bits/s)},
+              pkt_rate (inicio, paquetes/s), iat, jitter (serie J), jitter_last
+              y bursts (ver burst_stats)
+    """
+    ts = np.asarray(ts, dtype=np.float64)
+    sizes = np.asarray(sizes)
+    if transit is not None:
+        transit = np.asarray(transit, dtype=np.float64)
+
+    if len(ts) and np.any(ts[1:] < ts[:-1]):
+        order = np.argsort(ts, kind="stable")
+        ts, sizes = ts[order], sizes[order]
+        if transit is not None:
+            transit = transit[order]
+
+    result = {
+        "packets": len(ts),
+        "bytes": int(sizes.sum()) if len(ts) else 0,
+        "duration": float(ts[-1] - ts[0]) if len(ts) else 0.0,
+        "throughput": {},
+    }
+    if len(ts) == 0:
+        result.update(pkt_rate=(np.array([]), np.array([])), iat=np.array([]),
+                      jitter=np.array([]), jitter_last=0.0,
+                      bursts=burst_stats(ts, sizes, burst_gap))
+        for w in windows:
+            result["throughput"][w] = (np.array([]), np.array([]))
+        return result
+
+    # ---- Throughput y tasa de paquetes (una suma acumulada) ----
+    csum = _prefix_sums(sizes)
+    for w in windows:
+        lo, hi = _tumbling(ts[0], ts[-1], w)
+        result["throughput"][w] = (lo, _range_sums(ts, csum, lo, hi) * 8 / w)
+
+    lo, hi = _tumbling(ts[0], ts[-1], 1.0)
+    counts = np.searchsorted(ts, hi, side="left") - np.searchsorted(ts, lo, side="left")
+    result["pkt_rate"] = (lo, counts.astype(np.float64))
+
+    # ---- IAT y jitter ----
+    first = int(np.searchsorted(ts, ts[0] + discard_seconds, side="left"))
+    iat = np.diff(ts[first:]) if len(ts) - first >= 2 else np.array([])
+    result["iat"] = iat
+
+    if transit is not None:
+        d = np.diff(transit[first:])
+    else:
+        d = iat - np.median(iat) if len(iat) else iat
+    jitter = rfc3550_jitter(d)
+    result["jitter"] = jitter
+    result["jitter_last"] = float(jitter[-1]) if len(jitter) else 0.0
+
+    # ---- Ráfagas y silencios ----
+    result["bursts"] = burst_stats(ts, sizes, burst_gap)
+    return result
@@ -0,0 +1,384 @@
+# analysis/mpegts.py
+
+"""
+Contabilidad MPEG-TS a partir de los payloads UDP capturados
+FFmpeg transmite con -f mpegts, así que cada datagrama lleva paquetes TS
+de 188 bytes. Las cabeceras TS se leen directamente del pcap mapeado en
+memoria (np.frombuffer sobre el mmap, sin copiar los payloads) usando los
+offsets de payload del lector: solo se recogen los 6 primeros bytes de
+cada paquete TS.
+
+Por PID se obtiene el bitrate (video/audio/PSI según la PAT/PMT) y, con el
+contador de continuidad de 4 bits, la pérdida, los duplicados y el
+reordenamiento a nivel TS. Con la captura del emisor, los paquetes del
+receptor se cuentan en el orden de envío (frames.sender_order).
+"""
+
+import mmap
+
+import numpy as np
+
+from .pcap_reader import has_payload_offsets
+from .profiling import profiled
+
+
+TS_PACKET = 188
+SYNC_BYTE = 0x47
+HEADER_BYTES = 6
+NULL_PID = 0x1FFF
+PAT_PID = 0x0000
+CHUNK = 1 << 18              # datagramas por bloque al leer cabeceras
+
+# stream_type de la PMT (ISO/IEC 13818-1, tabla 2-34)
+STREAM_TYPES = {
+    0x01: "video", 0x02: "video", 0x10: "video", 0x1B: "video", 0x24: "video",
+    0x03: "audio", 0x04: "audio", 0x0F: "audio", 0x11: "audio", 0x81: "audio",
+}
+
+# Bits de la columna "flags"
+FLAG_PUSI = 1                # payload_unit_start_indicator
+FLAG_PAYLOAD = 2             # adaptation_field_control con payload
+FLAG_DISC = 4                # discontinuity_indicator del adaptation field
+FLAG_ERROR = 8               # byte de sincronía incorrecto o transport_error
+FLAG_DUP_DGRAM = 16          # dentro de un datagrama UDP repetido
+
+
+def ts_packet_offsets(payload_off, payload_len):
+    """
+    Offset de cada paquete TS dentro de la captura
+
+    Args:
+        payload_off: Offset de cada payload UDP en el archivo
+        payload_len: Longitud de cada payload
+
+    Returns:
+        tuple: (offsets de los paquetes TS, número de paquetes TS por datagrama)
+    """
+    payload_off = np.asarray(payload_off, dtype=np.int64)
+    per_dgram = np.asarray(payload_len, dtype=np.int64) // TS_PACKET
+    total = int(per_dgram.sum())
+    first = np.cumsum(per_dgram) - per_dgram
+    j = np.arange(total, dtype=np.int64) - np.repeat(first, per_dgram)
+    return np.repeat(payload_off, per_dgram) + j * TS_PACKET, per_dgram
+
+
+def parse_headers(data, offs):
+    """
+    Decodificar las cabeceras TS en los offsets indicados
+
+    Args:
+        data: Captura como array uint8 (vista del mmap)
+        offs: Offset de cada paquete TS
+
+    Returns:
+        dict: pid (uint16), cc (uint8), flags (uint8, ver FLAG_*) y start
+              (uint8, inicio del payload dentro del paquete TS)
+    """
+    b = data[offs[:, None] + np.arange(HEADER_BYTES)]
+    pid = ((b[:, 1].astype(np.uint16) & 0x1F) << 8) | b[:, 2]
+    afc = (b[:, 3] >> 4) & 0x3
+
+    flags = np.zeros(len(offs), dtype=np.uint8)
+    flags |= np.where(b[:, 1] & 0x40, FLAG_PUSI, 0).astype(np.uint8)
+    flags |= np.where(afc & 0x1, FLAG_PAYLOAD, 0).astype(np.uint8)
+    disc = (afc & 0x2).astype(bool) & (b[:, 4] > 0) & ((b[:, 5] & 0x80) != 0)
+    flags |= np.where(disc, FLAG_DISC, 0).astype(np.uint8)
+    bad = (b[:, 0] != SYNC_BYTE) | ((b[:, 1] & 0x80) != 0)
+    flags |= np.where(bad, FLAG_ERROR, 0).astype(np.uint8)
+
+    start = np.where(afc & 0x2, np.minimum(5 + b[:, 4].astype(np.int64), TS_PACKET), 4)
+
+    return {"pid": pid, "cc": (b[:, 3] & 0x0F).astype(np.uint8), "flags": flags,
+            "start": start.astype(np.uint8)}
+
+
+def continuity(cc, flags, rank=None):
+    """
+    Pérdida, duplicados y reordenamiento de un PID por su contador de
+    continuidad
+
+    Solo cuentan los paquetes con payload (el contador no avanza en los que
+    llevan solo adaptation field) que no vienen en un datagrama repetido, y
+    se ignoran los saltos señalados con discontinuity_indicator. Cada salto
+    del contador distinto de +1 es un error de continuidad:
+
+    - salto 0: paquete TS duplicado
+    - salto k (2..15): k - 1 paquetes perdidos
+
+    Con `rank` (posición de envío de cada paquete, ver analyze_ts) los
+    paquetes se ponen en el orden del emisor antes de contar los saltos, y
+    el reordenamiento es el número de paquetes que llegaron después de uno
+    enviado más tarde. Sin él, un salto cuyo siguiente salto, menos de 16
+    paquetes después, vuelve justo al inicio de su hueco se toma como un
+    tramo que llegó tarde: el hueco, ese salto y el de vuelta no cuentan
+    como pérdida. Esa heurística solo deshace intercambios aislados; con
+    reordenamiento frecuente hace falta `rank`.
+
+    Cada salto se evalúa por separado, así que un error no se arrastra al
+    resto del flujo. Limitación propia de un contador de 4 bits: la
+    pérdida de 16 paquetes seguidos de un PID no se ve y las pérdidas se
+    cuentan módulo 16.
+
+    Args:
+        cc: Contador de continuidad de cada paquete, en orden de llegada
+        flags: Bits FLAG_* de cada paquete
+        rank: Clave de orden de envío de cada paquete (None = orden de llegada)
+
+    Returns:
+        dict: packets, cc_errors, lost, duplicates, reordered (eventos sin
+              `rank`, paquetes con él)
+    """
+    sel = ((flags & FLAG_PAYLOAD) != 0) & ((flags & FLAG_DUP_DGRAM) == 0)
+    c = cc[sel].astype(np.int64)
+    signalled = (flags[sel] & FLAG_DISC) != 0
+    n = len(c)
+    if n < 2:
+        return {"packets": n, "cc_errors": 0, "lost": 0, "duplicates": 0, "reordered": 0}
+
+    late_packets = None
+    if rank is not None:
+        r = np.asarray(rank)[sel]
+        late_packets = int(np.count_nonzero(r[1:] < np.maximum.accumulate(r)[:-1]))
+        order = np.argsort(r, kind="stable")
+        c, signalled = c[order], signalled[order]
+
+    delta = (c[1:] - c[:-1]) & 0xF
+    ok = (delta == 1) | signalled[1:]
+    dup = (delta == 0) & ~ok
+    pos = np.flatnonzero(~ok & ~dup) + 1        # paquete tras cada salto
+    gap = delta[pos - 1] - 1
+
+    cancel = np.zeros(len(pos), dtype=bool)
+    if late_packets is None:
+        # El salto k+1, poco después, vuelve justo al inicio del hueco del salto k
+        late = np.flatnonzero((((c[pos[1:]] - c[pos[:-1] - 1] - 1) & 0xF) == 0)
+                              & (np.diff(pos) < 16) & (gap[:-1] > 0))
+        # El salto de vuelta también cumple la condición respecto al tardío
+        late = late[~np.isin(late - 1, late)]
+        for shift in (0, 1, 2):
+            k = late + shift
+            cancel[k[k < len(pos)]] = True
+        late_packets = len(late)
+
+    return {
+        "packets": n,
+        "cc_errors": int(len(pos) + dup.sum()),
+        "lost": int(gap[~cancel].sum()),
+        "duplicates": int(dup.sum()),
+        "reordered": int(late_packets),
+    }
+
+
+def _section(data, off, flags):
+    """Bytes de la sección PSI que empieza en el paquete TS de offset `off`"""
+    pkt = bytes(data[off:off + TS_PACKET])
+    pos = 4
+    if (pkt[3] >> 4) & 0x2:
+        pos += 1 + pkt[4]
+    if not flags & FLAG_PUSI or pos >= TS_PACKET:
+        return None
+    pos += 1 + pkt[pos]                  # pointer_field
+    return pkt[pos:] if pos + 3 <= TS_PACKET else None
+
+
+def program_map(data, offs, headers):
+    """
+    Tipo de cada PID a partir de la primera PAT y PMT de la captura
+
+    Returns:
+        dict: {pid: "video" | "audio" | "PSI" | "datos"}
+    """
+    pid, flags = headers["pid"], headers["flags"]
+    kinds = {PAT_PID: "PSI"}
+    start = (flags & FLAG_PUSI) != 0
+
+    pat = np.flatnonzero(start & (pid == PAT_PID))
+    if len(pat) == 0:
+        return kinds
+    sec = _section(data, offs[pat[0]], flags[pat[0]])
+    if sec is None or sec[0] != 0x00:
+        return kinds
+
+    length = ((sec[1] & 0x0F) << 8) | sec[2]
+    pmt_pids = []
+    for i in range(8, min(3 + length - 4, len(sec) - 3), 4):
+        program = (sec[i] << 8) | sec[i + 1]
+        if program != 0:
+            pmt_pids.append(((sec[i + 2] & 0x1F) << 8) | sec[i + 3])
+
+    for pmt_pid in pmt_pids:
+        kinds[pmt_pid] = "PSI"
+        found = np.flatnonzero(start & (pid == pmt_pid))
+        if len(found) == 0:
+            continue
+        sec = _section(data, offs[found[0]], flags[found[0]])
+        if sec is None or sec[0] != 0x02:
+            continue
+        length = ((sec[1] & 0x0F) << 8) | sec[2]
+        end = min(3 + length - 4, len(sec))
+        i = 12 + (((sec[10] & 0x0F) << 8) | sec[11])
+        while i + 5 <= end:
+            es_pid = ((sec[i + 1] & 0x1F) << 8) | sec[i + 2]
+            kinds[es_pid] = STREAM_TYPES.get(sec[i], "datos")
+            i += 5 + (((sec[i + 3] & 0x0F) << 8) | sec[i + 4])
+
+    return kinds
+
+
+def pid_kind(pid, kinds):
+    if pid in kinds:
+        return kinds[pid]
+    if pid == NULL_PID:
+        return "nulo"
+    if pid <= 0x1F:
+        return "PSI"
+    return "desconocido"
+
+
+def iter_ts_chunks(filename, packets):
+    """
+    Recorrer por bloques de CHUNK datagramas las cabeceras TS de una captura
+
+    Mantiene el pcap mapeado mientras dura la iteración. Los datagramas que
+    repiten la huella ("fp") de uno anterior marcan sus paquetes TS con
+    FLAG_DUP_DGRAM.
+
+    Yields:
+        tuple: (s, data, offs, per_dgram, headers): índice del primer
+               datagrama del bloque, captura como array uint8, offset de
+               cada paquete TS, paquetes TS por datagrama y parse_headers
+    """
+    payload_off = np.asarray(packets["payload_off"], dtype=np.int64)
+    payload_len = np.asarray(packets["payload_len"], dtype=np.int64)
+    if not has_payload_offsets(packets):
+        raise ValueError(f"{filename}: el análisis MPEG-TS necesita el lector nativo pcap/pcapng "
+                         f"(la captura se leyó con scapy y sus payloads no tienen offset)")
+    if len(payload_off) == 0:
+        return
+
+    dup_dgram = np.zeros(len(payload_off), dtype=bool)
+    if "fp" in packets:
+        dup_dgram[:] = True
+        dup_dgram[np.unique(packets["fp"], return_index=True)[1]] = False
+
+    with open(filename, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        data = np.frombuffer(buf, dtype=np.uint8)
+        for s in range(0, len(payload_off), CHUNK):
+            offs, per_dgram = ts_packet_offsets(payload_off[s:s + CHUNK],
+                                                payload_len[s:s + CHUNK])
+            h = parse_headers(data, offs)
+            h["flags"] |= np.where(np.repeat(dup_dgram[s:s + CHUNK], per_dgram),
+                                   FLAG_DUP_DGRAM, 0).astype(np.uint8)
+            yield s, data, offs, per_dgram, h
+        del data
+    finally:
+        try:
+            buf.close()
+        except BufferError:
+            pass                # el llamador aún tiene una vista; se libera con ella
+
+
+@profiled("mpegts", items=lambda res, *a, **k: res["ts_packets"])
+def analyze_ts(filename, packets, window=1.0, order=None):
+    """
+    Bitrate por PID y continuidad TS de los datagramas de una captura
+
+    Args:
+        filename: Ruta del pcap del que salen las columnas
+        packets: Columnas del lector (read_udp_packets / load_packets) ya
+                 filtradas al flujo MPEG-TS. Los datagramas con la misma
+                 huella ("fp") que uno anterior son copias: sus paquetes TS
+                 cuentan como duplicados y no entran en la continuidad
+        window: Ventana de la serie de bitrate por PID (s)
+        order: Posición de envío de cada datagrama (frames.sender_order con
+               la captura del emisor). Con ella la continuidad se cuenta en
+               el orden de envío y el reordenamiento no se toma por pérdida
+
+    Returns:
+        dict: {"pids": {pid: {kind, packets, bytes, bitrate, cc_errors,
+                              lost, duplicates, reordered}},
+               "series": (inicio de ventana, {pid: bits/s}),
+               "ts_packets", "errors", "not_ts" (datagramas sin TS)}
+    """
+    payload_len = np.asarray(packets["payload_len"], dtype=np.int64)
+    ts = np.asarray(packets["ts"], dtype=np.float64)
+
+    empty = {"pids": {}, "series": (np.array([]), {}), "ts_packets": 0,
+             "errors": 0, "not_ts": int(len(ts))}
+    if len(ts) == 0:
+        return empty
+
+    t0 = ts.min()
+    nwin = int((ts.max() - t0) // window) + 1
+
+    pid_parts, cc_parts, flag_parts, win_parts, rank_parts = [], [], [], [], []
+    kinds = None
+    for s, data, offs, per_dgram, h in iter_ts_chunks(filename, packets):
+        if kinds is None or len(kinds) == 1:
+            kinds = program_map(data, offs, h)
+        win = ((ts[s:s + CHUNK] - t0) // window).astype(np.int64)
+        pid_parts.append(h["pid"])
+        cc_parts.append(h["cc"])
+        flag_parts.append(h["flags"])
+        win_parts.append(np.repeat(win, per_dgram))
+        if order is not None:
+            rank_parts.append(np.repeat(np.asarray(order[s:s + CHUNK], dtype=np.float64),
+                                        per_dgram))
+
+    pid = np.concatenate(pid_parts)
+    cc = np.concatenate(cc_parts)
+    flags = np.concatenate(flag_parts)
+    win = np.concatenate(win_parts)
+    rank = np.concatenate(rank_parts) if order is not None else None
+
+    errors = (flags & FLAG_ERROR) != 0
+    ok = ~errors
+    pid, cc, flags, win = pid[ok], cc[ok], flags[ok], win[ok]
+    if rank is not None:
+        rank = rank[ok]
+    not_ts = int(np.count_nonzero(payload_len % TS_PACKET != 0))
+
+    duration = max(float(ts.max() - t0), window)
+    result = {"pids": {}, "series": (np.arange(nwin) * window, {}),
+              "ts_packets": int(len(pid)), "errors": int(errors.sum()), "not_ts": not_ts}
+
+    # Un grupo por PID (hay pocos PIDs): una pasada de argsort estable
+    order = np.argsort(pid, kind="stable")
+    pids, starts = np.unique(pid[order], return_index=True)
+    bounds = np.r_[starts, len(order)]
+
+    for k, p in enumerate(pids):
+        idx = order[bounds[k]:bounds[k + 1]]
+        stats = continuity(cc[idx], flags[idx], None if rank is None else rank[idx])
+        copies = int(np.count_nonzero(flags[idx] & FLAG_DUP_DGRAM))
+        count = len(idx)
+        p = int(p)
+        result["pids"][p] = {
+            "kind": pid_kind(p, kinds),
+            "packets": count,
+            "bytes": count * TS_PACKET,
+            "bitrate": count * TS_PACKET * 8 / duration,
+            "cc_errors": stats["cc_errors"],
+            "lost": stats["lost"],
+            "duplicates": stats["duplicates"] + copies,
+            "reordered": stats["reordered"],
+        }
+        per_win = np.bincount(win[idx], minlength=nwin)
+        result["series"][1][p] = per_win * TS_PACKET * 8 / window
+
+    return result
+
+
+def format_ts_table(result):
+    """Tabla de texto con el resumen por PID de analyze_ts"""
+    lines = [f"{'PID':>7} {'tipo':<12} {'paquetes':>10} {'kbps':>10} "
+             f"{'errores CC':>10} {'perdidos':>9} {'duplic.':>8} {'reord.':>7}"]
+    for p, s in sorted(result["pids"].items()):
+        lines.append(f"{p:#7x} {s['kind']:<12} {s['packets']:>10} {s['bitrate'] / 1e3:>10.1f} "
+                     f"{s['cc_errors']:>10} {s['lost']:>9} {s['duplicates']:>8} "
+                     f"{s['reordered']:>7}")
+    lines.append(f"Paquetes TS: {result['ts_packets']}  con error: {result['errors']}  "
+                 f"datagramas no TS: {result['not_ts']}")
+    return "\n".join(lines)
@@ -0,0 +1,646 @@
+# analysis/pcap_reader.py
+
+"""
+Lector rápido de capturas pcap y pcapng
+Recorre las cabeceras de registro pcap (o los bloques pcapng) y las
+cabeceras Ethernet/IPv4/UDP directamente sobre el archivo mapeado en
+memoria (mmap + NumPy), sin construir un objeto scapy por paquete. scapy
+solo se usa como respaldo para tipos de enlace que este lector no conoce.
+"""
+
+import mmap
+import socket
+import struct
+from array import array
+
+import numpy as np
+
+from .profiling import profiled, stage
+
+
+# Magic number -> (endianness, factor de la fracción del timestamp)
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+
+PCAP_HEADER_LEN = 24
+RECORD_HEADER_LEN = 16
+
+# pcapng: Section Header, Interface Description y Enhanced Packet Block
+PCAPNG_MAGIC = b"\x0a\x0d\x0d\x0a"
+PCAPNG_BOM_LE = b"\x4d\x3c\x2b\x1a"
+BLOCK_IDB = 1
+BLOCK_EPB = 6
+EPB_HEADER_LEN = 28
+OPT_IF_TSRESOL = 9
+
+# Tipos de enlace soportados por el lector rápido
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+LINKTYPES_RAW_IP = (12, 14, LINKTYPE_RAW)
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPES_VLAN = (0x8100, 0x88A8)
+IPPROTO_UDP = 17
+
+# Columnas que devuelve el lector (todas arrays NumPy de igual longitud)
+COLUMNS = {
+    "ts": np.float64,          # timestamp de captura (s)
+    "size": np.int64,          # longitud del paquete en el cable (bytes)
+    "src": np.uint32,          # IPv4 origen
+    "dst": np.uint32,          # IPv4 destino
+    "sport": np.uint16,        # puerto UDP origen
+    "dport": np.uint16,        # puerto UDP destino
+    "payload_off": np.int64,   # offset del payload UDP en el archivo (-1 si no aplica)
+    "payload_len": np.int32,   # bytes de payload UDP capturados
+    "fp": np.uint64,           # huella (hash) del payload UDP
+}
+
+# Bytes del inicio y del final del payload que entran en la huella. Las
+# huellas se calculan por bloques de FINGERPRINT_CHUNK payloads con unos
+# FINGERPRINT_WORK_BYTES de temporales por payload (dentro de
+# WORKING_BYTES_PER_PACKET)
+FINGERPRINT_BYTES = 32
+FINGERPRINT_CHUNK = 1 << 16
+FINGERPRINT_WORK_BYTES = 64
+
+# Lectura por bloques: memoria de trabajo estimada por paquete (columnas +
+# temporales de decode_records) y registro pcap más pequeño posible
+# (Ethernet + IPv4 + UDP sin payload)
+WORKING_BYTES_PER_PACKET = 512
+MIN_RECORD_LEN = RECORD_HEADER_LEN + 14 + 20 + 8
+MIN_CHUNK_BYTES = 1 << 18          # mayor que el snaplen máximo de tcpdump
+
+_FP_SEED = np.uint64(0x9E3779B97F4A7C15)
+_FP_MUL = np.uint64(0xBF58476D1CE4E5B9)
+_FP_MUL2 = np.uint64(0x94D049BB133111EB)
+
+
+def empty_columns():
+    """Diccionario de columnas vacías con los tipos del lector"""
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+@profiled("read_pcap", items=lambda res, *a, **k: len(res["ts"]))
+def read_udp_packets(filename, port=None):
+    """
+    Leer todos los datagramas UDP/IPv4 de una captura pcap o pcapng
+
+    Args:
+        filename: Ruta del archivo .pcap / .pcapng
+        port: Si se indica, solo se conservan paquetes con sport o dport igual
+
+    Returns:
+        dict: Columnas NumPy (ver COLUMNS) en el orden de la captura
+    """
+    with open(filename, "rb") as f:
+        magic = f.read(4)
+        if magic not in PCAP_MAGIC and magic != PCAPNG_MAGIC:
+            packets = _read_with_scapy(filename)
+            return filter_port(packets, port)
+
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        native = _native_decoder(buf)
+        if native is None:
+            packets = _read_with_scapy(filename)
+        else:
+            start, decode = native
+            packets, _ = decode(start, len(buf))
+    finally:
+        buf.close()
+
+    return filter_port(packets, port)
+
+
+def _native_decoder(buf):
+    """
+    Lector rápido para una captura mapeada
+
+    Returns:
+        tuple: (offset del primer registro, decode(offset, end) ->
+               (columnas, offset siguiente)), o None si hay que usar scapy
+    """
+    magic = bytes(buf[:4])
+    if magic in PCAP_MAGIC:
+        endian, ts_scale = PCAP_MAGIC[magic]
+        linktype = _read_linktype(buf, endian)
+        if linktype is None:
+            return None
+
+        def decode(offset, end):
+            offsets, nxt = scan_records(buf, offset, end, endian)
+            return decode_records(buf, offsets, endian, ts_scale, linktype), nxt
+        return PCAP_HEADER_LEN, decode
+
+    if magic == PCAPNG_MAGIC:
+        probe = pcapng_state()
+        scan_blocks(buf, 0, len(buf), probe, stop_at_packet=True)
+        if any(linktype is None for _, linktype, _ in probe["interfaces"]):
+            return None
+
+        state = pcapng_state()
+
+        def decode(offset, end):
+            offsets, ifaces, nxt = scan_blocks(buf, offset, end, state)
+            return decode_blocks(buf, offsets, ifaces, state["interfaces"]), nxt
+        return 0, decode
+
+    return None
+
+
+def chunk_bytes(max_memory):
+    """
+    Bytes de pcap por bloque para que la memoria de trabajo de un bloque
+    no supere `max_memory` bytes, aunque todos los registros sean mínimos
+    """
+    return max(MIN_CHUNK_BYTES, int(max_memory) * MIN_RECORD_LEN // WORKING_BYTES_PER_PACKET)
+
+
+def iter_udp_packets(filename, port=None, max_memory=256 << 20):
+    """
+    Leer una captura por bloques de tamaño acotado
+
+    Cada bloque abarca como mucho chunk_bytes(max_memory) bytes del pcap.
+    Las páginas del mmap ya procesadas se devuelven al sistema
+    (MADV_DONTNEED), así que la memoria no crece con el tamaño de la
+    captura. Los offsets de payload son absolutos, como en read_udp_packets.
+
+    Args:
+        filename: Ruta del archivo .pcap
+        port: Filtrar por puerto origen/destino (None = todos)
+        max_memory: Memoria de trabajo por bloque (bytes)
+
+    Yields:
+        dict: Columnas NumPy (ver COLUMNS) de cada bloque, en orden
+    """
+    batch = max(1, max_memory // WORKING_BYTES_PER_PACKET)
+    with open(filename, "rb") as f:
+        magic = f.read(4)
+        if magic not in PCAP_MAGIC and magic != PCAPNG_MAGIC:
+            for packets in _iter_with_scapy(filename, batch):
+                yield filter_port(packets, port)
+            return
+
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        native = _native_decoder(buf)
+        if native is None:
+            for packets in _iter_with_scapy(filename, batch):
+                yield filter_port(packets, port)
+            return
+
+        offset, decode = native
+        step = chunk_bytes(max_memory)
+        while offset < len(buf):
+            with stage("read_chunk") as st:
+                packets, nxt = decode(offset, min(offset + step, len(buf)))
+                st.count(len(packets["ts"]))
+            if nxt == offset:
+                break                   # registro truncado al final
+            _release_pages(buf, offset, nxt)
+            offset = nxt
+            yield filter_port(packets, port)
+    finally:
+        buf.close()
+
+
+def _release_pages(buf, start, end):
+    """Descartar del mmap las páginas completas de [start, end)"""
+    if not hasattr(buf, "madvise") or not hasattr(mmap, "MADV_DONTNEED"):
+        return
+    lo = start - start % mmap.PAGESIZE
+    hi = end - end % mmap.PAGESIZE
+    if hi > lo:
+        buf.madvise(mmap.MADV_DONTNEED, lo, hi - lo)
+
+
+def filter_port(packets, port):
+    """Conservar solo los paquetes cuyo puerto origen o destino sea `port`"""
+    if port is None:
+        return packets
+    mask = (packets["sport"] == port) | (packets["dport"] == port)
+    return {name: col[mask] for name, col in packets.items()}
+
+
+def _read_linktype(buf, endian):
+    """Tipo de enlace de la cabecera global, o None si no está soportado"""
+    if len(buf) < PCAP_HEADER_LEN:
+        return None
+    linktype = struct.unpack_from(endian + "I", buf, 20)[0] & 0x0FFFFFFF
+    supported = (LINKTYPE_NULL, LINKTYPE_ETHERNET, LINKTYPE_LINUX_SLL,
+                 LINKTYPE_LINUX_SLL2) + LINKTYPES_RAW_IP
+    return linktype if linktype in supported else None
+
+
+def scan_records(buf, offset, end, endian):
+    """
+    Recorrer las cabeceras de registro pcap
+
+    Es el único bucle por paquete del lector: solo lee `incl_len` para
+    saltar al siguiente registro. Un registro incompleto al final (archivo
+    que aún se está escribiendo) se deja sin consumir.
+
+    Args:
+        buf: Buffer (mmap/bytes) con los registros
+        offset: Posición del primer registro
+        end: Límite del buffer
+        endian: "<" o ">"
+
+    Returns:
+        tuple: (offsets de cada registro como array int64, offset siguiente)
+    """
+    unpack = struct.Struct(endian + "I").unpack_from
+    offsets = array("q")
+    append = offsets.append
+
+    while offset + RECORD_HEADER_LEN <= end:
+        incl_len = unpack(buf, offset + 8)[0]
+        nxt = offset + RECORD_HEADER_LEN + incl_len
+        if nxt > end:
+            break
+        append(offset)
+        offset = nxt
+
+    return np.frombuffer(offsets, dtype=np.int64), offset
+
+
+def decode_records(buf, offsets, endian, ts_scale, linktype):
+    """
+    Decodificar de forma vectorizada las cabeceras de los registros indicados
+
+    Args:
+        buf: Buffer con la captura completa
+        offsets: Offsets de cada registro (salida de scan_records)
+        endian: Endianness de las cabeceras pcap
+        ts_scale: 1e-6 (µs) o 1e-9 (ns)
+        linktype: Tipo de enlace de la captura
+
+    Returns:
+        dict: Columnas NumPy de los datagramas UDP/IPv4 encontrados
+    """
+    if len(offsets) == 0:
+        return empty_columns()
+
+    data = np.frombuffer(buf, dtype=np.uint8)
+    little = endian == "<"
+
+    ts_sec = _u32(data, offsets, little)
+    ts_frac = _u32(data, offsets + 4, little)
+    ts = ts_sec.astype(np.float64) + ts_frac * ts_scale
+    incl_len = _u32(data, offsets + 8, little).astype(np.int64)
+    orig_len = _u32(data, offsets + 12, little).astype(np.int64)
+
+    return decode_frames(data, ts, offsets + RECORD_HEADER_LEN, incl_len, orig_len, linktype)
+
+
+def pcapng_state():
+    """
+    Estado de lectura de un pcapng que pasa de un bloque de lectura al
+    siguiente: endianness de la sección actual, primera interfaz de la
+    sección e interfaces descritas, como (endian, linktype o None, ticks
+    por segundo)
+    """
+    return {"endian": "<", "base": 0, "interfaces": []}
+
+
+def scan_blocks(buf, offset, end, state, stop_at_packet=False):
+    """
+    Recorrer los bloques de una captura pcapng
+
+    Como scan_records, es el único bucle por bloque: guarda la posición de
+    cada Enhanced Packet Block y va añadiendo al estado las interfaces que
+    se describen (una sección nueva empieza su propia numeración).
+    Los demás bloques se saltan; un bloque incompleto se deja sin consumir.
+
+    Args:
+        buf: Buffer con la captura
+        offset: Posición del primer bloque
+        end: Límite del buffer
+        state: Estado de pcapng_state(), se actualiza en el sitio
+        stop_at_packet: Parar en el primer paquete (para leer solo las
+                        interfaces del principio)
+
+    Returns:
+        tuple: (offsets de los EPB, índice de interfaz de cada uno,
+                offset siguiente)
+    """
+    heads = {e: struct.Struct(e + "III") for e in "<>"}
+    offsets = array("q")
+    ifaces = array("q")
+    interfaces = state["interfaces"]
+    endian, base = state["endian"], state["base"]
+
+    while offset + 12 <= end:
+        if buf[offset:offset + 4] == PCAPNG_MAGIC:
+            endian = "<" if buf[offset + 8:offset + 12] == PCAPNG_BOM_LE else ">"
+            base = len(interfaces)
+        btype, blen, first = heads[endian].unpack_from(buf, offset)
+        if blen < 12 or blen % 4:
+            break                       # bloque corrupto: se trata como final
+        nxt = offset + blen
+        if nxt > end:
+            break
+
+        if btype == BLOCK_EPB:
+            if stop_at_packet:
+                break
+            offsets.append(offset)
+            ifaces.append(base + first)
+        elif btype == BLOCK_IDB:
+            interfaces.append(_parse_idb(buf, offset, blen, endian))
+        offset = nxt
+
+    state["endian"], state["base"] = endian, base
+    return (np.frombuffer(offsets, dtype=np.int64),
+            np.frombuffer(ifaces, dtype=np.int64), offset)
+
+
+def _parse_idb(buf, offset, blen, endian):
+    """(endian, linktype soportado o None, ticks por segundo) de un IDB"""
+    linktype = struct.unpack_from(endian + "H", buf, offset + 8)[0]
+    supported = (LINKTYPE_NULL, LINKTYPE_ETHERNET, LINKTYPE_LINUX_SLL,
+                 LINKTYPE_LINUX_SLL2) + LINKTYPES_RAW_IP
+
+    # Opciones: código, longitud y valor alineado a 4 bytes
+    ticks = 10 ** 6
+    pos, end = offset + 16, offset + blen - 4
+    while pos + 4 <= end:
+        code, length = struct.unpack_from(endian + "HH", buf, pos)
+        if code == 0:
+            break
+        if code == OPT_IF_TSRESOL and length >= 1:
+            res = buf[pos + 4]
+            ticks = 2 ** (res & 0x7F) if res & 0x80 else 10 ** res
+        pos += 4 + (length + 3) // 4 * 4
+
+    return endian, linktype if linktype in supported else None, ticks
+
+
+def decode_blocks(buf, offsets, ifaces, interfaces):
+    """
+    Decodificar los Enhanced Packet Blocks indicados (ver scan_blocks)
+
+    Los paquetes de interfaces con tipo de enlace no soportado se omiten.
+
+    Returns:
+        dict: Columnas NumPy en el orden de la captura
+    """
+    if len(offsets) == 0:
+        return empty_columns()
+
+    data = np.frombuffer(buf, dtype=np.uint8)
+    parts = []
+    for i in np.unique(ifaces):
+        endian, linktype, ticks = interfaces[i]
+        if linktype is None:
+            continue
+        o = offsets[ifaces == i]
+        little = endian == "<"
+
+        # Timestamp de 64 bits en ticks: segundos y fracción por separado
+        # para no perder resolución (ns) en el float64
+        raw = (_u32(data, o + 12, little).astype(np.uint64) << np.uint64(32)) \
+            | _u32(data, o + 16, little)
+        ts = (raw // np.uint64(ticks)).astype(np.float64) \
+            + (raw % np.uint64(ticks)).astype(np.float64) / ticks
+        incl_len = _u32(data, o + 20, little).astype(np.int64)
+        orig_len = _u32(data, o + 24, little).astype(np.int64)
+        parts.append(decode_frames(data, ts, o + EPB_HEADER_LEN, incl_len, orig_len, linktype))
+
+    if not parts:
+        return empty_columns()
+    packets = {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+    if len(parts) > 1:
+        # El payload está dentro de su bloque: su offset da el orden original
+        order = np.argsort(packets["payload_off"], kind="stable")
+        packets = {name: col[order] for name, col in packets.items()}
+    return packets
+
+
+def decode_frames(data, ts, pkt, incl_len, orig_len, linktype):
+    """
+    Decodificar Ethernet/IPv4/UDP de los paquetes que empiezan en `pkt`
+
+    Args:
+        data: Captura completa como array uint8
+        ts: Timestamp de cada paquete (s)
+        pkt: Offset del inicio de cada paquete (cabecera de enlace)
+        incl_len: Bytes capturados de cada paquete
+        orig_len: Longitud original de cada paquete
+        linktype: Tipo de enlace
+
+    Returns:
+        dict: Columnas NumPy de los datagramas UDP/IPv4 encontrados
+    """
+    pkt_end = pkt + incl_len
+
+    # ---- Cabecera de enlace -> inicio de IPv4 ----
+    l3, is_ipv4 = _locate_ipv4(data, pkt, pkt_end, linktype)
+
+    # ---- IPv4 ----
+    ok = is_ipv4 & (l3 + 20 <= pkt_end)
+    l3 = np.where(ok, l3, 0)
+    ver_ihl = data[l3]
+    ihl = (ver_ihl & 0x0F).astype(np.int64) * 4
+    frag = _u16be(data, l3 + 6) & 0x1FFF
+    ok &= ((ver_ihl >> 4) == 4) & (ihl >= 20) & (data[l3 + 9] == IPPROTO_UDP) & (frag == 0)
+
+    # ---- UDP ----
+    l4 = l3 + ihl
+    ok &= l4 + 8 <= pkt_end
+
+    idx = np.flatnonzero(ok)
+    l3, l4, pkt_end = l3[idx], l4[idx], pkt_end[idx]
+
+    udp_len = _u16be(data, l4 + 4).astype(np.int64)
+    payload_off = l4 + 8
+    payload_len = np.clip(np.minimum(udp_len - 8, pkt_end - payload_off), 0, None)
+
+    return {
+        "ts": ts[idx],
+        "size": orig_len[idx],
+        "src": _u32(data, l3 + 12, False),
+        "dst": _u32(data, l3 + 16, False),
+        "sport": _u16be(data, l4),
+        "dport": _u16be(data, l4 + 2),
+        "payload_off": payload_off,
+        "payload_len": payload_len.astype(np.int32),
+        "fp": payload_fingerprints(data, payload_off, payload_len),
+    }
+
+
+def payload_fingerprints(data, payload_off, payload_len, nbytes=FINGERPRINT_BYTES):
+    """
+    Huella de 64 bits de cada payload UDP
+
+    Combina la longitud del payload con sus primeros y últimos `nbytes`
+    bytes. Los datagramas MPEG-TS que envía FFmpeg llevan en esas zonas el
+    contador de continuidad y datos comprimidos, así que la huella
+    identifica el mismo datagrama en las capturas de emisor y receptor.
+    Los bytes se leen columna a columna (un byte de cada payload del
+    bloque por vez) en bloques de FINGERPRINT_CHUNK payloads, así que los
+    temporales no pasan de FINGERPRINT_WORK_BYTES por payload ni de
+    FINGERPRINT_CHUNK payloads en total, sea cual sea el tamaño del bloque
+    de lectura.
+
+    Args:
+        data: Buffer de la captura como array uint8
+        payload_off: Offset de cada payload en `data`
+        payload_len: Longitud de cada payload
+        nbytes: Bytes tomados de cada extremo (múltiplo de 8)
+
+    Returns:
+        np.ndarray: Huellas uint64
+    """
+    n = len(payload_off)
+    out = np.empty(n, dtype=np.uint64)
+
+    for s in range(0, n, FINGERPRINT_CHUNK):
+        off = np.asarray(payload_off[s:s + FINGERPRINT_CHUNK], dtype=np.int64)
+        length = np.asarray(payload_len[s:s + FINGERPRINT_CHUNK], dtype=np.int64)
+        idx = np.empty_like(off)
+        word = np.empty(len(off), dtype=np.uint64)
+
+        h = length.astype(np.uint64) ^ _FP_SEED
+        for base in (off, off + np.maximum(length - nbytes, 0)):
+            for w in range(0, nbytes, 8):
+                # Palabra little-endian de 8 bytes; los bytes más allá del payload son 0
+                word[:] = 0
+                for k in range(8):
+                    valid = length > w + k
+                    np.add(base, w + k, out=idx)
+                    idx[~valid] = 0
+                    byte = data[idx].astype(np.uint64)
+                    byte[~valid] = 0
+                    word |= byte << np.uint64(8 * k)
+                h = _mix64((h ^ word) * _FP_MUL)
+        out[s:s + FINGERPRINT_CHUNK] = h
+
+    return out
+
+
+def _mix64(h):
+    """Finalizador de splitmix64"""
+    h = (h ^ (h >> np.uint64(30))) * _FP_MUL
+    h = (h ^ (h >> np.uint64(27))) * _FP_MUL2
+    return h ^ (h >> np.uint64(31))
+
+
+def _locate_ipv4(data, pkt, pkt_end, linktype):
+    """Offset de la cabecera IP y máscara de paquetes IPv4 según el enlace"""
+    if linktype in LINKTYPES_RAW_IP:
+        ok = pkt < pkt_end
+        l3 = pkt
+        return l3, ok & ((data[np.where(ok, l3, 0)] >> 4) == 4)
+
+    if linktype == LINKTYPE_NULL:
+        ok = pkt + 4 <= pkt_end
+        family = _u32(data, np.where(ok, pkt, 0), True)
+        # AF_INET = 2, en el orden de bytes del host que capturó
+        return pkt + 4, ok & ((family == 2) | (family == 0x02000000))
+
+    if linktype == LINKTYPE_LINUX_SLL:
+        ok = pkt + 16 <= pkt_end
+        proto = _u16be(data, np.where(ok, pkt + 14, 0))
+        return pkt + 16, ok & (proto == ETHERTYPE_IPV4)
+
+    if linktype == LINKTYPE_LINUX_SLL2:
+        ok = pkt + 20 <= pkt_end
+        proto = _u16be(data, np.where(ok, pkt, 0))
+        return pkt + 20, ok & (proto == ETHERTYPE_IPV4)
+
+    # Ethernet, con hasta dos etiquetas VLAN
+    ok = pkt + 14 <= pkt_end
+    type_off = pkt + 12
+    ethertype = _u16be(data, np.where(ok, type_off, 0))
+    for _ in range(2):
+        vlan = ok & np.isin(ethertype, ETHERTYPES_VLAN) & (type_off + 8 <= pkt_end)
+        type_off = np.where(vlan, type_off + 4, type_off)
+        ethertype = np.where(vlan, _u16be(data, np.where(vlan, type_off, 0)), ethertype)
+    return type_off + 2, ok & (ethertype == ETHERTYPE_IPV4)
+
+
+def _u16be(data, offs):
+    """Leer enteros de 16 bits big-endian en los offsets indicados"""
+    return (data[offs].astype(np.uint16) << 8) | data[offs + 1]
+
+
+def _u32(data, offs, little):
+    """Leer enteros de 32 bits en los offsets indicados"""
+    b = [data[offs + i].astype(np.uint32) for i in range(4)]
+    if little:
+        b.reverse()
+    return (b[0] << 24) | (b[1] << 16) | (b[2] << 8) | b[3]
+
+
+def has_payload_offsets(packets):
+    """
+    True si todos los datagramas tienen el offset de su payload en el archivo
+
+    Las capturas leídas con scapy no lo tienen (payload_off = -1), y el
+    análisis MPEG-TS (mpegts, frames) lee los payloads del pcap mapeado.
+    """
+    off = packets["payload_off"]
+    return len(off) == 0 or bool(off.min() >= 0)
+
+
+def _read_with_scapy(filename):
+    """
+    Respaldo para capturas que el lector rápido no entiende (tipos de
+    enlace poco comunes, formatos que no son pcap/pcapng). Usa PcapReader
+    para no cargar toda la captura en memoria. Los payloads no quedan
+    localizados en el archivo: payload_off es -1 (ver has_payload_offsets).
+    """
+    parts = list(_iter_with_scapy(filename))
+    if not parts:
+        return empty_columns()
+    return {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+
+
+def _iter_with_scapy(filename, batch=None):
+    """Columnas leídas con scapy en bloques de `batch` paquetes (None = uno solo)"""
+    from scapy.all import PcapReader, IP, UDP
+
+    cols = {name: [] for name in COLUMNS if name != "fp"}
+    payloads = bytearray()
+    with PcapReader(filename) as reader:
+        for p in reader:
+            if IP not in p or UDP not in p:
+                continue
+            cols["ts"].append(float(p.time))
+            cols["size"].append(getattr(p, "wirelen", None) or len(p))
+            cols["src"].append(struct.unpack("!I", socket.inet_aton(p[IP].src))[0])
+            cols["dst"].append(struct.unpack("!I", socket.inet_aton(p[IP].dst))[0])
+            cols["sport"].append(p[UDP].sport)
+            cols["dport"].append(p[UDP].dport)
+            cols["payload_off"].append(-1)
+            payload = bytes(p[UDP].payload)
+            cols["payload_len"].append(len(payload))
+            payloads += payload
+
+            if batch is not None and len(cols["ts"]) >= batch:
+                yield _scapy_columns(cols, payloads)
+                cols = {name: [] for name in cols}
+                payloads = bytearray()
+
+    if cols["ts"]:
+        yield _scapy_columns(cols, payloads)
+
+
+def _scapy_columns(cols, payloads):
+    packets = {name: np.array(values, dtype=COLUMNS[name]) for name, values in cols.items()}
+
+    # La huella se calcula sobre los payloads concatenados
+    local_off = np.concatenate([[0], np.cumsum(packets["payload_len"], dtype=np.int64)[:-1]])
+    data = np.frombuffer(bytes(payloads) + bytes(FINGERPRINT_BYTES), dtype=np.uint8)
+    packets["fp"] = payload_fingerprints(data, local_off[:len(packets["ts"])], packets["payload_len"])
+    return packets
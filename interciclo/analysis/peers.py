@@ -0,0 +1,392 @@
+# analysis/peers.py
+
+"""
+Sincronización conjunta de relojes y matriz de delay entre N capturas
+Cada portátil captura su propia interfaz. Cada captura se lee y se
+clasifica por flujos una sola vez; de ahí salen los datagramas de cada
+sentido i → j en el emisor (captura i) y en el receptor (captura j), que
+se emparejan una vez por sentido.
+
+Reloj de cada captura k respecto a la de referencia (modelo lineal):
+t_k - T_ref = (t - T_ref) · (1 + s_k) + θ_k. Para cada sentido i → j la
+envolvente inferior de t_j - t_i (estimate_clock) da s_j - s_i y
+θ_j - θ_i + delay mínimo. Con los dos sentidos el delay mínimo se cancela
+(se supone simétrico, como en NTP): θ_j - θ_i = (off_ij - off_ji) / 2.
+Todos los offsets y derivas se resuelven a la vez por mínimos cuadrados
+ponderados sobre esas diferencias, así que los pares dejan de dar offsets
+incompatibles y el residuo de cada par mide cuánto se contradicen. Un par
+con un solo sentido solo fija su offset si no hay otro camino (peso
+ONE_WAY_WEIGHT, delay referido al mínimo como en analize1.py).
+"""
+
+import numpy as np
+
+from .clock import estimate_clock, correct_timestamps
+from .flows import flow_table, select_flows, ip_text, _ip_value
+from .matching import match_nearest, match_fingerprints
+from .merge import expand_captures, read_merged
+from .metrics import rfc3550_jitter
+from .pcap_reader import read_udp_packets, filter_port
+from .profiling import profiled, stage
+
+
+ONE_WAY_WEIGHT = 1e-3       # peso relativo de un offset con un solo sentido
+LOSS_KEYS = ("sent", "received", "lost", "loss_rate", "reordered", "duplicates", "ambiguous")
+MATRICES = ("delay_ms", "delay_p95_ms", "jitter_ms", "loss_rate", "throughput_mbps")
+
+
+# ---------------------------------------------------------------
+# CAPTURAS
+# ---------------------------------------------------------------
+def load_capture(spec, port=None):
+    """Columnas UDP de una captura (archivo, directorio o glob)"""
+    files = expand_captures(spec)
+    packets = read_udp_packets(files[0]) if len(files) == 1 else read_merged(files)
+    return packets if port is None else filter_port(packets, port)
+
+
+def own_address(packets):
+    """
+    IPv4 del equipo que hizo la captura
+
+    Es la dirección que aparece en más datagramas, como origen o destino
+    (en una captura de la propia interfaz está en todos). Si varias empatan
+    (con dos equipos, las dos están en todos los datagramas), la que más
+    aparece como origen: el equipo que envía.
+
+    Returns:
+        tuple: (dirección o None si la captura está vacía, direcciones empatadas)
+    """
+    addrs = np.concatenate([packets["src"], packets["dst"]])
+    if len(addrs) == 0:
+        return None, []
+    values, counts = np.unique(addrs, return_counts=True)
+    tied = values[counts == counts.max()]
+    if len(tied) == 1:
+        return int(tied[0]), []
+    sent = np.array([np.count_nonzero(packets["src"] == a) for a in tied])
+    best = tied[sent == sent.max()]
+    return (int(best[0]) if len(best) == 1 else None), [int(a) for a in tied]
+
+
+def own_addresses(captures):
+    """
+    own_address de cada captura, sin repetir equipo
+
+    Una captura con empate no puede quedarse con la dirección que otra
+    captura tiene sin empate; si aun así dos capturas dan el mismo equipo
+    (p. ej. un solo sentido de tráfico entre dos equipos) no se puede
+    deducir cuál es cuál.
+
+    Raises:
+        ValueError: Si hay capturas sin equipo o con el mismo equipo
+    """
+    found = [own_address(p) for p in captures]
+    sure = {host for host, tied in found if host is not None and not tied}
+    hosts = []
+    for host, tied in found:
+        rest = [a for a in tied if a not in sure]
+        hosts.append(rest[0] if len(rest) == 1 else host)
+
+    known = [h for h in hosts if h is not None]
+    if None in hosts or len(set(known)) < len(known):
+        raise ValueError(
+            "No se puede deducir el equipo de cada captura (direcciones detectadas: "
+            + ", ".join(ip_text(h) if h is not None else "?" for h in hosts)
+            + "); indicar las IPv4 con --hosts")
+    return hosts
+
+
+def check_directions(pairs):
+    """
+    Comprobar que los equipos deducidos no están intercambiados
+
+    Con los dos sentidos de un par, off_ij + off_ji = delay mínimo i → j +
+    delay mínimo j → i, que es positivo; si es negativo, los datagramas
+    tomados como enviados eran los recibidos.
+
+    Raises:
+        ValueError: Si algún par tiene la suma negativa
+    """
+    for (i, j), fit in pairs.items():
+        back = pairs.get((j, i))
+        if i < j and back is not None and fit["offset"] + back["offset"] < 0:
+            raise ValueError(
+                f"Los equipos deducidos de las capturas {i} y {j} parecen intercambiados "
+                f"(delay de ida y vuelta {(fit['offset'] + back['offset']) * 1000:.3f} ms); "
+                f"indicar las IPv4 con --hosts")
+
+
+def _directed(table, src, dst):
+    """Índices de los paquetes src → dst de una captura"""
+    return np.flatnonzero(np.isin(table["index"], select_flows(table, src=src, dst=dst)))
+
+
+# ---------------------------------------------------------------
+# EMPAREJAMIENTO POR SENTIDO
+# ---------------------------------------------------------------
+@profiled("match_links", items=lambda res, *a, **k: len(res))
+def match_links(captures, hosts, match="payload", max_delay=1.0):
+    """
+    Emparejar los datagramas de cada sentido i → j
+
+    Args:
+        captures: Columnas de cada captura
+        hosts: IPv4 (entero) del equipo de cada captura
+        match: "payload" (huella exacta) o "nearest" (timestamp más
+               cercano, exige relojes a menos de max_delay)
+        max_delay: |t_j - t_i| máximo en modo "nearest" (s)
+
+    Returns:
+        dict: (i, j) -> tx y rx (índices de los pares en las capturas i y
+              j), tx_all y rx_all (todos los paquetes del sentido) y, con
+              "payload", sent, received, lost, loss_rate, reordered...
+    """
+    tables = [flow_table(p) for p in captures]
+    links = {}
+    for i, A in enumerate(captures):
+        for j, B in enumerate(captures):
+            if i == j:
+                continue
+            tx = _directed(tables[i], hosts[i], hosts[j])
+            rx = _directed(tables[j], hosts[i], hosts[j])
+            if len(tx) == 0 or len(rx) == 0:
+                continue
+            if match == "payload":
+                res = match_fingerprints(A["fp"][tx], A["ts"][tx], B["fp"][rx], B["ts"][rx])
+                link = {k: res[k] for k in LOSS_KEYS}
+                ia, ib = res["idxA"], res["idxB"]
+            else:
+                ia, ib, _ = match_nearest(A["ts"][tx], B["ts"][rx], max_gap=max_delay)
+                link = {}
+            if len(ia) < 2:
+                continue
+            link.update(tx=tx[ia], rx=rx[ib], tx_all=tx, rx_all=rx)
+            links[(i, j)] = link
+    return links
+
+
+# ---------------------------------------------------------------
+# RELOJES
+# ---------------------------------------------------------------
+def solve_differences(n, edges, reference=0):
+    """
+    Mínimos cuadrados ponderados de x_j - x_i = v con x[reference] = 0
+
+    Args:
+        n: Número de incógnitas
+        edges: Lista de (i, j, v, peso)
+        reference: Incógnita fijada a cero
+
+    Returns:
+        tuple: (x, residuo v - (x_j - x_i) de cada arista); NaN en las
+               incógnitas sin camino hasta la referencia
+    """
+    x = np.full(n, np.nan)
+    x[reference] = 0.0
+    if not edges:
+        return x, np.array([])
+
+    # Componente conexa de la referencia
+    reach = {reference}
+    grown = True
+    while grown:
+        grown = False
+        for i, j, _, _ in edges:
+            if (i in reach) != (j in reach):
+                reach.update((i, j))
+                grown = True
+
+    cols = [k for k in sorted(reach) if k != reference]
+    rows = [e for e in edges if e[0] in reach and e[1] in reach]
+    if cols and rows:
+        col = {k: c for c, k in enumerate(cols)}
+        M = np.zeros((len(rows), len(cols)))
+        v = np.empty(len(rows))
+        for r, (i, j, value, weight) in enumerate(rows):
+            w = np.sqrt(weight)
+            if j in col:
+                M[r, col[j]] = w
+            if i in col:
+                M[r, col[i]] = -w
+            v[r] = w * value
+        x[cols] = np.linalg.lstsq(M, v, rcond=None)[0]
+
+    residual = np.array([value - (x[j] - x[i]) for i, j, value, _ in edges])
+    return x, residual
+
+
+@profiled("clock_solve", items=lambda res, *a, **k: len(res["pairs"]))
+def solve_clocks(captures, links, reference=0):
+    """
+    Offset y deriva de cada captura respecto a la de referencia
+
+    Returns:
+        dict: t_ref, offset y skew (arrays por captura, NaN si no está
+              conectada), pairs (ajuste de cada sentido en t_ref) y
+              residual_ms de offset por par de equipos
+    """
+    n = len(captures)
+    t_ref = float(captures[reference]["ts"].min())
+
+    pairs = {}
+    for (i, j), link in links.items():
+        tx_ts = captures[i]["ts"][link["tx"]]
+        fit = estimate_clock(tx_ts, captures[j]["ts"][link["rx"]] - tx_ts)
+        if fit is None:
+            continue
+        # Offset del sentido llevado al instante de referencia común
+        fit["offset"] += fit["skew"] * (t_ref - fit["t_ref"])
+        fit["t_ref"] = t_ref
+        pairs[(i, j)] = fit
+
+    skew_edges = [(i, j, fit["skew"], fit["samples"]) for (i, j), fit in pairs.items()]
+    offset_edges = []
+    for (i, j), fit in pairs.items():
+        back = pairs.get((j, i))
+        if back is None:
+            offset_edges.append((i, j, fit["offset"], ONE_WAY_WEIGHT * fit["samples"]))
+        elif i < j:
+            offset_edges.append((i, j, (fit["offset"] - back["offset"]) / 2,
+                                 min(fit["samples"], back["samples"])))
+
+    skew, _ = solve_differences(n, skew_edges, reference)
+    offset, residual = solve_differences(n, offset_edges, reference)
+    return {
+        "t_ref": t_ref,
+        "offset": offset,
+        "skew": skew,
+        "pairs": pairs,
+        "residual_ms": {(min(i, j), max(i, j)): float(r * 1000)
+                        for (i, j, _, _), r in zip(offset_edges, residual)},
+    }
+
+
+# ---------------------------------------------------------------
+# MATRIZ DE DELAY Y THROUGHPUT
+# ---------------------------------------------------------------
+def _rate(ts, sizes):
+    """Tasa media en bits/s entre el primer y el último paquete"""
+    span = float(ts.max() - ts.min()) if len(ts) > 1 else 0.0
+    return float(sizes.sum()) * 8 / span if span > 0 else 0.0
+
+
+def link_metrics(captures, links, clocks):
+    """
+    Delay, jitter, pérdida y throughput de cada sentido con los relojes corregidos
+
+    Returns:
+        dict: (i, j) -> métricas del sentido
+    """
+    corrected = []
+    for k, packets in enumerate(captures):
+        if np.isnan(clocks["offset"][k]) or np.isnan(clocks["skew"][k]):
+            corrected.append(None)
+            continue
+        clk = {"offset": clocks["offset"][k], "skew": clocks["skew"][k], "t_ref": clocks["t_ref"]}
+        corrected.append(correct_timestamps(packets["ts"], clk))
+
+    metrics = {}
+    for (i, j), link in links.items():
+        A, B = captures[i], captures[j]
+        m = {k: link[k] for k in LOSS_KEYS if k in link}
+        m["tx_packets"] = len(link["tx_all"])
+        m["rx_packets"] = len(link["rx_all"])
+        m["tx_mbps"] = _rate(A["ts"][link["tx_all"]], A["size"][link["tx_all"]]) / 1e6
+        m["throughput_mbps"] = _rate(B["ts"][link["rx_all"]], B["size"][link["rx_all"]]) / 1e6
+        if corrected[i] is not None and corrected[j] is not None:
+            delays = corrected[j][link["rx"]] - corrected[i][link["tx"]]
+            m["delay"] = (corrected[i][link["tx"]], delays)
+            m["delay_ms"] = float(np.median(delays) * 1000)
+            m["delay_p95_ms"] = float(np.percentile(delays, 95) * 1000)
+            m["delay_mean_ms"] = float(delays.mean() * 1000)
+            m["delay_min_ms"] = float(delays.min() * 1000)
+            m["jitter_ms"] = float(rfc3550_jitter(np.diff(delays))[-1] * 1000)
+        metrics[(i, j)] = m
+    return metrics
+
+
+def peer_matrix(captures, hosts=None, match="payload", reference=0, max_delay=1.0):
+    """
+    Relojes conjuntos y matriz emisor → receptor de N capturas ya leídas
+
+    Args:
+        captures: Columnas de cada captura (una por equipo)
+        hosts: IPv4 de cada equipo (texto o entero); None = own_addresses
+        match: "payload" o "nearest" (ver match_links)
+        reference: Captura cuyo reloj se toma como referencia
+
+    Returns:
+        dict: hosts (texto), clocks (offset, skew_ppm por captura), pairs
+              (métricas y ajuste de reloj de cada sentido) y matrices N×N
+              delay_ms (mediana), delay_p95_ms, jitter_ms, loss_rate y
+              throughput_mbps (recibido), NaN donde no hay tráfico
+    """
+    n = len(captures)
+    detected = hosts is None
+    if detected:
+        hosts = own_addresses(captures)
+    hosts = [_ip_value(h) if h is not None else None for h in hosts]
+
+    links = match_links(captures, hosts, match, max_delay)
+    clocks = solve_clocks(captures, links, reference)
+    if detected:
+        check_directions(clocks["pairs"])
+    metrics = link_metrics(captures, links, clocks)
+
+    with stage("peer_matrix", items=len(metrics)):
+        matrix = {name: np.full((n, n), np.nan) for name in MATRICES}
+        pairs = []
+        for (i, j), m in sorted(metrics.items()):
+            for name in MATRICES:
+                if name in m:
+                    matrix[name][i, j] = m[name]
+            fit = clocks["pairs"].get((i, j))
+            residual = clocks["residual_ms"].get((min(i, j), max(i, j)))
+            pairs.append(dict(
+                {k: v for k, v in m.items() if k != "delay"}, src=i, dst=j,
+                pair_offset_ms=fit["offset"] * 1000 if fit else None,
+                pair_skew_ppm=fit["skew_ppm"] if fit else None,
+                residual_ms=residual))
+
+    return {
+        "hosts": [ip_text(h) if h is not None else None for h in hosts],
+        "reference": reference,
+        "match": match,
+        "clocks": [{"offset_ms": float(o * 1000), "skew_ppm": float(s * 1e6)}
+                   for o, s in zip(clocks["offset"], clocks["skew"])],
+        "t_ref": clocks["t_ref"],
+        "pairs": pairs,
+        # (instante de envío, delay) por paquete de cada sentido, reloj de referencia
+        "delays": {(i, j): m["delay"] for (i, j), m in metrics.items() if "delay" in m},
+        "matrix": matrix,
+    }
+
+
+def format_peers(result):
+    """Relojes, residuos y matrices de peer_matrix como texto"""
+    hosts = result["hosts"]
+    names = [f"{k}:{h}" for k, h in enumerate(hosts)]
+    width = max(12, max(len(s) for s in names) + 1)
+
+    lines = [f"Relojes (referencia {names[result['reference']]})",
+             f"{'captura':<{width}} {'offset (ms)':>12} {'deriva (ppm)':>13}"]
+    for name, clk in zip(names, result["clocks"]):
+        lines.append(f"{name:<{width}} {clk['offset_ms']:>12.3f} {clk['skew_ppm']:>13.3f}")
+
+    residuals = [p for p in result["pairs"] if p["residual_ms"] is not None and p["src"] < p["dst"]]
+    if residuals:
+        lines.append("Residuo del offset por par (ms): " + ", ".join(
+            f"{p['src']}-{p['dst']} {p['residual_ms']:+.3f}" for p in residuals))
+
+    titles = {"delay_ms": "Delay mediano (ms)", "delay_p95_ms": "Delay p95 (ms)",
+              "jitter_ms": "Jitter RFC 3550 (ms)", "loss_rate": "Pérdida (%)",
+              "throughput_mbps": "Throughput recibido (Mbps)"}
+    for name, title in titles.items():
+        m = result["matrix"][name] * (100 if name == "loss_rate" else 1)
+        lines.append(f"\n{title}  (fila = emisor, columna = receptor)")
+        lines.append(" " * width + "".join(f"{k:>10}" for k in range(len(hosts))))
+        for k, row in enumerate(m):
+            lines.append(f"{names[k]:<{width}}" + "".join(
+                f"{'-':>10}" if np.isnan(v) else f"{v:>10.3f}" for v in row))
+    return "\n".join(lines)
@@ -0,0 +1,284 @@
+# analysis/profiling.py
+
+"""
+Instrumentación por etapas del análisis
+Cada etapa (lectura del pcap, emparejamiento, reloj, throughput, figuras...)
+se marca con el decorador `profiled` o con el contexto `stage`. Con el
+perfilado activado (enable, --profile en los scripts) se registran por
+etapa el tiempo real, el tiempo de CPU, los elementos procesados y el pico
+de memoria residente, agregados por ruta de etapas anidadas; opcionalmente
+cada etapa se perfila además con cProfile y se guarda en un .prof (solo
+con el tiempo propio de la etapa: al entrar en una etapa anidada se pausa
+el perfil de la exterior).
+
+Desactivado, `stage` devuelve un contexto vacío compartido y `profiled`
+llama directamente a la función: el coste es una comprobación por llamada.
+
+El pico de RSS de cada etapa se mide reiniciando el máximo del kernel
+(/proc/self/clear_refs, Linux) al entrar y leyendo VmHWM al salir; en otros
+sistemas es el máximo de todo el proceso hasta ese momento. Las etapas que
+se ejecutan en procesos hijos (--jobs > 1) solo cuentan en el tiempo real
+de la etapa que las lanza.
+"""
+
+import functools
+import os
+import resource
+import sys
+import time
+
+_STATE = None               # None = desactivado
+
+
+class _NullStage:
+    """Contexto de una etapa con el perfilado desactivado"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, n):
+        pass
+
+
+_NULL = _NullStage()
+
+
+class _State:
+    def __init__(self, dump_dir=None):
+        self.dump_dir = dump_dir
+        self.stats = {}          # ruta -> totales
+        self.stack = []
+        self.profiles = {}       # ruta -> cProfile.Profile
+        self.can_reset = _reset_peak()
+
+
+class _Stage:
+    __slots__ = ("state", "path", "items", "wall", "cpu", "peak", "profile")
+
+    def __init__(self, state, name, items):
+        self.state = state
+        parent = state.stack[-1].path if state.stack else ()
+        self.path = parent + (name,)
+        self.items = items
+        self.profile = None
+
+    def count(self, n):
+        """Sumar elementos procesados a la etapa"""
+        self.items = (self.items or 0) + int(n)
+
+    def __enter__(self):
+        state = self.state
+        # El pico visto hasta aquí pertenece a las etapas abiertas
+        hwm = _peak_rss()
+        for frame in state.stack:
+            frame.peak = max(frame.peak, hwm)
+        if state.can_reset:
+            _reset_peak()
+        self.peak = 0
+
+        if state.dump_dir is not None:
+            import cProfile
+            if state.stack:
+                state.stack[-1].profile.disable()
+            self.profile = state.profiles.setdefault(self.path, cProfile.Profile())
+            self.profile.enable()
+        state.stack.append(self)
+
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        state = self.state
+        if self.profile is not None:
+            self.profile.disable()
+
+        self.peak = max(self.peak, _peak_rss())
+        state.stack.pop()
+        if self.profile is not None and state.stack:
+            state.stack[-1].profile.enable()
+        for frame in state.stack:
+            frame.peak = max(frame.peak, self.peak)
+
+        total = state.stats.setdefault(self.path, {"calls": 0, "wall": 0.0, "cpu": 0.0,
+                                                   "items": None, "peak_rss": 0})
+        total["calls"] += 1
+        total["wall"] += wall
+        total["cpu"] += cpu
+        if self.items is not None:
+            total["items"] = (total["items"] or 0) + self.items
+        total["peak_rss"] = max(total["peak_rss"], self.peak)
+        return False
+
+
+def _reset_peak():
+    """Reiniciar VmHWM del proceso; False si el sistema no lo permite"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    """Pico de memoria residente en bytes (desde el último reinicio)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+# ---------------------------------------------------------------
+# API
+# ---------------------------------------------------------------
+def enable(dump_dir=None):
+    """
+    Activar el registro de etapas
+
+    Args:
+        dump_dir: Si se indica, cada etapa se perfila con cProfile y se
+                  guarda en dump_dir/<ruta de etapas>.prof, sin el tiempo
+                  de sus etapas anidadas (cProfile no admite dos perfiles
+                  activos a la vez)
+    """
+    global _STATE
+    if dump_dir is not None:
+        os.makedirs(dump_dir, exist_ok=True)
+    _STATE = _State(dump_dir)
+
+
+def disable():
+    global _STATE
+    _STATE = None
+
+
+def enabled():
+    return _STATE is not None
+
+
+def stage(name, items=None):
+    """
+    Contexto que mide una etapa
+
+        with stage("match", items=len(tsA)) as st:
+            ...
+            st.count(n)     # o contar los elementos sobre la marcha
+    """
+    if _STATE is None:
+        return _NULL
+    return _Stage(_STATE, name, items)
+
+
+def profiled(name, items=None):
+    """
+    Decorador: la función es una etapa
+
+    Args:
+        name: Nombre de la etapa
+        items: Función del resultado (y de los argumentos) que da el
+               número de elementos procesados, p. ej.
+               lambda res, *a, **k: len(res["ts"])
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _STATE is None:
+                return func(*args, **kwargs)
+            with _Stage(_STATE, name, None) as st:
+                result = func(*args, **kwargs)
+                if items is not None:
+                    st.count(items(result, *args, **kwargs))
+                return result
+        return wrapper
+    return decorator
+
+
+def results():
+    """
+    Totales por etapa
+
+    Returns:
+        list: Diccionarios con stage (ruta "a/b"), depth, calls, wall,
+              cpu (s), items y peak_rss (bytes), en orden de aparición
+    """
+    if _STATE is None:
+        return []
+    return [dict(stage="/".join(path), depth=len(path) - 1, **total)
+            for path, total in _STATE.stats.items()]
+
+
+def dump():
+    """Guardar los perfiles cProfile; devuelve las rutas escritas"""
+    if _STATE is None or _STATE.dump_dir is None:
+        return []
+    paths = []
+    for path, profile in _STATE.profiles.items():
+        filename = os.path.join(_STATE.dump_dir, "__".join(path) + ".prof")
+        profile.dump_stats(filename)
+        paths.append(filename)
+    return paths
+
+
+def format_table():
+    """Tabla de texto de las etapas (anidadas con sangría)"""
+    rows = results()
+    lines = [f"{'etapa':<34} {'llamadas':>8} {'real (s)':>9} {'CPU (s)':>9} {'CPU %':>6} "
+             f"{'elementos':>11} {'elem/s':>11} {'pico RSS (MB)':>14}"]
+    # Orden de árbol: cada etapa bajo su padre, en orden de aparición
+    order = {r["stage"]: i for i, r in enumerate(rows)}
+    rows.sort(key=lambda r: [order["/".join(r["stage"].split("/")[:k + 1])]
+                             for k in range(r["depth"] + 1)])
+    for r in rows:
+        name = "  " * r["depth"] + r["stage"].rsplit("/", 1)[-1]
+        pct = 100 * r["cpu"] / r["wall"] if r["wall"] > 0 else 0.0
+        items = f"{r['items']:>11}" if r["items"] is not None else f"{'':>11}"
+        rate = f"{r['items'] / r['wall']:>11.3g}" if r["items"] and r["wall"] > 0 else f"{'':>11}"
+        lines.append(f"{name:<34} {r['calls']:>8} {r['wall']:>9.3f} {r['cpu']:>9.3f} {pct:>6.0f} "
+                     f"{items} {rate} {r['peak_rss'] / 1e6:>14.1f}")
+    if not _STATE or not _STATE.can_reset:
+        lines.append("(pico RSS acumulado del proceso: el sistema no permite reiniciarlo por etapa)")
+    return "\n".join(lines)
+
+
+def report(file=None):
+    """Imprimir la tabla y, si se pidió, guardar los perfiles cProfile"""
+    if _STATE is None:
+        return
+    file = file or sys.stdout
+    print("\nPerfil por etapas", file=file)
+    print(format_table(), file=file)
+    for path in dump():
+        print(f"  cProfile: {path}", file=file)
+
+
+def add_arguments(parser):
+    """Opciones --profile y --profile-dump de los scripts"""
+    parser.add_argument("--profile", action="store_true", dest="profile_stages",
+                        help="Medir cada etapa (tiempo real, CPU, elementos, pico RSS) "
+                             "e imprimir la tabla al final")
+    parser.add_argument("--profile-dump", metavar="DIR",
+                        help="Además, perfilar cada etapa con cProfile y guardar DIR/<etapa>.prof")
+
+
+def setup(args):
+    """
+    Activar el perfilado según las opciones de add_arguments
+
+    El destino es profile_stages y no profile: los subcomandos de
+    `python -m analysis` usan --profile para filtrar perfiles de calidad.
+    """
+    if args.profile_stages or args.profile_dump:
+        enable(args.profile_dump)
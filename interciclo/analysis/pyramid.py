@@ -0,0 +1,266 @@
+# analysis/pyramid.py
+
+"""
+Pirámide multirresolución de throughput
+Los bytes y paquetes de una captura se cuentan una sola vez en bins de
+BASE_RESOLUTION (1 ms) a partir del primer paquete; cada nivel superior
+suma FANOUT bins del anterior (10 ms, 100 ms, 1 s, 10 s...). Cualquier
+ventana múltiplo de la resolución base, contigua o deslizante, y en
+cualquier tramo de tiempo, sale del nivel más grueso que la divide con
+una suma acumulada sobre ese tramo, sin volver a recorrer los paquetes.
+
+Las ventanas son las de compute_throughput (inicio en el primer paquete,
+sin la última ventana incompleta) con los bordes exactos start + j·paso.
+Con tiempos relativos a la captura los valores coinciden salvo por los
+paquetes que caen justo en un borde, que pueden quedar en la ventana
+vecina por redondeo; con tiempos absolutos (epoch) np.arange avanza con
+(start + paso) - start, que no es el paso pedido (~1e-7 s de error por
+ventana por debajo del segundo), y los bordes de compute_throughput se
+desplazan. matches_throughput() dice si la pirámide reproduce esas
+ventanas; si no, quien tenga los paquetes usa compute_throughput.
+cache.load_pyramid guarda la pirámide junto a la caché de cada captura.
+"""
+
+import math
+
+import numpy as np
+
+from .profiling import profiled
+
+
+BASE_RESOLUTION = 1e-3      # s
+FANOUT = 10
+MAX_BINS = 4000             # bins por vista en resolution_for
+EDGE_TOLERANCE = 1e-9       # s, deriva admitida de los bordes de np.arange
+PYRAMID_VERSION = 1         # subir al cambiar los bins o to_arrays (clave de la caché)
+
+
+def _compact(counts):
+    """Contadores con el entero sin signo más pequeño que los representa"""
+    top = int(counts.max()) if len(counts) else 0
+    return counts.astype(np.min_scalar_type(top))
+
+
+class ThroughputPyramid:
+    """
+    Bytes y paquetes por bin a varias resoluciones
+
+    Se alimenta con update() por bloques de paquetes ordenados (como
+    StreamingThroughput) o de una vez con from_packets(); los niveles
+    gruesos se calculan al primer uso sumando el nivel base.
+    """
+
+    def __init__(self, base=BASE_RESOLUTION, fanout=FANOUT):
+        self.base = base
+        self.fanout = fanout
+        self.start = None
+        self.last_ts = None
+        self.n_bins = 0
+        self.ignored = 0                    # paquetes anteriores al primero del flujo
+        self._bytes = np.zeros(0, dtype=np.int64)
+        self._packets = np.zeros(0, dtype=np.int64)
+        self._levels = None
+
+    @classmethod
+    def from_packets(cls, ts, sizes, base=BASE_RESOLUTION, fanout=FANOUT):
+        """Pirámide de un flujo completo en memoria (en cualquier orden)"""
+        ts = np.asarray(ts, dtype=np.float64)
+        sizes = np.asarray(sizes)
+        if len(ts) and np.any(ts[1:] < ts[:-1]):
+            order = np.argsort(ts, kind="stable")
+            ts, sizes = ts[order], sizes[order]
+        pyramid = cls(base, fanout)
+        pyramid.update(ts, sizes)
+        return pyramid
+
+    def update(self, ts, sizes):
+        """Añadir un bloque de paquetes ordenados por tiempo"""
+        ts = np.asarray(ts, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.int64)
+        if len(ts) == 0:
+            return
+        if self.start is None:
+            self.start = ts[0]
+        self.last_ts = ts[-1] if self.last_ts is None else max(self.last_ts, ts[-1])
+
+        idx = np.floor((ts - self.start) / self.base).astype(np.int64)
+        ok = idx >= 0
+        self.ignored += int(len(idx) - ok.sum())
+        idx, sizes = idx[ok], sizes[ok]
+        if len(idx) == 0:
+            return
+        i0 = int(idx.min())
+        n = int(idx.max()) + 1
+        if n > len(self._bytes):
+            size = max(n, 2 * len(self._bytes))
+            self._bytes = np.resize(self._bytes, size)
+            self._packets = np.resize(self._packets, size)
+            self._bytes[self.n_bins:] = 0
+            self._packets[self.n_bins:] = 0
+        self._bytes[i0:n] += np.bincount(idx - i0, weights=sizes, minlength=n - i0).astype(np.int64)
+        self._packets[i0:n] += np.bincount(idx - i0, minlength=n - i0)
+        self.n_bins = max(self.n_bins, n)
+        self._levels = None
+
+    # -----------------------------------------------------------
+    # Niveles
+    # -----------------------------------------------------------
+    @property
+    def levels(self):
+        """Lista de (resolución en s, bytes por bin, paquetes por bin), de fina a gruesa"""
+        if self._levels is None:
+            nbytes = self._bytes[:self.n_bins]
+            npackets = self._packets[:self.n_bins]
+            levels = [(self.base, _compact(nbytes), _compact(npackets))]
+            resolution = self.base
+            while len(nbytes) > 1:
+                pad = -len(nbytes) % self.fanout
+                nbytes = np.pad(nbytes, (0, pad)).reshape(-1, self.fanout).sum(axis=1)
+                npackets = np.pad(npackets, (0, pad)).reshape(-1, self.fanout).sum(axis=1)
+                resolution *= self.fanout
+                levels.append((resolution, _compact(nbytes), _compact(npackets)))
+            self._levels = levels
+        return self._levels
+
+    @property
+    def resolutions(self):
+        return [level[0] for level in self.levels]
+
+    def _level_for(self, *durations):
+        """Nivel más grueso cuya resolución divide todas las duraciones"""
+        for k in range(len(self.levels) - 1, -1, -1):
+            resolution = self.levels[k][0]
+            ratios = [d / resolution for d in durations]
+            if all(r >= 1 - 1e-9 and abs(r - round(r)) < 1e-6 * r for r in ratios):
+                return k, [int(round(r)) for r in ratios]
+        raise ValueError(f"Las ventanas deben ser múltiplos de {self.base} s: {durations}")
+
+    def resolution_for(self, start=None, end=None, max_bins=MAX_BINS):
+        """Resolución más fina con la que el tramo [start, end) tiene <= max_bins bins"""
+        start = self.start if start is None else start
+        end = self.last_ts if end is None else end
+        for resolution in self.resolutions:
+            if (end - start) / resolution <= max_bins:
+                return resolution
+        return self.resolutions[-1]
+
+    # -----------------------------------------------------------
+    # Consultas
+    # -----------------------------------------------------------
+    def matches_throughput(self, window=1.0, step=None):
+        """
+        True si window_counts da las mismas ventanas que compute_throughput
+
+        Hace falta que la ventana y el paso sean múltiplos de la resolución
+        base y que np.arange(start, fin, paso), que avanza con
+        (start + paso) - start, no se desvíe de start + j·paso más de
+        EDGE_TOLERANCE en toda la captura; con tiempos epoch no ocurre.
+        """
+        if self.start is None:
+            return True
+        step = window if step is None else step
+        try:
+            self._level_for(window, step)
+        except ValueError:
+            return False
+        span = self.last_ts - self.start
+        return all(abs((self.start + d) - self.start - d) * math.ceil(span / d) <= EDGE_TOLERANCE
+                   for d in (window, step))
+
+    @profiled("pyramid_query", items=lambda res, *a, **k: len(res[0]))
+    def window_counts(self, window=1.0, step=None, start=None, end=None):
+        """
+        Bytes y paquetes por ventana, sin recorrer los paquetes
+
+        Las ventanas son las de compute_throughput (contiguas o deslizantes
+        con `step`); con start/end (tiempos absolutos, como los de la
+        captura) solo se devuelven las que caen enteras en [start, end).
+
+        Args:
+            window: Duración de la ventana (s, múltiplo de la resolución base)
+            step: Desplazamiento entre ventanas (s). None = ventanas contiguas
+            start, end: Tramo de tiempo (None = toda la captura)
+
+        Returns:
+            tuple: (inicio de cada ventana, bytes, paquetes)
+        """
+        empty = np.array([]), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        if self.start is None:
+            return empty
+        step = window if step is None else step
+        k, (width, stride) = self._level_for(window, step)
+        _, nbytes, npackets = self.levels[k]
+
+        # Ventanas válidas como en compute_throughput: inicios antes del
+        # último paquete, sin la última contigua o sin las deslizantes que
+        # terminan después del último paquete
+        span = self.last_ts - self.start
+        n_lo = max(math.ceil(span / step), 0)
+        if step == window:
+            n_valid = max(n_lo - 1, 0)
+        else:
+            n_valid = min(n_lo, max(math.floor((span - window) / step) + 2, 0))
+            while n_valid and (n_valid - 1) * step + window > span:
+                n_valid -= 1
+
+        j0, j1 = 0, n_valid
+        if start is not None:
+            j0 = max(j0, math.ceil((start - self.start) / step - 1e-9))
+        if end is not None:
+            j1 = min(j1, math.floor((end - self.start - window) / step + 1e-9) + 1)
+        if j1 <= j0:
+            return empty
+
+        b0, b1 = j0 * stride, (j1 - 1) * stride + width
+        out = []
+        for counts in (nbytes, npackets):
+            seg = np.zeros(b1 - b0 + 1, dtype=np.int64)
+            chunk = counts[b0:b1]
+            np.cumsum(chunk, out=seg[1:len(chunk) + 1])
+            seg[len(chunk) + 1:] = seg[len(chunk)]
+            i = np.arange(j1 - j0, dtype=np.int64) * stride
+            out.append(seg[i + width] - seg[i])
+        return self.start + np.arange(j0, j1) * step, out[0], out[1]
+
+    def throughput(self, window=1.0, step=None, start=None, end=None):
+        """(inicio de cada ventana, throughput en bits/s), como compute_throughput"""
+        lo, nbytes, _ = self.window_counts(window, step, start, end)
+        return lo, nbytes * 8 / window
+
+    def pkt_rate(self, window=1.0, step=None, start=None, end=None):
+        """(inicio de cada ventana, paquetes/s)"""
+        lo, _, npackets = self.window_counts(window, step, start, end)
+        return lo, npackets / window
+
+    # -----------------------------------------------------------
+    # Persistencia (arrays para np.savez)
+    # -----------------------------------------------------------
+    def to_arrays(self):
+        """Todos los niveles y los metadatos como arrays con nombre"""
+        arrays = {"meta": np.array([self.base, self.fanout,
+                                    np.nan if self.start is None else self.start,
+                                    np.nan if self.last_ts is None else self.last_ts,
+                                    self.ignored])}
+        for k, (_, nbytes, npackets) in enumerate(self.levels):
+            arrays[f"bytes_{k}"] = nbytes
+            arrays[f"packets_{k}"] = npackets
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Reconstruir una pirámide guardada con to_arrays"""
+        base, fanout, start, last_ts, ignored = arrays["meta"]
+        pyramid = cls(float(base), int(fanout))
+        pyramid.ignored = int(ignored)
+        if not np.isnan(start):
+            pyramid.start, pyramid.last_ts = float(start), float(last_ts)
+        n_levels = sum(1 for name in arrays if name.startswith("bytes_"))
+        levels, resolution = [], pyramid.base
+        for k in range(n_levels):
+            levels.append((resolution, arrays[f"bytes_{k}"], arrays[f"packets_{k}"]))
+            resolution *= pyramid.fanout
+        pyramid._bytes = levels[0][1].astype(np.int64)
+        pyramid._packets = levels[0][2].astype(np.int64)
+        pyramid.n_bins = len(pyramid._bytes)
+        pyramid._levels = levels
+        return pyramid
@@ -0,0 +1,177 @@
+# analysis/report.py
+
+"""
+Renderizado de figuras de los scripts de análisis
+Cada figura se describe como una tarea: nombre, disposición de ejes y una
+función de dibujo draw(fig, axes, *args). En modo interactivo las tareas
+se muestran con plt.show(); en modo reporte se dibujan con el backend Agg
+(sin ventanas) y se guardan como PNG/SVG, repartidas entre procesos. Cada
+proceso reutiliza la figura y los ejes de una misma disposición entre
+tareas en lugar de crear una figura nueva por perfil.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .profiling import profiled, stage
+
+
+FORMATS = ("png", "svg")
+DPI = 100
+
+# Figuras ya creadas en este proceso, por disposición
+_FIGURES = {}
+
+
+def figure_task(name, draw, *args, nrows=1, ncols=1, figsize=(12, 6)):
+    """
+    Describir una figura
+
+    Args:
+        name: Nombre del archivo de salida (sin extensión)
+        draw: Función de nivel de módulo draw(fig, axes, *args)
+        args: Datos de la figura (deben poder enviarse a otro proceso)
+        nrows, ncols, figsize: Disposición, como en plt.subplots
+
+    Returns:
+        dict: Tarea para show_figures / render_figures
+    """
+    return {
+        "name": name,
+        "draw": draw,
+        "args": args,
+        "layout": (nrows, ncols, tuple(figsize)),
+    }
+
+
+def use_agg():
+    """Usar el backend Agg (sin interfaz gráfica) en este proceso"""
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+
+def _figure(layout):
+    """
+    Figura y ejes reutilizables para una disposición, ya limpios
+
+    Los ejes que no son de la rejilla (barras de color) se eliminan y los de
+    la rejilla recuperan su posición original, que colorbar les reduce.
+    """
+    import matplotlib.pyplot as plt
+
+    if layout not in _FIGURES:
+        nrows, ncols, figsize = layout
+        fig, axes = plt.subplots(nrows, ncols, figsize=figsize)
+        grid = np.atleast_1d(axes).ravel()
+        _FIGURES[layout] = fig, axes, [ax.get_subplotspec() for ax in grid]
+        return fig, axes
+
+    fig, axes, specs = _FIGURES[layout]
+    grid = np.atleast_1d(axes).ravel()
+    for ax in fig.axes:
+        if not any(ax is g for g in grid):
+            ax.remove()
+    for ax, spec in zip(grid, specs):
+        ax.clear()
+        ax.set_subplotspec(spec)
+        ax.set_position(spec.get_position(fig))
+    fig.suptitle("")
+    return fig, axes
+
+
+@profiled("render_figure", items=lambda res, *a, **k: 1)
+def render_task(task, outdir, formats=("png",), dpi=DPI):
+    """
+    Dibujar una tarea en la figura reutilizable y guardarla
+
+    Returns:
+        list: Rutas de los archivos escritos
+    """
+    fig, axes = _figure(task["layout"])
+    task["draw"](fig, axes, *task["args"])
+
+    paths = []
+    for fmt in formats:
+        path = os.path.join(outdir, f"{task['name']}.{fmt}")
+        fig.savefig(path, dpi=dpi)
+        paths.append(path)
+    return paths
+
+
+def _render_batch(tasks, outdir, formats, dpi):
+    paths = []
+    for task in tasks:
+        paths.extend(render_task(task, outdir, formats, dpi))
+    return paths
+
+
+@profiled("render_figures", items=lambda res, tasks, *a, **k: len(tasks))
+def render_figures(tasks, outdir, formats=("png",), jobs=1, dpi=DPI):
+    """
+    Guardar todas las figuras en `outdir` sin abrir ventanas
+
+    Las tareas se ordenan por disposición y se reparten en `jobs` lotes
+    contiguos, de modo que cada proceso dibuja seguidas las figuras que
+    comparten figura y ejes.
+
+    Args:
+        tasks: Lista de figure_task
+        outdir: Directorio de salida (se crea si no existe)
+        formats: Extensiones a guardar ("png", "svg", ...)
+        jobs: Procesos de dibujo (1 = en este proceso)
+        dpi: Resolución de los PNG
+
+    Returns:
+        list: Rutas de los archivos escritos, en el orden de las tareas
+    """
+    os.makedirs(outdir, exist_ok=True)
+    if not tasks:
+        return []
+
+    order = sorted(range(len(tasks)), key=lambda i: str(tasks[i]["layout"]))
+    jobs = max(1, min(jobs, len(tasks)))
+
+    if jobs == 1:
+        use_agg()
+        results = [render_task(tasks[i], outdir, formats, dpi) for i in order]
+    else:
+        batches = [[tasks[i] for i in part] for part in np.array_split(order, jobs)]
+        with ProcessPoolExecutor(max_workers=jobs, initializer=use_agg) as executor:
+            futures = [executor.submit(_render_batch, batch, outdir, formats, dpi)
+                       for batch in batches]
+            flat = [path for future in futures for path in future.result()]
+        n = len(formats)
+        results = [flat[k * n:(k + 1) * n] for k in range(len(order))]
+
+    by_task = dict(zip(order, results))
+    return [path for i in range(len(tasks)) for path in by_task[i]]
+
+
+def show_figures(tasks):
+    """Modo interactivo: dibujar todas las tareas y abrir las ventanas"""
+    with stage("draw_figures", items=len(tasks)):
+        import matplotlib.pyplot as plt
+
+        for task in tasks:
+            nrows, ncols, figsize = task["layout"]
+            fig, axes = plt.subplots(nrows, ncols, figsize=figsize)
+            task["draw"](fig, axes, *task["args"])
+    plt.show()
+
+
+def output_figures(tasks, report_dir=None, formats=("png",), jobs=1):
+    """
+    Mostrar las figuras o, si se indica report_dir, guardarlas sin GUI
+
+    Returns:
+        list: Rutas escritas (vacía en modo interactivo)
+    """
+    if report_dir is None:
+        show_figures(tasks)
+        return []
+
+    paths = render_figures(tasks, report_dir, formats=formats, jobs=jobs)
+    print(f"✔ {len(paths)} archivos guardados en {report_dir}")
+    return paths
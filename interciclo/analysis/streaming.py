@@ -0,0 +1,442 @@
+# analysis/streaming.py
+
+"""
+Estadísticas en streaming con memoria acotada
+Permiten procesar capturas por bloques de paquetes sin guardar todas las
+muestras: media/varianza de Welford, histograma logarítmico de bins fijos
+(sketch de cuantiles fusionable) y acumuladores de IAT y throughput que
+mantienen el estado entre bloques. StreamingFlow combina todo lo anterior
+para calcular las métricas de flow_metrics sobre capturas que no caben
+en memoria (pcap_reader.iter_udp_packets).
+"""
+
+import math
+
+import numpy as np
+
+from .decimate import StreamingDecimator, DEFAULT_POINTS
+
+
+class RunningStats:
+    """
+    Media, varianza, mínimo y máximo con el algoritmo de Welford
+
+    Los bloques se combinan con la fórmula de Chan et al., así que
+    update() acepta arrays completos y dos instancias se pueden fusionar.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        """Añadir un bloque de muestras"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        other = RunningStats()
+        other.n = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other):
+        """Fusionar otra instancia en esta"""
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def var(self):
+        """Varianza muestral (ddof=1)"""
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+
+class LogHistogram:
+    """
+    Histograma logarítmico de bins fijos usado como sketch de cuantiles
+
+    Los bins crecen en progresión geométrica de razón
+    gamma = (1 + rel_error) / (1 - rel_error) entre min_value y max_value,
+    de modo que el valor representativo de un bin está a una distancia
+    relativa <= rel_error de cualquier muestra del bin. La memoria es
+    fija (depende solo del rango y del error) y dos histogramas con los
+    mismos parámetros se fusionan sumando sus contadores.
+
+    Cota de error: quantile(q) difiere como mucho rel_error (relativo) de
+    la interpolación lineal entre las muestras de rango floor(q·(n-1)) y
+    ceil(q·(n-1)), que es lo que calcula np.percentile / boxplot. Los
+    extremos (q = 0 y q = 1) son exactos.
+    """
+
+    def __init__(self, rel_error=1e-3, min_value=1e-6, max_value=1e7):
+        self.rel_error = rel_error
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + rel_error) / (1 - rel_error)
+        self.log_gamma = math.log(self.gamma)
+        self.k0 = math.floor(math.log(min_value) / self.log_gamma)
+        nbins = math.ceil(math.log(max_value) / self.log_gamma) - self.k0 + 1
+        self.counts = np.zeros(nbins, dtype=np.int64)
+        self.zeros = 0
+        self.stats = RunningStats()
+
+    @property
+    def n(self):
+        return self.stats.n
+
+    def update(self, values):
+        """Añadir un bloque de muestras (los valores <= 0 cuentan como cero)"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        self.stats.update(values)
+        pos = values[values > 0]
+        self.zeros += len(values) - len(pos)
+        k = np.ceil(np.log(pos) / self.log_gamma).astype(np.int64) - self.k0
+        np.clip(k, 0, len(self.counts) - 1, out=k)
+        self.counts += np.bincount(k, minlength=len(self.counts))
+
+    def merge(self, other):
+        """Fusionar otro histograma con los mismos parámetros"""
+        if len(other.counts) != len(self.counts) or other.k0 != self.k0:
+            raise ValueError("Histogramas con parámetros distintos")
+        self.counts += other.counts
+        self.zeros += other.zeros
+        self.stats.merge(other.stats)
+
+    def bin_values(self):
+        """Valor representativo de cada bin"""
+        k = np.arange(len(self.counts)) + self.k0
+        return 2 * self.gamma ** k / (self.gamma + 1)
+
+    def _value_at_rank(self, rank):
+        """Valor aproximado de la muestra de rango `rank` (0 .. n-1)"""
+        if rank <= 0:
+            return self.stats.min
+        if rank >= self.n - 1:
+            return self.stats.max
+        if rank < self.zeros:
+            return 0.0
+        cum = np.cumsum(self.counts)
+        k = int(np.searchsorted(cum, rank - self.zeros, side="right"))
+        value = 2 * self.gamma ** (k + self.k0) / (self.gamma + 1)
+        return min(max(value, self.stats.min), self.stats.max)
+
+    def quantile(self, q):
+        """Cuantil q (0..1) con interpolación lineal como np.percentile"""
+        if self.n == 0:
+            return math.nan
+        rank = q * (self.n - 1)
+        lo, hi = math.floor(rank), math.ceil(rank)
+        v_lo = self._value_at_rank(lo)
+        if hi == lo:
+            return v_lo
+        v_hi = self._value_at_rank(hi)
+        return v_lo + (v_hi - v_lo) * (rank - lo)
+
+    def boxplot_stats(self, label=None, whis=1.5):
+        """
+        Estadísticas para Axes.bxp (mediana, cuartiles, bigotes, atípicos)
+
+        Los bigotes son la muestra más extrema dentro de
+        [Q1 - whis·IQR, Q3 + whis·IQR], como en boxplot; los atípicos se
+        representan con un valor por bin no vacío fuera de ese rango.
+        """
+        q1, med, q3 = self.quantile(0.25), self.quantile(0.5), self.quantile(0.75)
+        iqr = q3 - q1
+        lo_fence, hi_fence = q1 - whis * iqr, q3 + whis * iqr
+
+        values = self.bin_values()
+        nonzero = self.counts > 0
+        inside = nonzero & (values >= lo_fence) & (values <= hi_fence)
+
+        if self.stats.min >= lo_fence:
+            whislo = self.stats.min
+        elif self.zeros and lo_fence <= 0:
+            whislo = 0.0
+        else:
+            whislo = max(values[inside].min(), self.stats.min) if inside.any() else q1
+
+        if self.stats.max <= hi_fence:
+            whishi = self.stats.max
+        else:
+            whishi = min(values[inside].max(), self.stats.max) if inside.any() else q3
+
+        fliers = values[nonzero & ((values < whislo) | (values > whishi))]
+        fliers = np.clip(fliers, self.stats.min, self.stats.max)
+
+        return {
+            "label": label,
+            "med": med,
+            "q1": q1,
+            "q3": q3,
+            "iqr": iqr,
+            "whislo": whislo,
+            "whishi": whishi,
+            "mean": self.stats.mean,
+            "fliers": fliers,
+        }
+
+
+class StreamingIAT:
+    """
+    IAT por bloques: conserva el último timestamp entre bloques y descarta
+    el tramo inicial igual que metrics.compute_iat
+    """
+
+    def __init__(self, discard_seconds=1.0, scale=1.0, **hist_kwargs):
+        self.discard_seconds = discard_seconds
+        self.scale = scale
+        self.t_start = None
+        self.last = None
+        self.hist = LogHistogram(**hist_kwargs)
+
+    def update(self, ts):
+        """Añadir un bloque de timestamps ordenados; devuelve sus IAT"""
+        ts = np.asarray(ts, dtype=np.float64)
+        if len(ts) == 0:
+            return np.array([])
+        if self.t_start is None:
+            self.t_start = ts[0] + self.discard_seconds
+        ts = ts[ts >= self.t_start]
+        if len(ts) == 0:
+            return np.array([])
+
+        if self.last is None:
+            iat = np.diff(ts)
+        else:
+            iat = np.diff(ts, prepend=self.last)
+        self.last = ts[-1]
+
+        iat = iat * self.scale
+        self.hist.update(iat)
+        return iat
+
+
+class StreamingThroughput:
+    """
+    Throughput por ventanas contiguas, alimentado por bloques
+
+    Usa la misma rejilla que compute_throughput (inicio en el primer
+    paquete, bordes de np.arange) y descarta la última ventana incompleta
+    al cerrar, así que los valores coinciden con la versión en memoria.
+    Solo mantiene abiertas las ventanas que aún pueden recibir paquetes.
+    """
+
+    def __init__(self, window=1.0, keep_series=True):
+        self.window = window
+        self.keep_series = keep_series
+        self.start = None
+        self.last_ts = None
+        self.base = 0                       # índice de la primera ventana abierta
+        self.open = np.zeros(0, dtype=np.int64)
+        self.series = []
+        self.stats = RunningStats()
+
+    def _edges(self, i0, i1):
+        """Bordes i0..i1-1 calculados igual que np.arange(start, ..., window)"""
+        i = np.arange(i0, i1, dtype=np.int64)
+        delta = (self.start + self.window) - self.start
+        edges = self.start + i * delta
+        edges[i == 0] = self.start
+        edges[i == 1] = self.start + self.window
+        return edges
+
+    def update(self, ts, sizes):
+        """Añadir un bloque de paquetes ordenados por tiempo"""
+        ts = np.asarray(ts, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.int64)
+        if len(ts) == 0:
+            return
+        if self.start is None:
+            self.start = ts[0]
+        self.last_ts = ts[-1] if self.last_ts is None else max(self.last_ts, ts[-1])
+
+        # Ventana de cada paquete dentro de los bordes de este bloque
+        n_upto = int((ts.max() - self.start) / self.window) + 3
+        edges = self._edges(self.base, self.base + max(n_upto - self.base, 1) + 1)
+        idx = np.searchsorted(edges, ts, side="right") - 1
+        ok = idx >= 0                        # paquetes en ventanas ya cerradas se ignoran
+        counts = np.bincount(idx[ok], weights=sizes[ok], minlength=len(edges)).astype(np.int64)
+
+        if len(counts) > len(self.open):
+            self.open = np.concatenate([self.open, np.zeros(len(counts) - len(self.open), np.int64)])
+        self.open[:len(counts)] += counts
+
+        # Cerrar las ventanas que seguro son completas: todas salvo la del
+        # último paquete y la anterior (si el paquete cae justo en un borde
+        # esa ventana es la última y se descarta)
+        n_closed = int(np.searchsorted(edges, self.last_ts, side="right")) - 2
+        if n_closed > 0:
+            self._emit(self.open[:n_closed])
+            self.open = self.open[n_closed:]
+            self.base += n_closed
+
+    def _emit(self, nbytes):
+        thr = nbytes * 8 / self.window
+        self.stats.update(thr)
+        if self.keep_series:
+            self.series.append(thr)
+
+    def finish(self):
+        """
+        Cerrar el flujo y devolver (inicio de ventanas, throughput en bits/s)
+
+        Las ventanas válidas son las de np.arange(start, último ts, window)
+        salvo la última, igual que compute_throughput.
+        """
+        if self.start is None:
+            return np.array([]), np.array([])
+        n_edges = len(np.arange(self.start, self.last_ts, self.window))
+        n_valid = max(n_edges - 1, 0)
+        pending = n_valid - self.base
+        if pending > 0:
+            self._emit(self.open[:pending])
+        self.open = np.zeros(0, dtype=np.int64)
+        self.base = max(self.base, n_valid)
+
+        if not self.keep_series:
+            return np.array([]), np.array([])
+        values = np.concatenate(self.series) if self.series else np.array([])
+        values = values[:n_valid]
+        return self._edges(0, len(values)), values
+
+
+class StreamingFlow:
+    """
+    Métricas de un flujo por bloques, con memoria acotada
+
+    Equivale a metrics.flow_metrics pero sin guardar las muestras por
+    paquete: el throughput y la tasa de paquetes se acumulan por ventanas
+    (StreamingThroughput), el IAT en un LogHistogram y la serie del IAT
+    se decima al vuelo. El estado que cruza los bordes de bloque es el
+    último timestamp, las ventanas abiertas y la ráfaga en curso.
+
+    El jitter RFC 3550 usa, como flow_metrics, D = IAT - mediana del IAT.
+    La mediana solo se conoce al final, pero el filtro olvida el pasado
+    con un factor 15/16 por paquete, así que basta con guardar los últimos
+    JITTER_TAIL IAT para obtener el último valor de J.
+    """
+
+    JITTER_TAIL = 1024
+
+    def __init__(self, windows=(1.0,), discard_seconds=1.0, burst_gap=0.002,
+                 scale=1.0, max_points=DEFAULT_POINTS):
+        self.windows = tuple(windows)
+        self.burst_gap = burst_gap
+        self.scale = scale
+        self.throughput = {w: StreamingThroughput(w) for w in self.windows}
+        self.rate = StreamingThroughput(1.0)
+        self.iat = StreamingIAT(discard_seconds, scale)
+        self.series = StreamingDecimator(max_points)
+        self.tail = np.array([])
+        self.n_iat = 0
+
+        self.packets = 0
+        self.bytes = 0
+        self.first_ts = None
+        self.last_ts = None
+
+        # Ráfagas: la ráfaga en curso continúa en el siguiente bloque
+        self.bursts = 0
+        self.burst_len = 0
+        self.burst_max = 0
+        self.gaps = LogHistogram(min_value=1e-6, max_value=1e5)
+
+    def update(self, ts, sizes):
+        """Añadir un bloque de paquetes (se ordena por tiempo)"""
+        ts = np.asarray(ts, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.int64)
+        if len(ts) == 0:
+            return
+        if np.any(ts[1:] < ts[:-1]):
+            order = np.argsort(ts, kind="stable")
+            ts, sizes = ts[order], sizes[order]
+
+        for w, thr in self.throughput.items():
+            thr.update(ts, sizes)
+        self.rate.update(ts, np.ones(len(ts), dtype=np.int64))
+
+        iat = self.iat.update(ts)
+        if len(iat):
+            self.series.update(np.arange(self.n_iat, self.n_iat + len(iat)), iat)
+            self.n_iat += len(iat)
+            self.tail = np.concatenate([self.tail, iat])[-self.JITTER_TAIL:]
+
+        self._update_bursts(ts)
+        if self.first_ts is None:
+            self.first_ts = ts[0]
+        self.last_ts = ts[-1] if self.last_ts is None else max(self.last_ts, ts[-1])
+        self.packets += len(ts)
+        self.bytes += int(sizes.sum())
+
+    def _update_bursts(self, ts):
+        gaps = np.diff(ts) if self.last_ts is None else np.diff(ts, prepend=self.last_ts)
+        if self.last_ts is None:
+            self.bursts = 1
+        breaks = np.flatnonzero(gaps > self.burst_gap)
+        self.gaps.update(gaps[breaks])
+
+        # Longitud de las ráfagas cerradas en este bloque; la primera
+        # continúa la ráfaga en curso del bloque anterior
+        offset = 0 if self.last_ts is not None else 1
+        bounds = np.r_[0, breaks + offset, len(ts)]
+        lengths = np.diff(bounds)
+        lengths[0] += self.burst_len
+        if len(lengths) > 1:
+            self.burst_max = max(self.burst_max, int(lengths[:-1].max()))
+        self.burst_len = int(lengths[-1])
+        self.bursts += len(breaks)
+
+    def finish(self):
+        """
+        Cerrar el flujo
+
+        Returns:
+            dict: packets, bytes, duration, throughput {ventana: (inicio,
+                  bits/s)}, pkt_rate, iat_hist (LogHistogram en unidades de
+                  `scale`), iat_series (índice, IAT decimados), jitter_last
+                  (s) y bursts (count, mean_packets, max_packets y gaps,
+                  LogHistogram de silencios en s)
+        """
+        tail = self.tail / self.scale
+        if len(tail):
+            from .metrics import rfc3550_jitter
+            median = self.iat.hist.quantile(0.5) / self.scale
+            jitter_last = float(rfc3550_jitter(tail - median)[-1])
+        else:
+            jitter_last = 0.0
+
+        t_rate, rate = self.rate.finish()          # "bits/s" de paquetes de 1 byte
+        return {
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "duration": float(self.last_ts - self.first_ts) if self.packets else 0.0,
+            "throughput": {w: thr.finish() for w, thr in self.throughput.items()},
+            "pkt_rate": (t_rate, rate / 8),
+            "iat_hist": self.iat.hist,
+            "iat_series": self.series.finish(),
+            "jitter_last": jitter_last,
+            "bursts": {
+                "count": self.bursts,
+                "mean_packets": self.packets / self.bursts if self.bursts else 0.0,
+                "max_packets": max(self.burst_max, self.burst_len),
+                "gaps": self.gaps,
+            },
+        }
@@ -0,0 +1,362 @@
+# analysis/synth.py
+
+"""
+Capturas sintéticas con la forma de nuestros flujos MPEG-TS
+Genera de forma determinista (semilla fija) el par de capturas emisor /
+receptor de una transmisión de video: datagramas UDP de 7 paquetes TS de
+188 bytes, frames a 30 fps en ráfagas (un IDR grande cada GOP y frames P
+de tamaño log-normal), PAT/PMT al inicio de cada GOP, contadores de
+continuidad y PTS correctos y una cabecera de slice H.264 al inicio de
+cada frame. El receptor ve los mismos datagramas con pérdida, un delay
+base más jitter (con reordenamiento opcional) y su propio reloj (offset y
+deriva), así que sirven para medir y validar todo el pipeline de análisis.
+
+Los archivos se escriben por bloques de tamaño fijo, con memoria acotada
+para cualquier número de paquetes; el resultado depende solo de los
+parámetros y de la semilla.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .mpegts import TS_PACKET, PAT_PID
+
+TS_PER_DGRAM = 7
+PAYLOAD_LEN = TS_PER_DGRAM * TS_PACKET
+VIDEO_PID = 0x0100
+PMT_PID = 0x1000
+SEQ_OFFSET = 24             # número de secuencia del datagrama (huella única)
+CHUNK = 1 << 16             # datagramas por bloque de escritura
+PCAP_NSEC_MAGIC = 0xA1B23C4D
+FORMAT_VERSION = 2          # sube cuando cambian los archivos generados (ensure_pair)
+
+T0 = 1_700_000_000.0        # instante del primer paquete (s, reloj del emisor)
+
+DEFAULTS = {
+    "packets": 10_000,
+    "seed": 1,
+    "port": 39400,
+    "fps": 30.0,
+    "gop": 30,
+    "bitrate": 4e6,          # bits/s de video
+    "idr_ratio": 5.0,        # tamaño del IDR / tamaño medio de un P
+    "link_rate": 100e6,      # espaciado de los datagramas de una ráfaga (bits/s)
+    "loss": 0.0,             # probabilidad de pérdida por datagrama
+    "delay": 0.005,          # delay base emisor → receptor (s)
+    "jitter": 0.001,         # desviación típica del delay (s)
+    "reorder": False,        # delay independiente por paquete (si no, cola FIFO)
+    "offset": 0.0,           # offset del reloj del receptor (s)
+    "drift_ppm": 0.0,        # deriva del reloj del receptor (ppm)
+}
+
+RECORD = np.dtype([
+    ("ts_sec", "<u4"), ("ts_nsec", "<u4"), ("incl_len", "<u4"), ("orig_len", "<u4"),
+    ("eth", "u1", 14),
+    ("ip_vhl", "u1"), ("ip_tos", "u1"), ("ip_len", ">u2"), ("ip_id", ">u2"),
+    ("ip_frag", ">u2"), ("ip_ttl", "u1"), ("ip_proto", "u1"), ("ip_sum", ">u2"),
+    ("ip_src", ">u4"), ("ip_dst", ">u4"),
+    ("sport", ">u2"), ("dport", ">u2"), ("udp_len", ">u2"), ("udp_sum", ">u2"),
+    ("ts", "u1", (TS_PER_DGRAM, TS_PACKET)),
+])
+
+SENDER = (0xC0A87F01, "02:00:00:00:00:01")        # 192.168.127.1
+RECEIVER = (0xC0A87F02, "02:00:00:00:00:02")      # 192.168.127.2
+
+
+# ---------------------------------------------------------------
+# SECCIONES PSI
+# ---------------------------------------------------------------
+def crc32_mpeg(data):
+    """CRC-32/MPEG-2 de una sección PSI"""
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+            crc &= 0xFFFFFFFF
+    return crc
+
+
+def _psi_packet(pid, section):
+    """Paquete TS con una sección PSI completa (cc = 0; se ajusta al escribir)"""
+    section = section + crc32_mpeg(section).to_bytes(4, "big")
+    pkt = bytes([0x47, 0x40 | (pid >> 8), pid & 0xFF, 0x10, 0x00]) + section
+    return np.frombuffer(pkt.ljust(TS_PACKET, b"\xff"), dtype=np.uint8)
+
+
+def _pat_pmt():
+    pat = bytes([0x00, 0xB0, 13, 0x00, 0x01, 0xC1, 0x00, 0x00,
+                 0x00, 0x01, 0xE0 | (PMT_PID >> 8), PMT_PID & 0xFF])
+    pmt = bytes([0x02, 0xB0, 18, 0x00, 0x01, 0xC1, 0x00, 0x00,
+                 0xE0 | (VIDEO_PID >> 8), VIDEO_PID & 0xFF, 0xF0, 0x00,
+                 0x1B, 0xE0 | (VIDEO_PID >> 8), VIDEO_PID & 0xFF, 0xF0, 0x00])
+    return _psi_packet(PAT_PID, pat), _psi_packet(PMT_PID, pmt)
+
+
+# ---------------------------------------------------------------
+# EMISOR: DATAGRAMAS Y TIMESTAMPS
+# ---------------------------------------------------------------
+def _frames(rng, params, first_frame, n_frames):
+    """Datagramas de cada frame (IDR cada GOP, P log-normales)"""
+    es_per_dgram = TS_PER_DGRAM * (TS_PACKET - 4)
+    mean_bytes = params["bitrate"] / 8 / params["fps"]
+    gop, ratio = params["gop"], params["idr_ratio"]
+    p_bytes = mean_bytes * gop / (ratio + gop - 1)
+
+    idx = first_frame + np.arange(n_frames)
+    size = p_bytes * rng.lognormal(-0.125, 0.5, n_frames)
+    size = np.where(idx % gop == 0, p_bytes * ratio, size)
+    return idx, np.maximum(1, np.ceil(size / es_per_dgram)).astype(np.int64)
+
+
+def iter_sender(params):
+    """
+    Datagramas del emisor por bloques de CHUNK
+
+    Yields:
+        dict: seq, ts (s), frame, first (primer datagrama del frame) y
+              psi (primer datagrama del GOP, lleva PAT y PMT)
+    """
+    rng = np.random.default_rng(params["seed"])
+    spacing = RECORD.itemsize * 8 / params["link_rate"]
+    total, frame, seq = params["packets"], 0, 0
+    pending = None
+
+    while seq < total:
+        n_frames = max(64, int(CHUNK / 4))
+        idx, dgrams = _frames(rng, params, frame, n_frames)
+        frame += n_frames
+        pos = np.arange(int(dgrams.sum())) - np.repeat(np.cumsum(dgrams) - dgrams, dgrams)
+        fidx = np.repeat(idx, dgrams)
+        block = {
+            "frame": fidx,
+            "ts": T0 + fidx / params["fps"] + pos * spacing,
+            "first": pos == 0,
+            "psi": (pos == 0) & (fidx % params["gop"] == 0),
+        }
+        if pending is not None:
+            block = {k: np.concatenate([pending[k], block[k]]) for k in block}
+        while len(block["ts"]) >= CHUNK or (seq < total and len(block["ts"]) >= total - seq):
+            n = min(CHUNK, total - seq)
+            out = {k: v[:n] for k, v in block.items()}
+            out["seq"] = np.arange(seq, seq + n, dtype=np.int64)
+            seq += n
+            block = {k: v[n:] for k, v in block.items()}
+            yield out
+            if seq >= total:
+                return
+        pending = block
+
+
+# ---------------------------------------------------------------
+# REGISTROS PCAP
+# ---------------------------------------------------------------
+def _mac(text):
+    return [int(b, 16) for b in text.split(":")]
+
+
+def _ip_checksum(ip_len, ip_id, src, dst):
+    """Checksum IPv4 de cada cabecera (solo varían longitud e id)"""
+    words = (0x4500 + ip_len.astype(np.int64) + ip_id + 0x4011
+             + (src >> 16) + (src & 0xFFFF) + (dst >> 16) + (dst & 0xFFFF))
+    words = (words & 0xFFFF) + (words >> 16)
+    words = (words & 0xFFFF) + (words >> 16)
+    return (~words) & 0xFFFF
+
+
+def _pts_bytes(pts):
+    """Campo PTS de 5 bytes de la cabecera PES"""
+    pts = pts.astype(np.int64)
+    return np.stack([0x21 | ((pts >> 29) & 0x0E),
+                     (pts >> 22) & 0xFF,
+                     0x01 | ((pts >> 14) & 0xFE),
+                     (pts >> 7) & 0xFF,
+                     0x01 | ((pts << 1) & 0xFE)], axis=1).astype(np.uint8)
+
+
+def build_records(dgrams, ts, params, psi, fill, video_cc0, psi_cc):
+    """
+    Registros pcap (cabecera + Ethernet/IPv4/UDP + 7 paquetes TS)
+
+    Args:
+        dgrams: Bloque de iter_sender (o un subconjunto)
+        ts: Timestamp de captura de cada datagrama (s)
+        psi: (paquete TS de la PAT, de la PMT)
+        fill: 184 bytes de relleno del ES
+        video_cc0: Paquetes TS de video anteriores al primer datagrama
+        psi_cc: Índice de GOP de cada datagrama (contador de la PAT/PMT)
+
+    Returns:
+        np.ndarray: Registros con dtype RECORD
+    """
+    n = len(ts)
+    rec = np.zeros(n, dtype=RECORD)
+    ns = np.round((ts - np.floor(ts)) * 1e9).astype(np.int64)
+    sec = np.floor(ts).astype(np.int64) + ns // 1_000_000_000
+    rec["ts_sec"] = sec
+    rec["ts_nsec"] = ns % 1_000_000_000
+    rec["incl_len"] = rec["orig_len"] = RECORD.itemsize - 16
+
+    rec["eth"][:, 0:6] = _mac(RECEIVER[1])
+    rec["eth"][:, 6:12] = _mac(SENDER[1])
+    rec["eth"][:, 12:14] = (0x08, 0x00)
+    ip_len = np.full(n, 20 + 8 + PAYLOAD_LEN, dtype=np.int64)
+    ip_id = dgrams["seq"] & 0xFFFF
+    rec["ip_vhl"], rec["ip_ttl"], rec["ip_proto"] = 0x45, 64, 17
+    rec["ip_len"], rec["ip_id"] = ip_len, ip_id
+    rec["ip_src"], rec["ip_dst"] = SENDER[0], RECEIVER[0]
+    rec["ip_sum"] = _ip_checksum(ip_len, ip_id, SENDER[0], RECEIVER[0])
+    rec["sport"], rec["dport"] = params["port"], params["port"]
+    rec["udp_len"] = 8 + PAYLOAD_LEN
+
+    # ---- Paquetes TS ----
+    pkt = rec["ts"]
+    pkt[:, :, 4:] = fill
+    psi_rows = np.flatnonzero(dgrams["psi"])
+    pkt[psi_rows, 0] = psi[0]
+    pkt[psi_rows, 1] = psi[1]
+    pkt[psi_rows, 0, 3] |= (psi_cc[psi_rows] & 0x0F).astype(np.uint8)
+    pkt[psi_rows, 1, 3] |= (psi_cc[psi_rows] & 0x0F).astype(np.uint8)
+
+    # Contador de continuidad del video: paquetes TS de video anteriores
+    n_video = TS_PER_DGRAM - 2 * dgrams["psi"].astype(np.int64)
+    first_video = video_cc0 + np.cumsum(n_video) - n_video
+    slot = np.arange(TS_PER_DGRAM)
+    vslot = 2 * dgrams["psi"][:, None]
+    is_video = slot[None, :] >= vslot
+    cc = (first_video[:, None] + slot[None, :] - vslot) & 0x0F
+    pkt[:, :, 0] = np.where(is_video, 0x47, pkt[:, :, 0])
+    pkt[:, :, 1] = np.where(is_video, VIDEO_PID >> 8, pkt[:, :, 1])
+    pkt[:, :, 2] = np.where(is_video, VIDEO_PID & 0xFF, pkt[:, :, 2])
+    pkt[:, :, 3] = np.where(is_video, 0x10 | cc, pkt[:, :, 3])
+
+    # Inicio de frame: PUSI, cabecera PES con PTS y cabecera de slice
+    rows = np.flatnonzero(dgrams["first"])
+    s = 2 * dgrams["psi"][rows].astype(np.int64)
+    pkt[rows, s, 1] |= 0x40
+    pes = pkt[rows, s]
+    pes[:, 4:13] = (0x00, 0x00, 0x01, 0xE0, 0x00, 0x00, 0x80, 0x80, 0x05)
+    pes[:, 13:18] = _pts_bytes(90000 * (dgrams["frame"][rows] + 1) / params["fps"])
+    idr = (dgrams["frame"][rows] % params["gop"] == 0)[:, None]
+    pes[:, 18:23] = np.where(idr, np.array([0, 0, 1, 0x65, 0x88], dtype=np.uint8),
+                             np.array([0, 0, 1, 0x41, 0x98], dtype=np.uint8))
+    pkt[rows, s] = pes
+
+    # Número de secuencia en los primeros bytes del payload (huella única)
+    head = rec["ts"].reshape(n, -1)
+    head[:, SEQ_OFFSET:SEQ_OFFSET + 8] = (
+        dgrams["seq"].astype(">u8").view(np.uint8).reshape(n, 8))
+    return rec
+
+
+def pcap_header():
+    """Cabecera global de un pcap Ethernet con timestamps en nanosegundos"""
+    return np.array([(PCAP_NSEC_MAGIC, 2, 4, 0, 0, 65535, 1)],
+                    dtype=[("magic", "<u4"), ("major", "<u2"), ("minor", "<u2"),
+                           ("zone", "<i4"), ("sigfigs", "<u4"), ("snaplen", "<u4"),
+                           ("linktype", "<u4")]).tobytes()
+
+
+# ---------------------------------------------------------------
+# PAR EMISOR / RECEPTOR
+# ---------------------------------------------------------------
+def generate_pair(prefix, **overrides):
+    """
+    Escribir <prefix>_A.pcap (emisor), <prefix>_B.pcap (receptor) y
+    <prefix>.json con los parámetros y los valores reales
+
+    El receptor registra tB = tA + delay (reloj de A) llevado a su reloj:
+    tB' - T0 = (tB - T0) · (1 + deriva) + offset. El delay es delay base +
+    Gamma(k=2) con la desviación `jitter`, así que hay reordenamiento
+    cuando el jitter supera el espaciado de los datagramas.
+
+    Returns:
+        dict: Parámetros y verdad de referencia (sent, received, lost,
+              delay medio real)
+    """
+    unknown = set(overrides) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+    params = dict(DEFAULTS, **overrides)
+    rng = np.random.default_rng(params["seed"] + 1)
+    psi = _pat_pmt()
+    fill = rng.integers(0, 256, TS_PACKET - 4, dtype=np.uint8)
+    theta = params["jitter"] / np.sqrt(2)
+    skew = params["drift_ppm"] * 1e-6
+
+    sent = received = 0
+    delay_sum = 0.0
+    video_cc0 = 0
+    last_arrival = -np.inf
+    held = None                 # datagramas de B que aún pueden ser adelantados
+
+    with open(f"{prefix}_A.pcap", "wb") as fa, open(f"{prefix}_B.pcap", "wb") as fb:
+        fa.write(pcap_header())
+        fb.write(pcap_header())
+        chunks = iter_sender(params)
+        block = next(chunks, None)
+        while block is not None:
+            nxt = next(chunks, None)
+            gop_idx = block["frame"] // params["gop"]
+
+            recA = build_records(block, block["ts"], params, psi, fill, video_cc0, gop_idx)
+            n_video = TS_PER_DGRAM * len(block["ts"]) - 2 * int(block["psi"].sum())
+            video_cc0 += n_video
+            fa.write(recA.tobytes())
+            sent += len(recA)
+
+            keep = rng.random(len(recA)) >= params["loss"]
+            delay = params["delay"] + rng.gamma(2.0, theta, len(recA)) if theta > 0 \
+                else np.full(len(recA), params["delay"])
+            arrival = (block["ts"] + delay)[keep]
+            if not params["reorder"] and len(arrival):
+                arrival = np.maximum.accumulate(np.maximum(arrival, last_arrival))
+                last_arrival = arrival[-1]
+            delay_sum += float((arrival - block["ts"][keep]).sum())
+            recB = recA[keep]
+            if held is not None:
+                # concatenate devuelve el orden de bytes nativo: se vuelve a RECORD
+                recB = np.concatenate([held[0], recB]).astype(RECORD, copy=False)
+                arrival = np.concatenate([held[1], arrival])
+            order = np.argsort(arrival, kind="stable")
+            recB, arrival = recB[order], arrival[order]
+
+            # Lo que llega después del primer envío del bloque siguiente
+            # más el delay mínimo puede quedar detrás de él: se retiene
+            cut = len(arrival) if nxt is None else int(
+                np.searchsorted(arrival, nxt["ts"][0] + params["delay"], side="right"))
+            held = (recB[cut:], arrival[cut:])
+            recB, arrival = recB[:cut], arrival[:cut]
+
+            tB = T0 + (arrival - T0) * (1 + skew) + params["offset"]
+            out = recB.copy()
+            ns = np.round((tB - np.floor(tB)) * 1e9).astype(np.int64)
+            out["ts_sec"] = np.floor(tB).astype(np.int64) + ns // 1_000_000_000
+            out["ts_nsec"] = ns % 1_000_000_000
+            fb.write(out.tobytes())
+            received += len(out)
+            block = nxt
+
+    truth = dict(params, version=FORMAT_VERSION, sent=sent, received=received,
+                 lost=sent - received, mean_delay=delay_sum / received if received else 0.0,
+                 files=[f"{prefix}_A.pcap", f"{prefix}_B.pcap"])
+    with open(f"{prefix}.json", "w") as f:
+        json.dump(truth, f, indent=2)
+    return truth
+
+
+def ensure_pair(prefix, **overrides):
+    """generate_pair solo si no existe ya un par con los mismos parámetros"""
+    params = dict(DEFAULTS, **overrides)
+    try:
+        with open(f"{prefix}.json") as f:
+            truth = json.load(f)
+        if truth.get("version") == FORMAT_VERSION and \
+                all(truth.get(k) == v for k, v in params.items()) and \
+                all(os.path.exists(p) for p in truth["files"]):
+            return truth
+    except (OSError, ValueError, KeyError):
+        pass
+    return generate_pair(prefix, **overrides)
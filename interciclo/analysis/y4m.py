@@ -0,0 +1,337 @@
+# analysis/y4m.py
+
+"""
+Lector de video YUV4MPEG2 (.y4m) en memoria mapeada y PSNR por frame
+El archivo se mapea con mmap y cada plano Y/U/V de cada frame es una vista
+NumPy sobre el mapa, sin copiar. Si todas las cabeceras FRAME miden lo
+mismo (lo habitual), los frames de un tramo son además una sola vista 3-D
+(frame, fila, columna) con el salto entre frames como stride.
+
+psnr_frames compara dos videos por tandas de frames: los errores
+cuadráticos de cada plano se suman en enteros sobre la tanda entera y las
+tandas se reparten entre procesos. El resultado es el de
+`ffmpeg -lavfi psnr` (mismas fórmulas, mismos redondeos en el CSV y en el
+stats_file); como su filtro, si un video tiene menos frames se repite su
+último frame hasta que termina el otro.
+
+collect_psnr reúne el PSNR medio de cada configuración de video a partir
+de los resúmenes psnr_*.txt de P4/psnr_video.sh.
+"""
+
+import mmap
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .profiling import profiled
+
+
+Y4M_MAGIC = b"YUV4MPEG2"
+FRAME_TAG = b"FRAME"
+PLANES = ("y", "u", "v")
+BATCH_BYTES = 32 << 20      # memoria de trabajo por tanda (diferencias en int32/int64)
+
+# Etiqueta C de la cabecera -> submuestreo de crominancia (horizontal, vertical)
+CHROMA = {"420": (2, 2), "422": (2, 1), "444": (1, 1), "411": (4, 1)}
+
+
+def _colorspace(tag):
+    """Submuestreo y bits por muestra de la etiqueta C (C420jpeg, C420p10...)"""
+    m = re.fullmatch(r"(420|422|444|411)(?:jpeg|paldv|mpeg2)?(?:p(\d+))?", tag)
+    if m is None:
+        raise ValueError(f"Espacio de color Y4M no soportado: C{tag}")
+    return CHROMA[m.group(1)], int(m.group(2) or 8)
+
+
+class Y4MVideo:
+    """
+    Video .y4m mapeado en memoria
+
+        video = Y4MVideo("original.y4m")
+        y, u, v = video.frame(0)         # vistas (alto, ancho), sin copia
+        Y, U, V = video.frames(0, 32)    # vistas (frames, alto, ancho)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        end = self._mm.find(b"\n")
+        header = self._mm[:end].split()
+        if end < 0 or not header or header[0] != Y4M_MAGIC:
+            raise ValueError(f"{path} no es un archivo YUV4MPEG2")
+
+        params = {p[:1].decode(): p[1:].decode() for p in header[1:]}
+        self.width = int(params["W"])
+        self.height = int(params["H"])
+        self.fps = params.get("F", "")
+        self.colorspace = params.get("C", "420jpeg")
+        (sx, sy), self.depth = _colorspace(self.colorspace)
+        self.dtype = np.dtype(np.uint8 if self.depth <= 8 else "<u2")
+        self.max_value = (1 << self.depth) - 1
+
+        # Planos: Y a resolución completa, U y V submuestreados (redondeo hacia arriba)
+        cw, ch = -(-self.width // sx), -(-self.height // sy)
+        self.shapes = [(self.height, self.width), (ch, cw), (ch, cw)]
+        self.plane_offsets = [0, self.height * self.width, self.height * self.width + ch * cw]
+        self.frame_samples = self.height * self.width + 2 * ch * cw
+        self.frame_bytes = self.frame_samples * self.dtype.itemsize
+
+        self.offsets, self.stride = self._frame_offsets(end + 1)
+
+    def _frame_offsets(self, pos):
+        """
+        Offset de los datos de cada frame y el salto entre frames
+
+        Primero se supone que todas las cabeceras FRAME miden lo mismo que
+        la primera y se comprueba en bloque; si no, se recorren una a una.
+
+        Returns:
+            tuple: (offsets, salto en bytes o None si no es constante)
+        """
+        mm, size = self._mm, len(self._mm)
+        if size <= pos:
+            return np.zeros(0, dtype=np.int64), None
+        head = mm.find(b"\n", pos) + 1 - pos
+        stride = head + self.frame_bytes
+        n = (size - pos) // stride
+        if head > 0 and pos + n * stride == size:
+            starts = pos + np.arange(n, dtype=np.int64) * stride
+            data = np.frombuffer(mm, dtype=np.uint8)
+            ok = all(np.all(data[starts + k] == c) for k, c in enumerate(FRAME_TAG))
+            ok = ok and np.all(data[starts + head - 1] == ord("\n"))
+            if ok:
+                return starts + head, stride
+
+        offsets = []
+        while pos < size:
+            if mm[pos:pos + len(FRAME_TAG)] != FRAME_TAG:
+                raise ValueError(f"{self.path}: cabecera FRAME inválida en el byte {pos}")
+            data = mm.find(b"\n", pos) + 1
+            if data == 0 or data + self.frame_bytes > size:
+                break                               # último frame truncado
+            offsets.append(data)
+            pos = data + self.frame_bytes
+        return np.array(offsets, dtype=np.int64), None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def frame(self, i):
+        """Planos (Y, U, V) del frame i como vistas sobre el mapa"""
+        base = int(self.offsets[i])
+        return tuple(
+            np.frombuffer(self._mm, dtype=self.dtype, count=h * w,
+                          offset=base + off * self.dtype.itemsize).reshape(h, w)
+            for off, (h, w) in zip(self.plane_offsets, self.shapes))
+
+    def frames(self, start, stop):
+        """
+        Planos (Y, U, V) de los frames start..stop-1 como arrays (frames, alto, ancho)
+
+        Con cabeceras de tamaño constante son vistas con stride sobre el
+        mapa; si no, copias.
+        """
+        if self.stride is None:
+            planes = [self.frame(i) for i in range(start, stop)]
+            return tuple(np.stack(p) for p in zip(*planes))
+        base = int(self.offsets[start]) if stop > start else 0
+        item = self.dtype.itemsize
+        return tuple(
+            np.ndarray((stop - start, h, w), dtype=self.dtype, buffer=self._mm,
+                       offset=base + off * item, strides=(self.stride, w * item, item))
+            for off, (h, w) in zip(self.plane_offsets, self.shapes))
+
+    def close(self):
+        """Cerrar el mapa (si todavía hay vistas vivas, se cierra al liberarlas)"""
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+        self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# ---------------------------------------------------------------
+# PSNR POR TANDAS DE FRAMES
+# ---------------------------------------------------------------
+_OPEN = {}                  # videos ya mapeados en este proceso
+
+
+def _video(path):
+    if path not in _OPEN:
+        _OPEN[path] = Y4MVideo(path)
+    return _OPEN[path]
+
+
+def _tail(video, start, stop):
+    """Frames start..stop-1 repitiendo el último frame más allá del final"""
+    n = len(video)
+    if stop <= n:
+        return video.frames(start, stop)
+    planes = video.frames(min(start, n - 1), n)
+    idx = np.minimum(np.arange(start, stop), n - 1) - min(start, n - 1)
+    return tuple(p[idx] for p in planes)
+
+
+def batch_sse(ref_path, dist_path, start, stop):
+    """
+    Suma de errores cuadráticos por frame y plano de los frames start..stop-1
+
+    Returns:
+        np.ndarray: (frames, 3) int64, columnas Y, U, V
+    """
+    ref, dist = _video(ref_path), _video(dist_path)
+    acc = np.int64 if ref.depth > 15 else np.int32
+    sse = np.empty((stop - start, 3), dtype=np.int64)
+    for k, (a, b) in enumerate(zip(_tail(ref, start, stop), _tail(dist, start, stop))):
+        d = np.subtract(a, b, dtype=acc)
+        np.multiply(d, d, out=d)
+        sse[:, k] = d.reshape(len(d), -1).sum(axis=1, dtype=np.int64)
+    return sse
+
+
+def _psnr(mse, max_value):
+    """10·log10(max² / mse), inf con mse = 0 (como ffmpeg)"""
+    with np.errstate(divide="ignore"):
+        return 10 * np.log10(max_value ** 2 / mse)
+
+
+@profiled("y4m_psnr", items=lambda res, *a, **k: len(res["psnr"]))
+def psnr_frames(ref_path, dist_path, jobs=1, batch=None):
+    """
+    PSNR por frame de un video frente al original
+
+    Args:
+        ref_path: Video original (.y4m)
+        dist_path: Video a comparar (.y4m, mismo tamaño y formato)
+        jobs: Procesos entre los que se reparten las tandas
+        batch: Frames por tanda (None = los que caben en BATCH_BYTES)
+
+    Returns:
+        dict: n (frames), sse, mse y psnr (frames × [Y, U, V]), mse_avg y
+              psnr_avg (los cuatro planos ponderados por píxeles, como el
+              psnr_avg de ffmpeg)
+    """
+    ref, dist = _video(ref_path), _video(dist_path)
+    if (ref.width, ref.height, ref.colorspace) != (dist.width, dist.height, dist.colorspace):
+        raise ValueError(f"{dist_path} ({dist.width}x{dist.height} C{dist.colorspace}) no tiene "
+                         f"el formato de {ref_path} ({ref.width}x{ref.height} C{ref.colorspace})")
+    if len(ref) == 0 or len(dist) == 0:
+        raise ValueError(f"Video sin frames: {ref_path if len(ref) == 0 else dist_path}")
+
+    n = max(len(ref), len(dist))
+    if batch is None:
+        batch = max(1, BATCH_BYTES // (8 * ref.frame_samples))
+    ranges = [(i, min(i + batch, n)) for i in range(0, n, batch)]
+
+    if jobs <= 1 or len(ranges) == 1:
+        parts = [batch_sse(ref_path, dist_path, i0, i1) for i0, i1 in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            parts = list(executor.map(batch_sse, [ref_path] * len(ranges),
+                                      [dist_path] * len(ranges), *zip(*ranges)))
+    sse = np.concatenate(parts)
+    _OPEN.pop(dist_path).close()            # el original se reutiliza con la siguiente variante
+
+    pixels = np.array([h * w for h, w in ref.shapes], dtype=np.float64)
+    mse = sse / pixels
+    mse_avg = sse.sum(axis=1) / pixels.sum()
+    return {
+        "n": n,
+        "sse": sse,
+        "mse": mse,
+        "psnr": _psnr(mse, ref.max_value),
+        "mse_avg": mse_avg,
+        "psnr_avg": _psnr(mse_avg, ref.max_value),
+    }
+
+
+def write_csv(path, result):
+    """CSV n,psnr_y,psnr_u,psnr_v por frame (n desde 1, dos decimales)"""
+    with open(path, "w") as f:
+        for i, (y, u, v) in enumerate(result["psnr"], 1):
+            f.write(f"{i},{y:.2f},{u:.2f},{v:.2f}\n")
+
+
+def write_stats(path, result):
+    """Registro por frame con el formato del stats_file de ffmpeg -lavfi psnr"""
+    with open(path, "w") as f:
+        for i in range(result["n"]):
+            mse, psnr = result["mse"][i], result["psnr"][i]
+            f.write(f"n:{i + 1} mse_avg:{result['mse_avg'][i]:.2f} "
+                    + " ".join(f"mse_{p}:{m:.2f}" for p, m in zip(PLANES, mse))
+                    + f" psnr_avg:{result['psnr_avg'][i]:.2f} "
+                    + " ".join(f"psnr_{p}:{v:.2f}" for p, v in zip(PLANES, psnr)) + " \n")
+
+
+# ---------------------------------------------------------------
+# PSNR MEDIO POR CONFIGURACIÓN
+# ---------------------------------------------------------------
+def read_psnr_summary(path):
+    """
+    PSNR medio de un archivo generado por psnr_video.sh
+
+    La primera línea es el resumen de la herramienta psnr de EvalVid:
+    psnr: 300 frames (CPU: 0 s) mean: 15.37 stdv: 4.33
+
+    Returns:
+        float: PSNR medio (dB), o None si el archivo no tiene ese formato
+    """
+    try:
+        with open(path) as f:
+            header = f.readline().strip()
+        if not header:
+            print(f"  [-] Archivo vacío: {path}")
+            return None
+        if "mean:" not in header:
+            print(f"  [-] Formato inválido en: {path}")
+            return None
+        return float(header.split("mean:")[1].split()[0])
+    except (OSError, ValueError, IndexError) as e:
+        print(f"  [-] Error al procesar {path}: {e}")
+        return None
+
+
+@profiled("collect_psnr", items=lambda res, *a, **k: len(res or {}))
+def collect_psnr(videos_dir):
+    """
+    PSNR medio de cada configuración: una subcarpeta de videos_dir por
+    configuración con su archivo psnr_*.txt
+
+    Returns:
+        dict: {configuración: PSNR medio (dB)}, o None si no hay ninguno
+    """
+    configs = {}
+    config_dirs = sorted(d for d in Path(videos_dir).iterdir() if d.is_dir())
+    if not config_dirs:
+        print(f"[-] No se encontraron directorios en {videos_dir}")
+        return None
+
+    print(f"[+] Analizando {len(config_dirs)} configuración(es)...\n")
+    for config_dir in config_dirs:
+        print(f"[*] Procesando: {config_dir.name}")
+        psnr_files = sorted(config_dir.glob("psnr_*.txt"))
+        if not psnr_files:
+            print(f"  [-] No se encontró archivo PSNR en {config_dir.name}")
+            continue
+
+        print(f"  [*] Archivo: {psnr_files[0].name}")
+        mean_psnr = read_psnr_summary(psnr_files[0])
+        if mean_psnr is not None:
+            configs[config_dir.name] = mean_psnr
+            print(f"  [+] PSNR Mean: {mean_psnr:.2f} dB")
+        print()
+
+    if not configs:
+        print("[-] No se recopilaron datos PSNR")
+        return None
+    return configs
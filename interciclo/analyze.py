@@ -1,81 +1,67 @@
 #!/usr/bin/env python3
 import sys
-from scapy.all import rdpcap, UDP
-import matplotlib.pyplot as plt
-from collections import defaultdict
 import numpy as np
 
+from analysis.pcap_reader import read_udp_packets
+from analysis.metrics import compute_throughput
+from analysis.matching import match_nearest, match_fingerprints
+from analysis import profiling
+
 # -------------------------------------------------
 #  Helper: Extract timestamps and sizes from PCAP
 # -------------------------------------------------
 def extract_flows(pcap_file, port):
-    pkts = rdpcap(pcap_file)
-    flows = []
-    for p in pkts:
-        if UDP in p and p[UDP].dport == port or p[UDP].sport == port:
-            ts = float(p.time)
-            size = len(p)
-            flows.append((ts, size))
-    return sorted(flows, key=lambda x: x[0])
-
-# -------------------------------------------------
-#  Throughput: bits/s por ventanas de 1 segundo
-# -------------------------------------------------
-def compute_throughput(flow):
-    # Agrupar por segundo
-    throughput = defaultdict(int)
-    for ts, size in flow:
-        sec = int(ts)
-        throughput[sec] += size * 8  # bits
-    # Ordenar salida
-    times = sorted(throughput.keys())
-    values = [throughput[t] for t in times]
-    return times, values
+    pkts = read_udp_packets(pcap_file, port)
+    order = np.argsort(pkts["ts"], kind="stable")
+    return pkts["ts"][order], pkts["size"][order], pkts["fp"][order]
 
 # -------------------------------------------------
 #  Delay relativo: Matching por timestamps cercanos
 # -------------------------------------------------
-def compute_delay(flowA, flowB, max_gap=0.050):
+def compute_delay(flowA, flowB, max_gap=0.050, match="nearest"):
     """
     Para cada paquete enviado por A, busca el paquete más cercano en B.
     max_gap = 50 ms tolerancia
-    """
-    delays = []
-    idxB = 0
-    for tsA, sizeA in flowA:
-        # avanzar B
-        while idxB + 1 < len(flowB) and abs(flowB[idxB + 1][0] - tsA) < abs(flowB[idxB][0] - tsA):
-            idxB += 1
-        
-        tsB, sizeB = flowB[idxB]
-        diff = tsB - tsA
 
-        if abs(diff) <= max_gap:  # solo aceptamos si es plausible delay
-            delays.append(diff)
+    Con match="payload" se empareja el mismo datagrama en ambas capturas
+    por la huella del payload (delay exacto, sin tolerancia).
+    """
+    if match == "payload":
+        return match_fingerprints(flowA[2], flowA[0], flowB[2], flowB[0])["delay"]
 
+    # solo aceptamos si es plausible delay
+    _, _, delays = match_nearest(flowA[0], flowB[0], max_gap=max_gap)
     return delays
 
 # -------------------------------------------------
 #  Main
 # -------------------------------------------------
 if __name__ == "__main__":
+    if "--profile" in sys.argv:
+        sys.argv.remove("--profile")
+        profiling.enable()
+
     if len(sys.argv) < 4:
-        print("Uso: python analyze_vc.py captura_A.pcap captura_B.pcap PUERTO")
+        print("Uso: python analyze_vc.py captura_A.pcap captura_B.pcap PUERTO [nearest|payload] [--profile]")
         sys.exit(1)
 
+    with profiling.stage("import_matplotlib"):
+        import matplotlib.pyplot as plt
+
     pcapA = sys.argv[1]
     pcapB = sys.argv[2]
     port = int(sys.argv[3])
+    match = sys.argv[4] if len(sys.argv) > 4 else "nearest"
 
     print(f"[i] Cargando PCAPs…")
     flowA = extract_flows(pcapA, port)
     flowB = extract_flows(pcapB, port)
 
     print(f"[i] Calculando throughput…")
-    tA, thrA = compute_throughput(flowA)
+    tA, thrA = compute_throughput(flowA[0], flowA[1])
 
     print(f"[i] Calculando delay relativo…")
-    delays = compute_delay(flowA, flowB)
+    delays = compute_delay(flowA, flowB, match=match)
 
     # -------------------------------
     #   Graficar resultados
@@ -99,6 +85,7 @@ if __name__ == "__main__":
     plt.show()
 
     print(f"[OK] Análisis completado.")
-    print(f"   → Paquetes analizados A: {len(flowA)}")
-    print(f"   → Paquetes analizados B: {len(flowB)}")
+    print(f"   → Paquetes analizados A: {len(flowA[0])}")
+    print(f"   → Paquetes analizados B: {len(flowB[0])}")
     print(f"   → Muestras de delay: {len(delays)}")
+    profiling.report()
@@ -1,82 +1,175 @@
 #!/usr/bin/env python3
-import sys
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from scapy.all import rdpcap, UDP
+
+from analysis.pcap_reader import read_udp_packets, iter_udp_packets, has_payload_offsets
+from analysis.metrics import flow_metrics
+from analysis.flows import (flow_table, select_flows, flow_packets, stream_ports,
+                            format_flow_table)
+from analysis.mpegts import analyze_ts, format_ts_table
+from analysis.matching import choose_match
+from analysis.frames import sender_order
+from analysis.report import figure_task, output_figures, FORMATS
+from analysis.decimate import decimate, DEFAULT_POINTS, METHODS
+from analysis import profiling
 
 # ---------------------------------------------------------------
 # CARGA PCAP Y FILTRA POR PUERTO (solo paquetes UDP)
 # ---------------------------------------------------------------
 def load_pcap(filename, port):
-    packets = rdpcap(filename)
-    timestamps = []
-    sizes = []
-
-    for p in packets:
-        if UDP in p:
-            if p[UDP].sport == port or p[UDP].dport == port:
-                timestamps.append(float(p.time))
-                sizes.append(len(p))
-
-    return np.array(timestamps), np.array(sizes)
+    return read_udp_packets(filename, port)
 
 
 # ---------------------------------------------------------------
-# CALCULAR IAT = Inter-arrival time (delay a nivel captura)
+# MÉTRICAS POR BLOQUES (capturas más grandes que la memoria)
 # ---------------------------------------------------------------
-def compute_iat(ts, discard_seconds=1.0):
+def stream_metrics(filename, ports, max_memory, max_points=DEFAULT_POINTS):
     """
-    Calcula IAT eliminando el tramo inicial para evitar picos
-    por diferencias entre inicios de captura.
+    Una sola lectura por bloques: métricas de cada puerto y tabla de flujos
+
+    Returns:
+        tuple: ({puerto: métricas de StreamingFlow}, tabla de flujos)
     """
-    if len(ts) < 2:
-        return np.array([])
+    return stream_ports(iter_udp_packets(filename, max_memory=max_memory), ports,
+                        max_points=max_points)
 
-    # descartar tramo inicial
-    t0 = ts[0] + discard_seconds
-    ts = ts[ts >= t0]
 
-    if len(ts) < 2:
-        return np.array([])
+def burst_summary(bursts):
+    """(ráfagas, paquetes de media, máximo, silencio mediano, silencio máximo)"""
+    if "count" in bursts:
+        gaps = bursts["gaps"]
+        return (bursts["count"], bursts["mean_packets"], bursts["max_packets"],
+                gaps.quantile(0.5) if gaps.n else None, gaps.stats.max if gaps.n else None)
+    n = len(bursts["packets"])
+    gaps = bursts["gaps"]
+    return (n, np.mean(bursts["packets"]) if n else 0.0, bursts["packets"].max() if n else 0,
+            np.median(gaps) if len(gaps) else None, gaps.max() if len(gaps) else None)
 
-    return np.diff(ts)
+
+# ---------------------------------------------------------------
+# RESUMEN DE MÉTRICAS DE UN FLUJO
+# ---------------------------------------------------------------
+def print_summary(name, metrics):
+    n_bursts, mean_pkts, max_pkts, gap_med, gap_max = burst_summary(metrics["bursts"])
+    n_iat = metrics["iat_hist"].n if "iat_hist" in metrics else len(metrics["iat"])
+    rate = metrics["pkt_rate"][1]
+    print(f"{name}: {metrics['packets']} paquetes, IAT {n_iat} muestras")
+    print(f"  Jitter RFC 3550: {metrics['jitter_last'] * 1000:.3f} ms")
+    if len(rate):
+        print(f"  Paquetes/s: media {rate.mean():.1f}, máx {rate.max():.0f}")
+    if n_bursts:
+        print(f"  Ráfagas: {n_bursts}, {mean_pkts:.1f} paquetes de media (máx {max_pkts})")
+    if gap_med is not None:
+        print(f"  Silencios: mediana {gap_med * 1000:.2f} ms, máx {gap_max * 1000:.2f} ms")
 
 
 # ---------------------------------------------------------------
-# THROUGHPUT EN VENTANAS DE 1s
+# FIGURAS
 # ---------------------------------------------------------------
-def compute_throughput(ts, sizes, window=1.0):
-    if len(ts) == 0:
-        return np.array([]), np.array([])
+def draw_iat(fig, ax, iatA, iatB, method="minmax", max_points=DEFAULT_POINTS):
+    """iatA, iatB: (n° de paquete, IAT en s)"""
+    xA, yA = iatA
+    xB, yB = iatB
+    ax.plot(*decimate(xA, yA * 1000, max_points, method), label="IAT A (ms)", alpha=0.7)
+    ax.plot(*decimate(xB, yB * 1000, max_points, method), label="IAT B (ms)", alpha=0.7)
+    ax.set_title("Delay a nivel de captura (IAT)")
+    ax.set_xlabel("N° de paquete")
+    ax.set_ylabel("IAT (ms)")
+    ax.grid()
+    ax.legend()
 
-    start = ts[0]
-    end = ts[-1]
-    bins = np.arange(start, end, window)
-    throughput = []
 
-    for i in range(len(bins)-1):
-        t0 = bins[i]
-        t1 = bins[i+1]
-        mask = (ts >= t0) & (ts < t1)
-        total_bytes = sizes[mask].sum()
-        throughput.append(total_bytes * 8 / window)
+def draw_ts_bitrate(fig, ax, tsA, tsB):
+    """Bitrate por PID (video/audio/PSI) de cada captura"""
+    fig.suptitle("Bitrate por PID MPEG-TS")
+    for axis, res, title in ((ax[0], tsA, "A"), (ax[1], tsB, "B")):
+        t, series = res["series"]
+        for pid, bps in sorted(series.items()):
+            axis.plot(t, bps / 1e6, label=f"{pid:#x} {res['pids'][pid]['kind']}")
+        axis.set_title(title)
+        axis.set_xlabel("Tiempo (s)")
+        axis.set_ylabel("Mbps")
+        axis.grid()
+        axis.legend()
+    fig.tight_layout()
 
-    return bins[:-1], np.array(throughput)
+
+def draw_throughput(fig, ax, tA, thrA, tB, thrB):
+    ax.plot(tA, thrA/1e6, label="Throughput A (Mbps)")
+    ax.plot(tB, thrB/1e6, label="Throughput B (Mbps)")
+    ax.set_title("Throughput")
+    ax.set_xlabel("Tiempo (s)")
+    ax.set_ylabel("Mbps")
+    ax.grid()
+    ax.legend()
 
 
 # ---------------------------------------------------------------
 # ANÁLISIS GENERAL
 # ---------------------------------------------------------------
-def analyze(pcapA, pcapB, port):
+def analyze(pcapA, pcapB, ports, report_dir=None, formats=("png",), jobs=1,
+            decimation="minmax", max_points=DEFAULT_POINTS, ts_stats=False, max_memory=None,
+            show_flows=False):
+    """
+    ports: puerto o lista de puertos; cada captura se lee una sola vez y
+           la tabla de flujos reparte sus paquetes entre los puertos
+    show_flows: imprimir la tabla de flujos UDP de cada captura
+    """
+    ports = [ports] if np.isscalar(ports) else list(ports)
+    if max_memory is not None:
+        analyze_chunked(pcapA, pcapB, ports, report_dir, formats, jobs,
+                        decimation, max_points, max_memory, show_flows)
+        return
+
+    # ----------------------------
+    # UNA LECTURA POR CAPTURA Y TABLA DE FLUJOS (5-tupla)
+    # ----------------------------
     print("Cargando PCAP A...")
-    tsA, sizeA = load_pcap(pcapA, port)
+    allA = load_pcap(pcapA, None)
+    tableA = flow_table(allA)
 
     print("Cargando PCAP B...")
-    tsB, sizeB = load_pcap(pcapB, port)
+    allB = load_pcap(pcapB, None)
+    tableB = flow_table(allB)
+
+    if show_flows:
+        print_flows(tableA, tableB)
+    if ts_stats and not (has_payload_offsets(allA) and has_payload_offsets(allB)):
+        print("MPEG-TS: se necesita el lector nativo pcap/pcapng (captura leída con scapy, "
+              "se omite)")
+        ts_stats = False
+
+    figures = []
+    for port in ports:
+        packetsA = flow_packets(allA, tableA, select_flows(tableA, port=port))
+        packetsB = flow_packets(allB, tableB, select_flows(tableB, port=port))
+        figures += analyze_port(pcapA, pcapB, port, packetsA, packetsB, decimation,
+                                max_points, ts_stats, suffix=_suffix(port, ports))
+    output_figures(figures, report_dir, formats=formats, jobs=jobs)
+
+
+def _suffix(port, ports):
+    """Sufijo de los nombres de figura cuando se analizan varios puertos"""
+    return f"_{port}" if len(ports) > 1 else ""
+
+
+def print_flows(tableA, tableB):
+    print("\nFlujos UDP A:")
+    print(format_flow_table(tableA))
+    print("\nFlujos UDP B:")
+    print(format_flow_table(tableB))
+    print()
+
+
+def analyze_port(pcapA, pcapB, port, packetsA, packetsB, decimation="minmax",
+                 max_points=DEFAULT_POINTS, ts_stats=False, suffix=""):
+    """Métricas y figuras de los paquetes de un puerto en ambas capturas"""
+    tsA, sizeA = packetsA["ts"], packetsA["size"]
+    tsB, sizeB = packetsB["ts"], packetsB["size"]
 
     if len(tsA) == 0 or len(tsB) == 0:
-        print("ERROR: Uno de los PCAP no tiene paquetes UDP en ese puerto.")
-        return
+        print(f"ERROR: Uno de los PCAP no tiene paquetes UDP en el puerto {port}.")
+        return []
 
     # Normalizar tiempos para gráfica
     t0 = min(tsA[0], tsB[0])
@@ -84,53 +177,121 @@ def analyze(pcapA, pcapB, port):
     tsB_norm = tsB - t0
 
     # ----------------------------
-    # IAT
+    # IAT, THROUGHPUT, JITTER Y RÁFAGAS (una pasada por flujo)
     # ----------------------------
-    iatA = compute_iat(tsA_norm)
-    iatB = compute_iat(tsB_norm)
+    metricsA = flow_metrics(tsA_norm, sizeA)
+    metricsB = flow_metrics(tsB_norm, sizeB)
+    print_summary(f"A:{port}", metricsA)
+    print_summary(f"B:{port}", metricsB)
 
-    print(f"IAT A: {len(iatA)} muestras")
-    print(f"IAT B: {len(iatB)} muestras")
+    iatA = (np.arange(len(metricsA["iat"])), metricsA["iat"])
+    iatB = (np.arange(len(metricsB["iat"])), metricsB["iat"])
+    tA, thrA = metricsA["throughput"][1.0]
+    tB, thrB = metricsB["throughput"][1.0]
+
+    # ---------------------------------------------------
+    # GRÁFICAS (IAT y throughput)
+    # ---------------------------------------------------
+    figures = [
+        figure_task(f"iat{suffix}", draw_iat, iatA, iatB, decimation, max_points),
+        figure_task(f"throughput{suffix}", draw_throughput, tA, thrA, tB, thrB),
+    ]
 
     # ----------------------------
-    # THROUGHPUT
+    # MPEG-TS: bitrate por PID y continuidad (mismas columnas, sin releer)
     # ----------------------------
-    tA, thrA = compute_throughput(tsA_norm, sizeA)
-    tB, thrB = compute_throughput(tsB_norm, sizeB)
+    if ts_stats:
+        # Continuidad de B en el orden de envío: el reordenamiento no es pérdida
+        order = sender_order(packetsA, packetsB) \
+            if choose_match(packetsA, packetsB) == "payload" else None
+        tsA_res = analyze_ts(pcapA, packetsA)
+        tsB_res = analyze_ts(pcapB, packetsB, order=order)
+        print(f"\nMPEG-TS A:{port}")
+        print(format_ts_table(tsA_res))
+        print(f"\nMPEG-TS B:{port}")
+        print(format_ts_table(tsB_res))
+        figures.append(figure_task(f"ts_bitrate{suffix}", draw_ts_bitrate, tsA_res, tsB_res,
+                                   ncols=2, figsize=(14, 6)))
+    return figures
 
-    # ---------------------------------------------------
-    # GRÁFICAS
-    # ---------------------------------------------------
 
-    # ----------- IAT (delay capturado) ----------------
-    plt.figure(figsize=(12, 6))
-    plt.plot(iatA * 1000, label="IAT A (ms)", alpha=0.7)
-    plt.plot(iatB * 1000, label="IAT B (ms)", alpha=0.7)
-    plt.title("Delay a nivel de captura (IAT)")
-    plt.xlabel("N° de paquete")
-    plt.ylabel("IAT (ms)")
-    plt.grid()
-    plt.legend()
-
-    # ----------- THROUGHPUT ---------------------------
-    plt.figure(figsize=(12, 6))
-    plt.plot(tA, thrA/1e6, label="Throughput A (Mbps)")
-    plt.plot(tB, thrB/1e6, label="Throughput B (Mbps)")
-    plt.title("Throughput")
-    plt.xlabel("Tiempo (s)")
-    plt.ylabel("Mbps")
-    plt.grid()
-    plt.legend()
-
-    plt.show()
+def analyze_chunked(pcapA, pcapB, ports, report_dir=None, formats=("png",), jobs=1,
+                    decimation="minmax", max_points=DEFAULT_POINTS, max_memory=256 << 20,
+                    show_flows=False):
+    """
+    Mismo análisis leyendo cada captura por bloques: la memoria de trabajo
+    no depende del tamaño del pcap. La serie del IAT se decima al vuelo
+    (min-max) y el jitter y las ráfagas se acumulan entre bloques.
+    """
+    print(f"Procesando PCAP A por bloques ({max_memory >> 20} MB)...")
+    allA, tableA = stream_metrics(pcapA, ports, max_memory, max_points)
+    print(f"Procesando PCAP B por bloques ({max_memory >> 20} MB)...")
+    allB, tableB = stream_metrics(pcapB, ports, max_memory, max_points)
+
+    if show_flows:
+        print_flows(tableA, tableB)
+
+    figures = []
+    for port in ports:
+        metricsA, metricsB = allA[port], allB[port]
+        if metricsA["packets"] == 0 or metricsB["packets"] == 0:
+            print(f"ERROR: Uno de los PCAP no tiene paquetes UDP en el puerto {port}.")
+            continue
+
+        print_summary(f"A:{port}", metricsA)
+        print_summary(f"B:{port}", metricsB)
+
+        tA, thrA = metricsA["throughput"][1.0]
+        tB, thrB = metricsB["throughput"][1.0]
+        t0 = min(tA[0] if len(tA) else np.inf, tB[0] if len(tB) else np.inf)
+        if np.isfinite(t0):
+            tA, tB = tA - t0, tB - t0
+
+        suffix = _suffix(port, ports)
+        figures += [
+            figure_task(f"iat{suffix}", draw_iat, metricsA["iat_series"],
+                        metricsB["iat_series"], decimation, max_points),
+            figure_task(f"throughput{suffix}", draw_throughput, tA, thrA, tB, thrB),
+        ]
+    output_figures(figures, report_dir, formats=formats, jobs=jobs)
 
 
 # ---------------------------------------------------------------
 # MAIN
 # ---------------------------------------------------------------
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Uso: python3 analyze_iat.py <pcap_A> <pcap_B> <puerto>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="IAT y throughput de dos capturas")
+    parser.add_argument("pcap_A")
+    parser.add_argument("pcap_B")
+    parser.add_argument("puerto", type=int, nargs="+",
+                        help="Puerto(s) UDP; todos salen de una sola lectura de cada captura")
+    parser.add_argument("--flows", action="store_true",
+                        help="Mostrar la tabla de flujos UDP (5-tupla) de cada captura")
+    parser.add_argument("--ts", action="store_true",
+                        help="Bitrate por PID y errores de continuidad MPEG-TS")
+    parser.add_argument("--report", metavar="DIR",
+                        help="Guardar las figuras en DIR sin abrir ventanas (backend Agg)")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["png"],
+                        dest="formats", help="Formatos de las figuras en modo reporte")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Procesos de dibujo en modo reporte")
+    parser.add_argument("--decimate", choices=METHODS, default="minmax",
+                        help="Decimación de las series por paquete (none = todas las muestras)")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS,
+                        help="Puntos por serie tras la decimación")
+    parser.add_argument("--max-memory", type=int, metavar="MB",
+                        help="Procesar las capturas por bloques sin superar MB de memoria "
+                             "de trabajo (para pcap más grandes que la RAM)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    if args.max_memory is not None and args.ts:
+        parser.error("--ts necesita la captura completa en memoria; no se combina con --max-memory")
+    profiling.setup(args)
 
-    analyze(sys.argv[1], sys.argv[2], int(sys.argv[3]))
+    with profiling.stage("analyze2"):
+        analyze(args.pcap_A, args.pcap_B, args.puerto,
+                report_dir=args.report, formats=tuple(args.formats), jobs=max(1, args.jobs),
+                decimation=args.decimate, max_points=args.points, ts_stats=args.ts,
+                max_memory=args.max_memory << 20 if args.max_memory is not None else None,
+                show_flows=args.flows)
+    profiling.report()
@@ -1,96 +1,74 @@
 #!/usr/bin/env python3
 import os
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from scapy.all import rdpcap, UDP
-from scipy.stats import t
+
+from analysis.catalog import (summarize_profiles, layout, open_catalog, default_path, ingest,
+                              query, aggregate, format_groups, order_profiles, month_range,
+                              parse_date, CAPTURE_PATTERN)
+from analysis.ci import batch_ci, error_bars, CI_METHODS
+from analysis.flows import format_flow_table
+from analysis.report import figure_task, output_figures, FORMATS
+from analysis.decimate import decimate, DEFAULT_POINTS, METHODS
+from analysis import profiling
 
 # ---------------------------------------------------------------
 # CONFIG
 # ---------------------------------------------------------------
 BASE_DIR = "mediciones"
-PROFILES = ["cercano", "medio", "lejano"]
+PROFILES = None            # None = los directorios <usuario>/<perfil>/ de BASE_DIR
+USERS = None
 PORT = 39400
+CAPTURE = CAPTURE_PATTERN  # archivo, directorio o glob dentro de <usuario>/<perfil>/
+USE_CACHE = True
+JOBS = 1
+REPORT_DIR = None          # None = ventanas interactivas
+REPORT_FORMATS = ("png",)
+DECIMATE = "minmax"        # "minmax", "lttb" o "none"
+PLOT_POINTS = DEFAULT_POINTS
+MAX_MEMORY = None          # bytes; None = cargar cada captura completa
+SHOW_FLOWS = False         # imprimir la tabla de flujos UDP de cada captura
+CI_METHOD = "block"        # "t", "normal", "bootstrap" o "block" (analysis.ci.batch_ci)
+CONFIDENCE = 0.90
+CI_LABELS = {"t": "t", "normal": "normal", "bootstrap": "bootstrap",
+             "block": "bootstrap por bloques"}
 
 
 # ---------------------------------------------------------------
-# CARGA PCAP Y FILTRA POR UDP
+# INTERVALOS DE CONFIANZA DEL THROUGHPUT
 # ---------------------------------------------------------------
-def load_pcap(filename, port):
-    packets = rdpcap(filename)
-    timestamps = []
-    sizes = []
-
-    for p in packets:
-        if UDP in p:
-            if p[UDP].sport == port or p[UDP].dport == port:
-                timestamps.append(float(p.time))
-                sizes.append(len(p))
-
-    return np.array(timestamps), np.array(sizes)
-
-
-# ---------------------------------------------------------------
-# COMPUTE IAT (delay)
-# ---------------------------------------------------------------
-def compute_iat(ts, discard_seconds=1.0):
-    if len(ts) < 2:
-        return np.array([])
-
-    t0 = ts[0] + discard_seconds
-    ts = ts[ts >= t0]
-    if len(ts) < 2:
-        return np.array([])
-
-    return np.diff(ts)
-
-
-# ---------------------------------------------------------------
-# THROUGHPUT EN VENTANAS DE 1s
-# ---------------------------------------------------------------
-def compute_throughput(ts, sizes, window=1.0):
-    if len(ts) == 0:
-        return np.array([]), np.array([])
-
-    start = ts[0]
-    end = ts[-1]
-    bins = np.arange(start, end, window)
-    throughput = []
-
-    for i in range(len(bins)-1):
-        t0, t1 = bins[i], bins[i+1]
-        mask = (ts >= t0) & (ts < t1)
-        total_bytes = sizes[mask].sum()
-        throughput.append(total_bytes * 8 / window)
-
-    return bins[:-1], np.array(throughput)
+def throughput_ci(series, method=None, confidence=None):
+    """
+    Intervalos de la media del throughput de todas las celdas en una llamada
 
+    El throughput por segundo está fuertemente autocorrelacionado, así que
+    por defecto se usa el bootstrap por bloques móviles (CI_METHOD): el
+    intervalo t supone muestras independientes y sale demasiado estrecho.
 
-# ---------------------------------------------------------------
-# INTERVALO DE CONFIANZA 90%
-# ---------------------------------------------------------------
-def confidence_interval(data, confidence=0.90):
-    if len(data) < 2:
-        return 0, 0
+    Args:
+        series: Lista de series de throughput (Mbps por segundo)
 
-    mean = np.mean(data)
-    sem = np.std(data, ddof=1) / np.sqrt(len(data))
-    t_val = t.ppf((1 + confidence) / 2, df=len(data)-1)
-    return mean, t_val * sem
+    Returns:
+        dict: El de analysis.ci.batch_ci (mean, lo, hi, half por serie)
+    """
+    return batch_ci(series, method=method or CI_METHOD, confidence=confidence or CONFIDENCE)
 
 
 # ---------------------------------------------------------------
 # GRAFICAR PROMEDIOS CON LÍNEA Y TEXTO
 # ---------------------------------------------------------------
-def plot_with_mean(ax, x, y, title, ylabel, xlabel):
-    ax.plot(x, y, alpha=0.7)
+def plot_with_mean(ax, x, y, title, ylabel, xlabel,
+                   method="minmax", max_points=DEFAULT_POINTS, mean=None):
+    # El promedio se calcula con todas las muestras; solo se decima el trazo
+    # (mean: promedio ya calculado si `y` es una serie decimada)
+    ax.plot(*decimate(x, y, max_points, method), alpha=0.7)
     ax.set_title(title)
     ax.set_ylabel(ylabel)
     ax.set_xlabel(xlabel)
     ax.grid()
 
     if len(y) > 0:
-        m = np.mean(y)
+        m = np.mean(y) if mean is None else mean
         ax.axhline(m, color='r', linestyle='--', linewidth=1.3)
         ax.text(x[len(x)//2], m, f"{m:.3f}", color='r')
 
@@ -136,138 +114,260 @@ def annotate_boxplot(ax, bp):
 
 
 # ---------------------------------------------------------------
-# PROCESAR PERFIL
+# FIGURAS (funciones de dibujo para analysis.report)
 # ---------------------------------------------------------------
-def process_profile(profile):
-    results = {}
-    for user in ["userA", "userB"]:
-        pcap_path = os.path.join(BASE_DIR, user, profile, f"{profile}.pcap")
-        ts, size = load_pcap(pcap_path, PORT)
+def draw_users(fig, ax, title, series, ylabel, xlabel,
+               method="minmax", max_points=DEFAULT_POINTS):
+    """
+    Serie de cada usuario lado a lado, con su promedio
+    series: lista de (usuario, x, y, promedio de todas las muestras)
+    """
+    fig.suptitle(title)
+    for axis, (user, x, y, mean) in zip(np.atleast_1d(ax), series):
+        plot_with_mean(axis, x, y, user, ylabel, xlabel, method, max_points, mean=mean)
+    fig.tight_layout()
+
+
+def draw_ci_bars(fig, ax, labels, users, means, errors, ci_label="90%"):
+    """
+    Barras de throughput promedio + intervalo de confianza
+    means: {usuario: valor por perfil de `labels`}
+    errors: {usuario: yerr 2 × perfiles (hacia abajo, hacia arriba)}
+    """
+    x = np.arange(len(labels))
+    width = 0.7 / max(1, len(users))
+
+    for k, user in enumerate(users):
+        offset = (k - (len(users) - 1) / 2) * width
+        ax.bar(x + offset, means[user], width, yerr=errors[user], label=user, capsize=6)
+
+    ax.set_ylabel("Throughput (Mbps)")
+    ax.set_title(f"Promedio + Intervalo de Confianza ({ci_label}) – Throughput")
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels)
+    ax.grid(axis='y')
+    ax.legend()
 
-        ts_norm = ts - ts[0]
 
-        iat = compute_iat(ts_norm)
-        iat_ms = iat * 1000
+def draw_boxplots(fig, ax, users, box_stats):
+    """
+    Boxplots del delay + anotaciones
+    (a partir de los histogramas: error relativo <= 0.1 %)
+    box_stats: {usuario: estadísticas de bxp por perfil}
+    """
+    fig.suptitle("Distribución del Delay (IAT) – Boxplots por Perfil")
 
-        t_thr, thr = compute_throughput(ts_norm, size)
+    for axis, user in zip(np.atleast_1d(ax), users):
+        bp = axis.bxp(box_stats[user], showfliers=True)
+        axis.set_title(user)
+        axis.set_ylabel("Delay (ms)")
+        axis.set_yscale('log')
+        axis.grid(axis='y')
+        annotate_boxplot(axis, bp)
 
-        results[user] = {
-            "iat": iat_ms,
-            "thr": thr / 1e6,
-        }
+    fig.tight_layout()
 
-    return results
+
+def summary_figures(profiles, users, cells, ci_method=CI_METHOD):
+    """
+    Barras de throughput + CI y boxplots del IAT por perfil y usuario
+    cells: {(perfil, usuario): (throughput por segundo en Mbps, LogHistogram del IAT)}
+    """
+    keys = [(profile, user) for profile in profiles for user in users if (profile, user) in cells]
+    ci = throughput_ci([cells[key][0] for key in keys], ci_method)
+    bars = dict(zip(keys, zip(ci["mean"], error_bars(ci).T)))
+
+    thr_means = {user: [] for user in users}
+    thr_cis = {user: [] for user in users}
+    box_stats = {user: [] for user in users}
+    for profile in profiles:
+        for user in users:
+            if (profile, user) not in cells:
+                thr_means[user].append(0)
+                thr_cis[user].append((0, 0))
+                continue
+            m, err = bars[profile, user]
+            thr_means[user].append(m)
+            thr_cis[user].append(err)
+            # Solo se conserva el histograma del IAT (memoria constante)
+            box_stats[user].append(cells[profile, user][1].boxplot_stats(profile))
+    thr_cis = {user: np.transpose(err) for user, err in thr_cis.items()}
+    ci_label = f"{CONFIDENCE:.0%}, {CI_LABELS[ci_method]}"
+
+    return [
+        # ===========================================================
+        # GRÁFICAS DE BARRAS + CI (THROUGHPUT)
+        # ===========================================================
+        figure_task("throughput_ci", draw_ci_bars, profiles, users, thr_means, thr_cis,
+                    ci_label, figsize=(10, 6)),
+        # ===========================================================
+        # BOXPLOTS DEL DELAY + ANOTACIONES
+        # ===========================================================
+        figure_task("iat_boxplots", draw_boxplots, users, box_stats,
+                    ncols=len(users), figsize=(7 * len(users), 7)),
+    ]
 
 
 # ---------------------------------------------------------------
 # MAIN
 # ---------------------------------------------------------------
-def main():
-    profile_stats_thr = {}
-    all_iat_A = []
-    all_iat_B = []
-
-    for profile in PROFILES:
+def main(profiles, users, base_dir=BASE_DIR, port=PORT, capture=CAPTURE, use_cache=USE_CACHE,
+         jobs=JOBS, report_dir=REPORT_DIR, formats=REPORT_FORMATS, decimation=DECIMATE,
+         max_points=PLOT_POINTS, max_memory=MAX_MEMORY, show_flows=SHOW_FLOWS,
+         ci_method=CI_METHOD):
+    figures = []
+    cells = {}
+
+    print(f"Procesando {len(profiles) * len(users)} capturas ({jobs} proceso(s))...")
+    with profiling.stage("process_all", items=len(profiles) * len(users)):
+        all_results = summarize_profiles(profiles, users, base_dir, port, jobs=jobs,
+                                         use_cache=use_cache, max_memory=max_memory,
+                                         max_points=max_points, capture=capture)
+
+    for profile in profiles:
         print(f"\nProcesando perfil: {profile}")
-        results = process_profile(profile)
+        results = all_results[profile]
+        present = [user for user in users if user in results]
+        for user in present:
+            print(f"  {user}: jitter RFC 3550 {results[user]['jitter_ms']:.3f} ms, "
+                  f"{results[user]['bursts']} ráfagas")
+            if show_flows:
+                print(format_flow_table(results[user]["flows"]))
+            cells[profile, user] = (results[user]["thr"][1], results[user]["iat_hist"])
+        if not present:
+            continue
 
         # -------------------------
         # THROUGHPUT
         # -------------------------
-        fig, ax = plt.subplots(1, 2, figsize=(14, 6))
-        fig.suptitle(f"Throughput – Perfil: {profile}")
-
-        plot_with_mean(ax[0], np.arange(len(results["userA"]["thr"])),
-                       results["userA"]["thr"],
-                       "User A", "Mbps", "Tiempo")
-
-        plot_with_mean(ax[1], np.arange(len(results["userB"]["thr"])),
-                       results["userB"]["thr"],
-                       "User B", "Mbps", "Tiempo")
-
-        plt.tight_layout()
-        plt.show()
+        figures.append(figure_task(
+            f"{profile}_throughput", draw_users,
+            f"Throughput – Perfil: {profile}",
+            [(user, *results[user]["thr"], results[user]["thr_stats"].mean) for user in present],
+            "Mbps", "Tiempo",
+            decimation, max_points,
+            ncols=len(present), figsize=(7 * len(present), 6)))
 
         # -------------------------
         # DELAY (IAT)
         # -------------------------
-        fig, ax = plt.subplots(1, 2, figsize=(14, 6))
-        fig.suptitle(f"Delay (IAT) – Perfil: {profile}")
-
-        plot_with_mean(ax[0], np.arange(len(results["userA"]["iat"])),
-                       results["userA"]["iat"],
-                       "User A", "ms", "No. Paquetes")
-
-        plot_with_mean(ax[1], np.arange(len(results["userB"]["iat"])),
-                       results["userB"]["iat"],
-                       "User B", "ms", "No. Paquetes")
-
-        plt.tight_layout()
-        plt.show()
-
-        all_iat_A.append(results["userA"]["iat"])
-        all_iat_B.append(results["userB"]["iat"])
-
-        # Estadísticas throughput
-        thr_means, thr_cis = [], []
-        for user in ["userA", "userB"]:
-            m, ci = confidence_interval(results[user]["thr"])
-            thr_means.append(m)
-            thr_cis.append(ci)
-
-        profile_stats_thr[profile] = (thr_means, thr_cis)
-
-    # ===========================================================
-    # GRÁFICAS DE BARRAS + CI (THROUGHPUT)
-    # ===========================================================
-    labels = PROFILES
-    x = np.arange(len(labels))
-
-    userA_means = [profile_stats_thr[p][0][0] for p in PROFILES]
-    userA_err = [profile_stats_thr[p][1][0] for p in PROFILES]
-
-    userB_means = [profile_stats_thr[p][0][1] for p in PROFILES]
-    userB_err = [profile_stats_thr[p][1][1] for p in PROFILES]
+        figures.append(figure_task(
+            f"{profile}_iat", draw_users,
+            f"Delay (IAT) – Perfil: {profile}",
+            [(user, *results[user]["iat"], results[user]["iat_hist"].stats.mean)
+             for user in present],
+            "ms", "No. Paquetes",
+            decimation, max_points,
+            ncols=len(present), figsize=(7 * len(present), 6)))
 
-    width = 0.35
+    figures += summary_figures(profiles, users, cells, ci_method)
+    output_figures(figures, report_dir, formats=formats, jobs=jobs)
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.bar(x - width/2, userA_means, width, yerr=userA_err, label="User A", capsize=6)
-    ax.bar(x + width/2, userB_means, width, yerr=userB_err, label="User B", capsize=6)
-
-    ax.set_ylabel("Throughput (Mbps)")
-    ax.set_title("Promedio + Intervalo de Confianza (90%) – Throughput")
-    ax.set_xticks(x)
-    ax.set_xticklabels(labels)
-    ax.grid(axis='y')
-    ax.legend()
-    plt.show()
 
-    # ===========================================================
-    # BOXPLOTS DEL DELAY + ANOTACIONES
-    # ===========================================================
-    fig, ax = plt.subplots(1, 2, figsize=(14, 7))
-    fig.suptitle("Distribución del Delay (IAT) – Boxplots por Perfil")
-
-    # --- User A ---
-    bpA = ax[0].boxplot(all_iat_A, tick_labels=PROFILES, showfliers=True)
-    ax[0].set_title("User A")
-    ax[0].set_ylabel("Delay (ms)")
-    ax[0].set_yscale('log')
-    ax[0].grid(axis='y')
-    annotate_boxplot(ax[0], bpA)
-
-    # --- User B ---
-    bpB = ax[1].boxplot(all_iat_B, tick_labels=PROFILES, showfliers=True)
-    ax[1].set_title("User B")
-    ax[1].set_ylabel("Delay (ms)")
-    ax[1].set_yscale('log')
-    ax[1].grid(axis='y')
-    annotate_boxplot(ax[1], bpB)
-
-    plt.tight_layout()
-    plt.show()
+# ---------------------------------------------------------------
+# MODO CATÁLOGO: resúmenes desde la base SQLite, sin leer los pcap
+# ---------------------------------------------------------------
+def main_catalog(db_path, profiles=None, users=None, since=None, until=None, update=True,
+                 base_dir=BASE_DIR, port=PORT, use_cache=USE_CACHE, max_memory=MAX_MEMORY,
+                 jobs=JOBS, report_dir=REPORT_DIR, formats=REPORT_FORMATS, ci_method=CI_METHOD):
+    """
+    Barras de throughput + CI y boxplots del IAT de todas las capturas
+    catalogadas de cada perfil y usuario (entre since y until), fusionando
+    sus estadísticas. Con update se catalogan antes las capturas nuevas o
+    modificadas.
+    """
+    db = open_catalog(db_path)
+    if update:
+        counts = ingest(db, base_dir, ports=(port,), use_cache=use_cache,
+                        max_memory=max_memory, jobs=jobs)
+        print(f"Catálogo {db_path}: {counts['new']} nuevas, {counts['updated']} actualizadas, "
+              f"{counts['unchanged']} sin cambios, {counts['removed']} eliminadas")
+
+    rows = query(db, profile=profiles, user=users, port=port, since=since, until=until)
+    if not rows:
+        print("No hay capturas catalogadas con esos criterios.")
+        return
+    groups = aggregate(rows)
+    print(format_groups(groups))
+
+    profiles = profiles or order_profiles({g["profile"] for g in groups})
+    users = users or sorted({g["user"] for g in groups})
+    cells = {(g["profile"], g["user"]): (g["thr_series"], g["iat_hist"]) for g in groups}
+    output_figures(summary_figures(profiles, users, cells, ci_method), report_dir,
+                   formats=formats, jobs=jobs)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Throughput y delay (IAT) por perfil")
+    parser.add_argument("--base-dir", default=BASE_DIR, metavar="DIR",
+                        help="Directorio de las mediciones (<usuario>/<perfil>/<captura>)")
+    parser.add_argument("--profiles", nargs="+", metavar="PERFIL",
+                        help="Perfiles; por defecto los directorios encontrados")
+    parser.add_argument("--users", nargs="+", metavar="USUARIO",
+                        help="Usuarios; por defecto los directorios encontrados")
+    parser.add_argument("--port", type=int, default=PORT, help="Puerto UDP del flujo de video")
+    parser.add_argument("--capture", default=CAPTURE, metavar="PATRÓN",
+                        help="Captura de cada <usuario>/<perfil>/: archivo, directorio o glob "
+                             "({profile} = nombre del perfil). Varias capturas se mezclan "
+                             "por timestamp, p. ej. '{profile}.pcap*' o '.'")
+    parser.add_argument("--catalog", nargs="?", const="", metavar="DB",
+                        help="Resúmenes desde el catálogo SQLite (por defecto "
+                             "<base-dir>/catalog.sqlite) sin leer los pcap ya catalogados: "
+                             "todas las capturas de cada perfil y usuario")
+    parser.add_argument("--no-update", action="store_true",
+                        help="Con --catalog, no catalogar capturas nuevas (solo consultar)")
+    parser.add_argument("--since", metavar="FECHA",
+                        help="Con --catalog, capturas desde FECHA (AAAA-MM-DD[ HH:MM])")
+    parser.add_argument("--until", metavar="FECHA",
+                        help="Con --catalog, capturas anteriores a FECHA")
+    parser.add_argument("--month", nargs="?", const="", metavar="AAAA-MM",
+                        help="Con --catalog, capturas de ese mes (sin valor: el mes actual)")
+    parser.add_argument("--ci", choices=CI_METHODS, default=CI_METHOD,
+                        help="Intervalo de confianza del throughput medio: t, normal, "
+                             "bootstrap i.i.d. o bootstrap por bloques móviles (por defecto; "
+                             "el throughput por segundo está autocorrelacionado)")
+    parser.add_argument("--flows", action="store_true",
+                        help="Mostrar la tabla de flujos UDP (5-tupla) de cada captura")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Leer siempre los pcap sin usar la caché de columnas")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="Procesos para extraer métricas y dibujar (1 = en serie)")
+    parser.add_argument("--report", metavar="DIR",
+                        help="Guardar las figuras en DIR sin abrir ventanas (backend Agg)")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["png"],
+                        dest="formats", help="Formatos de las figuras en modo reporte")
+    parser.add_argument("--decimate", choices=METHODS, default="minmax",
+                        help="Decimación de las series por paquete (none = todas las muestras)")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS,
+                        help="Puntos por serie tras la decimación")
+    parser.add_argument("--max-memory", type=int, metavar="MB",
+                        help="Leer las capturas por bloques sin superar MB de memoria "
+                             "de trabajo en total (sin caché; para pcap más grandes que la RAM)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.setup(args)
+
+    jobs = max(1, args.jobs)
+    max_memory = args.max_memory << 20 if args.max_memory is not None else None
+    options = dict(base_dir=args.base_dir, port=args.port, use_cache=not args.no_cache,
+                   max_memory=max_memory, jobs=jobs, report_dir=args.report,
+                   formats=tuple(args.formats), ci_method=args.ci)
+    if profiling.enabled() and jobs > 1:
+        print("⚠ --profile con --jobs > 1: las etapas de los procesos hijos solo cuentan "
+              "en el tiempo de la etapa que los lanza")
+    with profiling.stage("analyze_profiles"):
+        if args.catalog is not None:
+            since = parse_date(args.since) if args.since else None
+            until = parse_date(args.until) if args.until else None
+            if args.month is not None:
+                since, until = month_range(args.month or None)
+            main_catalog(args.catalog or default_path(args.base_dir),
+                         args.profiles or PROFILES, args.users or USERS,
+                         since, until, update=not args.no_update, **options)
+        else:
+            users, profiles = layout(args.base_dir)
+            main(args.profiles or PROFILES or profiles, args.users or USERS or users,
+                 capture=args.capture,
+                 decimation=args.decimate, max_points=args.points, show_flows=args.flows,
+                 **options)
+    profiling.report()
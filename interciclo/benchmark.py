@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del pipeline de análisis sobre capturas sintéticas
+
+  generate  Escribir pares emisor/receptor deterministas (analysis/synth.py)
+  run       Medir tiempo y pico de memoria de cada etapa y guardar un JSON
+  compare   Comparar dos JSON de resultados (regresiones entre versiones)
+
+Cada etapa se ejecuta --repeat veces y se guarda el mejor tiempo y la
+mediana; el pico de memoria se mide en una ejecución aparte con
+tracemalloc (arrays NumPy incluidos; no cuenta las páginas del mmap).
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from analysis.synth import ensure_pair, generate_pair
+from analysis.pcap_reader import read_udp_packets, iter_udp_packets
+from analysis.flows import flow_table
+from analysis.metrics import compute_throughput, compute_iat, flow_metrics, rfc3550_jitter
+from analysis.pyramid import ThroughputPyramid
+from analysis.matching import match_nearest, match_fingerprints
+from analysis.clock import estimate_clock, correct_timestamps
+from analysis.mpegts import analyze_ts
+from analysis.frames import extract_frames
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Condiciones de red de los pares de benchmark (ver analysis.synth.DEFAULTS)
+IMPAIRMENTS = {"loss": 0.001, "jitter": 0.001, "offset": 0.5, "drift_ppm": 20.0}
+
+DATA_DIR = "bench_data"
+RESULTS_DIR = "bench_results"
+CHUNK_MEMORY = 64 << 20
+THRESHOLD = 0.10            # regresión: más de un 10 % más lento o más memoria
+MIN_DELTA = 0.02            # s; diferencias menores son ruido de medida
+
+
+# ---------------------------------------------------------------
+# ETAPAS
+# ---------------------------------------------------------------
+def build_stages(pathA, pathB):
+    """
+    Etapas en el orden del pipeline. Cada una es (nombre, preparar, medir):
+    preparar() no se mide y devuelve los argumentos de medir(); medir()
+    devuelve el número de elementos procesados.
+    """
+    cache = {}
+
+    def packets(path):
+        if path not in cache:
+            cache[path] = read_udp_packets(path)
+        return cache[path]
+
+    def ab():
+        return packets(pathA), packets(pathB)
+
+    def read(path):
+        return len(read_udp_packets(path)["ts"])
+
+    def read_chunked(path):
+        return sum(len(p["ts"]) for p in iter_udp_packets(path, max_memory=CHUNK_MEMORY))
+
+    def throughput(ts, size, step=None):
+        compute_throughput(ts, size, 1.0, step)
+        return len(ts)
+
+    def pyramid(ts, size):
+        pyr = ThroughputPyramid.from_packets(ts, size)
+        for window in (1.0, 0.1, 0.01):
+            pyr.throughput(window)
+        return len(ts)
+
+    def clock(A, B):
+        res = match_fingerprints(A["fp"], A["ts"], B["fp"], B["ts"])
+        estimate_clock(A["ts"][res["idxA"]], res["delay"])
+        return len(res["delay"])
+
+    def delay_nearest(A, B):
+        idxA, _, diffs = match_nearest(A["ts"], B["ts"], max_gap=1.0)
+        tsB = correct_timestamps(B["ts"], estimate_clock(A["ts"][idxA], diffs))
+        return len(match_nearest(A["ts"], tsB, max_gap=1.0)[2])
+
+    return [
+        ("read_pcap", lambda: (pathA,), read),
+        ("read_chunked", lambda: (pathA,), read_chunked),
+        ("flow_table", lambda: (packets(pathA),), lambda p: len(flow_table(p)["index"])),
+        ("compute_throughput", lambda: (packets(pathA)["ts"], packets(pathA)["size"]),
+         throughput),
+        ("compute_throughput_sliding",
+         lambda: (packets(pathA)["ts"], packets(pathA)["size"], 0.01), throughput),
+        ("throughput_pyramid", lambda: (packets(pathA)["ts"], packets(pathA)["size"]), pyramid),
+        ("compute_iat", lambda: (packets(pathB)["ts"],), lambda ts: len(compute_iat(ts))),
+        ("rfc3550_jitter", lambda: (np.diff(packets(pathB)["ts"]),),
+         lambda d: len(rfc3550_jitter(d))),
+        ("flow_metrics", lambda: (packets(pathB)["ts"], packets(pathB)["size"]),
+         lambda ts, size: flow_metrics(ts, size, windows=(0.1, 1.0))["packets"]),
+        ("match_nearest", ab, lambda A, B: len(match_nearest(A["ts"], B["ts"], 1.0)[2])),
+        ("match_fingerprints", ab,
+         lambda A, B: match_fingerprints(A["fp"], A["ts"], B["fp"], B["ts"])["received"]),
+        ("clock_payload", ab, clock),
+        ("delay_nearest", ab, delay_nearest),
+        ("analyze_ts", lambda: (pathB, packets(pathB)),
+         lambda path, p: analyze_ts(path, p)["ts_packets"]),
+        ("extract_frames", lambda: (pathB, packets(pathB)),
+         lambda path, p: len(extract_frames(path, p)["pts"])),
+    ]
+
+
+def time_stage(measure, args, repeat):
+    runs, items = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        items = measure(*args)
+        runs.append(time.perf_counter() - t0)
+    return runs, int(items)
+
+
+def peak_memory(measure, args):
+    """Pico de memoria asignada durante la etapa (MB)"""
+    tracemalloc.start()
+    try:
+        measure(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def cli_startup(path, repeat):
+    """Arranque en frío de `python -m analysis iat` según su propio campo timing"""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-m", "analysis", "iat", path],
+                             capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        runs.append(json.loads(out.stdout)["timing"]["startup_s"])
+    return runs
+
+
+# ---------------------------------------------------------------
+# RESULTADOS
+# ---------------------------------------------------------------
+def git_version():
+    """(commit abreviado, True si hay cambios sin confirmar) o (None, None)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               cwd=here, capture_output=True, text=True).stdout.strip()
+        return commit, bool(dirty)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def run(size, data_dir=DATA_DIR, repeat=3, memory=True, stages=None, startup=True):
+    """
+    Todas las etapas sobre el par de `size` paquetes
+
+    Returns:
+        dict: Entorno, parámetros del par y, por etapa: seconds (mejor),
+              median, runs, items, items_per_s y peak_mb
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    print(f"Par sintético de {size} paquetes...", file=sys.stderr)
+    truth = ensure_pair(os.path.join(data_dir, f"synth_{size}"),
+                        packets=SIZES[size], **IMPAIRMENTS)
+    pathA, pathB = truth["files"]
+
+    commit, dirty = git_version()
+    result = {
+        "size": size,
+        "commit": commit,
+        "dirty": dirty,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPU)",
+        "dataset": truth,
+        "stages": {},
+    }
+
+    for name, prepare, measure in build_stages(pathA, pathB):
+        if stages and name not in stages:
+            continue
+        args = prepare()
+        runs, items = time_stage(measure, args, repeat)
+        best = min(runs)
+        entry = {"seconds": best, "median": statistics.median(runs), "runs": runs,
+                 "items": items, "items_per_s": items / best if best > 0 else None}
+        if memory:
+            entry["peak_mb"] = peak_memory(measure, args)
+        result["stages"][name] = entry
+        print(f"  {name:<28} {best:9.4f} s  {entry.get('peak_mb', 0):9.1f} MB",
+              file=sys.stderr)
+
+    if startup and (not stages or "cli_startup" in stages):
+        runs = cli_startup(pathA, repeat)
+        result["stages"]["cli_startup"] = {"seconds": min(runs), "median": statistics.median(runs),
+                                           "runs": runs, "items": 1}
+        print(f"  {'cli_startup':<28} {min(runs):9.4f} s", file=sys.stderr)
+
+    result["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def compare(base, new, threshold=THRESHOLD):
+    """
+    Tabla de cambios por etapa entre dos resultados
+
+    Returns:
+        tuple: (texto, lista de etapas con regresión)
+    """
+    lines = [f"{base.get('commit')} → {new.get('commit')}  ({new['size']} paquetes)",
+             f"{'etapa':<28} {'antes (s)':>10} {'ahora (s)':>10} {'ratio':>7} "
+             f"{'MB antes':>9} {'MB ahora':>9}"]
+    regressions = []
+    for name, cur in new["stages"].items():
+        old = base["stages"].get(name)
+        if old is None:
+            lines.append(f"{name:<28} {'-':>10} {cur['seconds']:>10.4f}")
+            continue
+        ratio = cur["seconds"] / old["seconds"] if old["seconds"] > 0 else float("inf")
+        mem_old, mem_new = old.get("peak_mb"), cur.get("peak_mb")
+        slower = ratio > 1 + threshold and cur["seconds"] - old["seconds"] > MIN_DELTA
+        bigger = mem_old and mem_new and mem_new > mem_old * (1 + threshold)
+        flag = "  ⚠ más lento" if slower else ""
+        flag += "  ⚠ más memoria" if bigger else ""
+        if slower or bigger:
+            regressions.append(name)
+        lines.append(f"{name:<28} {old['seconds']:>10.4f} {cur['seconds']:>10.4f} {ratio:>7.2f} "
+                     f"{mem_old if mem_old is not None else float('nan'):>9.1f} "
+                     f"{mem_new if mem_new is not None else float('nan'):>9.1f}{flag}")
+    return "\n".join(lines), regressions
+
+
+# ---------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks del análisis con capturas sintéticas")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="Escribir un par emisor/receptor sintético")
+    p.add_argument("prefix", help="Se escriben PREFIX_A.pcap, PREFIX_B.pcap y PREFIX.json")
+    p.add_argument("--packets", type=lambda v: SIZES.get(v) or int(v), default=10_000,
+                   help="Número de datagramas (o 10k, 100k, 1m, 10m)")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--port", type=int, default=39400)
+    p.add_argument("--bitrate", type=float, default=4e6, help="bits/s de video")
+    p.add_argument("--loss", type=float, default=0.0, help="Probabilidad de pérdida")
+    p.add_argument("--delay", type=float, default=0.005, help="Delay base (s)")
+    p.add_argument("--jitter", type=float, default=0.001, help="Desviación del delay (s)")
+    p.add_argument("--reorder", action="store_true",
+                   help="Delay independiente por datagrama (reordenamiento)")
+    p.add_argument("--offset", type=float, default=0.0, help="Offset del reloj de B (s)")
+    p.add_argument("--drift-ppm", type=float, default=0.0, help="Deriva del reloj de B (ppm)")
+
+    p = sub.add_parser("run", help="Medir cada etapa y guardar el resultado en JSON")
+    p.add_argument("--size", nargs="+", choices=SIZES, default=["10k", "1m"])
+    p.add_argument("--data-dir", default=DATA_DIR)
+    p.add_argument("--out-dir", default=RESULTS_DIR)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--stage", nargs="+", help="Solo estas etapas")
+    p.add_argument("--no-memory", action="store_true", help="No medir el pico de memoria")
+    p.add_argument("--no-startup", action="store_true", help="No medir el arranque del CLI")
+
+    p = sub.add_parser("compare", help="Comparar dos resultados")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=THRESHOLD,
+                   help="Cambio relativo que cuenta como regresión")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        truth = generate_pair(args.prefix, packets=args.packets, seed=args.seed, port=args.port,
+                              bitrate=args.bitrate, loss=args.loss, delay=args.delay,
+                              jitter=args.jitter, reorder=args.reorder, offset=args.offset,
+                              drift_ppm=args.drift_ppm)
+        print(f"✔ {truth['sent']} enviados, {truth['received']} recibidos → "
+              f"{', '.join(truth['files'])}")
+
+    elif args.command == "run":
+        os.makedirs(args.out_dir, exist_ok=True)
+        for size in args.size:
+            result = run(size, args.data_dir, max(1, args.repeat), not args.no_memory,
+                         args.stage, not args.no_startup)
+            tag = result["commit"] or "local"
+            if result["dirty"]:
+                tag += "-dirty"
+            path = os.path.join(args.out_dir, f"{size}_{tag}.json")
+            with open(path, "w") as f:
+                json.dump(result, f, indent=2)
+            print(f"✔ {path}")
+
+    else:
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        text, regressions = compare(base, new, args.threshold)
+        print(text)
+        if regressions:
+            print(f"\n⚠ Regresiones: {', '.join(regressions)}")
+            sys.exit(1)
@@ -4,17 +4,18 @@
 # Mide: Throughput, Delay (de análisis posterior)
 #
 # Uso:
-#   ./capture.sh <INTERFAZ> <PUERTO> <DURACION_SEG>
+#   ./capture.sh <INTERFAZ> <PUERTO> <DURACION_SEG> [--live]
 #
 # Ejemplo:
 #   ./capture.sh eth0 5000 120
+#   ./capture.sh eth0 5000 120 --live   # throughput/IAT cada segundo (live_monitor.py)
 #
 
 ### ================================
 ### VALIDACIÓN DE PARÁMETROS
 ### ================================
-if [ $# -ne 3 ]; then
-    echo "Uso: $0 <INTERFAZ> <PUERTO> <DURACION_SEG>"
+if [ $# -lt 3 ] || [ $# -gt 4 ]; then
+    echo "Uso: $0 <INTERFAZ> <PUERTO> <DURACION_SEG> [--live]"
     exit 1
 fi
 
@@ -22,6 +23,16 @@ IFACE=$1
 PORT=$2
 DURATION=$3
 
+LIVE=0
+if [ "$4" == "--live" ]; then
+    LIVE=1
+elif [ -n "$4" ]; then
+    echo "Opción desconocida: $4"
+    exit 1
+fi
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+
 ### ================================
 ### PREPARAR DIRECTORIOS
 ### ================================
@@ -45,6 +56,7 @@ echo "Interfaz:   $IFACE" | tee -a "$LOG_FILE"
 echo "Puerto UDP: $PORT" | tee -a "$LOG_FILE"
 echo "Duración:   $DURATION seg" | tee -a "$LOG_FILE"
 echo "Output:     $PCAP_FILE" | tee -a "$LOG_FILE"
+echo "En vivo:    $([ $LIVE -eq 1 ] && echo si || echo no)" | tee -a "$LOG_FILE"
 echo "" | tee -a "$LOG_FILE"
 
 sleep 1
@@ -55,10 +67,24 @@ sleep 1
 echo "Iniciando captura durante $DURATION segundos..."
 echo "Presiona Ctrl+C para detener antes."
 
-sudo timeout "$DURATION" tcpdump -i "$IFACE" udp port "$PORT" -w "$PCAP_FILE"
+TCPDUMP_OPTS=()
+if [ $LIVE -eq 1 ]; then
+    # -U: escribir cada paquete al momento para que el monitor lo vea
+    TCPDUMP_OPTS+=(-U)
+    python3 "$SCRIPT_DIR/live_monitor.py" "$PCAP_FILE" --port "$PORT" &
+    LIVE_PID=$!
+fi
+
+sudo timeout "$DURATION" tcpdump -i "$IFACE" "${TCPDUMP_OPTS[@]}" udp port "$PORT" -w "$PCAP_FILE"
 
 CAPTURE_EXIT=$?
 
+if [ $LIVE -eq 1 ]; then
+    sleep 1
+    kill "$LIVE_PID" 2>/dev/null
+    wait "$LIVE_PID" 2>/dev/null
+fi
+
 if [ $CAPTURE_EXIT -eq 124 ]; then
     echo "" | tee -a "$LOG_FILE"
     echo ">>> Captura finalizada automáticamente tras ${DURATION}s." | tee -a "$LOG_FILE"
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Monitor en vivo de una captura de videoconferencia
+
+Lee el pcap mientras tcpdump lo escribe y publica cada segundo el
+throughput y el IAT del último segundo y de una ventana móvil.
+
+Uso:
+    # Siguiendo el archivo que escribe capture.sh
+    python3 live_monitor.py capturas/capture_X/capture_39400.pcap --port 39400
+
+    # Desde una tubería
+    sudo tcpdump -i wlan0 -U -w - udp port 39400 | python3 live_monitor.py - --port 39400
+"""
+
+import argparse
+
+from analysis.live import run_live
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput e IAT en vivo desde un pcap en escritura")
+    parser.add_argument("source", help="Archivo pcap que se está escribiendo, o - para stdin")
+    parser.add_argument("--port", type=int, default=None, help="Filtrar por puerto UDP")
+    parser.add_argument("--interval", type=float, default=1.0, help="Segundos entre resúmenes")
+    parser.add_argument("--window", type=int, default=10, help="Ventana del promedio móvil (s)")
+    parser.add_argument("--history", type=int, default=60, help="Segundos guardados en el buffer circular")
+    parser.add_argument("--no-follow", action="store_true", help="Leer el archivo una vez y terminar")
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="Terminar tras N segundos sin datos nuevos")
+    parser.add_argument("--json", action="store_true", help="Publicar una línea JSON por resumen")
+    args = parser.parse_args()
+
+    try:
+        run_live(args.source, port=args.port, interval=args.interval, window=args.window,
+                 history=args.history, follow=not args.no_follow, as_json=args.json,
+                 idle_timeout=args.idle_timeout)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,18 @@
+# tests/conftest.py
+
+"""
+Configuración común de pytest
+Los tests importan el paquete `analysis` desde la raíz de interciclo. Los
+scripts de embebido (test_*_embedding.py) son pruebas manuales con ventana
+que necesitan PyQt6 y python-vlc; sin ellos no se recogen.
+"""
+
+import importlib.util
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+collect_ignore = []
+if any(importlib.util.find_spec(m) is None for m in ("vlc", "PyQt6")):
+    collect_ignore += ["test_ffplay_embedding.py", "test_vlc_embedding.py"]
@@ -0,0 +1,86 @@
+# tests/test_cache.py
+
+"""Caché de columnas y pirámides: mapeo en memoria e invalidación por clave"""
+
+import os
+
+import numpy as np
+import pytest
+
+from analysis import cache
+from analysis.cache import cache_path, load_packets, load_pyramid, pyramid_path
+from analysis.pcap_reader import COLUMNS, read_udp_packets
+from analysis.synth import DEFAULTS, generate_pair
+
+
+PORT = DEFAULTS["port"]
+
+
+@pytest.fixture
+def capture(tmp_path):
+    truth = generate_pair(str(tmp_path / "pair"), packets=3000, loss=0.01)
+    return truth["files"][1]
+
+
+def _key(cpath):
+    return str(np.load(os.path.join(cpath, cache.KEY_FILE)))
+
+
+def test_columns_are_memory_mapped(capture):
+    first = load_packets(capture)
+    assert os.path.isdir(cache_path(capture))
+    cached = load_packets(capture)
+    whole = read_udp_packets(capture)
+    for name in COLUMNS:
+        assert not cached[name].flags.writeable, name     # mapa de solo lectura
+        np.testing.assert_array_equal(cached[name], whole[name], err_msg=name)
+        np.testing.assert_array_equal(first[name], whole[name], err_msg=name)
+    port = load_packets(capture, PORT)
+    assert len(port["ts"]) == len(whole["ts"]) and port["ts"].flags.writeable
+
+
+def test_rebuilt_when_capture_changes(capture):
+    load_packets(capture)
+    key = _key(cache_path(capture))
+
+    # Misma cabecera y tamaño, otra fecha de modificación
+    st = os.stat(capture)
+    os.utime(capture, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache._read_cache(cache_path(capture), cache.capture_key(capture)) is None
+    load_packets(capture)
+    assert _key(cache_path(capture)) != key
+
+
+def test_rebuilt_when_version_changes(capture, monkeypatch):
+    load_packets(capture)
+    old = cache.capture_key(capture)
+    monkeypatch.setattr(cache, "CACHE_VERSION", cache.CACHE_VERSION + 1)
+    assert cache._read_cache(cache_path(capture), cache.capture_key(capture)) is None
+
+    # Una caché de otra versión con columnas falsas no se sirve nunca
+    cache._write_cache(cache_path(capture), old, {name: np.zeros(1) for name in COLUMNS})
+    packets = load_packets(capture)
+    assert len(packets["ts"]) == len(read_udp_packets(capture)["ts"])
+    assert _key(cache_path(capture)) == cache.capture_key(capture)
+
+
+def test_pyramid_rebuilt_when_version_changes(capture, monkeypatch):
+    first = load_pyramid(capture, PORT)
+    ppath = pyramid_path(capture, PORT)
+    key = _key(ppath)
+    again = load_pyramid(capture, PORT)
+    np.testing.assert_array_equal(again.levels[0][1], first.levels[0][1])
+    assert _key(ppath) == key
+
+    monkeypatch.setattr(cache, "PYRAMID_VERSION", cache.PYRAMID_VERSION + 1)
+    load_pyramid(capture, PORT)
+    assert _key(ppath) != key
+
+
+def test_incomplete_directory_is_ignored(capture):
+    """Un directorio sin clave (escritura interrumpida) no pasa por vigente"""
+    load_packets(capture)
+    os.remove(os.path.join(cache_path(capture), cache.KEY_FILE))
+    assert cache._read_cache(cache_path(capture), cache.capture_key(capture)) is None
+    load_packets(capture)
+    assert _key(cache_path(capture)) == cache.capture_key(capture)
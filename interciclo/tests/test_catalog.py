@@ -0,0 +1,110 @@
+# tests/test_catalog.py
+
+"""Catálogo SQLite: ingesta incremental, poda y consultas agregadas"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from analysis.catalog import aggregate, default_path, ingest, month_range, open_catalog, query
+from analysis.metrics import compute_iat
+from analysis.pcap_reader import read_udp_packets
+from analysis.synth import DEFAULTS, generate_pair
+
+
+PORT = DEFAULTS["port"]
+MONTH = 40 * 86400          # desplaza una captura de noviembre a diciembre de 2023
+
+
+def _capture(tmp_path, base_dir, user, profile, seed, offset=0.0):
+    """Receptor de un par sintético en <base_dir>/<usuario>/<perfil>/<perfil>.pcap"""
+    truth = generate_pair(str(tmp_path / f"{user}_{profile}"), packets=4000, seed=seed,
+                          offset=offset)
+    path = base_dir / user / profile / f"{profile}.pcap"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy(truth["files"][1], path)
+    return path
+
+
+@pytest.fixture
+def campaign(tmp_path):
+    base_dir = tmp_path / "mediciones"
+    paths = {
+        ("u1", "cercano"): _capture(tmp_path, base_dir, "u1", "cercano", 1),
+        ("u1", "lejano"): _capture(tmp_path, base_dir, "u1", "lejano", 2),
+        ("u2", "cercano"): _capture(tmp_path, base_dir, "u2", "cercano", 3, offset=MONTH),
+    }
+    (base_dir / "u1" / "notas.txt").write_text("no es una captura\n")
+    (base_dir / "u1" / "cercano" / "cercano.pcap.npz").write_bytes(b"PK\x03\x04 v1")
+    return base_dir, paths
+
+
+def test_incremental_ingest_and_prune(campaign):
+    base_dir, paths = campaign
+    db = open_catalog(default_path(base_dir))
+
+    counts = ingest(db, str(base_dir), ports=(PORT,))
+    assert (counts["new"], counts["read"], counts["removed"]) == (3, 3, 0)
+    # Las cachés de columnas creadas al leer no se catalogan como capturas
+    assert os.path.isdir(f"{paths['u1', 'cercano']}.cache")
+    assert ingest(db, str(base_dir), ports=(PORT,)) == dict(
+        new=0, updated=0, unchanged=3, removed=0, read=0)
+
+    # Solo se relee la captura modificada
+    path = paths["u1", "lejano"]
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    counts = ingest(db, str(base_dir), ports=(PORT,))
+    assert (counts["updated"], counts["unchanged"], counts["read"]) == (1, 2, 1)
+
+    # Un puerto nuevo relee todas, sin duplicar filas
+    counts = ingest(db, str(base_dir), ports=(PORT, 5000))
+    assert (counts["updated"], counts["read"]) == (3, 3)
+    assert len(query(db)) == 6
+    assert all(row["packets"] == 0 for row in query(db, port=5000))
+
+    os.remove(paths["u2", "cercano"])
+    counts = ingest(db, str(base_dir), ports=(PORT,))
+    assert (counts["removed"], counts["unchanged"]) == (1, 2)
+    assert {row["user"] for row in query(db)} == {"u1"}
+
+
+def test_query_and_aggregate(campaign):
+    base_dir, paths = campaign
+    db = open_catalog(default_path(base_dir))
+    ingest(db, str(base_dir), ports=(PORT,))
+    packets = {cell: read_udp_packets(str(p), PORT) for cell, p in paths.items()}
+
+    rows = query(db, profile="cercano", port=PORT)
+    assert [(r["user"], r["packets"]) for r in rows] == [
+        (u, len(packets[u, "cercano"]["ts"])) for u in ("u1", "u2")]
+    assert [r["user"] for r in query(db, since=month_range("2023-12")[0])] == ["u2"]
+    assert sorted(r["profile"] for r in query(db, user="u1", until=month_range("2023-12")[0])) \
+        == ["cercano", "lejano"]
+
+    # Mediana del IAT de todos los paquetes, no la mediana de las medianas
+    (group,) = aggregate(rows, by=("profile",))
+    iat = np.concatenate([compute_iat(packets[u, "cercano"]["ts"]) for u in ("u1", "u2")])
+    assert group["runs"] == 2
+    assert group["packets"] == sum(len(packets[u, "cercano"]["ts"]) for u in ("u1", "u2"))
+    assert group["iat_hist"].stats.n == len(iat)
+    assert group["iat_hist"].quantile(0.5) == pytest.approx(np.median(iat) * 1000, rel=2e-3)
+
+    by_user = aggregate(query(db, port=PORT), by=("user",))
+    assert [(g["user"], g["runs"]) for g in by_user] == [("u1", 2), ("u2", 1)]
+
+
+def test_catalog_survives_moving_base_dir(campaign, tmp_path):
+    """Las rutas son relativas: una copia del directorio no se vuelve a leer"""
+    base_dir, _ = campaign
+    db = open_catalog(default_path(base_dir))
+    ingest(db, str(base_dir), ports=(PORT,))
+    db.close()
+
+    moved = tmp_path / "copia"
+    shutil.copytree(base_dir, moved, copy_function=shutil.copy2)
+    db = open_catalog(default_path(moved))
+    counts = ingest(db, str(moved), ports=(PORT,))
+    assert (counts["unchanged"], counts["read"]) == (3, 0)
@@ -0,0 +1,101 @@
+# tests/test_chunked.py
+
+"""Lectura por bloques: mismos paquetes y métricas que en memoria, memoria acotada"""
+
+import struct
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from analysis.flows import stream_ports
+from analysis.metrics import flow_metrics
+from analysis.pcap_reader import COLUMNS, iter_udp_packets, read_udp_packets
+from analysis.synth import generate_pair
+
+
+@pytest.fixture(scope="module")
+def capture(tmp_path_factory):
+    prefix = str(tmp_path_factory.mktemp("chunked") / "pair")
+    truth = generate_pair(prefix, packets=20_000, loss=0.01, jitter=0.002, reorder=True)
+    return truth["files"][1]
+
+
+def _concat(chunks):
+    chunks = list(chunks)
+    return len(chunks), {name: np.concatenate([c[name] for c in chunks]) for name in COLUMNS}
+
+
+@pytest.mark.parametrize("max_memory", [1 << 20, 3 << 20, 64 << 20])
+def test_chunks_concatenate_to_whole_read(capture, max_memory):
+    """Los registros partidos por el borde de un bloque pasan al siguiente"""
+    whole = read_udp_packets(capture)
+    n_chunks, chunked = _concat(iter_udp_packets(capture, max_memory=max_memory))
+    assert n_chunks > 1 or max_memory == 64 << 20
+    for name in COLUMNS:
+        np.testing.assert_array_equal(chunked[name], whole[name], err_msg=name)
+
+
+def test_pcapng_chunks(capture, tmp_path):
+    scapy = pytest.importorskip("scapy.all")
+    path = tmp_path / "cap.pcapng"
+    with scapy.PcapNgWriter(str(path)) as writer:
+        for p in scapy.PcapReader(capture):
+            writer.write(p)
+            if writer.linktype is not None and path.stat().st_size > (2 << 20):
+                break
+    whole = read_udp_packets(str(path))
+    n_chunks, chunked = _concat(iter_udp_packets(str(path), max_memory=1 << 20))
+    assert n_chunks > 1
+    for name in COLUMNS:
+        np.testing.assert_array_equal(chunked[name], whole[name], err_msg=name)
+
+
+def test_streaming_metrics_carry_over(capture):
+    """Throughput, jitter y ráfagas acumulados entre bloques = cálculo en memoria"""
+    whole = read_udp_packets(capture)
+    by_port, table = stream_ports(iter_udp_packets(capture, max_memory=1 << 20), [39400])
+    metrics = by_port[39400]
+    assert metrics["packets"] == len(whole["ts"])
+    assert int(table["packets"].sum()) == len(whole["ts"])
+
+    ref = flow_metrics(whole["ts"], whole["size"])
+    np.testing.assert_allclose(metrics["throughput"][1.0][1], ref["throughput"][1.0][1])
+    np.testing.assert_allclose(metrics["pkt_rate"][1], ref["pkt_rate"][1])
+    assert metrics["jitter_last"] == pytest.approx(ref["jitter_last"], rel=1e-3)
+    bursts = metrics["bursts"]
+    assert bursts["count"] == len(ref["bursts"]["packets"])
+    assert bursts["max_packets"] == int(ref["bursts"]["packets"].max())
+    assert bursts["mean_packets"] == pytest.approx(ref["bursts"]["packets"].mean())
+
+
+def _small_datagrams(path, n):
+    """pcap Ethernet de n datagramas UDP de 0 a 15 bytes: el peor caso de memoria por byte"""
+    rng = np.random.default_rng(2)
+    length = rng.integers(0, 16, n)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for i, m in enumerate(length):
+            udp = struct.pack(">HHHH", 5000, 39400, 8 + m, 0) + bytes(rng.integers(0, 256, m,
+                                                                                   np.uint8))
+            ip = struct.pack(">BBHHHBBHII", 0x45, 0, 20 + len(udp), i & 0xFFFF, 0, 64, 17, 0,
+                             0x0A000001, 0x0A000002) + udp
+            frame = b"\x02" * 6 + b"\x04" * 6 + b"\x08\x00" + ip
+            f.write(struct.pack("<IIII", 1_700_000_000 + i // 1000, i % 1000 * 1000,
+                                len(frame), len(frame)) + frame)
+
+
+def test_memory_cap_with_small_datagrams(tmp_path):
+    """Con registros mínimos los temporales (huellas incluidas) no pasan de max_memory"""
+    path = tmp_path / "small.pcap"
+    _small_datagrams(path, 200_000)
+    max_memory = 8 << 20
+
+    tracemalloc.start()
+    try:
+        total = sum(len(c["ts"]) for c in iter_udp_packets(str(path), max_memory=max_memory))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert total == 200_000
+    assert peak < max_memory
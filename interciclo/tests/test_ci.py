@@ -0,0 +1,92 @@
+# tests/test_ci.py
+
+"""Intervalos de confianza frente a SciPy"""
+
+import numpy as np
+import pytest
+
+from analysis.ci import batch_ci, block_length, error_bars, mean_ci, normal_ppf, t_ppf
+
+stats = pytest.importorskip("scipy.stats")
+
+
+def _groups():
+    rng = np.random.default_rng(5)
+    sizes = [2, 3, 5, 17, 30, 31, 200, 1000]
+    return [rng.gamma(2.0, 3.0, n) for n in sizes]
+
+
+@pytest.mark.parametrize("q", [0.9, 0.95, 0.975, 0.995])
+@pytest.mark.parametrize("df", [1, 2, 4, 10, 29, 100, 1000])
+def test_t_ppf(q, df):
+    assert t_ppf(q, df) == pytest.approx(stats.t.ppf(q, df), rel=1e-6)
+
+
+@pytest.mark.parametrize("q", [0.9, 0.95, 0.975, 0.995])
+def test_normal_ppf(q):
+    assert normal_ppf(q) == pytest.approx(stats.norm.ppf(q), rel=1e-9)
+
+
+@pytest.mark.parametrize("confidence", [0.90, 0.95])
+def test_batch_t(confidence):
+    groups = _groups()
+    res = batch_ci(groups, "t", confidence)
+    for g, lo, hi in zip(groups, res["lo"], res["hi"]):
+        ref = stats.t.interval(confidence, len(g) - 1, loc=g.mean(), scale=stats.sem(g))
+        np.testing.assert_allclose((lo, hi), ref, rtol=1e-7)
+        assert mean_ci(len(g), g.mean(), g.std(ddof=1), confidence)[1] == \
+            pytest.approx((hi - lo) / 2, rel=1e-9)
+
+
+def test_batch_normal():
+    groups = _groups()
+    res = batch_ci(groups, "normal", 0.95)
+    for g, lo, hi in zip(groups, res["lo"], res["hi"]):
+        ref = stats.norm.interval(0.95, loc=g.mean(), scale=stats.sem(g))
+        np.testing.assert_allclose((lo, hi), ref, rtol=1e-9)
+
+
+def test_batch_bootstrap_close_to_t():
+    """Con n grande el percentil bootstrap se acerca al intervalo t"""
+    groups = _groups()[-2:]
+    res = batch_ci(groups, "bootstrap", 0.90, n_boot=4000)
+    for g, half in zip(groups, res["half"]):
+        t_half = stats.t.ppf(0.95, len(g) - 1) * stats.sem(g)
+        assert half == pytest.approx(t_half, rel=0.1)
+    again = batch_ci(groups, "bootstrap", 0.90, n_boot=4000)
+    np.testing.assert_array_equal(res["lo"], again["lo"])
+
+
+def test_batch_block_matches_loop():
+    """Bootstrap por bloques circulares frente a un remuestreo bloque a bloque"""
+    groups = _groups()[-3:]
+    res = batch_ci(groups, "block", 0.90, n_boot=4000)
+    rng = np.random.default_rng(9)
+    for g, block, lo, hi in zip(groups, res["block"], res["lo"], res["hi"]):
+        n = len(g)
+        k = -(-n // block)
+        means = []
+        for _ in range(4000):
+            starts = rng.integers(0, n, k)
+            idx = (starts[:, None] + np.arange(block)) % n
+            means.append(g[idx.ravel()[:n]].mean())
+        ref_lo, ref_hi = np.quantile(means, [0.05, 0.95])
+        assert (hi - lo) == pytest.approx(ref_hi - ref_lo, rel=0.1)
+        assert (lo + hi) / 2 == pytest.approx((ref_lo + ref_hi) / 2, abs=0.1 * (hi - lo))
+
+
+def test_batch_small_groups():
+    res = batch_ci([[], [4.0], [1.0, 3.0]], "t")
+    assert np.isnan(res["mean"][0])
+    assert res["lo"][1] == res["hi"][1] == 4.0
+    assert res["lo"][2] < 2.0 < res["hi"][2]
+
+
+def test_error_bars_and_block_length():
+    groups = _groups()
+    res = batch_ci(groups, "t")
+    yerr = error_bars(res)
+    assert yerr.shape == (2, len(groups))
+    np.testing.assert_allclose(res["mean"] - yerr[0], res["lo"])
+    np.testing.assert_allclose(res["mean"] + yerr[1], res["hi"])
+    np.testing.assert_array_equal(block_length([1, 8, 9, 1000]), [1, 2, 3, 10])
@@ -0,0 +1,67 @@
+# tests/test_cli.py
+
+"""Opciones de python -m analysis"""
+
+import json
+
+import pytest
+
+from analysis.cli import PERCENTILES, build_parser, main
+from analysis.synth import generate_pair
+
+
+@pytest.mark.parametrize("argv, stages, profiles", [
+    (["--profile", "profiles"], True, None),
+    (["profiles", "--profile", "cercano"], False, ["cercano"]),
+    (["--profile", "catalog", "query", "--profile", "lejano"], True, ["lejano"]),
+])
+def test_profile_flag_and_filter(argv, stages, profiles):
+    """--profile (perfilado por etapas) y --profile (filtro de perfiles) no se pisan"""
+    args = build_parser().parse_args(argv)
+    assert args.profile_stages is stages
+    assert args.profile == profiles
+
+
+def _summary(tmp_path, argv, name):
+    out = tmp_path / f"{name}.json"
+    assert main(["-o", str(out)] + argv) == 0
+    return json.loads(out.read_text())["captures"][0]
+
+
+def test_iat_streaming_matches_in_memory(tmp_path):
+    """iat con --max-memory da los mismos valores (y unidades) que en memoria"""
+    prefix = str(tmp_path / "pair")
+    generate_pair(prefix, packets=20_000, loss=0.01, jitter=0.002, reorder=True)
+    capture = f"{prefix}_B.pcap"
+    full = _summary(tmp_path, ["iat", capture], "full")
+    chunked = _summary(tmp_path, ["iat", capture, "--max-memory", "1"], "chunked")
+
+    for key in ("packets", "bytes", "duration_s"):
+        assert chunked[key] == pytest.approx(full[key])
+    assert chunked["jitter_ms"] == pytest.approx(full["jitter_ms"], rel=1e-3)
+    for key in ("count", "mean_packets", "max_packets"):
+        assert chunked["bursts"][key] == pytest.approx(full["bursts"][key])
+    for a, b in ((full["iat_ms"], chunked["iat_ms"]),
+                 (full["bursts"]["gap_ms"], chunked["bursts"]["gap_ms"])):
+        assert b["n"] == a["n"]
+        for key in ("mean", "std", "min", "max", "ci"):
+            assert b[key] == pytest.approx(a[key], rel=1e-9, abs=1e-12), key
+        # Los percentiles del histograma logarítmico son aproximados
+        for p in PERCENTILES:
+            assert b[f"p{p}"] == pytest.approx(a[f"p{p}"], rel=0.01), p
+
+
+def test_psnr_summary(tmp_path):
+    """psnr lee los resúmenes de psnr_video.sh con el paquete, sin scripts del repositorio"""
+    videos = tmp_path / "videos"
+    for name, mean in (("qp20", 35.5), ("b500", 30.25), ("vacio", None)):
+        (videos / name).mkdir(parents=True)
+        if mean is not None:
+            (videos / name / f"psnr_{name}.txt").write_text(
+                f"psnr: 300 frames (CPU: 0 s) mean: {mean:.2f} stdv: 1.20\n35.1\n")
+    out = tmp_path / "psnr.json"
+    assert main(["-o", str(out), "psnr", str(videos)]) == 0
+    result = json.loads(out.read_text())
+    assert result["configs"] == {"b500": 30.25, "qp20": 35.5}
+    assert result["best"] == "qp20"
+    assert result["mean"] == pytest.approx(32.875)
@@ -0,0 +1,58 @@
+# tests/test_clock.py
+
+"""Ajuste de offset y deriva de reloj sobre capturas sintéticas"""
+
+import pytest
+
+from analysis.clock import check_nearest_clock, coarse_offset, correct_timestamps, estimate_clock
+from analysis.matching import match_fingerprints, match_nearest
+from analysis.pcap_reader import read_udp_packets
+from analysis.synth import generate_pair
+
+
+@pytest.fixture(scope="module")
+def pair(tmp_path_factory):
+    prefix = str(tmp_path_factory.mktemp("clock") / "pair")
+    truth = generate_pair(prefix, packets=30_000, loss=0.02, jitter=0.002,
+                          reorder=True, offset=0.3, drift_ppm=50.0)
+    return truth, read_udp_packets(truth["files"][0]), read_udp_packets(truth["files"][1])
+
+
+def test_clock_recovers_offset_and_drift(pair):
+    """Offset en el primer envío y deriva del receptor dentro del delay base"""
+    truth, a, b = pair
+    match = match_fingerprints(a["fp"], a["ts"], b["fp"], b["ts"])
+    tsA = a["ts"][match["idxA"]]
+    clock = estimate_clock(tsA, match["delay"])
+
+    # La envolvente inferior de tB - tA es offset + delay base más el mínimo
+    # de la cola de cada ventana (una fracción del jitter)
+    base = clock["offset"] - truth["offset"]
+    assert truth["delay"] <= base < truth["delay"] + truth["jitter"] / 2
+    assert clock["skew_ppm"] == pytest.approx(truth["drift_ppm"], abs=2.0)
+
+    # Corregido el reloj, queda el delay real menos el de la envolvente
+    tsB = correct_timestamps(b["ts"][match["idxB"]], clock)
+    assert (tsB - tsA).mean() + base == pytest.approx(truth["mean_delay"], abs=1e-4)
+
+
+def test_coarse_offset_flags_wrong_nearest_fit(pair):
+    """
+    El offset real (0.3 s) supera la separación entre paquetes: el vecino
+    más cercano da un ajuste falso y la correlación de bytes lo detecta
+    """
+    truth, a, b = pair
+    lag = coarse_offset(a["ts"], a["size"], b["ts"], b["size"])
+    assert lag == pytest.approx(truth["offset"] + truth["mean_delay"], abs=0.01)
+
+    idxA, _, diffs = match_nearest(a["ts"], b["ts"], max_gap=1.0)
+    clock = estimate_clock(a["ts"][idxA], diffs)
+    assert abs(clock["offset"] - truth["offset"]) > 0.05
+    assert check_nearest_clock(clock["offset"], a["ts"], a["size"], b["ts"], b["size"],
+                               clock["skew"], clock["t_ref"]) is not None
+
+    # Con el ajuste por huella no hay aviso
+    match = match_fingerprints(a["fp"], a["ts"], b["fp"], b["ts"])
+    clock = estimate_clock(a["ts"][match["idxA"]], match["delay"])
+    assert check_nearest_clock(clock["offset"], a["ts"], a["size"], b["ts"], b["size"],
+                               clock["skew"], clock["t_ref"]) is None
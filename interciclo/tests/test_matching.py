@@ -0,0 +1,49 @@
+# tests/test_matching.py
+
+"""Emparejamiento por huella de payload frente a la verdad de synth"""
+
+import numpy as np
+import pytest
+
+from analysis.matching import choose_match, match_fingerprints
+from analysis.pcap_reader import read_udp_packets
+from analysis.synth import generate_pair
+
+
+@pytest.fixture(scope="module")
+def pair(tmp_path_factory):
+    prefix = str(tmp_path_factory.mktemp("matching") / "pair")
+    truth = generate_pair(prefix, packets=30_000, loss=0.02, jitter=0.002,
+                          reorder=True, offset=0.3, drift_ppm=50.0)
+    return truth, read_udp_packets(truth["files"][0]), read_udp_packets(truth["files"][1])
+
+
+def test_match_counts(pair):
+    truth, a, b = pair
+    assert choose_match(a, b) == "payload"
+    match = match_fingerprints(a["fp"], a["ts"], b["fp"], b["ts"])
+    assert match["ambiguous"] == 0
+    assert match["received"] == truth["received"]
+    assert match["lost"] == truth["lost"]
+    assert match["reordered"] > 0
+    np.testing.assert_array_equal(a["fp"][match["idxA"]], b["fp"][match["idxB"]])
+
+
+def test_duplicates_and_ambiguous():
+    """Copias en B: cuenta la primera llegada; huellas repetidas en A: sin pareja"""
+    fpA = np.array([1, 2, 3, 3, 4], dtype=np.uint64)
+    tsA = np.arange(5, dtype=np.float64)
+    fpB = np.array([2, 1, 2, 3, 9], dtype=np.uint64)
+    tsB = np.array([1.5, 0.5, 1.2, 3.5, 4.5])
+    match = match_fingerprints(fpA, tsA, fpB, tsB)
+    assert (match["sent"], match["received"], match["lost"]) == (3, 2, 1)
+    assert (match["ambiguous"], match["duplicates"]) == (2, 1)
+    np.testing.assert_array_equal(match["idxB"], [1, 2])
+    np.testing.assert_allclose(match["delay"], [0.5, 0.2])
+
+
+def test_choose_match_falls_back_to_nearest(pair):
+    _, a, b = pair
+    other = dict(b, fp=b["fp"] ^ np.uint64(1))
+    assert choose_match(a, other) == "nearest"
+    assert choose_match({k: v for k, v in a.items() if k != "fp"}, b) == "nearest"
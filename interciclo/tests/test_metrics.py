@@ -0,0 +1,76 @@
+# tests/test_metrics.py
+
+"""Motor de métricas de una pasada frente a las funciones sueltas y los bucles"""
+
+import numpy as np
+import pytest
+
+from analysis.metrics import (JITTER_BLOCK, burst_stats, compute_iat, compute_throughput,
+                              flow_metrics, rfc3550_jitter)
+
+
+def test_jitter_matches_loop():
+    """Forma cerrada por bloques frente a J += (|D| - J) / 16 paquete a paquete"""
+    rng = np.random.default_rng(1)
+    d = rng.normal(0, 0.003, 3 * JITTER_BLOCK + 123)
+    d[1000:1010] = 0.5                      # picos grandes en medio de un bloque
+
+    expected = np.empty(len(d))
+    j = 0.0
+    for i, x in enumerate(d):
+        j += (abs(x) - j) / 16
+        expected[i] = j
+    np.testing.assert_allclose(rfc3550_jitter(d), expected, rtol=1e-9, atol=1e-15)
+    assert len(rfc3550_jitter([])) == 0
+
+
+def _flow(n=20_000, seed=4):
+    """Flujo con ráfagas: grupos de paquetes a 0.1 ms separados por silencios"""
+    rng = np.random.default_rng(seed)
+    gaps = np.where(rng.random(n) < 0.1, rng.exponential(0.02, n), 1e-4)
+    ts = 1_700_000_000 + np.cumsum(gaps)
+    return ts, rng.integers(60, 1500, n)
+
+
+def test_flow_metrics_matches_separate_functions():
+    ts, sizes = _flow()
+    perm = np.random.default_rng(0).permutation(len(ts))
+    res = flow_metrics(ts[perm], sizes[perm], windows=(0.1, 1.0))
+
+    assert res["packets"] == len(ts)
+    assert res["bytes"] == sizes.sum()
+    assert res["duration"] == ts[-1] - ts[0]
+    for w in (0.1, 1.0):
+        for got, want in zip(res["throughput"][w], compute_throughput(ts, sizes, w)):
+            np.testing.assert_array_equal(got, want)
+    _, npk = res["pkt_rate"]
+    np.testing.assert_array_equal(npk * 8, compute_throughput(ts, np.ones_like(sizes), 1.0)[1])
+
+    iat = compute_iat(ts)
+    np.testing.assert_array_equal(res["iat"], iat)
+    np.testing.assert_array_equal(res["jitter"], rfc3550_jitter(iat - np.median(iat)))
+    assert res["jitter_last"] == res["jitter"][-1]
+
+    bursts = burst_stats(ts, sizes)
+    for name in bursts:
+        np.testing.assert_array_equal(res["bursts"][name], bursts[name])
+    assert bursts["packets"].sum() == len(ts)
+    assert np.all(bursts["gaps"] > 0.002)
+
+
+def test_flow_metrics_transit_and_empty():
+    """Con tiempos de tránsito el jitter usa sus diferencias, como en la RFC"""
+    ts, sizes = _flow(5000)
+    transit = 0.01 + np.random.default_rng(2).exponential(0.001, len(ts))
+    res = flow_metrics(ts, sizes, discard_seconds=0.0, transit=transit)
+    np.testing.assert_array_equal(res["jitter"], rfc3550_jitter(np.diff(transit)))
+
+    empty = flow_metrics([], [])
+    assert empty["packets"] == 0 and empty["jitter_last"] == 0.0
+    assert len(empty["throughput"][1.0][0]) == 0
+
+
+@pytest.mark.parametrize("n", [0, 1, 2])
+def test_burst_stats_short(n):
+    res = burst_stats(np.arange(n) * 1e-4, np.full(n, 100))
+    assert res["packets"].sum() == n and len(res["gaps"]) == 0
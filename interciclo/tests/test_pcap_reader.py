@@ -0,0 +1,86 @@
+# tests/test_pcap_reader.py
+
+"""Lector rápido frente al respaldo con scapy"""
+
+import numpy as np
+import pytest
+
+from analysis.pcap_reader import COLUMNS, _read_with_scapy, read_udp_packets
+
+scapy = pytest.importorskip("scapy.all")
+
+
+def _packets(link):
+    """Datagramas UDP de varios tamaños mezclados con tráfico que no es UDP"""
+    rng = np.random.default_rng(7)
+    out = []
+    for i in range(60):
+        payload = rng.integers(0, 256, int(rng.integers(0, 1400)), dtype=np.uint8).tobytes()
+        ip = scapy.IP(src=f"10.0.0.{1 + i % 3}", dst="10.0.1.9")
+        if i % 7 == 3:
+            pkt = ip / scapy.TCP(sport=80, dport=5000 + i) / payload
+        else:
+            pkt = ip / scapy.UDP(sport=4000 + i % 5, dport=39400) / payload
+        pkt = link(i) / pkt
+        pkt.time = 1_700_000_000 + i * 0.0137
+        out.append(pkt)
+    return out
+
+
+LINKS = {
+    "ethernet": lambda i: scapy.Ether(src="02:00:00:00:00:01", dst="02:00:00:00:00:02"),
+    "vlan": lambda i: scapy.Ether() / scapy.Dot1Q(vlan=10 + i % 2),
+    "qinq": lambda i: scapy.Ether(type=0x88A8) / scapy.Dot1AD(vlan=5) / scapy.Dot1Q(vlan=20),
+    "sll": lambda i: scapy.CookedLinux(pkttype=0, lladdrtype=1, lladdrlen=6, proto=0x0800),
+    "sll2": lambda i: scapy.CookedLinuxV2(proto=0x0800, ifindex=2, lladdrlen=6),
+}
+
+
+def _write(path, packets, pcapng):
+    if pcapng:
+        with scapy.PcapNgWriter(str(path)) as writer:
+            for p in packets:
+                writer.write(p)
+    else:
+        scapy.wrpcap(str(path), packets)
+
+
+@pytest.mark.parametrize("pcapng", [False, True], ids=["pcap", "pcapng"])
+@pytest.mark.parametrize("link", sorted(LINKS))
+def test_native_matches_scapy(tmp_path, link, pcapng):
+    """Mismas columnas que scapy salvo payload_off, que scapy no conoce"""
+    path = tmp_path / ("cap.pcapng" if pcapng else "cap.pcap")
+    _write(path, _packets(LINKS[link]), pcapng)
+
+    native = read_udp_packets(str(path))
+    reference = _read_with_scapy(str(path))
+    assert len(native["ts"]) == 51
+    for name in COLUMNS:
+        assert native[name].dtype == reference[name].dtype, name
+        if name == "payload_off":
+            assert np.all(native[name] >= 0)
+        elif name == "ts":
+            np.testing.assert_allclose(native[name], reference[name], rtol=0, atol=1e-6)
+        else:
+            np.testing.assert_array_equal(native[name], reference[name], err_msg=name)
+
+
+def test_payload_offsets_point_at_payload(tmp_path):
+    """payload_off/payload_len localizan en el archivo el payload UDP"""
+    path = tmp_path / "cap.pcap"
+    packets = _packets(LINKS["vlan"])
+    _write(path, packets, False)
+
+    native = read_udp_packets(str(path))
+    data = path.read_bytes()
+    expected = [bytes(p[scapy.UDP].payload) for p in packets if scapy.UDP in p]
+    for off, n, payload in zip(native["payload_off"], native["payload_len"], expected):
+        assert data[off:off + n] == payload
+
+
+def test_port_filter(tmp_path):
+    path = tmp_path / "cap.pcap"
+    _write(path, _packets(LINKS["ethernet"]), False)
+    packets = read_udp_packets(str(path), port=4002)
+    assert len(packets["ts"]) > 0
+    assert np.all((packets["sport"] == 4002) | (packets["dport"] == 4002))
@@ -0,0 +1,80 @@
+# tests/test_pyramid.py
+
+"""Pirámide de throughput frente a compute_throughput"""
+
+import numpy as np
+import pytest
+
+from analysis.metrics import compute_throughput
+from analysis.pyramid import ThroughputPyramid
+
+
+def _flow(n=20_000, seed=3):
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000 + np.cumsum(rng.exponential(0.002, n))
+    sizes = rng.integers(60, 1500, n)
+    return ts, sizes
+
+
+@pytest.mark.parametrize("window,step", [(1.0, None), (0.5, None), (2.0, 0.5), (1.0, 0.1)])
+def test_pyramid_matches_compute_throughput(window, step):
+    """Ventanas de la pirámide iguales a las de compute_throughput"""
+    ts, sizes = _flow()
+    ts = ts - ts[0] + 0.0003                # tiempos relativos, primer paquete fuera de la rejilla
+    lo_ref, thr_ref = compute_throughput(ts, sizes, window, step)
+
+    pyramid = ThroughputPyramid.from_packets(ts, sizes)
+    assert pyramid.matches_throughput(window, step)
+    lo, thr = pyramid.throughput(window, step)
+    assert len(lo) == len(lo_ref)
+    np.testing.assert_allclose(lo, lo_ref, rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(thr, thr_ref)
+
+
+def test_pyramid_incremental_equals_batch():
+    ts, sizes = _flow()
+    whole = ThroughputPyramid.from_packets(ts, sizes)
+    parts = ThroughputPyramid()
+    for chunk in np.array_split(np.arange(len(ts)), 7):
+        parts.update(ts[chunk], sizes[chunk])
+    for (_, b1, p1), (_, b2, p2) in zip(whole.levels, parts.levels):
+        np.testing.assert_array_equal(b1, b2)
+        np.testing.assert_array_equal(p1, p2)
+
+
+def test_epoch_windows_not_reproduced():
+    """Con tiempos epoch np.arange no avanza el paso pedido: la pirámide lo dice"""
+    ts, sizes = _flow()
+    pyramid = ThroughputPyramid.from_packets(ts, sizes)
+    assert not pyramid.matches_throughput(0.1)
+    assert not pyramid.matches_throughput(0.0015)      # no es múltiplo de 1 ms
+    lo_ref, _ = compute_throughput(ts, sizes, 0.1)
+    assert np.diff(lo_ref)[0] != 0.1
+
+
+@pytest.mark.parametrize("relative", [False, True])
+def test_draw_throughput_matches_compute_throughput(relative):
+    """Cada eje de analize1 muestra las ventanas de compute_throughput, epoch o no"""
+    pytest.importorskip("matplotlib")
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from analize1 import draw_throughput
+
+    ts, sizes = _flow(60_000)
+    if relative:
+        ts = ts - ts[0]
+    windows = (1.0, 0.1, 0.01)
+    pyramid = ThroughputPyramid.from_packets(ts, sizes)
+    assert pyramid.matches_throughput(0.1) == relative
+
+    fig, axes = plt.subplots(len(windows))
+    try:
+        draw_throughput(fig, axes, [pyramid], ["A"], windows, [(ts, sizes)])
+        for axis, window in zip(axes, windows):
+            t, mbps = axis.get_lines()[0].get_data()
+            lo_ref, thr_ref = compute_throughput(ts, sizes, window)
+            np.testing.assert_allclose(t, lo_ref, rtol=0, atol=1e-6)
+            np.testing.assert_allclose(mbps, thr_ref / 1e6, rtol=1e-12)
+    finally:
+        plt.close(fig)
@@ -0,0 +1,26 @@
+# tests/test_synth.py
+
+"""Capturas sintéticas: lectura del par generado"""
+
+import numpy as np
+
+from analysis.pcap_reader import read_udp_packets
+from analysis.synth import CHUNK, RECEIVER, SENDER, generate_pair
+
+
+def test_pair_round_trip(tmp_path):
+    """Todos los paquetes de ambos lados con las IP y el puerto configurados"""
+    prefix = str(tmp_path / "pair")
+    truth = generate_pair(prefix, packets=CHUNK + 5_000, port=39400,
+                          loss=0.01, jitter=0.002, reorder=True)
+
+    a = read_udp_packets(f"{prefix}_A.pcap")
+    b = read_udp_packets(f"{prefix}_B.pcap")
+    assert len(a["ts"]) == truth["sent"]
+    assert len(b["ts"]) == truth["received"] > CHUNK
+    for packets in (a, b):
+        assert np.all(packets["src"] == SENDER[0])
+        assert np.all(packets["dst"] == RECEIVER[0])
+        assert np.all(packets["sport"] == 39400)
+        assert np.all(packets["dport"] == 39400)
+        assert np.all(packets["payload_len"] == 7 * 188)
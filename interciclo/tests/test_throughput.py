@@ -0,0 +1,96 @@
+# tests/test_throughput.py
+
+"""Throughput vectorizado frente a los bucles originales y rejilla de analyze.py"""
+
+import numpy as np
+import pytest
+
+from analysis.metrics import compute_throughput
+from analysis.synth import DEFAULTS, generate_pair
+
+
+def _flow(n=20_000, seed=3):
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000 + np.cumsum(rng.exponential(0.002, n))
+    sizes = rng.integers(60, 1500, n)
+    return ts, sizes
+
+
+def _throughput_loop(ts, sizes, window=1.0):
+    """Versión original de analyze2.py: una máscara por ventana"""
+    bins = np.arange(ts[0], ts[-1], window)
+    throughput = []
+    for i in range(len(bins) - 1):
+        mask = (ts >= bins[i]) & (ts < bins[i + 1])
+        throughput.append(sizes[mask].sum() * 8 / window)
+    return bins[:-1], np.array(throughput)
+
+
+def _sliding_loop(ts, sizes, window, step):
+    lo = np.arange(ts[0], ts[-1], step)
+    lo = lo[lo + window <= ts[-1]]
+    return lo, np.array([sizes[(ts >= t) & (ts < t + window)].sum() * 8 / window for t in lo])
+
+
+@pytest.mark.parametrize("window", [0.1, 1.0, 2.5])
+def test_throughput_matches_loop(window):
+    ts, sizes = _flow()
+    lo, thr = compute_throughput(ts, sizes, window)
+    lo_ref, thr_ref = _throughput_loop(ts, sizes, window)
+    np.testing.assert_array_equal(lo, lo_ref)
+    np.testing.assert_array_equal(thr, thr_ref)
+
+
+def test_throughput_sliding_and_unsorted():
+    ts, sizes = _flow()
+    lo, thr = compute_throughput(ts, sizes, 1.0, step=0.25)
+    lo_ref, thr_ref = _sliding_loop(ts, sizes, 1.0, 0.25)
+    np.testing.assert_array_equal(lo, lo_ref)
+    np.testing.assert_array_equal(thr, thr_ref)
+
+    perm = np.random.default_rng(0).permutation(len(ts))
+    lo_perm, thr_perm = compute_throughput(ts[perm], sizes[perm], 1.0)
+    lo_ref, thr_ref = _throughput_loop(ts, sizes, 1.0)
+    np.testing.assert_array_equal(lo_perm, lo_ref)
+    np.testing.assert_array_equal(thr_perm, thr_ref)
+
+
+def test_throughput_empty():
+    lo, thr = compute_throughput([], [])
+    assert len(lo) == 0 and len(thr) == 0
+
+
+def _seconds_loop(ts, sizes):
+    """Versión original de analyze.py: bits por segundo entero del reloj, int(ts)"""
+    throughput = {}
+    for t, size in zip(ts.tolist(), sizes.tolist()):
+        throughput[int(t)] = throughput.get(int(t), 0) + size * 8
+    times = sorted(throughput)
+    return np.array(times, dtype=np.float64), np.array([throughput[t] for t in times])
+
+
+def test_analyze_grid_is_anchored_at_first_packet(tmp_path):
+    """
+    analyze.py usa la rejilla común: ventanas de 1 s desde el primer paquete,
+    segundos sin tráfico a 0 y sin la última ventana incompleta
+    """
+    from analyze import extract_flows
+
+    truth = generate_pair(str(tmp_path / "pair"), packets=5000, loss=0.01)
+    ts, sizes, _ = extract_flows(truth["files"][1], DEFAULTS["port"])   # B empieza a mitad de segundo
+    lo, thr = compute_throughput(ts, sizes)
+    assert lo[0] == ts[0] and ts[0] != int(ts[0])
+    np.testing.assert_allclose(np.diff(lo), 1.0, rtol=0, atol=1e-6)
+    assert lo[-1] + 1.0 <= ts[-1] < lo[-1] + 2.0
+    assert thr.sum() == sizes[ts < lo[-1] + 1.0].sum() * 8
+
+    # Con un silencio de 3 s las ventanas vacías siguen en la serie
+    gap = np.concatenate([ts, ts[-1] + 3.0 + (ts - ts[0])])
+    lo_gap, thr_gap = compute_throughput(gap, np.concatenate([sizes, sizes]))
+    np.testing.assert_allclose(np.diff(lo_gap), 1.0, rtol=0, atol=1e-6)
+    assert np.count_nonzero(thr_gap == 0) >= 2
+
+    # La versión por segundos enteros daba otra rejilla (y otros valores)
+    t_old, thr_old = _seconds_loop(ts, sizes)
+    assert t_old[0] == int(ts[0]) != lo[0]
+    assert thr_old.sum() == sizes.sum() * 8
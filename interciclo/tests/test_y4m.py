@@ -0,0 +1,113 @@
+# tests/test_y4m.py
+
+"""PSNR por frame de psnr_frames frente a NumPy plano sobre videos pequeños"""
+
+import numpy as np
+import pytest
+
+from analysis.y4m import Y4MVideo, psnr_frames
+
+
+def _write_y4m(path, frames, width, height, colorspace="420jpeg", frame_params=None):
+    """frames: lista de (Y, U, V); frame_params: texto opcional tras FRAME por frame"""
+    with open(path, "wb") as f:
+        f.write(f"YUV4MPEG2 W{width} H{height} F30:1 Ip A1:1 C{colorspace}\n".encode())
+        for i, planes in enumerate(frames):
+            extra = frame_params[i] if frame_params else ""
+            f.write(b"FRAME" + extra.encode() + b"\n")
+            for plane in planes:
+                f.write(np.ascontiguousarray(plane).astype(plane.dtype.newbyteorder("<")).tobytes())
+
+
+def _frames(n, width, height, depth=8, seed=0):
+    rng = np.random.default_rng(seed)
+    dtype = np.uint8 if depth <= 8 else np.uint16
+    top = (1 << depth) - 1
+    cw, ch = -(-width // 2), -(-height // 2)
+    out = []
+    for _ in range(n):
+        planes = []
+        for h, w in ((height, width), (ch, cw), (ch, cw)):
+            planes.append(rng.integers(0, top + 1, (h, w)).astype(dtype))
+        out.append(planes)
+    return out
+
+
+def _distort(frames, depth, seed=1):
+    rng = np.random.default_rng(seed)
+    top = (1 << depth) - 1
+    return [[np.clip(p.astype(np.int64) + rng.integers(-6, 7, p.shape), 0, top).astype(p.dtype)
+             for p in planes] for planes in frames]
+
+
+def _reference(ref, dist, depth):
+    """PSNR por frame y plano, repitiendo el último frame del video más corto"""
+    n = max(len(ref), len(dist))
+    top = (1 << depth) - 1
+    psnr = np.empty((n, 3))
+    for i in range(n):
+        a, b = ref[min(i, len(ref) - 1)], dist[min(i, len(dist) - 1)]
+        for k in range(3):
+            mse = np.mean((a[k].astype(np.float64) - b[k].astype(np.float64)) ** 2)
+            psnr[i, k] = np.inf if mse == 0 else 10 * np.log10(top ** 2 / mse)
+    return psnr
+
+
+@pytest.mark.parametrize("depth", [8, 10])
+@pytest.mark.parametrize("width,height", [(32, 16), (33, 17)])
+def test_psnr_matches_numpy(tmp_path, depth, width, height):
+    colorspace = "420jpeg" if depth == 8 else f"420p{depth}"
+    ref = _frames(7, width, height, depth)
+    dist = _distort(ref, depth)
+    _write_y4m(tmp_path / "ref.y4m", ref, width, height, colorspace)
+    _write_y4m(tmp_path / "dist.y4m", dist, width, height, colorspace)
+
+    res = psnr_frames(str(tmp_path / "ref.y4m"), str(tmp_path / "dist.y4m"), batch=3)
+    assert res["n"] == 7
+    np.testing.assert_allclose(res["psnr"], _reference(ref, dist, depth), rtol=1e-12)
+
+
+def test_repeats_last_frame(tmp_path):
+    """El video más corto repite su último frame, como el filtro psnr de ffmpeg"""
+    ref = _frames(6, 32, 16)
+    dist = _distort(ref[:4], 8)
+    dist[1] = ref[1]                          # frame idéntico: PSNR infinito
+    _write_y4m(tmp_path / "ref.y4m", ref, 32, 16)
+    _write_y4m(tmp_path / "dist.y4m", dist, 32, 16)
+
+    res = psnr_frames(str(tmp_path / "ref.y4m"), str(tmp_path / "dist.y4m"))
+    expected = _reference(ref, dist, 8)
+    assert res["n"] == 6
+    assert np.all(np.isinf(res["psnr"][1]))
+    np.testing.assert_allclose(res["psnr"], expected, rtol=1e-12)
+
+    # Con más frames en el distorsionado se repite el último del original
+    res = psnr_frames(str(tmp_path / "dist.y4m"), str(tmp_path / "ref.y4m"))
+    np.testing.assert_allclose(res["psnr"], _reference(dist, ref, 8), rtol=1e-12)
+
+
+def test_variable_frame_headers(tmp_path):
+    """Cabeceras FRAME de distinto largo: offsets frame a frame, mismos planos"""
+    frames = _frames(4, 32, 16)
+    _write_y4m(tmp_path / "var.y4m", frames, 32, 16,
+               frame_params=["", " Ixyz", "", " Ip"])
+    with Y4MVideo(str(tmp_path / "var.y4m")) as video:
+        assert len(video) == 4 and video.stride is None
+        for i, planes in enumerate(frames):
+            for got, want in zip(video.frame(i), planes):
+                np.testing.assert_array_equal(got, want)
+
+
+def test_jobs_and_format_mismatch(tmp_path):
+    """Repartir las tandas entre procesos no cambia el resultado"""
+    ref = _frames(9, 32, 16)
+    _write_y4m(tmp_path / "ref.y4m", ref, 32, 16)
+    _write_y4m(tmp_path / "dist.y4m", _distort(ref, 8), 32, 16)
+    one = psnr_frames(str(tmp_path / "ref.y4m"), str(tmp_path / "dist.y4m"), batch=2)
+    two = psnr_frames(str(tmp_path / "ref.y4m"), str(tmp_path / "dist.y4m"), jobs=2, batch=2)
+    for name in ("sse", "psnr", "psnr_avg"):
+        np.testing.assert_array_equal(one[name], two[name], err_msg=name)
+
+    _write_y4m(tmp_path / "small.y4m", _frames(2, 16, 16), 16, 16)
+    with pytest.raises(ValueError, match="formato"):
+        psnr_frames(str(tmp_path / "ref.y4m"), str(tmp_path / "small.y4m"))
@@ -3,7 +3,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import re
-from math import sqrt
+
+# Motor de intervalos de confianza del paquete analysis de interciclo (requirements.txt)
+from analysis.ci import batch_ci, error_bars
 
 # ====================
 # CONFIGURACIONES
@@ -11,7 +13,8 @@ from math import sqrt
 
 CARPETA_BASE = "./res"   # carpeta que contiene subcarpetas (cada una = una repetición)
 PAQUETES_ENVIADOS = 2000        # según tu experimento
-Z_90 = 1.645                     # valor Z para intervalo de confianza del 90%
+CONFIANZA = 0.90                # intervalo de confianza del 90%
+METODO_IC = "normal"            # "normal" (valor Z), "t", "bootstrap" o "block"
 
 # ====================
 # FUNCIONES
@@ -72,33 +75,17 @@ for carpeta in subcarpetas:
 
 distancias = sorted(datos_distancias.keys())
 
-medias_paquetes = []
-ic_paquetes = []
-
-medias_porcentaje = []
-ic_porcentaje = []
-
-for d in distancias:
-    muestras = np.array(datos_distancias[d])
-    n = len(muestras)
-
-    media = np.mean(muestras)
-    std = np.std(muestras, ddof=1)
-
-    # Intervalo de confianza 90%
-    margen = Z_90 * (std / sqrt(n))
-
-    # Guardar resultados paquetes
-    medias_paquetes.append(media)
-    ic_paquetes.append(margen)
+# Intervalos de todas las distancias en una sola llamada
+ic = batch_ci([datos_distancias[d] for d in distancias], method=METODO_IC, confidence=CONFIANZA)
 
-    # Convertir a porcentaje
-    porcentaje = (media / PAQUETES_ENVIADOS) * 100
-    margen_pct = (margen / PAQUETES_ENVIADOS) * 100
+medias_paquetes = ic["mean"]
+ic_paquetes = ic["half"]
 
-    medias_porcentaje.append(porcentaje)
-    ic_porcentaje.append(margen_pct)
+# Convertir a porcentaje
+medias_porcentaje = medias_paquetes / PAQUETES_ENVIADOS * 100
+ic_porcentaje = error_bars(ic) / PAQUETES_ENVIADOS * 100
 
+for d, media, margen in zip(distancias, medias_paquetes, ic_paquetes):
     print(f"Distancia {d}m → media={media:.1f}, IC90=±{margen:.1f} paquetes")
 
 
@@ -107,7 +94,7 @@ for d in distancias:
 # ====================
 
 plt.figure(figsize=(9, 5))
-plt.errorbar(distancias[:-1], medias_porcentaje[:-1], yerr=ic_porcentaje[:-1],
+plt.errorbar(distancias[:-1], medias_porcentaje[:-1], yerr=ic_porcentaje[:, :-1],
              fmt="o-", capsize=5, linewidth=2)
 
 plt.xlabel("Distancia [m]")